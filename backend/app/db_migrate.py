@@ -0,0 +1,42 @@
+"""
+起動時のスキーマ作成・パーティション管理（1回だけ実行する）
+
+    python -m app.db_migrate
+
+本番（start_server.py）ではワーカープロセスを起動する前に親プロセスで1回実行する
+開発（uvicorn app.main:app --reload）では DB_MIGRATE_ON_STARTUP=true の場合にWebプロセスの起動時に実行する
+複数のサーバーが同時に起動しても、Postgresのアドバイザリロックで1つずつ実行される
+"""
+import sys
+from sqlalchemy import text
+from .database import engine, Base
+from . import models  # すべてのモデルを登録
+from .services.partition_service import PartitionService
+from .services.single_flight import SingleFlight
+
+MIGRATE_LOCK_KEY = "db_migrate"
+
+def migrate() -> bool:
+    """テーブルの作成（存在しないもののみ）とcampaignsの月次パーティションの管理"""
+    print("[DB Migrate] Creating tables (if they don't exist)...")
+    lock_conn = None
+    try:
+        if engine.dialect.name == "postgresql":
+            lock_conn = engine.connect()
+            lock_conn.execute(text("SELECT pg_advisory_lock(:lock_id)"), {"lock_id": SingleFlight.lock_id(MIGRATE_LOCK_KEY)})
+        Base.metadata.create_all(bind=engine)
+        PartitionService.run_maintenance()
+        print("[DB Migrate] ✅ Completed")
+        return True
+    except Exception as e:
+        print(f"[DB Migrate] ❌ Failed: {str(e)}")
+        return False
+    finally:
+        if lock_conn is not None:
+            try:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": SingleFlight.lock_id(MIGRATE_LOCK_KEY)})
+            finally:
+                lock_conn.close()
+
+if __name__ == "__main__":
+    sys.exit(0 if migrate() else 1)
@@ -4,21 +4,21 @@ from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from .config import settings
-from .database import engine, Base
 from .routers import auth
 from .routers import users
 from .routers import uploads
 from .routers import campaigns
 from .routers import analysis
 from .routers import notifications
+from .routers import jobs
+from .routers import reports
 # from .routers import teams  # Temporarily disabled
 from .middleware.security import RateLimitMiddleware, SecurityHeadersMiddleware
 # Import all models to ensure they are registered with Base
 from . import models  # This will import all models via models/__init__.py
 import traceback
 
-# Create database tables (if they don't exist)
-Base.metadata.create_all(bind=engine)
+# テーブルの作成はインポート時には行わない（本番は start_server.py / python -m app.db_migrate で1回だけ実行）
 
 app = FastAPI(
     title="Meta Ad Analyzer AI API",
@@ -64,39 +64,11 @@ async def global_exception_handler(request: Request, exc: Exception):
         headers=headers
     )
 
-# Custom middleware to fix HTTPS redirects (must be added first)
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import RedirectResponse
-
-class HTTPSRedirectMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        
-        # Fix HTTP redirects to HTTPS (but NOT for localhost/127.0.0.1)
-        # Check for redirect status codes
-        if hasattr(response, 'status_code') and response.status_code in [301, 302, 307, 308]:
-            location = response.headers.get("location", "")
-            if location and location.startswith("http://"):
-                # localhostや127.0.0.1の場合は変換しない（ローカル開発環境はHTTPで起動しているため）
-                if "localhost" not in location and "127.0.0.1" not in location:
-                    # Replace http:// with https://
-                    location = location.replace("http://", "https://", 1)
-                    response.headers["location"] = location
-        # Also handle RedirectResponse objects directly
-        elif isinstance(response, RedirectResponse):
-            location = response.headers.get("location", "")
-            if location and location.startswith("http://"):
-                # localhostや127.0.0.1の場合は変換しない（ローカル開発環境はHTTPで起動しているため）
-                if "localhost" not in location and "127.0.0.1" not in location:
-                    location = location.replace("http://", "https://", 1)
-                    response.headers["location"] = location
-        
-        return response
-
 # Security middleware (must be added before CORS)
-app.add_middleware(HTTPSRedirectMiddleware)
+# 純粋なASGIミドルウェア（BaseHTTPMiddlewareのようにレスポンスを包み直さず、ヘッダーのみを書き換える）
 app.add_middleware(SecurityHeadersMiddleware)
-app.add_middleware(RateLimitMiddleware, calls=settings.rate_limit_calls, period=60)
+# ログインエンドポイントのみレート制限を適用（それ以外のリクエストはそのまま通す）
+app.add_middleware(RateLimitMiddleware, calls=settings.rate_limit_calls, period=60, paths=[("POST", "/api/auth/login")])
 
 # CORS middleware (must be added last to ensure CORS headers are not overwritten)
 app.add_middleware(
@@ -107,11 +79,70 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 開発用: テーブルの作成とcampaignsテーブルの月次パーティション管理（将来分の作成 + 保持期間の適用）
+# 本番の複数ワーカー構成では start_server.py がワーカー起動前に1回だけ実行し、各ワーカーでは実行しない
+@app.on_event("startup")
+async def migrate_on_startup():
+    if settings.DB_MIGRATE_ON_STARTUP:
+        from .db_migrate import migrate
+        migrate()
+
+# ワーカーがリクエストを受け付ける前に重いライブラリの読み込みとDB接続を済ませる（WARMUP_ON_STARTUP=true の場合）
+@app.on_event("startup")
+async def warm_up_worker():
+    if settings.WARMUP_ON_STARTUP:
+        from starlette.concurrency import run_in_threadpool
+        from .utils.warmup import warm_up
+        await run_in_threadpool(warm_up)
+
+# 開発用: Webプロセス内でジョブワーカーを起動（本番は python -m app.worker を別プロセスで起動）
+@app.on_event("startup")
+async def start_in_process_worker():
+    if settings.JOBS_RUN_IN_PROCESS:
+        import asyncio
+        from .worker import Worker
+        app.state.job_worker = Worker()
+        app.state.job_worker_task = asyncio.create_task(app.state.job_worker.run())
+
+# 停止時: Webプロセス内のワーカーは新しいジョブの取得をやめ、実行中のジョブ（同期など）の終了を待つ
+@app.on_event("shutdown")
+async def stop_in_process_worker():
+    if getattr(app.state, "job_worker", None) is not None:
+        import asyncio
+        app.state.job_worker.stop()
+        try:
+            await asyncio.wait_for(app.state.job_worker_task, timeout=settings.SHUTDOWN_GRACE_SECONDS)
+        except asyncio.TimeoutError:
+            print(f"[Worker] ⚠️ Running jobs did not finish within {settings.SHUTDOWN_GRACE_SECONDS}s, they will be requeued as stale")
+
+# 他のプロセスでのユーザーの更新を認証キャッシュに反映（Postgres の LISTEN）
+@app.on_event("startup")
+async def start_auth_invalidation_listener():
+    from .utils.auth_cache import AuthInvalidationListener
+    AuthInvalidationListener.start()
+
+@app.on_event("shutdown")
+async def stop_auth_invalidation_listener():
+    from .utils.auth_cache import AuthInvalidationListener
+    AuthInvalidationListener.stop()
+
+# bcrypt用のプロセスプールを終了
+@app.on_event("shutdown")
+async def shutdown_password_hasher():
+    from .utils.security import PasswordHasher
+    PasswordHasher.shutdown()
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
 
+# パスワードハッシュのキューの状況（待ち件数・処理時間・拒否数）
+@app.get("/health/password-hashing")
+async def password_hashing_metrics():
+    from .utils.security import PasswordHasher
+    return PasswordHasher.metrics()
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
@@ -119,6 +150,8 @@ app.include_router(uploads.router, prefix="/api/uploads", tags=["uploads"])
 app.include_router(campaigns.router, prefix="/api/campaigns", tags=["campaigns"])
 app.include_router(analysis.router, prefix="/api/analysis", tags=["analysis"])
 app.include_router(notifications.router, prefix="/api/notifications", tags=["notifications"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
+app.include_router(reports.router, prefix="/api/reports", tags=["reports"])
 
 # Meta API router
 from .routers import meta_api
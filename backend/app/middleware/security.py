@@ -1,152 +1,100 @@
-from fastapi import Request
-from fastapi.responses import JSONResponse, RedirectResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from time import time
-from collections import defaultdict
-
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, calls: int = 60, period: int = 60):
-        super().__init__(app)
-        self.calls = calls
-        self.period = period
-        self.cache = defaultdict(list)
-    
-    async def dispatch(self, request: Request, call_next):
-        # Skip rate limiting for health checks, docs, and OPTIONS requests (CORS preflight)
-        if request.url.path in ["/health", "/docs", "/openapi.json", "/redoc"] or request.method == "OPTIONS":
-            return await call_next(request)
-        
-        # ログインエンドポイントのみレート制限を適用
-        is_login_endpoint = request.url.path == "/api/auth/login" and request.method == "POST"
-        
-        if not is_login_endpoint:
-            # ログイン以外のエンドポイントはレート制限を適用しない
-            return await call_next(request)
-        
-        # Get client IP
-        client_ip = request.client.host
-        
-        # Clean old entries
-        now = time()
-        self.cache[client_ip] = [
-            timestamp for timestamp in self.cache[client_ip]
-            if now - timestamp < self.period
-        ]
-        
-        # Check rate limit (ログインエンドポイントのみ)
-        if len(self.cache[client_ip]) >= self.calls:
-            return JSONResponse(
+from fastapi.responses import JSONResponse
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Iterable, Optional, Tuple
+from ..utils.rate_limiter import RateLimiter
+
+# ASGIミドルウェア（BaseHTTPMiddlewareは使わない）
+# BaseHTTPMiddlewareはリクエストごとにタスクとストリームでレスポンスを包み直すため、全リクエストにオーバーヘッドがかかる
+# ここではレスポンスヘッダーを http.response.start メッセージの段階で書き換えるだけにする
+
+REDIRECT_STATUS_CODES = {301, 302, 307, 308}
+
+# (ヘッダー名, 値) 既存のヘッダーは上書きしない
+SECURITY_HEADERS = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+]
+
+def to_https_location(location: str) -> Optional[str]:
+    """http:// のリダイレクト先を https:// に変換（localhost・127.0.0.1はローカル開発環境のためHTTPのまま）"""
+    if location.startswith("http://") and "localhost" not in location and "127.0.0.1" not in location:
+        return location.replace("http://", "https://", 1)
+    return None
+
+class SecurityHeadersMiddleware:
+    """
+    セキュリティヘッダーの付与と、リダイレクト先のHTTPS化
+    - リダイレクト（301/302/307/308）の http:// の Location を https:// に変換
+      （FastAPI/Starletteの末尾スラッシュのリダイレクトなど。localhost・127.0.0.1は除く）
+    - CORSヘッダーがないレスポンスに、未設定のセキュリティヘッダーを追加
+    ヘッダーの走査はレスポンスごとに1回のみ
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                raw_headers = message.setdefault("headers", [])
+                names = {name.lower() for name, _ in raw_headers}
+                if message["status"] in REDIRECT_STATUS_CODES and b"location" in names:
+                    headers = MutableHeaders(scope=message)
+                    https_location = to_https_location(headers.get("location", ""))
+                    if https_location:
+                        headers["location"] = https_location
+                    raw_headers = message["headers"]  # MutableHeadersはヘッダーのリストを作り直すため
+                # CORSヘッダーがある場合はヘッダーを変更しない（CORSミドルウェアの設定を妨げないため）
+                if not any(name.startswith(b"access-control-") for name in names):
+                    for name, value in SECURITY_HEADERS:
+                        if name not in names:
+                            raw_headers.append((name, value))
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+class RateLimitMiddleware:
+    """
+    指定したパス（メソッド, パス）のみに適用するIPごとのレート制限（period秒あたりcalls回まで）
+    対象外のリクエストは判定を1回行うだけでそのまま通す
+    回数は RateLimiter（Redis、なければ同じサーバーの全ワーカーで共有するメモリ）で管理する
+    """
+    def __init__(
+        self,
+        app: ASGIApp,
+        calls: int = 60,
+        period: int = 60,
+        paths: Iterable[Tuple[str, str]] = (("POST", "/api/auth/login"),),
+        message: str = "短時間に複数回のログインを確認しました。１分ほどお時間をあけてから再度ログインをお試しください。",
+        namespace: str = "login"
+    ):
+        self.app = app
+        self.paths = {(method.upper(), path) for method, path in paths}
+        self.message = message
+        self.limiter = RateLimiter(calls, period, namespace)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+
+        allowed, retry_after = await self.limiter.hit(client_ip)
+        if not allowed:
+            response = JSONResponse(
                 status_code=429,
-                content={"detail": "短時間に複数回のログインを確認しました。１分ほどお時間をあけてから再度ログインをお試しください。"}
+                content={"detail": self.message},
+                headers={"Retry-After": str(retry_after)}
             )
-        
-        # Add current request
-        self.cache[client_ip].append(now)
-        
-        response = await call_next(request)
-        return response
-
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        
-        # If response is a redirect (307), ensure it uses HTTPS
-        # This handles cases where FastAPI or Starlette redirects to trailing slash
-        # BUT NOT for localhost/127.0.0.1 (local development uses HTTP)
-        if hasattr(response, 'status_code') and response.status_code in [301, 302, 307, 308]:
-            location = response.headers.get("location", "")
-            if location and location.startswith("http://"):
-                # localhostや127.0.0.1の場合は変換しない（ローカル開発環境はHTTPで起動しているため）
-                if "localhost" not in location and "127.0.0.1" not in location:
-                    # Replace http:// with https://
-                    location = location.replace("http://", "https://", 1)
-                    response.headers["location"] = location
-        
-        # Check if CORS headers are present - if so, don't modify headers at all
-        has_cors_headers = any(
-            header.lower().startswith('access-control-') 
-            for header in response.headers.keys()
-        )
-        
-        # Only add security headers if CORS headers are not present
-        # This ensures CORS middleware can set headers without interference
-        if not has_cors_headers:
-            if "X-Content-Type-Options" not in response.headers:
-                response.headers["X-Content-Type-Options"] = "nosniff"
-            if "X-Frame-Options" not in response.headers:
-                response.headers["X-Frame-Options"] = "DENY"
-            if "X-XSS-Protection" not in response.headers:
-                response.headers["X-XSS-Protection"] = "1; mode=block"
-            if "Strict-Transport-Security" not in response.headers:
-                response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        
-        return response
-
-        
-        return response
-
-        
-        return response
-
-        
-        return response
-
-        
-        return response
-
-        
-        return response
-
-        
-        return response
-
-        
-        return response
-
-        
-        return response
-
-        
-        return response
-
-        
-        return response
-
-        
-        return response
-
-        
-        return response
-
-        
-        return response
-
-        
-        return response
-
-        
-        return response
-
-        
-        return response
-
-        
-        return response
-
-        
-        return response
-
-        
-        return response
-
-        
-        return response
-
-        
-        return response
-
-        
-        return response
+            await response(scope, receive, send)
+            return
 
-        
-        return response
+        await self.app(scope, receive, send)
@@ -7,3 +7,8 @@ from . import email_verification
 from . import login_verification
 from . import password_reset
 
+from . import period_reach
+from . import dimension
+from . import sync_run
+from . import job
+from . import report_artifact
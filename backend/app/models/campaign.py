@@ -1,8 +1,10 @@
-from sqlalchemy import Column, String, Integer, Numeric, Date, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, Numeric, Date, DateTime, ForeignKey, Index, select
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import column_property
 from datetime import datetime
 import uuid
 from ..database import Base
+from .dimension import AdCampaign, AdSet, Ad
 
 class Upload(Base):
     __tablename__ = "uploads"
@@ -22,26 +24,40 @@ class Upload(Base):
 
 class Campaign(Base):
     __tablename__ = "campaigns"
+    # 日付の月単位でパーティション分割（パーティションは PartitionService で作成・削除）
+    # パーティションキーを含める必要があるため、主キーは (id, date)
+    __table_args__ = (
+        Index("ix_campaigns_user_date", "user_id", "date"),
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     upload_id = Column(UUID(as_uuid=True), ForeignKey("uploads.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     meta_account_id = Column(String(255), nullable=True)  # Meta広告アカウントID (例: act_123456789)
-    date = Column(Date, nullable=False)
-    campaign_name = Column(String(255), nullable=False)
-    ad_set_name = Column(String(255), nullable=True)
-    ad_name = Column(String(255), nullable=True)
+    # ディメンションテーブルへの整数キー（集計・GROUP BYはこちらを使用）
+    # 名前はカラムに持たず、ディメンションテーブルから参照する（adset_keyがNULLはキャンペーン単位、ad_keyがNULLは広告以外の行）
+    account_key = Column(Integer, ForeignKey("ad_accounts.id"), nullable=False, index=True)
+    campaign_key = Column(Integer, ForeignKey("ad_campaigns.id"), nullable=False, index=True)
+    adset_key = Column(Integer, ForeignKey("ad_sets.id"), nullable=True)
+    ad_key = Column(Integer, ForeignKey("ads.id"), nullable=True)
+    date = Column(Date, primary_key=True, nullable=False)
+    # 読み取り専用の名前（ディメンションのスカラーサブクエリ）。一覧で多数の行を読む場合は aggregate_by_campaign などのJOINを使う
+    campaign_name = column_property(
+        select(AdCampaign.name).where(AdCampaign.id == campaign_key).correlate_except(AdCampaign).scalar_subquery()
+    )
+    ad_set_name = column_property(
+        select(AdSet.name).where(AdSet.id == adset_key).correlate_except(AdSet).scalar_subquery()
+    )
+    ad_name = column_property(
+        select(Ad.name).where(Ad.id == ad_key).correlate_except(Ad).scalar_subquery()
+    )
     cost = Column(Numeric(10, 2), default=0)
     impressions = Column(Integer, default=0)
     clicks = Column(Integer, default=0)
     conversions = Column(Integer, default=0)
     conversion_value = Column(Numeric(10, 2), default=0)
-    reach = Column(Integer, default=0)  # 日次のリーチ数
-    period_unique_reach = Column(Integer, default=0)  # 全期間のユニークリーチ数（後方互換性のため残す）
-    # 期間別のユニークリーチ数（マイグレーション実行後に有効化）
-    period_unique_reach_7days = Column(Integer, default=0, nullable=True)  # 7日間のユニークリーチ数
-    period_unique_reach_30days = Column(Integer, default=0, nullable=True)  # 30日間のユニークリーチ数
-    period_unique_reach_all = Column(Integer, default=0, nullable=True)  # 全期間のユニークリーチ数
+    reach = Column(Integer, default=0)  # 日次のリーチ数（期間のユニークリーチは period_reach テーブルで管理）
     engagements = Column(Integer, default=0)
     link_clicks = Column(Integer, default=0)
     landing_page_views = Column(Integer, default=0)
@@ -51,6 +67,7 @@ class Campaign(Base):
     cpa = Column(Numeric(10, 2), default=0)
     cvr = Column(Numeric(10, 2), default=0)
     roas = Column(Numeric(10, 2), default=0)
+    row_hash = Column(String(32), nullable=True)  # 指標値のハッシュ（Meta同期時の差分検出用）
     created_at = Column(DateTime, default=datetime.utcnow)
     created_at = Column(DateTime, default=datetime.utcnow)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,80 @@
+from sqlalchemy import Column, String, Integer, Float, Boolean, Date, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+from ..database import Base
+
+# ディメンションテーブル（アカウント/キャンペーン/広告セット/広告）
+# source_key: Meta APIデータはMetaのオブジェクトID、CSVデータは "name:<正規化名>" のサロゲートキー
+# campaignsテーブル（日次のファクト）は整数キーでこれらを参照する
+
+class AdAccount(Base):
+    __tablename__ = "ad_accounts"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    source_key = Column(String(255), nullable=False)  # Meta広告アカウントID（act_...）または "csv"
+    meta_account_id = Column(String(255), nullable=True)  # CSVデータの場合はNULL
+    name = Column(String(255), nullable=True)
+    # Meta広告アカウントのメタデータ（Meta APIから取得してキャッシュ、AD_ACCOUNT_METADATA_TTL_HOURSごとに再取得）
+    timezone_name = Column(String(64), nullable=True)  # 例: Asia/Tokyo
+    timezone_offset_hours = Column(Float, nullable=True)  # 例: 9.0
+    currency = Column(String(8), nullable=True)  # 例: JPY
+    account_status = Column(Integer, nullable=True)  # Metaのaccount_status（1: ACTIVE, 2: DISABLED など）
+    is_accessible = Column(Boolean, nullable=False, default=True)  # 現在のアクセストークンで参照できるか
+    metadata_refreshed_at = Column(DateTime, nullable=True)
+    # campaignsのデータ件数（同期・削除のたびに更新）
+    data_count = Column(Integer, nullable=True)
+    campaign_count = Column(Integer, nullable=True)
+    latest_date = Column(Date, nullable=True)
+    stats_refreshed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint("user_id", "source_key", name="uq_ad_accounts_user_source"),
+    )
+
+class AdCampaign(Base):
+    __tablename__ = "ad_campaigns"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    account_key = Column(Integer, ForeignKey("ad_accounts.id", ondelete="CASCADE"), nullable=False, index=True)
+    source_key = Column(String(255), nullable=False)  # MetaキャンペーンID または "name:<正規化名>"
+    meta_campaign_id = Column(String(64), nullable=True)
+    name = Column(String(255), nullable=False)  # 最新の名前（Ads Managerでの名前変更に追従）
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint("account_key", "source_key", name="uq_ad_campaigns_account_source"),
+    )
+
+class AdSet(Base):
+    __tablename__ = "ad_sets"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    campaign_key = Column(Integer, ForeignKey("ad_campaigns.id", ondelete="CASCADE"), nullable=False, index=True)
+    source_key = Column(String(255), nullable=False)  # Meta広告セットID または "name:<正規化名>"
+    meta_adset_id = Column(String(64), nullable=True)
+    name = Column(String(255), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint("campaign_key", "source_key", name="uq_ad_sets_campaign_source"),
+    )
+
+class Ad(Base):
+    __tablename__ = "ads"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    adset_key = Column(Integer, ForeignKey("ad_sets.id", ondelete="CASCADE"), nullable=False, index=True)
+    source_key = Column(String(255), nullable=False)  # Meta広告ID または "name:<正規化名>"
+    meta_ad_id = Column(String(64), nullable=True)
+    name = Column(String(255), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint("adset_key", "source_key", name="uq_ads_adset_source"),
+    )
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, JSON, Index
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+import uuid
+from ..database import Base
+
+class Job(Base):
+    """
+    バックグラウンドジョブ（Postgresをキューとして使用し、ワーカープロセス python -m app.worker が実行）
+    job_type: meta_sync, analysis, upload, report
+    """
+    __tablename__ = "jobs"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=True, index=True)
+    job_type = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    priority = Column(Integer, default=100, nullable=False)  # 数値が小さいほど優先
+    status = Column(String(20), default="queued", nullable=False)  # queued, running, completed, failed, cancelled
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+    result = Column(JSON, nullable=True)
+    error_message = Column(Text, nullable=True)
+    locked_by = Column(String(255), nullable=True)  # 実行中のワーカーID
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False)  # リトライ時のバックオフ
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_jobs_dequeue", "status", "priority", "run_after"),
+    )
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, String, Integer, Date, DateTime, ForeignKey, UniqueConstraint, Index
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+import uuid
+from ..database import Base
+
+class PeriodReach(Base):
+    """
+    期間別ユニークリーチのキャッシュ
+    ユニークリーチは日次データの合計では求められないため、
+    (アカウント, レベル, 対象, 期間) ごとにMeta APIの集計値を保存する
+    """
+    __tablename__ = "period_reach"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    meta_account_id = Column(String(255), nullable=False)  # act_ プレフィックス付き
+    level = Column(String(20), nullable=False)  # account, campaign, adset, ad
+    object_key = Column(String(255), nullable=False)  # 正規化済みの名前（accountレベルは "__account__"）
+    since = Column(Date, nullable=False)
+    until = Column(Date, nullable=False)
+    reach = Column(Integer, default=0, nullable=False)
+    fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    
+    __table_args__ = (
+        UniqueConstraint("user_id", "meta_account_id", "level", "object_key", "since", "until", name="uq_period_reach_key"),
+        Index("ix_period_reach_lookup", "user_id", "meta_account_id", "level", "since", "until"),
+    )
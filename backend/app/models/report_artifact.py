@@ -0,0 +1,27 @@
+from sqlalchemy import Column, String, Integer, DateTime, LargeBinary, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+import uuid
+from ..database import Base
+
+class ReportArtifact(Base):
+    """
+    生成済みのレポート（PDF・Excel・CSV）のキャッシュ
+    cache_key: レポート種別 + 分析ID/期間 + データのバージョンのハッシュ（データが変わると別のキーになる）
+    reportジョブ（ワーカー）が生成して保存し、同じキーのダウンロードはここから直接返す
+    """
+    __tablename__ = "report_artifacts"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    cache_key = Column(String(64), nullable=False, unique=True)
+    report_type = Column(String(20), nullable=False)  # pdf, excel, csv
+    filename = Column(String(255), nullable=False)
+    content_type = Column(String(100), nullable=False)
+    content = Column(LargeBinary, nullable=False)
+    size_bytes = Column(Integer, nullable=False, default=0)
+    render_ms = Column(Integer, nullable=True)  # 生成にかかった時間
+    download_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_accessed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,59 @@
+from sqlalchemy import Column, String, Integer, Boolean, Date, DateTime, Text, ForeignKey, JSON, UniqueConstraint, Index
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+import uuid
+from ..database import Base
+
+class SyncRun(Base):
+    """
+    Meta同期の1回分の実行
+    同じ (アカウント, 取得日数の指定) の再実行は、失敗した実行のチェックポイントとステージングテーブルから再開する
+    """
+    __tablename__ = "sync_runs"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    meta_account_id = Column(String(255), nullable=False)  # act_ プレフィックス付き
+    requested_days = Column(Integer, nullable=True)  # 同期の指定（取得日数）。NULLは全期間。再開の照合に使う
+    since = Column(Date, nullable=False)
+    until = Column(Date, nullable=False)
+    replace_all_dates = Column(Boolean, default=False, nullable=False)
+    status = Column(String(20), default="running", nullable=False)  # running, completed, failed
+    attempt_count = Column(Integer, default=1, nullable=False)
+    error_message = Column(Text, nullable=True)
+    # チェックポイント済みのバッチの行を書き込んだステージングテーブル（完了時・再開期限の経過後に削除）
+    staging_table = Column(String(63), nullable=True)
+    # 入れ替え時の差分の件数
+    rows_inserted = Column(Integer, nullable=True)
+    rows_updated = Column(Integer, nullable=True)
+    rows_deleted = Column(Integer, nullable=True)
+    rows_unchanged = Column(Integer, nullable=True)
+    # プランの制限で取得しなかったデータ（スキップしたレベル・広告セット数の上限）
+    plan_limits = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    completed_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_sync_runs_lookup", "user_id", "meta_account_id", "requested_days", "status"),
+    )
+
+class SyncCheckpoint(Base):
+    """
+    同期の完了済み単位（レベル, バッチ, 期間）
+    取得したデータはステージングテーブルに書き込み済み（行の sync_checkpoint_id がこのチェックポイントのID）
+    """
+    __tablename__ = "sync_checkpoints"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    run_id = Column(UUID(as_uuid=True), ForeignKey("sync_runs.id", ondelete="CASCADE"), nullable=False, index=True)
+    level = Column(String(20), nullable=False)  # campaign, adset, ad
+    batch_index = Column(Integer, nullable=False)
+    time_slice = Column(String(50), nullable=False)  # "YYYY-MM-DD~YYYY-MM-DD"
+    object_ids = Column(JSON, nullable=False)  # バッチに含まれるMetaオブジェクトID
+    row_count = Column(Integer, default=0, nullable=False)  # ステージングに書き込んだ行数
+    completed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint("run_id", "level", "batch_index", "time_slice", name="uq_sync_checkpoints_unit"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String, Integer, DateTime, JSON
 from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime
 import uuid
@@ -17,5 +17,8 @@ class User(Base):
     # Meta API settings
     meta_account_id = Column(String(255), nullable=True)  # Meta広告アカウントID (例: act_123456789)
     meta_access_token = Column(String(500), nullable=True)  # Metaアクセストークン（暗号化推奨）
+    conversion_action_types = Column(JSON, nullable=True)  # コンバージョンとしてカウントするアクションタイプ（優先順位順、NULLは既定）
+    # アクセストークン（JWTの "ver"）のバージョン。パスワードリセット時に上げて発行済みのトークンを無効にする
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta, date as date_type
 from typing import Optional
@@ -6,21 +6,23 @@ from ..database import get_db
 from ..models.analysis import AnalysisResult
 from ..models.user import User
 from ..models.campaign import Campaign
+from ..services.dimension_service import aggregate_by_campaign, campaign_name_filter
 from ..utils.dependencies import get_current_user
 from ..services.ai_service import AIAnalysisService
+from ..services.job_queue import JobQueue
 from sqlalchemy import func
 import uuid
 
 router = APIRouter()
 
-def perform_analysis_task(
+async def perform_analysis_task(
     analysis_id: uuid.UUID,
     user_id: uuid.UUID,
     start_date: date_type,
     end_date: date_type,
     campaign_name: Optional[str] = None
 ):
-    """Background task to perform AI analysis"""
+    """Background task to perform AI analysis (ワーカーのanalysisジョブから実行)"""
     from ..database import SessionLocal
     
     db = SessionLocal()
@@ -34,16 +36,10 @@ def perform_analysis_task(
         
         # Filter by campaign name if provided
         if campaign_name:
-            query = query.filter(Campaign.campaign_name == campaign_name)
+            query = query.filter(campaign_name_filter(campaign_name))
         
         # データの重複排除: キャンペーンレベルのみを使用
-        from sqlalchemy import or_
-        query = query.filter(
-            or_(
-                Campaign.ad_set_name == '',
-                Campaign.ad_set_name.is_(None)
-            )
-        )
+        query = query.filter(Campaign.adset_key.is_(None))
         
         # Get summary - 16項目すべてを取得
         result = query.with_entities(
@@ -118,12 +114,13 @@ def perform_analysis_task(
         top_campaigns = []
         bottom_campaigns = []
         if not campaign_name:
-            campaigns = query.with_entities(
-                Campaign.campaign_name,
+            # キャンペーンのディメンションキーで集計（名前変更後も同一キャンペーンとして集計される）
+            campaigns = aggregate_by_campaign(
+                query,
                 func.sum(Campaign.cost).label('cost'),
                 func.sum(Campaign.conversions).label('conversions'),
                 func.sum(Campaign.conversion_value).label('conversion_value')
-            ).group_by(Campaign.campaign_name).all()
+            ).all()
             
             campaign_list = []
             for c in campaigns:
@@ -156,10 +153,9 @@ def perform_analysis_task(
             prompt = f"【分析対象キャンペーン】\n{campaign_name}\n\n" + prompt
         
         # Call AI
-        import asyncio
         print(f"[Analysis] Starting AI analysis for analysis_id: {analysis_id}")
         try:
-            ai_result = asyncio.run(AIAnalysisService.analyze_campaigns(prompt))
+            ai_result = await AIAnalysisService.analyze_campaigns(prompt)
             print(f"[Analysis] AI result received: overall_rating={ai_result.get('overall_rating')}, issues_count={len(ai_result.get('issues', []))}, recommendations_count={len(ai_result.get('recommendations', []))}, action_plan_count={len(ai_result.get('action_plan', []))}")
         except Exception as ai_error:
             print(f"[Analysis] AI analysis failed: {ai_error}")
@@ -208,7 +204,6 @@ def perform_analysis_task(
 
 @router.post("/")
 async def create_analysis(
-    background_tasks: BackgroundTasks,
     start_date: Optional[date_type] = Query(None),
     end_date: Optional[date_type] = Query(None),
     campaign_name: Optional[str] = Query(None),
@@ -250,14 +245,19 @@ async def create_analysis(
     db.commit()
     db.refresh(analysis)
     
-    # Add background task
-    background_tasks.add_task(
-        perform_analysis_task,
-        analysis.id,
-        current_user.id,
-        start_date,
-        end_date,
-        campaign_name
+    # ワーカーで実行するジョブを登録
+    JobQueue.enqueue(
+        db,
+        "analysis",
+        {
+            "analysis_id": str(analysis.id),
+            "user_id": str(current_user.id),
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "campaign_name": campaign_name
+        },
+        user_id=current_user.id,
+        max_attempts=1  # 失敗時は分析結果をerrorにするためリトライしない
     )
     
     return {
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from datetime import timedelta
+from typing import Dict, Optional, Tuple
 import os
 from ..database import get_db
 from ..models.user import User
@@ -13,22 +15,19 @@ from ..schemas.user import (
     EmailVerificationRequest, EmailVerificationResponse,
     LoginVerificationRequest, LoginVerificationCodeRequest, LoginVerificationResponse
 )
-from ..utils.security import verify_password, get_password_hash, create_access_token
+from ..utils.security import PasswordHasher, create_access_token
 from ..services.email_service import EmailService
 from ..config import settings
 
 router = APIRouter()
 email_service = EmailService()
 
-@router.post("/register", response_model=UserResponse)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
-    # Check if user exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
-    if existing_user:
-        raise HTTPException(status_code=400, detail="このメールアドレスは既に登録されています")
-    
-    # Create new user (email not verified yet)
-    hashed_password = get_password_hash(user_data.password)
+# bcryptを待つハンドラー（async def）のDB処理はスレッドプールで実行する（イベントループをふさがない）
+def _find_user_by_email(db: Session, email: str) -> Optional[User]:
+    return db.query(User).filter(User.email == email).first()
+
+def _create_unverified_user(db: Session, user_data: UserCreate, hashed_password: str) -> Tuple[User, str]:
+    """ユーザー（メール未確認）と確認トークンを作成し、(ユーザー, 確認トークン) を返す"""
     new_user = User(
         email=user_data.email,
         name=user_data.name,
@@ -52,14 +51,52 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     db.add(email_verification)
     db.commit()
-    
+    # コミットで期限切れになった属性を読み込んでおく（レスポンスの作成時にイベントループ上でクエリを発行しない）
+    db.refresh(new_user)
+    return new_user, verification_token
+
+def _find_reset_target(db: Session, token: str) -> Tuple[Optional[PasswordResetToken], Optional[User]]:
+    """(リセットトークン, ユーザー)。トークンがなければ (None, None)"""
+    reset_token = db.query(PasswordResetToken).filter(PasswordResetToken.token == token).first()
+    if not reset_token:
+        return None, None
+    return reset_token, db.query(User).filter(User.id == reset_token.user_id).first()
+
+def _update_password(
+    db: Session,
+    user: User,
+    password_hash: str,
+    reset_token: Optional[PasswordResetToken] = None,
+    verify_email: bool = False
+):
+    """パスワードを更新し、発行済みのアクセストークンを無効にする（リセットトークンは使用済みにする）"""
+    user.password_hash = password_hash
+    user.token_version = (user.token_version or 0) + 1
+    if verify_email:
+        user.email_verified = "true"
+    if reset_token is not None:
+        reset_token.used = "true"
+    db.commit()
+
+@router.post("/register", response_model=UserResponse)
+async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+    # Check if user exists
+    existing_user = await run_in_threadpool(_find_user_by_email, db, user_data.email)
+    if existing_user:
+        raise HTTPException(status_code=400, detail="このメールアドレスは既に登録されています")
+
+    # Create new user (email not verified yet)
+    hashed_password = await PasswordHasher.hash(user_data.password)
+    new_user, verification_token = await run_in_threadpool(_create_unverified_user, db, user_data, hashed_password)
+
     # Send email verification email
     try:
         if email_service.is_configured():
             frontend_url = settings.FRONTEND_URL or os.getenv("FRONTEND_URL", "http://localhost:3000")
             verification_url = f"{frontend_url}/verify-email?token={verification_token}"
             
-            email_sent = email_service.send_email_verification_email(
+            email_sent = await run_in_threadpool(
+                email_service.send_email_verification_email,
                 to_email=new_user.email,
                 user_name=new_user.name or "ユーザー",
                 verification_token=verification_token,
@@ -79,12 +116,127 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     return new_user
 
 @router.post("/login", response_model=LoginVerificationResponse)
-def login(credentials: UserLogin, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """Legacy login endpoint - redirects to 2FA flow"""
-    return login_with_verification(LoginVerificationRequest(email=credentials.email, password=credentials.password), background_tasks, db)
+    return await login_with_verification(LoginVerificationRequest(email=credentials.email, password=credentials.password), background_tasks, db)
+
+def _complete_login(
+    db: Session,
+    user: User,
+    request: LoginVerificationRequest,
+    new_hash: Optional[str],
+    background_tasks: BackgroundTasks
+) -> Dict:
+    """パスワードの検証後のログイン処理（メール確認・2FAコードの発行）"""
+    if new_hash:
+        # BCRYPT_ROUNDSの変更後、初回ログイン時に新しいコストで再ハッシュ
+        user.password_hash = new_hash
+        db.commit()
+
+    # Check if email is verified
+    print(f"[Auth] Checking email verification status: {user.email_verified}")
+    email_lower = request.email.lower().strip()
+    
+    # Auto-verify email if in skip list
+    if user.email_verified != "true":
+        if email_lower in settings.skip_email_verification_emails_list:
+            print(f"[Auth] Email {email_lower} is in skip email verification list, auto-verifying")
+            user.email_verified = "true"
+            db.commit()
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="メールアドレスの確認が完了していません。登録時に送信されたメールの確認リンクをクリックしてください。"
+            )
+    
+    # Check if email is in skip 2FA list
+    email_lower = request.email.lower().strip()
+    if email_lower in settings.skip_2fa_emails_list:
+        print(f"[Auth] Email {email_lower} is in skip 2FA list, bypassing 2FA")
+        # Direct login without 2FA
+        access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        access_token = create_access_token(
+            data={"sub": str(user.id), "ver": user.token_version or 0}, expires_delta=access_token_expires
+        )
+        
+        from ..schemas.user import UserResponse
+        user_response = UserResponse(
+            id=user.id,
+            email=user.email,
+            name=user.name,
+            plan=user.plan or "FREE",
+            created_at=user.created_at
+        )
+        
+        return {
+            "message": "ログインに成功しました",
+            "requires_code": False,
+            "session_id": None,
+            "access_token": access_token,
+            "token_type": "bearer",
+            "user": user_response
+        }
+    
+    # Generate verification code
+    print(f"[Auth] Generating verification code...")
+    verification_code = LoginVerificationCode.generate_code()
+    expires_at = LoginVerificationCode.get_expiration_time(minutes=10)  # 10 minutes
+    print(f"[Auth] Verification code generated: {verification_code}")
+    
+    # Save code to database
+    print(f"[Auth] Saving verification code to database...")
+    login_verification = LoginVerificationCode(
+        user_id=user.id,
+        code=verification_code,
+        expires_at=expires_at,
+        used="false"
+    )
+    db.add(login_verification)
+    db.commit()
+    print(f"[Auth] Verification code saved to database")
+    
+    # Generate session ID (simple UUID for now)
+    import uuid
+    session_id = str(uuid.uuid4())
+    print(f"[Auth] Session ID generated: {session_id}")
+    
+    # Send verification code email in background (don't wait for it)
+    def send_email_background():
+        try:
+            print(f"[Auth] Background task: Starting email send...")
+            if email_service.is_configured():
+                email_sent = email_service.send_login_verification_email(
+                    to_email=user.email,
+                    user_name=user.name or "ユーザー",
+                    verification_code=verification_code
+                )
+                if not email_sent:
+                    print(f"[Auth] Failed to send login verification email to {user.email}")
+                else:
+                    print(f"[Auth] Login verification email sent successfully")
+            else:
+                print(f"[Auth] Email service not configured, skipping login verification email")
+        except Exception as e:
+            import traceback
+            error_details = traceback.format_exc()
+            print(f"[Auth] Exception in send_login_verification_email: {str(e)}")
+            print(f"[Auth] Error details: {error_details}")
+    
+    # Add email sending to background tasks
+    print(f"[Auth] Adding email task to background...")
+    background_tasks.add_task(send_email_background)
+    print(f"[Auth] Email task added to background")
+    
+    result = {
+        "message": "認証コードをメールアドレスに送信しました。",
+        "requires_code": True,
+        "session_id": session_id
+    }
+    print(f"[Auth] Returning response: {result}")
+    return result
 
 @router.post("/login/request-code", response_model=LoginVerificationResponse)
-def login_with_verification(
+async def login_with_verification(
     request: LoginVerificationRequest, 
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
@@ -94,117 +246,18 @@ def login_with_verification(
     
     try:
         print(f"[Auth] Querying user from database...")
-        user = db.query(User).filter(User.email == request.email).first()
+        user = await run_in_threadpool(_find_user_by_email, db, request.email)
         print(f"[Auth] User found: {user is not None}")
         
-        if not user or not verify_password(request.password, user.password_hash):
+        # bcryptの検証は専用のプロセスプールで実行（スレッドプール・他のAPIをふさがない）
+        password_valid, new_hash = await PasswordHasher.verify(request.password, user.password_hash) if user else (False, None)
+        if not password_valid:
             print(f"[Auth] Invalid credentials")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="メールアドレスまたはパスワードが正しくありません"
             )
-    
-        # Check if email is verified
-        print(f"[Auth] Checking email verification status: {user.email_verified}")
-        email_lower = request.email.lower().strip()
-        
-        # Auto-verify email if in skip list
-        if user.email_verified != "true":
-            if email_lower in settings.skip_email_verification_emails_list:
-                print(f"[Auth] Email {email_lower} is in skip email verification list, auto-verifying")
-                user.email_verified = "true"
-                db.commit()
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="メールアドレスの確認が完了していません。登録時に送信されたメールの確認リンクをクリックしてください。"
-                )
-        
-        # Check if email is in skip 2FA list
-        email_lower = request.email.lower().strip()
-        if email_lower in settings.skip_2fa_emails_list:
-            print(f"[Auth] Email {email_lower} is in skip 2FA list, bypassing 2FA")
-            # Direct login without 2FA
-            access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-            access_token = create_access_token(
-                data={"sub": str(user.id)}, expires_delta=access_token_expires
-            )
-            
-            from ..schemas.user import UserResponse
-            user_response = UserResponse(
-                id=user.id,
-                email=user.email,
-                name=user.name,
-                plan=user.plan or "FREE",
-                created_at=user.created_at
-            )
-            
-            return {
-                "message": "ログインに成功しました",
-                "requires_code": False,
-                "session_id": None,
-                "access_token": access_token,
-                "token_type": "bearer",
-                "user": user_response
-            }
-        
-        # Generate verification code
-        print(f"[Auth] Generating verification code...")
-        verification_code = LoginVerificationCode.generate_code()
-        expires_at = LoginVerificationCode.get_expiration_time(minutes=10)  # 10 minutes
-        print(f"[Auth] Verification code generated: {verification_code}")
-        
-        # Save code to database
-        print(f"[Auth] Saving verification code to database...")
-        login_verification = LoginVerificationCode(
-            user_id=user.id,
-            code=verification_code,
-            expires_at=expires_at,
-            used="false"
-        )
-        db.add(login_verification)
-        db.commit()
-        print(f"[Auth] Verification code saved to database")
-        
-        # Generate session ID (simple UUID for now)
-        import uuid
-        session_id = str(uuid.uuid4())
-        print(f"[Auth] Session ID generated: {session_id}")
-        
-        # Send verification code email in background (don't wait for it)
-        def send_email_background():
-            try:
-                print(f"[Auth] Background task: Starting email send...")
-                if email_service.is_configured():
-                    email_sent = email_service.send_login_verification_email(
-                        to_email=user.email,
-                        user_name=user.name or "ユーザー",
-                        verification_code=verification_code
-                    )
-                    if not email_sent:
-                        print(f"[Auth] Failed to send login verification email to {user.email}")
-                    else:
-                        print(f"[Auth] Login verification email sent successfully")
-                else:
-                    print(f"[Auth] Email service not configured, skipping login verification email")
-            except Exception as e:
-                import traceback
-                error_details = traceback.format_exc()
-                print(f"[Auth] Exception in send_login_verification_email: {str(e)}")
-                print(f"[Auth] Error details: {error_details}")
-        
-        # Add email sending to background tasks
-        print(f"[Auth] Adding email task to background...")
-        background_tasks.add_task(send_email_background)
-        print(f"[Auth] Email task added to background")
-        
-        result = {
-            "message": "認証コードをメールアドレスに送信しました。",
-            "requires_code": True,
-            "session_id": session_id
-        }
-        print(f"[Auth] Returning response: {result}")
-        return result
+        return await run_in_threadpool(_complete_login, db, user, request, new_hash, background_tasks)
     except HTTPException as he:
         print(f"[Auth] HTTPException raised: {he.status_code} - {he.detail}")
         raise
@@ -258,7 +311,7 @@ def verify_login_code(request: LoginVerificationCodeRequest, db: Session = Depen
     # Generate access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
+        data={"sub": str(user.id), "ver": user.token_version or 0}, expires_delta=access_token_expires
     )
     
     return {
@@ -323,12 +376,10 @@ def forgot_password(request: PasswordResetRequest, db: Session = Depends(get_db)
     return {"message": "パスワードリセットのメールを送信しました。メールアドレスが登録されている場合、リセットリンクをお送りします。"}
 
 @router.post("/reset-password", response_model=PasswordResetResponse)
-def reset_password(request: PasswordResetConfirm, db: Session = Depends(get_db)):
+async def reset_password(request: PasswordResetConfirm, db: Session = Depends(get_db)):
     """Reset password using token"""
     # Find token
-    reset_token = db.query(PasswordResetToken).filter(
-        PasswordResetToken.token == request.token
-    ).first()
+    reset_token, user = await run_in_threadpool(_find_reset_target, db, request.token)
     
     if not reset_token:
         raise HTTPException(
@@ -343,8 +394,6 @@ def reset_password(request: PasswordResetConfirm, db: Session = Depends(get_db))
             detail="無効または期限切れのトークンです。"
         )
     
-    # Get user
-    user = db.query(User).filter(User.id == reset_token.user_id).first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -358,13 +407,9 @@ def reset_password(request: PasswordResetConfirm, db: Session = Depends(get_db))
             detail="パスワードは8文字以上である必要があります。"
         )
     
-    # Update password
-    user.password_hash = get_password_hash(request.new_password)
-    
-    # Mark token as used
-    reset_token.used = "true"
-    
-    db.commit()
+    # Update password（発行済みのアクセストークンは無効にする）
+    password_hash = await PasswordHasher.hash(request.new_password)
+    await run_in_threadpool(_update_password, db, user, password_hash, reset_token=reset_token)
     
     return {"message": "パスワードが正常にリセットされました。"}
 
@@ -438,7 +483,7 @@ def verify_email(request: EmailVerificationRequest, db: Session = Depends(get_db
     }
 
 @router.post("/admin/reset-password-no-email", response_model=PasswordResetResponse)
-def admin_reset_password_no_email(
+async def admin_reset_password_no_email(
     email: str,
     new_password: str,
     db: Session = Depends(get_db)
@@ -456,7 +501,7 @@ def admin_reset_password_no_email(
         )
     
     # Find user
-    user = db.query(User).filter(User.email == email_lower).first()
+    user = await run_in_threadpool(_find_user_by_email, db, email_lower)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -470,10 +515,8 @@ def admin_reset_password_no_email(
             detail="パスワードは8文字以上である必要があります。"
         )
     
-    # Update password and auto-verify email
-    user.password_hash = get_password_hash(new_password)
-    user.email_verified = "true"
-    
-    db.commit()
+    # Update password and auto-verify email（発行済みのアクセストークンは無効にする）
+    password_hash = await PasswordHasher.hash(new_password)
+    await run_in_threadpool(_update_password, db, user, password_hash, verify_email=True)
     
     return {"message": "パスワードが正常にリセットされました。メール確認も完了しました。"}
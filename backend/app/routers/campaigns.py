@@ -5,11 +5,16 @@ from datetime import date, timedelta, datetime
 from typing import Optional, List
 from ..database import get_db
 from ..models.campaign import Campaign
-from ..utils.dependencies import get_current_user
+from ..services.dimension_service import aggregate_by_campaign, campaign_name_filter
+from ..utils.dependencies import get_current_user, get_current_user_id
 from ..models.user import User
 from ..schemas.campaign import CampaignResponse
+from ..services.reach_service import ReachService
+from ..services.graph_client import graph_client
+from ..utils.campaign_names import normalize_campaign_name
 import httpx
 import json
+import uuid
 import urllib.parse
 import logging
 
@@ -17,12 +22,35 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+def _attach_period_reach(db: Session, user_id, campaigns: List[Campaign], level: str) -> List[dict]:
+    """
+    日次レコードに期間別ユニークリーチ（7日間/30日間/全期間）を付与
+    値はperiod_reachキャッシュから取得する（レコードごとのカラムではない）
+    """
+    name_attr = {"campaign": "campaign_name", "adset": "ad_set_name", "ad": "ad_name"}.get(level, "campaign_name")
+    reach_maps = {}
+    for account_id in set(c.meta_account_id for c in campaigns if c.meta_account_id):
+        reach_maps[account_id] = ReachService.get_popular_reach_map(db, user_id, account_id, level)
+    
+    results = []
+    for c in campaigns:
+        item = CampaignResponse.model_validate(c).model_dump()
+        period_map = reach_maps.get(c.meta_account_id, {}) if c.meta_account_id else {}
+        object_key = normalize_campaign_name(getattr(c, name_attr) or '')
+        item["period_unique_reach_7days"] = period_map.get("7days", {}).get(object_key, 0)
+        item["period_unique_reach_30days"] = period_map.get("30days", {}).get(object_key, 0)
+        item["period_unique_reach_all"] = period_map.get("all", {}).get(object_key, 0)
+        item["period_unique_reach"] = item["period_unique_reach_all"]  # 後方互換性（全期間の値）
+        results.append(item)
+    return results
+
+
 @router.get("/data/")
 async def get_campaign_data(
     campaign_name: str = Query(..., description="キャンペーン名"),
     start_date: str = Query(..., description="開始日 (YYYY-MM-DD)"),
     end_date: str = Query(..., description="終了日 (YYYY-MM-DD)"),
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: Session = Depends(get_db)
 ):
     """
@@ -38,19 +66,13 @@ async def get_campaign_data(
     
     # シンプルなクエリ: 指定されたキャンペーンと期間のデータを取得（キャンペーンレベルのみ）
     records = db.query(Campaign).filter(
-        Campaign.user_id == current_user.id,
-        Campaign.campaign_name == campaign_name,
+        Campaign.user_id == current_user_id,
+        campaign_name_filter(campaign_name),
         Campaign.date >= start,
         Campaign.date <= end,
-        # キャンペーンレベルのみ（ad_set_nameとad_nameがNULL）
-        or_(
-            Campaign.ad_set_name == '',
-            Campaign.ad_set_name.is_(None)
-        ),
-        or_(
-            Campaign.ad_name == '',
-            Campaign.ad_name.is_(None)
-        )
+        # キャンペーンレベルのみ（adset_keyとad_keyがNULL）
+        Campaign.adset_key.is_(None),
+        Campaign.ad_key.is_(None)
     ).all()
     
     # 合計を計算
@@ -114,34 +136,22 @@ def debug_ads(
     
     # 統計情報（meta_account_idフィルタを適用）
     campaign_level_count = base_query.filter(
-        or_(
-            Campaign.ad_set_name == '',
-            Campaign.ad_set_name.is_(None)
-        ),
-        or_(
-            Campaign.ad_name == '',
-            Campaign.ad_name.is_(None)
-        )
+        Campaign.adset_key.is_(None),
+        Campaign.ad_key.is_(None)
     ).count()
     
     adset_level_count = base_query.filter(
-        Campaign.ad_set_name != '',
-        Campaign.ad_set_name.isnot(None),
-        or_(
-            Campaign.ad_name == '',
-            Campaign.ad_name.is_(None)
-        )
+        Campaign.adset_key.isnot(None),
+        Campaign.ad_key.is_(None)
     ).count()
     
     ad_level_count = base_query.filter(
-        Campaign.ad_name != '',
-        Campaign.ad_name.isnot(None)
+        Campaign.ad_key.isnot(None)
     ).count()
     
-    # 広告レベルのデータのみを取得（ad_nameが存在する）
+    # 広告レベルのデータのみを取得（ad_keyが存在する）
     ads_query = base_query.filter(
-        Campaign.ad_name != '',
-        Campaign.ad_name.isnot(None)
+        Campaign.ad_key.isnot(None)
     )
     
     total_ads = ads_query.count()
@@ -149,12 +159,8 @@ def debug_ads(
     
     # 広告セットレベルのサンプルデータも取得
     adsets_query = base_query.filter(
-        Campaign.ad_set_name != '',
-        Campaign.ad_set_name.isnot(None),
-        or_(
-            Campaign.ad_name == '',
-            Campaign.ad_name.is_(None)
-        )
+        Campaign.adset_key.isnot(None),
+        Campaign.ad_key.is_(None)
     )
     adsets = adsets_query.order_by(desc(Campaign.date)).limit(10).all()
     
@@ -214,30 +220,19 @@ def debug_count_by_level(
     
     # ユニークなキャンペーン名の件数
     unique_campaigns = base_query.filter(
-        or_(
-            Campaign.ad_set_name == '',
-            Campaign.ad_set_name.is_(None)
-        ),
-        or_(
-            Campaign.ad_name == '',
-            Campaign.ad_name.is_(None)
-        )
+        Campaign.adset_key.is_(None),
+        Campaign.ad_key.is_(None)
     ).with_entities(Campaign.campaign_name).distinct().all()
     
     # ユニークな広告セット名の件数
     unique_adsets = base_query.filter(
-        Campaign.ad_set_name != '',
-        Campaign.ad_set_name.isnot(None),
-        or_(
-            Campaign.ad_name == '',
-            Campaign.ad_name.is_(None)
-        )
+        Campaign.adset_key.isnot(None),
+        Campaign.ad_key.is_(None)
     ).with_entities(Campaign.campaign_name, Campaign.ad_set_name).distinct().all()
     
     # ユニークな広告名の件数
     unique_ads = base_query.filter(
-        Campaign.ad_name != '',
-        Campaign.ad_name.isnot(None)
+        Campaign.ad_key.isnot(None)
     ).with_entities(Campaign.campaign_name, Campaign.ad_set_name, Campaign.ad_name).distinct().all()
     
     return {
@@ -268,14 +263,8 @@ def debug_campaign_adsets_count(
     
     # ユニークなキャンペーン名を取得（キャンペーンレベルのみ）
     unique_campaigns = base_query.filter(
-        or_(
-            Campaign.ad_set_name == '',
-            Campaign.ad_set_name.is_(None)
-        ),
-        or_(
-            Campaign.ad_name == '',
-            Campaign.ad_name.is_(None)
-        )
+        Campaign.adset_key.is_(None),
+        Campaign.ad_key.is_(None)
     ).with_entities(Campaign.campaign_name).distinct().all()
     
     result = []
@@ -283,22 +272,17 @@ def debug_campaign_adsets_count(
         campaign_name = campaign_tuple[0]
         
         # このキャンペーンの広告セット数を取得
-        # 広告セットレベル: ad_set_nameはあるが、ad_nameは空
+        # 広告セットレベル: adset_keyはあるが、ad_keyはNULL
         adset_count = base_query.filter(
-            Campaign.campaign_name == campaign_name,
-            Campaign.ad_set_name != '',
-            Campaign.ad_set_name.isnot(None),
-            or_(
-                Campaign.ad_name == '',
-                Campaign.ad_name.is_(None)
-            )
+            campaign_name_filter(campaign_name),
+            Campaign.adset_key.isnot(None),
+            Campaign.ad_key.is_(None)
         ).with_entities(Campaign.ad_set_name).distinct().count()
         
         # このキャンペーンの広告数を取得
         ad_count = base_query.filter(
-            Campaign.campaign_name == campaign_name,
-            Campaign.ad_name != '',
-            Campaign.ad_name.isnot(None)
+            campaign_name_filter(campaign_name),
+            Campaign.ad_key.isnot(None)
         ).with_entities(Campaign.ad_set_name, Campaign.ad_name).distinct().count()
         
         result.append({
@@ -332,30 +316,19 @@ def debug_campaign_hierarchy(
     
     # キャンペーンレベルのデータ
     campaign_level = base_query.filter(
-        or_(
-            Campaign.ad_set_name == '',
-            Campaign.ad_set_name.is_(None)
-        ),
-        or_(
-            Campaign.ad_name == '',
-            Campaign.ad_name.is_(None)
-        )
+        Campaign.adset_key.is_(None),
+        Campaign.ad_key.is_(None)
     ).all()
     
     # 広告セットレベルのデータ
     adset_level = base_query.filter(
-        Campaign.ad_set_name != '',
-        Campaign.ad_set_name.isnot(None),
-        or_(
-            Campaign.ad_name == '',
-            Campaign.ad_name.is_(None)
-        )
+        Campaign.adset_key.isnot(None),
+        Campaign.ad_key.is_(None)
     ).all()
     
     # 広告レベルのデータ
     ad_level = base_query.filter(
-        Campaign.ad_name != '',
-        Campaign.ad_name.isnot(None)
+        Campaign.ad_key.isnot(None)
     ).all()
     
     # ユニークなキャンペーン名、広告セット名、広告名を取得
@@ -370,8 +343,7 @@ def debug_campaign_hierarchy(
     
     unique_adsets_query = db.query(Campaign.ad_set_name).filter(
         Campaign.user_id == current_user.id,
-        Campaign.ad_set_name != '',
-        Campaign.ad_set_name.isnot(None)
+        Campaign.adset_key.isnot(None)
     )
     if meta_account_id:
         unique_adsets_query = unique_adsets_query.filter(Campaign.meta_account_id == meta_account_id)
@@ -381,8 +353,7 @@ def debug_campaign_hierarchy(
     
     unique_ads_query = db.query(Campaign.ad_name).filter(
         Campaign.user_id == current_user.id,
-        Campaign.ad_name != '',
-        Campaign.ad_name.isnot(None)
+        Campaign.ad_key.isnot(None)
     )
     if meta_account_id:
         unique_ads_query = unique_ads_query.filter(Campaign.meta_account_id == meta_account_id)
@@ -452,14 +423,8 @@ def debug_data_source(
     # キャンペーンレベルのデータのみを取得（詳細パフォーマンス分析で使用されるデータ）
     campaign_level_query = db.query(Campaign).filter(
         Campaign.user_id == current_user.id,
-        or_(
-            Campaign.ad_set_name == '',
-            Campaign.ad_set_name.is_(None)
-        ),
-        or_(
-            Campaign.ad_name == '',
-            Campaign.ad_name.is_(None)
-        )
+        Campaign.adset_key.is_(None),
+        Campaign.ad_key.is_(None)
     )
     
     # Meta APIデータ（meta_account_idが設定されている）
@@ -551,26 +516,29 @@ def debug_clicks(
     # SQLクエリで直接確認
     query = text("""
         SELECT 
-            id,
-            campaign_name,
-            ad_set_name,
-            ad_name,
-            date,
-            meta_account_id,
-            impressions,
-            clicks,
-            link_clicks,
-            cost,
-            conversions,
-            conversion_value,
-            reach,
-            engagements,
-            landing_page_views,
-            created_at
-        FROM campaigns
-        WHERE user_id = :user_id
-          AND (campaign_name LIKE :campaign_name_pattern1 OR campaign_name LIKE :campaign_name_pattern2)
-        ORDER BY date DESC, created_at DESC
+            c.id,
+            ac.name AS campaign_name,
+            s.name AS ad_set_name,
+            a.name AS ad_name,
+            c.date,
+            c.meta_account_id,
+            c.impressions,
+            c.clicks,
+            c.link_clicks,
+            c.cost,
+            c.conversions,
+            c.conversion_value,
+            c.reach,
+            c.engagements,
+            c.landing_page_views,
+            c.created_at
+        FROM campaigns c
+        JOIN ad_campaigns ac ON ac.id = c.campaign_key
+        LEFT JOIN ad_sets s ON s.id = c.adset_key
+        LEFT JOIN ads a ON a.id = c.ad_key
+        WHERE c.user_id = :user_id
+          AND (ac.name LIKE :campaign_name_pattern1 OR ac.name LIKE :campaign_name_pattern2)
+        ORDER BY c.date DESC, c.created_at DESC
         LIMIT 50
     """)
     
@@ -644,21 +612,15 @@ def debug_clicks(
         "records": records
     }
 
-@router.get("/")
-def get_campaigns(
-    start_date: Optional[date] = Query(None, description="開始日 (YYYY-MM-DD, JST 0時基準)"),
-    end_date: Optional[date] = Query(None, description="終了日 (YYYY-MM-DD, JST 0時基準)"),
-    campaign_name: Optional[str] = Query(None),
-    meta_account_id: Optional[str] = Query(None, description="Meta広告アカウントIDでフィルタリング"),
-    level: Optional[str] = Query(None, description="データレベル: 'campaign', 'adset', 'ad'"),
-    limit: int = Query(100, le=1000),
-    offset: int = Query(0),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+def _filter_campaigns(
+    query,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    campaign_name: Optional[str] = None,
+    meta_account_id: Optional[str] = None,
+    level: Optional[str] = None
 ):
-    """Get campaign data with filters"""
-    query = db.query(Campaign).filter(Campaign.user_id == current_user.id)
-    
+    """get_campaigns と export で共通の絞り込み（期間・キャンペーン名・広告アカウント・レベル）"""
     # Apply filters
     if start_date:
         query = query.filter(Campaign.date >= start_date)
@@ -668,57 +630,57 @@ def get_campaigns(
         query = query.filter(Campaign.campaign_name.ilike(f"%{campaign_name}%"))
     if meta_account_id:
         query = query.filter(Campaign.meta_account_id == meta_account_id)
-    
-    # Filter by level (ad_set_nameとad_nameの有無で判定)
+
+    # Filter by level (adset_keyとad_keyの有無で判定)
     # フロントエンドに合わせて、levelが指定されていない場合はキャンペーンレベルのみを返す
     if level:
         if level == 'campaign':
             query = query.filter(
-                or_(
-                    Campaign.ad_set_name == '',
-                    Campaign.ad_set_name.is_(None)
-                )
+                Campaign.adset_key.is_(None)
             ).filter(
-                or_(
-                    Campaign.ad_name == '',
-                    Campaign.ad_name.is_(None)
-                )
+                Campaign.ad_key.is_(None)
             )
         elif level == 'adset':
             query = query.filter(
-                Campaign.ad_set_name != '',
-                Campaign.ad_set_name.isnot(None)
+                Campaign.adset_key.isnot(None)
             ).filter(
-                or_(
-                    Campaign.ad_name == '',
-                    Campaign.ad_name.is_(None)
-                )
+                Campaign.ad_key.is_(None)
             )
         elif level == 'ad':
             query = query.filter(
-                Campaign.ad_name != '',
-                Campaign.ad_name.isnot(None)
+                Campaign.ad_key.isnot(None)
             )
     else:
         # levelが指定されていない場合、デフォルトでキャンペーンレベルのみを返す（フロントエンドに合わせる）
         query = query.filter(
-            or_(
-                Campaign.ad_set_name == '',
-                Campaign.ad_set_name.is_(None)
-            )
+            Campaign.adset_key.is_(None)
         ).filter(
-            or_(
-                Campaign.ad_name == '',
-                Campaign.ad_name.is_(None)
-            )
+            Campaign.ad_key.is_(None)
         )
+    return query
+
+@router.get("/")
+def get_campaigns(
+    start_date: Optional[date] = Query(None, description="開始日 (YYYY-MM-DD, JST 0時基準)"),
+    end_date: Optional[date] = Query(None, description="終了日 (YYYY-MM-DD, JST 0時基準)"),
+    campaign_name: Optional[str] = Query(None),
+    meta_account_id: Optional[str] = Query(None, description="Meta広告アカウントIDでフィルタリング"),
+    level: Optional[str] = Query(None, description="データレベル: 'campaign', 'adset', 'ad'"),
+    limit: int = Query(100, le=1000),
+    offset: int = Query(0),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    """Get campaign data with filters"""
+    query = db.query(Campaign).filter(Campaign.user_id == current_user_id)
+    query = _filter_campaigns(query, start_date, end_date, campaign_name, meta_account_id, level)
     
     # Get total count
     total = query.count()
     
     # ユニークな日付数を取得
     unique_dates_count = db.query(func.count(func.distinct(Campaign.date))).filter(
-        Campaign.user_id == current_user.id
+        Campaign.user_id == current_user_id
     ).scalar() or 0
     
     # Apply pagination
@@ -727,12 +689,52 @@ def get_campaigns(
     return {
         "total": total,
         "unique_dates_count": unique_dates_count,
-        "data": campaigns
+        "data": _attach_period_reach(db, current_user_id, campaigns, level or "campaign")
     }
 
+@router.get("/export")
+def export_campaigns(
+    format: str = Query("csv", description="出力形式: 'csv'（BOM付きUTF-8）, 'ndjson', 'parquet', 'xlsx'"),
+    columns: Optional[str] = Query(None, description="出力する列（カンマ区切り、未指定時はすべて）"),
+    start_date: Optional[date] = Query(None, description="開始日 (YYYY-MM-DD, JST 0時基準)"),
+    end_date: Optional[date] = Query(None, description="終了日 (YYYY-MM-DD, JST 0時基準)"),
+    campaign_name: Optional[str] = Query(None),
+    meta_account_id: Optional[str] = Query(None, description="Meta広告アカウントIDでフィルタリング"),
+    level: Optional[str] = Query(None, description="データレベル: 'campaign'（既定）, 'adset', 'ad'"),
+    current_user_id: uuid.UUID = Depends(get_current_user_id)
+):
+    """
+    キャンペーンデータのエクスポート（get_campaigns と同じ絞り込み、件数の上限なし）
+    サーバーサイドカーソルから読み込みながらチャンク転送で返すため、件数によらずメモリ使用量は一定
+    """
+    from fastapi.responses import StreamingResponse
+    from ..services.campaign_export import CampaignExportService, EXPORT_FORMATS
+
+    try:
+        selected_columns = CampaignExportService.parse_columns(columns)
+        CampaignExportService.check_format(format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    def build_query(db: Session):
+        query = db.query(Campaign).filter(Campaign.user_id == current_user_id)
+        query = _filter_campaigns(query, start_date, end_date, campaign_name, meta_account_id, level)
+        # (user_id, date) のインデックスの順に読み込む
+        return query.order_by(Campaign.date)
+
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"campaigns_{level or 'campaign'}_{start_date or 'all'}_{end_date or 'all'}.{extension}"
+    return StreamingResponse(
+        CampaignExportService.stream(build_query, selected_columns, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @router.get("/date-range/")
 def get_date_range(
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: Session = Depends(get_db)
 ):
     """データベースに保存されているデータの日付範囲を確認"""
@@ -741,13 +743,13 @@ def get_date_range(
         
         # 全データの日付範囲
         min_date = db.query(func.min(Campaign.date)).filter(
-            Campaign.user_id == current_user.id
+            Campaign.user_id == current_user_id
         ).scalar()
         max_date = db.query(func.max(Campaign.date)).filter(
-            Campaign.user_id == current_user.id
+            Campaign.user_id == current_user_id
         ).scalar()
         total_count = db.query(Campaign).filter(
-            Campaign.user_id == current_user.id
+            Campaign.user_id == current_user_id
         ).count()
         
         result = {
@@ -765,7 +767,7 @@ def get_date_range(
             func.max(Campaign.date).label('max_date'),
             func.count(Campaign.id).label('count')
         ).filter(
-            Campaign.user_id == current_user.id,
+            Campaign.user_id == current_user_id,
             Campaign.meta_account_id.isnot(None),
             Campaign.meta_account_id != ''
         ).first()
@@ -784,7 +786,7 @@ def get_date_range(
             func.max(Campaign.date).label('max_date'),
             func.count(Campaign.id).label('count')
         ).filter(
-            Campaign.user_id == current_user.id,
+            Campaign.user_id == current_user_id,
             or_(
                 Campaign.meta_account_id.is_(None),
                 Campaign.meta_account_id == ''
@@ -806,7 +808,7 @@ def get_date_range(
             func.max(Campaign.date).label('max_date'),
             func.count(Campaign.id).label('count')
         ).filter(
-            Campaign.user_id == current_user.id,
+            Campaign.user_id == current_user_id,
             Campaign.meta_account_id.isnot(None),
             Campaign.meta_account_id != ''
         ).group_by(Campaign.meta_account_id).all()
@@ -841,7 +843,7 @@ def get_date_range(
         
         # ユニークな日付数を確認
         unique_dates_count = db.query(func.count(func.distinct(Campaign.date))).filter(
-            Campaign.user_id == current_user.id
+            Campaign.user_id == current_user_id
         ).scalar()
         result["unique_dates_count"] = unique_dates_count
         
@@ -886,7 +888,7 @@ async def get_summary(
     
     # キャンペーンフィルタ
     if campaign_name:
-        query = query.filter(Campaign.campaign_name == campaign_name)
+        query = query.filter(campaign_name_filter(campaign_name))
 
     # 広告セットフィルタ
     if ad_set_name:
@@ -894,10 +896,7 @@ async def get_summary(
     elif ad_set_name is None:
         # ad_set_name が指定されていない場合はキャンペーンレベルのみ
         query = query.filter(
-            or_(
-                Campaign.ad_set_name == '',
-                Campaign.ad_set_name.is_(None)
-            )
+            Campaign.adset_key.is_(None)
         )
 
     # 広告フィルタ
@@ -906,10 +905,7 @@ async def get_summary(
     elif ad_name is None:
         # ad_name が指定されていない場合はキャンペーンレベルのみ
         query = query.filter(
-            or_(
-                Campaign.ad_name == '',
-                Campaign.ad_name.is_(None)
-            )
+            Campaign.ad_key.is_(None)
         )
     
     # Aggregate metrics（16項目すべてを取得）
@@ -935,14 +931,41 @@ async def get_summary(
     total_landing_page_views = int(result.total_landing_page_views or 0)
     total_link_clicks = int(result.total_link_clicks or 0)
     
-    # リーチ数はDBから取得（META API呼び出しを削除）
-    # DBに保存されたデータから合算値を取得（データ取得時にMETA APIから取得した値を使用）
-    total_reach = total_reach_from_db
+    # リーチ数: ユニークリーチは日次リーチの合算では求められないため、
+    # アカウントごとにperiod_reachキャッシュ（ミス時はMeta API）から期間全体の値を取得する
+    if ad_name:
+        reach_level, reach_object = "ad", ad_name
+    elif ad_set_name:
+        reach_level, reach_object = "adset", ad_set_name
+    elif campaign_name:
+        reach_level, reach_object = "campaign", campaign_name
+    else:
+        reach_level, reach_object = "account", None
+    
+    reach_by_account = query.with_entities(
+        Campaign.meta_account_id,
+        func.sum(Campaign.reach).label('daily_reach_sum')
+    ).group_by(Campaign.meta_account_id).all()
+    
+    total_reach = 0
+    for row in reach_by_account:
+        daily_reach_sum = int(row.daily_reach_sum or 0)
+        if not row.meta_account_id:
+            # CSVデータは期間のユニークリーチを取得できないため日次の合算値を使用
+            total_reach += daily_reach_sum
+            continue
+        unique_reach = await ReachService.get_reach(
+            db, current_user, row.meta_account_id, start_date, end_date,
+            level=reach_level, object_key=reach_object
+        )
+        if unique_reach is None:
+            print(f"[Summary] ⚠️ Unique reach unavailable for {row.meta_account_id}, fallback to daily sum: {daily_reach_sum}")
+            total_reach += daily_reach_sum
+        else:
+            # 複数アカウント間の重複ユーザーは除外できないため、アカウント単位の値を合算
+            total_reach += unique_reach
     
-    # META API呼び出しを削除（DBから直接取得する方式に変更）
-    # データ取得時にMETA APIから取得したユニークリーチがDBに保存されているため、
-    # ダッシュボード表示時にはDBから取得するだけで十分
-    print(f"[Summary] Using reach from DB: {total_reach}")
+    print(f"[Summary] Unique reach ({reach_level}): {total_reach} (daily sum: {total_reach_from_db})")
     
     # デバッグログ: 集計結果を検証
     print(f"[Summary] Aggregated metrics for period {start_date} to {end_date}:")
@@ -1040,10 +1063,7 @@ def get_trends(
     
     # データの重複排除: キャンペーンレベルのみを使用
     query = query.filter(
-        or_(
-            Campaign.ad_set_name == '',
-            Campaign.ad_set_name.is_(None)
-        )
+        Campaign.adset_key.is_(None)
     )
     
     # Group by date
@@ -1093,14 +1113,15 @@ def get_by_campaign(
         Campaign.date <= end_date
     )
     
-    campaigns = query.with_entities(
-        Campaign.campaign_name,
+    # キャンペーンのディメンションキーで集計（名前変更後も同一キャンペーンとして集計される）
+    campaigns = aggregate_by_campaign(
+        query,
         func.sum(Campaign.impressions).label('impressions'),
         func.sum(Campaign.clicks).label('clicks'),
         func.sum(Campaign.cost).label('cost'),
         func.sum(Campaign.conversions).label('conversions'),
         func.sum(Campaign.conversion_value).label('conversion_value')
-    ).group_by(Campaign.campaign_name).all()
+    ).all()
     
     # Calculate metrics for each campaign
     result = []
@@ -1164,20 +1185,18 @@ def get_top_performers(
     
     # データの重複排除: キャンペーンレベルのみを使用
     query = query.filter(
-        or_(
-            Campaign.ad_set_name == '',
-            Campaign.ad_set_name.is_(None)
-        )
+        Campaign.adset_key.is_(None)
     )
     
-    campaigns = query.with_entities(
-        Campaign.campaign_name,
+    # キャンペーンのディメンションキーで集計（名前変更後も同一キャンペーンとして集計される）
+    campaigns = aggregate_by_campaign(
+        query,
         func.sum(Campaign.impressions).label('impressions'),
         func.sum(Campaign.clicks).label('clicks'),
         func.sum(Campaign.cost).label('cost'),
         func.sum(Campaign.conversions).label('conversions'),
         func.sum(Campaign.conversion_value).label('conversion_value')
-    ).group_by(Campaign.campaign_name).all()
+    ).all()
     
     # Calculate and sort
     result = []
@@ -1232,20 +1251,18 @@ def get_bottom_performers(
     
     # データの重複排除: キャンペーンレベルのみを使用
     query = query.filter(
-        or_(
-            Campaign.ad_set_name == '',
-            Campaign.ad_set_name.is_(None)
-        )
+        Campaign.adset_key.is_(None)
     )
     
-    campaigns = query.with_entities(
-        Campaign.campaign_name,
+    # キャンペーンのディメンションキーで集計（名前変更後も同一キャンペーンとして集計される）
+    campaigns = aggregate_by_campaign(
+        query,
         func.sum(Campaign.impressions).label('impressions'),
         func.sum(Campaign.clicks).label('clicks'),
         func.sum(Campaign.cost).label('cost'),
         func.sum(Campaign.conversions).label('conversions'),
         func.sum(Campaign.conversion_value).label('conversion_value')
-    ).group_by(Campaign.campaign_name).all()
+    ).all()
     
     # Calculate and sort
     result = []
@@ -1295,7 +1312,7 @@ async def get_raw_meta_data(
     access_token = current_user.meta_access_token
     
     try:
-        async with httpx.AsyncClient() as client:
+        async with graph_client() as client:
             result = {
                 "meta_account_id": meta_account_id,
                 "campaigns": [],
@@ -1333,7 +1350,7 @@ async def get_raw_meta_data(
                 if not next_url:
                     break
                 campaigns_url = next_url
-                campaigns_params = {}
+                campaigns_params = None  # 次ページのURLにパラメータが含まれているため指定しない（空のdictはURLのクエリを消す）
             
             result["total_campaigns"] = len(all_campaigns)
             
@@ -1373,7 +1390,7 @@ async def get_raw_meta_data(
                     if not next_url:
                         break
                     adsets_url = next_url
-                    adsets_params = {}
+                    adsets_params = None  # 次ページのURLにパラメータが含まれているため指定しない（空のdictはURLのクエリを消す）
                 
                 campaign_data["total_adsets"] = len(all_adsets)
                 result["total_adsets"] += len(all_adsets)
@@ -1414,7 +1431,7 @@ async def get_raw_meta_data(
                         if not next_url:
                             break
                         ads_url = next_url
-                        ads_params = {}
+                        ads_params = None  # 次ページのURLにパラメータが含まれているため指定しない（空のdictはURLのクエリを消す）
                     
                     adset_data["total_ads"] = len(all_ads)
                     adset_data["ads"] = all_ads[:10]  # 最初の10件のみ返す
@@ -1479,7 +1496,7 @@ async def get_campaign_summary(
         end_date = yesterday
     elif period == "all":
         min_date_result = db.query(func.min(Campaign.date)).filter(
-            Campaign.campaign_name == campaign_name,
+            campaign_name_filter(campaign_name),
             Campaign.user_id == current_user.id
         ).scalar()
         start_date = min_date_result if min_date_result else yesterday
@@ -1489,9 +1506,12 @@ async def get_campaign_summary(
     
     logger.info(f"[Summary] 📅 Calculated date range: {start_date} ~ {end_date}")
     
+    # 全期間のユニークリーチはアカウントのデータ範囲全体で取得（同期後に事前計算されたキャッシュと同じ期間）
+    reach_since = date.min if period == "all" else start_date
+    
     # Step 2: データベースから該当期間のデータを取得
     db_records = db.query(Campaign).filter(
-        Campaign.campaign_name == campaign_name,
+        campaign_name_filter(campaign_name),
         Campaign.user_id == current_user.id,
         Campaign.date >= start_date,
         Campaign.date <= end_date
@@ -1500,9 +1520,9 @@ async def get_campaign_summary(
     logger.info(f"[Summary] 🗄️ DB records found: {len(db_records)}")
     
     if not db_records:
-        logger.warning(f"[Summary] ⚠️ No DB records found for date range, trying period_unique_reach from any record")
+        logger.warning(f"[Summary] ⚠️ No DB records found for date range, trying period reach cache")
         fallback_record = db.query(Campaign).filter(
-            Campaign.campaign_name == campaign_name,
+            campaign_name_filter(campaign_name),
             Campaign.user_id == current_user.id
         ).order_by(Campaign.date.desc()).first()
         if not fallback_record:
@@ -1511,13 +1531,13 @@ async def get_campaign_summary(
                 status_code=404, 
                 detail=f"No data found for campaign '{campaign_name}'"
             )
-        # 期間別のユニークリーチを取得（期間に応じたフィールドを使用）
-        if period == "7days":
-            db_reach = fallback_record.period_unique_reach_7days or fallback_record.period_unique_reach or 0
-        elif period == "30days":
-            db_reach = fallback_record.period_unique_reach_30days or fallback_record.period_unique_reach or 0
-        else:
-            db_reach = fallback_record.period_unique_reach_all or fallback_record.period_unique_reach or 0
+        # 期間別のユニークリーチをキャッシュ（ミス時はMeta API）から取得
+        db_reach = 0
+        if fallback_record.meta_account_id:
+            db_reach = await ReachService.get_reach(
+                db, current_user, fallback_record.meta_account_id, reach_since, end_date,
+                level="campaign", object_key=campaign_name
+            ) or 0
         logger.info(f"[Summary] ✅ Returning reach from fallback record: {db_reach}")
         start_date_str = start_date.strftime("%Y-%m-%d")
         end_date_str = end_date.strftime("%Y-%m-%d")
@@ -1560,21 +1580,18 @@ async def get_campaign_summary(
     total_link_clicks = sum(r.link_clicks or 0 for r in db_records)
     total_landing_page_views = sum(r.landing_page_views or 0 for r in db_records)
     
-    # リーチの計算：period_unique_reachフィールドを使用（期間全体のユニークリーチ）
-    # 同じキャンペーンの複数日付データではperiod_unique_reachは同じ値のはずなので、最初に見つかった値を使用
+    # リーチの計算：期間全体のユニークリーチをperiod_reachキャッシュ（ミス時はMeta API）から取得
+    # 複数アカウントに同名キャンペーンがある場合はアカウント単位の値を合算
     db_reach = 0
-    for r in db_records:
-        if period == "7days":
-            reach_value = r.period_unique_reach_7days or r.period_unique_reach
-        elif period == "30days":
-            reach_value = r.period_unique_reach_30days or r.period_unique_reach
-        else:
-            reach_value = r.period_unique_reach_all or r.period_unique_reach
-        if reach_value and reach_value > 0:
-            db_reach = reach_value
-            break
+    for account_id in sorted(set(r.meta_account_id for r in db_records if r.meta_account_id)):
+        reach_value = await ReachService.get_reach(
+            db, current_user, account_id, reach_since, end_date,
+            level="campaign", object_key=campaign_name
+        )
+        if reach_value:
+            db_reach += reach_value
     
-    # period_unique_reachが0または存在しない場合は、日次データの最大値を使用（フォールバック）
+    # ユニークリーチが取得できない場合（CSVデータなど）は、日次データの最大値を使用（フォールバック）
     if db_reach == 0:
         db_reach = max((r.reach or 0 for r in db_records), default=0)
     
@@ -1635,19 +1652,19 @@ def debug_reach_comparison(
     db: Session = Depends(get_db)
 ):
     """
-    データベースに保存されているperiod_unique_reach_allと日次リーチの合計を比較
-    period_unique_reach_allが日次リーチの合計で計算されていないか確認
+    period_reachキャッシュの全期間ユニークリーチと日次リーチの合計を比較
+    ユニークリーチが日次リーチの合計で計算されていないか確認
     """
     try:
         # キャンペーンレベルのデータのみを取得
         query = db.query(Campaign).filter(
             Campaign.user_id == current_user.id,
-            or_(Campaign.ad_set_name == '', Campaign.ad_set_name.is_(None)),
-            or_(Campaign.ad_name == '', Campaign.ad_name.is_(None))
+            Campaign.adset_key.is_(None),
+            Campaign.ad_key.is_(None)
         )
         
         if campaign_name:
-            query = query.filter(Campaign.campaign_name == campaign_name)
+            query = query.filter(campaign_name_filter(campaign_name))
         
         campaigns = query.order_by(Campaign.campaign_name, Campaign.date.desc()).all()
         
@@ -1657,19 +1674,26 @@ def debug_reach_comparison(
                 "campaigns": []
             }
         
+        # アカウントごとに期間別ユニークリーチのキャッシュを取得
+        reach_maps = {}
+        for account_id in set(c.meta_account_id for c in campaigns if c.meta_account_id):
+            reach_maps[account_id] = ReachService.get_popular_reach_map(db, current_user.id, account_id, "campaign")
+        
         # キャンペーンごとに集計
         campaign_stats = {}
         for c in campaigns:
             key = c.campaign_name
             if key not in campaign_stats:
+                period_map = reach_maps.get(c.meta_account_id, {}) if c.meta_account_id else {}
+                object_key = normalize_campaign_name(c.campaign_name)
                 campaign_stats[key] = {
                     "campaign_name": c.campaign_name,
                     "meta_account_id": c.meta_account_id,
                     "latest_date": str(c.date),
-                    "period_unique_reach_all": c.period_unique_reach_all or 0,
-                    "period_unique_reach_30days": c.period_unique_reach_30days or 0,
-                    "period_unique_reach_7days": c.period_unique_reach_7days or 0,
-                    "period_unique_reach": c.period_unique_reach or 0,
+                    "period_unique_reach_all": period_map.get("all", {}).get(object_key, 0),
+                    "period_unique_reach_30days": period_map.get("30days", {}).get(object_key, 0),
+                    "period_unique_reach_7days": period_map.get("7days", {}).get(object_key, 0),
+                    "period_unique_reach": period_map.get("all", {}).get(object_key, 0),
                     "daily_reach_sum": 0,
                     "daily_reach_records": [],
                     "record_count": 0
@@ -1730,19 +1754,18 @@ def debug_duplicate_check(
     """
     データの重複や不整合を確認
     - 同じキャンペーン名、同じ日付で複数のレコードが存在するか
-    - 同じキャンペーンの異なる日付のレコードで、period_unique_reach_7days、period_unique_reach_30days、period_unique_reach_allの値が異なるか
-    - 更新処理がすべてのレコードに適用されているか
+    ※ 期間別ユニークリーチはperiod_reachテーブルで1件ずつ管理するため、レコード間の不整合チェックは不要になった
     """
     try:
         # キャンペーンレベルのデータのみを取得
         query = db.query(Campaign).filter(
             Campaign.user_id == current_user.id,
-            or_(Campaign.ad_set_name == '', Campaign.ad_set_name.is_(None)),
-            or_(Campaign.ad_name == '', Campaign.ad_name.is_(None))
+            Campaign.adset_key.is_(None),
+            Campaign.ad_key.is_(None)
         )
         
         if campaign_name:
-            query = query.filter(Campaign.campaign_name == campaign_name)
+            query = query.filter(campaign_name_filter(campaign_name))
         
         campaigns = query.order_by(Campaign.campaign_name, Campaign.date).all()
         
@@ -1767,9 +1790,6 @@ def debug_duplicate_check(
                 "date": str(c.date),
                 "campaign_name": c.campaign_name,
                 "meta_account_id": c.meta_account_id,
-                "period_unique_reach_7days": c.period_unique_reach_7days or 0,
-                "period_unique_reach_30days": c.period_unique_reach_30days or 0,
-                "period_unique_reach_all": c.period_unique_reach_all or 0,
                 "reach": c.reach or 0,
                 "created_at": str(c.created_at) if c.created_at else None
             })
@@ -1785,50 +1805,8 @@ def debug_duplicate_check(
                     "records": records
                 })
         
-        # 2. 不整合チェック: 同じキャンペーンの異なる日付のレコードで、period_unique_reach_7days、period_unique_reach_30days、period_unique_reach_allの値が異なるか
-        campaign_groups = defaultdict(list)
-        for c in campaigns:
-            campaign_groups[c.campaign_name].append({
-                "date": str(c.date),
-                "period_unique_reach_7days": c.period_unique_reach_7days or 0,
-                "period_unique_reach_30days": c.period_unique_reach_30days or 0,
-                "period_unique_reach_all": c.period_unique_reach_all or 0,
-                "reach": c.reach or 0
-            })
-        
+        campaign_groups = set(c.campaign_name for c in campaigns)
         inconsistencies = []
-        for campaign_name_key, records in campaign_groups.items():
-            # 同じキャンペーンの異なる日付で、period_unique_reach_7days、period_unique_reach_30days、period_unique_reach_allの値が異なるか確認
-            unique_7days = set(r["period_unique_reach_7days"] for r in records)
-            unique_30days = set(r["period_unique_reach_30days"] for r in records)
-            unique_all = set(r["period_unique_reach_all"] for r in records)
-            
-            # 0以外の値が複数存在する場合は不整合
-            non_zero_7days = [v for v in unique_7days if v > 0]
-            non_zero_30days = [v for v in unique_30days if v > 0]
-            non_zero_all = [v for v in unique_all if v > 0]
-            
-            if len(non_zero_7days) > 1 or len(non_zero_30days) > 1 or len(non_zero_all) > 1:
-                inconsistencies.append({
-                    "campaign_name": campaign_name_key,
-                    "issue": "異なる日付のレコードでperiod_unique_reachの値が異なる",
-                    "period_unique_reach_7days_values": sorted(non_zero_7days) if len(non_zero_7days) > 1 else None,
-                    "period_unique_reach_30days_values": sorted(non_zero_30days) if len(non_zero_30days) > 1 else None,
-                    "period_unique_reach_all_values": sorted(non_zero_all) if len(non_zero_all) > 1 else None,
-                    "records": records
-                })
-            
-            # すべてのレコードでperiod_unique_reach_allが0の場合、または一部だけ0の場合も不整合の可能性
-            all_zero = all(r["period_unique_reach_all"] == 0 for r in records)
-            some_zero = any(r["period_unique_reach_all"] == 0 for r in records) and any(r["period_unique_reach_all"] > 0 for r in records)
-            
-            if some_zero:
-                inconsistencies.append({
-                    "campaign_name": campaign_name_key,
-                    "issue": "一部のレコードでperiod_unique_reach_allが0",
-                    "records_with_zero": [r for r in records if r["period_unique_reach_all"] == 0],
-                    "records_with_value": [r for r in records if r["period_unique_reach_all"] > 0]
-                })
         
         return {
             "message": "確認完了",
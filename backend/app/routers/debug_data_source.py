@@ -78,28 +78,16 @@ def analyze_data_source(
     # 5. キャンペーンレベルのデータのみを分析
     campaign_level_total = db.query(Campaign).filter(
         Campaign.user_id == current_user.id,
-        or_(
-            Campaign.ad_set_name == '',
-            Campaign.ad_set_name.is_(None)
-        ),
-        or_(
-            Campaign.ad_name == '',
-            Campaign.ad_name.is_(None)
-        )
+        Campaign.adset_key.is_(None),
+        Campaign.ad_key.is_(None)
     ).count()
     
     campaign_level_meta_api = db.query(Campaign).filter(
         Campaign.user_id == current_user.id,
         Campaign.meta_account_id.isnot(None),
         Campaign.meta_account_id != '',
-        or_(
-            Campaign.ad_set_name == '',
-            Campaign.ad_set_name.is_(None)
-        ),
-        or_(
-            Campaign.ad_name == '',
-            Campaign.ad_name.is_(None)
-        )
+        Campaign.adset_key.is_(None),
+        Campaign.ad_key.is_(None)
     ).count()
     
     campaign_level_csv = db.query(Campaign).filter(
@@ -108,14 +96,8 @@ def analyze_data_source(
             Campaign.meta_account_id.is_(None),
             Campaign.meta_account_id == ''
         ),
-        or_(
-            Campaign.ad_set_name == '',
-            Campaign.ad_set_name.is_(None)
-        ),
-        or_(
-            Campaign.ad_name == '',
-            Campaign.ad_name.is_(None)
-        )
+        Campaign.adset_key.is_(None),
+        Campaign.ad_key.is_(None)
     ).count()
     
     # 6. 各meta_account_idごとのデータ数
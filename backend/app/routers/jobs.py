@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+import uuid
+from ..database import get_db
+from ..models.user import User
+from ..models.job import Job
+from ..utils.dependencies import get_current_user
+from ..services.job_queue import JobQueue
+
+router = APIRouter()
+
+@router.get("/")
+def get_jobs(
+    job_type: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    limit: int = Query(20, le=100),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get background jobs for current user"""
+    query = db.query(Job).filter(Job.user_id == current_user.id)
+    if job_type:
+        query = query.filter(Job.job_type == job_type)
+    if status:
+        query = query.filter(Job.status == status)
+    jobs = query.order_by(Job.created_at.desc()).limit(limit).all()
+    return {"data": [JobQueue.to_dict(job) for job in jobs]}
+
+@router.get("/{job_id}")
+def get_job(
+    job_id: uuid.UUID,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get specific job status"""
+    job = db.query(Job).filter(Job.id == job_id, Job.user_id == current_user.id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobQueue.to_dict(job)
+
+@router.post("/{job_id}/cancel")
+def cancel_job(
+    job_id: uuid.UUID,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Cancel a queued job"""
+    job = db.query(Job).filter(Job.id == job_id, Job.user_id == current_user.id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not JobQueue.cancel(db, job):
+        raise HTTPException(status_code=409, detail="実行中または完了済みのジョブはキャンセルできません")
+    return JobQueue.to_dict(job)
@@ -1,58 +1,156 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks, Request
-from fastapi.responses import RedirectResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from fastapi.responses import RedirectResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_, text
-from typing import Optional
+from sqlalchemy import func, or_
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from ..models.user import User
 from ..models.campaign import Campaign, Upload
+from ..models.sync_run import SyncRun
 from ..utils.dependencies import get_current_user
-from ..database import get_db
+from ..database import get_db, SessionLocal
 from ..config import settings
+from ..utils.campaign_names import normalize_campaign_name
+from ..utils.plan_limits import get_sync_limits
+from ..services.reach_service import ReachService
+from ..services.dimension_service import DimensionResolver
+from ..services.partition_service import PartitionService
+from ..services.sync_staging import SyncStaging
+from ..services.sync_run_service import SyncRunService
+from ..services.job_queue import JobQueue
+from ..services.single_flight import SingleFlight
+from ..services.meta_actions import MetaActionExtractor
+from ..services.ad_account_service import AdAccountService
+from ..services.meta_async_reports import MetaAsyncReports
+from ..services.graph_client import graph_client
+import asyncio
+import hashlib
 import httpx
+import time
 import urllib.parse
-import re
 import secrets
 import uuid
 import json
+import weakref
 from decimal import Decimal
 
 router = APIRouter()
 
-def normalize_campaign_name(name: str) -> str:
+# ステージングテーブルへの書き込み単位（行数）
+STAGING_BATCH_SIZE = 1000
+
+# 数値の安全なパース関数（Noneや空文字列を0に変換）
+def safe_float(value, default=0.0):
+    if value is None or value == '':
+        return default
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return default
+
+def safe_int(value, default=0):
+    if value is None or value == '':
+        return default
+    try:
+        return int(float(value))  # float経由で変換（文字列の数値も対応）
+    except (ValueError, TypeError):
+        return default
+
+def normalize_insight_page(insights: List[Dict], extractor: MetaActionExtractor, verbose_count: int = 0) -> List[Optional[Dict]]:
     """
-    キャンペーン名を正規化（前後のスペース削除、全角・半角の統一、全角数字の半角化）
-    
-    Args:
-        name: 正規化するキャンペーン名
-        
-    Returns:
-        正規化されたキャンペーン名
+    Meta APIのInsights 1ページ分をCampaignテーブルのカラム値に変換（insightsと同じ順序、date_startがないものはNone）
+    campaign_name / ad_set_name / ad_name はディメンションの解決用（Campaignのカラムではない）
+    actions / action_values / conversions 由来の指標は extractor でページ単位にまとめて抽出する
+    verbose_count: 先頭から何件分、変換の過程をログ出力するか（確認用）
     """
-    if not name:
-        return ''
-    
-    # 前後のスペースを削除
-    name = name.strip()
-    
-    # 全角スペースを半角スペースに変換
-    name = name.replace('　', ' ')
-    
-    # 連続するスペースを1つに統一
-    name = re.sub(r'\s+', ' ', name)
-    
-    # 全角数字を半角数字に変換（例: 「１」→「1」）
-    import unicodedata
-    name = ''.join([unicodedata.normalize('NFKC', char) if unicodedata.category(char) == 'Nd' else char for char in name])
-    
-    # 再度前後のスペースを削除（連続スペース削除後のため）
-    name = name.strip()
-    
-    return name
+    action_metrics = extractor.extract_page(insights)
+    conversions_column = action_metrics["conversions"]
+    value_column = action_metrics["conversion_value"]
+    type_column = action_metrics["conversion_type"]
+    engagements_column = action_metrics["engagements"]
+    landing_page_views_column = action_metrics["landing_page_views"]
+
+    rows: List[Optional[Dict]] = []
+    for idx, insight in enumerate(insights):
+        # 日付を取得
+        date_str = insight.get('date_start')
+        if not date_str:
+            print(f"[Meta API] WARNING: Skipping insight with no date_start: {insight}")
+            rows.append(None)
+            continue
+        try:
+            campaign_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+        except ValueError:
+            print(f"[Meta API] WARNING: Skipping insight with invalid date_start: {date_str}")
+            rows.append(None)
+            continue
+
+        # キャンペーン名を正規化してから保存（期間別ユニークリーチ取得時のキャンペーン名と一致させるため）
+        campaign_name = normalize_campaign_name(insight.get('campaign_name', 'Unknown'))
+
+        spend = safe_float(insight.get('spend'), 0.0)
+        impressions = safe_int(insight.get('impressions'), 0)
+        all_clicks = safe_int(insight.get('clicks'), 0)
+        inline_link_clicks = safe_int(insight.get('inline_link_clicks'), 0)
+        reach = safe_int(insight.get('reach'), 0)
 
-async def sync_meta_data_to_campaigns(user: User, access_token: str, account_id: str, db: Session, days: Optional[int] = None):
+        # クリック数はinline_link_clicksを使用
+        clicks = inline_link_clicks if inline_link_clicks > 0 else all_clicks
+        link_clicks = clicks
+
+        conversions = conversions_column[idx]
+        conversion_value = value_column[idx]
+
+        # メトリクスを計算
+        ctr = (clicks / impressions * 100) if impressions > 0 else 0
+        cpc = (spend / clicks) if clicks > 0 else 0
+        cpm = (spend / impressions * 1000) if impressions > 0 else 0
+        cpa = (spend / conversions) if conversions > 0 else 0
+        cvr = (conversions / clicks * 100) if clicks > 0 else 0
+        roas = (conversion_value / spend) if spend > 0 else 0
+
+        # デバッグログ（最初の数件のみ）
+        if idx < verbose_count:
+            print(f"[Meta API] Processing insight: campaign={campaign_name}, date={campaign_date}")
+            print(f"  Raw data: spend={insight.get('spend')}, impressions={insight.get('impressions')}, clicks={insight.get('clicks')}, inline_link_clicks={insight.get('inline_link_clicks')}")
+            print(f"  Final values: spend={spend}, impressions={impressions}, clicks={clicks}, conversions={conversions}, reach={reach}")
+            print(f"  Selected conversion type: {type_column[idx]}, CVR={cvr:.2f}%")
+
+        rows.append({
+            "date": campaign_date,
+            "campaign_name": campaign_name,
+            "ad_set_name": insight.get('adset_name'),  # 広告セット名（あれば）
+            "ad_name": insight.get('ad_name'),  # 広告名（あれば）
+            "cost": Decimal(str(spend)),
+            "impressions": impressions,
+            "clicks": clicks,
+            "conversions": conversions,
+            "conversion_value": Decimal(str(conversion_value)),
+            "reach": reach,
+            "engagements": engagements_column[idx],
+            "link_clicks": link_clicks,
+            "landing_page_views": landing_page_views_column[idx],
+            "ctr": Decimal(str(round(ctr, 2))),
+            "cpc": Decimal(str(round(cpc, 2))),
+            "cpm": Decimal(str(round(cpm, 2))),
+            "cpa": Decimal(str(round(cpa, 2))),
+            "cvr": Decimal(str(round(cvr, 2))),
+            "roas": Decimal(str(round(roas, 2))),
+        })
+    return rows
+
+async def sync_meta_data_to_campaigns(
+    user: User,
+    access_token: str,
+    account_id: str,
+    db: Session,
+    days: Optional[int] = None,
+    replace_all_dates: bool = False
+):
     """
     Meta APIからキャンペーンレベルのデータのみを取得してCampaignテーブルに保存（シンプル版）
+    取得したデータは実行ごとのステージングテーブルに書き込み、検証後にまとめて入れ替える
+    （同期中もダッシュボードは同期前のデータを参照でき、失敗時は既存データがそのまま残る）
     
     Args:
         user: ユーザーオブジェクト
@@ -60,16 +158,19 @@ async def sync_meta_data_to_campaigns(user: User, access_token: str, account_id:
         account_id: Meta広告アカウントID
         db: データベースセッション
         days: 取得する日数（Noneの場合は37ヶ月、90の場合は3ヶ月など）
+        replace_all_dates: Trueの場合、取得期間外も含めてアカウントの全データを入れ替える（全期間再取得用）
     """
     # ダミーのUploadレコードを作成（Meta API同期用）
+    # 入れ替え時のupload_idとして参照されるため先にコミットし、完了時にstatusを更新する
     upload = Upload(
         user_id=user.id,
         file_name="Meta API Sync",
-        status="completed",
+        status="processing",
         row_count=0
     )
     db.add(upload)
-    db.flush()  # upload.idを取得するためにflush
+    db.commit()
+    sync_run = None
     
     # Meta広告アカウントのタイムゾーンで昨日を計算
     from datetime import timezone
@@ -78,26 +179,11 @@ async def sync_meta_data_to_campaigns(user: User, access_token: str, account_id:
     # Meta APIのアカウントIDは act_ プレフィックスが必要
     account_id_for_api = account_id if account_id.startswith("act_") else f"act_{account_id}"
     account_id_for_db = account_id_for_api
-    async def get_account_timezone():
-        try:
-            account_url = f"https://graph.facebook.com/v24.0/{account_id_for_api}"
-            account_params = {
-                "access_token": access_token,
-                "fields": "timezone_offset_hours_utc"
-            }
-            account_response = await client.get(account_url, params=account_params)
-            account_response.raise_for_status()
-            account_data = account_response.json()
-            tz_offset = account_data.get("timezone_offset_hours_utc")
-            if tz_offset is not None:
-                return float(tz_offset)
-        except Exception as e:
-            print(f"[Meta API] ⚠️ Failed to get account timezone, fallback to JST: {str(e)}")
-        return None
     
     try:
-        async with httpx.AsyncClient() as client:
-            tz_offset = await get_account_timezone()
+        async with graph_client() as client:
+            # タイムゾーンは ad_accounts のキャッシュから取得（期限切れの場合のみMeta APIを呼ぶ）
+            tz_offset = await AdAccountService.get_timezone_offset(db, user.id, account_id_for_db, access_token)
             if tz_offset is not None:
                 account_tz = timezone(timedelta(hours=tz_offset))
                 account_tz_label = f"UTC{tz_offset:+}"
@@ -149,9 +235,14 @@ async def sync_meta_data_to_campaigns(user: User, access_token: str, account_id:
                 # 未来の日付が含まれている場合は警告
                 if since_dt > today_tz or until_dt > today_tz:
                     print(f"[Meta API] WARNING: Date range includes future dates! Today ({account_tz_label}): {today_tz}, Since: {since}, Until: {until}")
-            all_insights = []
             all_campaigns = []
             
+            # プランの制限（表示できないレベルのデータはMeta APIから取得せず、DBにも保存しない）
+            # キャンペーンレベルはすべてのプランで件数の上限なし（広告セット数の上限は広告セットの取得時に適用する）
+            sync_limits = get_sync_limits(user.plan)
+            if sync_limits["skipped_levels"]:
+                print(f"[Meta API] Plan {sync_limits['plan']}: levels: {sync_limits['levels']} (skipped: {sync_limits['skipped_levels']})")
+            
             # キャンペーン一覧を取得（ページネーション対応）
             print(f"[Meta API] Fetching campaigns from account: {account_id_for_api}")
             campaigns_url = f"https://graph.facebook.com/v24.0/{account_id_for_api}/campaigns"
@@ -186,7 +277,7 @@ async def sync_meta_data_to_campaigns(user: User, access_token: str, account_id:
                 
                 # 次のページのURLを設定（パラメータをクリア）
                 campaigns_url = next_url
-                campaigns_params = {}  # URLにパラメータが含まれているためクリア
+                campaigns_params = None  # 次ページのURLにパラメータが含まれているため指定しない（空のdictはURLのクエリを消す）
             
             print(f"[Meta API] Total campaigns fetched: {len(all_campaigns)}")
             
@@ -242,6 +333,11 @@ async def sync_meta_data_to_campaigns(user: User, access_token: str, account_id:
                 actual_days = (current_until_dt - current_since_dt).days
                 print(f"[Meta API] Full period sync: Using full {actual_days} days range (days=None, since={since}, until={until})")
             
+            # 同期の実行を開始（同じアカウント・取得日数の未完了の実行があれば、その期間とステージング済みのバッチを引き継いで再開）
+            sync_run = SyncRunService.start(db, user.id, account_id_for_db, days, current_since_dt, current_until_dt, replace_all_dates)
+            current_since_dt, current_until_dt = sync_run.since, sync_run.until
+            staging_table = sync_run.staging_table
+            
             # 日付範囲を文字列に変換（since_dtとuntil_dtは既にJST基準で計算されているdate型）
             start_date_str = current_since_dt.strftime('%Y-%m-%d')
             end_date_str = current_until_dt.strftime('%Y-%m-%d')
@@ -258,349 +354,268 @@ async def sync_meta_data_to_campaigns(user: User, access_token: str, account_id:
             # time_increment=1を追加して日次データを取得（重要：これがないと期間全体の集計データが1件だけ返される）
             time_increment = "1"
             
-            # キャンペーンを50件ずつのバッチに分割
-            batch_size = 50  # Meta APIのバッチリクエスト最大数
-            for batch_start in range(0, len(all_campaigns), batch_size):
-                batch_end = min(batch_start + batch_size, len(all_campaigns))
-                batch_campaigns = all_campaigns[batch_start:batch_end]
-                batch_num = (batch_start // batch_size) + 1
-                total_batches = (len(all_campaigns) + batch_size - 1) // batch_size
-                
-                print(f"[Meta API] Processing campaign batch {batch_num}/{total_batches} ({len(batch_campaigns)} campaigns)")
-                
-                # バッチリクエストの作成
-                batch_requests = []
-                for campaign in batch_campaigns:
-                    campaign_id = campaign.get('id')
-                    # 相対URLを作成（access_tokenとtime_rangeを含む）
-                    # time_increment=1を追加して日次データを取得（重要：これがないと期間全体の集計データが1件だけ返される）
-                    # Meta APIのバッチリクエストでは、time_rangeはJSON文字列として渡す必要がある
-                    # URLエンコードが必要だが、{}や:などの文字もエンコードする必要がある
-                    # time_rangeは{"since":"2022-11-26","until":"2025-12-22"}の形式
-                    time_range_encoded = urllib.parse.quote(time_range_json, safe='')
-                    filtering_json = json.dumps([{
-                        "field": "campaign.id",
-                        "operator": "IN",
-                        "value": [campaign_id]
-                    }], separators=(',', ':'))
-                    filtering_encoded = urllib.parse.quote(filtering_json, safe='')
-                    # time_incrementパラメータを追加（日次データを取得するために必須）
-                    # level=campaignを明示的に指定（キャンペーンレベルのデータのみを取得）
-                    relative_url = f"{account_id_for_api}/insights?fields={campaign_fields}&time_range={time_range_encoded}&time_increment={time_increment}&level=campaign&filtering={filtering_encoded}&limit=100"
-                    
-                    # デバッグログ（最初のバッチの最初のキャンペーンのみ）
-                    if batch_start == 0 and len(batch_requests) == 0:
-                        print(f"[Meta API] Sample relative_url for batch request: {relative_url}")
-                        print(f"[Meta API] time_range_json: {time_range_json}")
-                        print(f"[Meta API] time_range_encoded: {time_range_encoded}")
-                        print(f"[Meta API] time_increment: {time_increment}")
-                        print(f"[Meta API] Full URL would be: https://graph.facebook.com/v24.0/{relative_url}")
-                    
-                    batch_requests.append({
-                        "method": "GET",
-                        "relative_url": relative_url
-                    })
-                
-                try:
-                    # バッチリクエストを送信
-                    batch_url = "https://graph.facebook.com/v24.0/"
-                    batch_params = {
-                        "access_token": access_token,
-                        "batch": json.dumps(batch_requests, separators=(',', ':'))
-                    }
-                    
-                    # デバッグ: バッチリクエストの内容を確認（最初のバッチのみ）
-                    if batch_start == 0:
-                        print(f"[Meta API] ===== Batch Request Debug (First Batch) =====")
-                        print(f"[Meta API] Batch URL: {batch_url}")
-                        print(f"[Meta API] Number of requests in batch: {len(batch_requests)}")
-                        print(f"[Meta API] First request relative_url: {batch_requests[0].get('relative_url')}")
-                        print(f"[Meta API] First request method: {batch_requests[0].get('method')}")
-                        # リクエストURLを解析してパラメータを確認
-                        first_relative_url = batch_requests[0].get('relative_url', '')
-                        print(f"[Meta API] Parsed relative_url: {first_relative_url}")
-                        # time_rangeとtime_incrementが含まれているか確認
-                        if 'time_range=' in first_relative_url:
-                            print(f"[Meta API] ✓ time_range parameter found in URL")
-                        else:
-                            print(f"[Meta API] ✗ ERROR: time_range parameter NOT found in URL!")
-                        if 'time_increment=' in first_relative_url:
-                            print(f"[Meta API] ✓ time_increment parameter found in URL")
-                        else:
-                            print(f"[Meta API] ✗ ERROR: time_increment parameter NOT found in URL!")
-                        print(f"[Meta API] ==============================================")
-                    
-                    batch_response = await client.post(batch_url, params=batch_params)
-                    raise_for_status_with_body(batch_response, "daily_insights_batch")
-                    batch_data = batch_response.json()
-                    
-                    # デバッグ: バッチレスポンスの内容を確認（最初のバッチの最初のレスポンスのみ）
-                    if batch_start == 0 and len(batch_data) > 0:
-                        first_response = batch_data[0]
-                        print(f"[Meta API] ===== Batch Response Debug (First Response) =====")
-                        print(f"[Meta API] Response code: {first_response.get('code')}")
-                        if first_response.get('code') == 200:
-                            try:
-                                first_body = json.loads(first_response.get('body', '{}'))
-                                first_data = first_body.get('data', [])
-                                print(f"[Meta API] Total insights in first response: {len(first_data)}")
-                                if len(first_data) > 0:
-                                    print(f"[Meta API] First insight date_start: {first_data[0].get('date_start')}")
-                                    print(f"[Meta API] First insight campaign_name: {first_data[0].get('campaign_name')}")
-                                    if len(first_data) > 1:
-                                        print(f"[Meta API] Second insight date_start: {first_data[1].get('date_start')}")
-                                        dates_in_first_batch = [d.get('date_start') for d in first_data[:10] if d.get('date_start')]
-                                        unique_dates_in_batch = sorted(list(set(dates_in_first_batch)))
-                                        print(f"[Meta API] First 10 dates in batch: {dates_in_first_batch}")
-                                        print(f"[Meta API] Unique dates in first 10 insights: {unique_dates_in_batch}")
-                                        print(f"[Meta API] Number of unique dates: {len(unique_dates_in_batch)}")
-                                        if len(unique_dates_in_batch) == 1:
-                                            print(f"[Meta API] ⚠️ WARNING: Only 1 unique date in first 10 insights!")
-                                    else:
-                                        print(f"[Meta API] ⚠️ WARNING: Only 1 insight returned!")
-                                else:
-                                    print(f"[Meta API] ⚠️ WARNING: No insights in response!")
-                                    print(f"[Meta API] Response body: {first_response.get('body', '')[:500]}")
-                            except Exception as e:
-                                print(f"[Meta API] Error parsing first response: {str(e)}")
-                                print(f"[Meta API] Response body: {first_response.get('body', '')[:500]}")
-                        else:
-                            print(f"[Meta API] ✗ ERROR: Response code is not 200!")
-                            print(f"[Meta API] Response body: {first_response.get('body', '')[:500]}")
-                        print(f"[Meta API] ================================================")
-                    
-                    # バッチレスポンスを処理
-                    for idx, batch_item in enumerate(batch_data):
-                        campaign = batch_campaigns[idx]
-                        campaign_name = campaign.get('name', 'Unknown')
-                        campaign_id = campaign.get('id')
-                        
-                        if batch_item.get('code') == 200:
-                            try:
-                                item_body = json.loads(batch_item.get('body', '{}'))
-                                page_insights = item_body.get('data', [])
-                                
-                                if len(page_insights) > 0:
-                                    all_insights.extend(page_insights)
-                                    
-                                    # サンプルデータをログ出力（最初のバッチの最初のキャンペーンのみ）
-                                    if batch_start == 0 and idx == 0:
-                                        sample = page_insights[0]
-                                        print(f"[Meta API] Sample insight data for campaign {campaign_name}:")
-                                        print(f"  date_start: {sample.get('date_start')}")
-                                        print(f"  impressions: {sample.get('impressions')}")
-                                        print(f"  clicks: {sample.get('clicks')}")
-                                        print(f"  inline_link_clicks: {sample.get('inline_link_clicks')}")
-                                        print(f"  spend: {sample.get('spend')}")
-                                        print(f"  reach: {sample.get('reach')}")
-                                        print(f"  frequency: {sample.get('frequency')}")
-                                        print(f"  Total insights retrieved: {len(page_insights)}")
-                                        # 日付のバリエーションを確認
-                                        if len(page_insights) > 1:
-                                            dates = [insight.get('date_start') for insight in page_insights[:10] if insight.get('date_start')]
-                                            unique_dates = list(set(dates))
-                                            print(f"  Sample dates (first 10 insights): {unique_dates}")
-                                            print(f"  Unique dates count: {len(unique_dates)}")
-                                    
-                                    # ページネーション処理（pagingがある場合）
-                                    paging = item_body.get('paging', {})
-                                    page_count = 1
-                                    while 'next' in paging:
-                                        page_count += 1
-                                        next_url = paging['next']
-                                        # next_urlには既にaccess_tokenが含まれている可能性があるため、そのまま使用
-                                        print(f"[Meta API] Fetching page {page_count} for {campaign_name}...")
-                                        next_response = await client.get(next_url)
-                                        next_response.raise_for_status()
-                                        next_data = next_response.json()
-                                        next_insights = next_data.get('data', [])
-                                        all_insights.extend(next_insights)
-                                        paging = next_data.get('paging', {})
-                                        print(f"[Meta API] Retrieved {len(next_insights)} more insights for {campaign_name} (page {page_count}, total: {len(all_insights)})")
-                                        # ページネーションのデバッグ（最初のキャンペーンのみ）
-                                        if batch_start == 0 and idx == 0 and len(next_insights) > 0:
-                                            next_dates = [d.get('date_start') for d in next_insights[:5] if d.get('date_start')]
-                                            print(f"[Meta API] Sample dates from page {page_count}: {next_dates}")
-                                    if page_count > 1:
-                                        print(f"[Meta API] Completed pagination for {campaign_name}: {page_count} pages, {len([i for i in all_insights if i.get('campaign_name') == campaign_name])} total insights")
-                                    
-                                    if idx < 3 or (batch_start == 0 and idx == 0):
-                                        print(f"  ✓ Success: Retrieved {len(page_insights)} insights for {campaign_name}")
-                                else:
-                                    if idx < 3:
-                                        print(f"  ⚠ No insights data returned for {campaign_name}")
-                            except json.JSONDecodeError as e:
-                                print(f"[Meta API] Error parsing batch response for {campaign_name}: {str(e)}")
-                                print(f"  Response body: {batch_item.get('body', '')[:200]}")
-                        else:
-                            error_body = batch_item.get('body', '{}')
-                            try:
-                                error_data = json.loads(error_body) if isinstance(error_body, str) else error_body
-                                error_msg = error_data.get('error', {}).get('message', str(error_body))
-                                print(f"[Meta API] Error fetching insights for {campaign_name} ({campaign_id}): {error_msg}")
-                            except:
-                                print(f"[Meta API] Error fetching insights for {campaign_name} ({campaign_id}): {error_body}")
+            time_slice = SyncRunService.time_slice(current_since_dt, current_until_dt)
+            checkpoints = SyncRunService.get_checkpoints(db, sync_run, "campaign")
+            completed_campaign_ids = SyncRunService.completed_object_ids(checkpoints, time_slice)
+            checkpoint_row_count = sum(
+                checkpoint.row_count or 0 for checkpoint in checkpoints if checkpoint.time_slice == time_slice
+            )
+            next_batch_index = max([checkpoint.batch_index for checkpoint in checkpoints], default=-1) + 1
+            pending_campaigns = [c for c in all_campaigns if str(c.get('id')) not in completed_campaign_ids]
+            if sync_limits["skipped_levels"]:
+                # プランの制限で取得しなかったレベルを記録（同期状況の表示・アップグレード案内用）
+                SyncRunService.record_plan_limits(db, sync_run, {
+                    "plan": sync_limits["plan"],
+                    "max_adsets": sync_limits["max_adsets"],
+                    "skipped_levels": sync_limits["skipped_levels"],
+                })
+            if completed_campaign_ids:
+                print(f"[Meta API] Resuming from checkpoint: {len(completed_campaign_ids)} campaigns already staged ({checkpoint_row_count} rows), {len(pending_campaigns)} remaining")
+            failed_batches = []
+            
+            async def fetch_campaign_insight_batches() -> AsyncIterator[Tuple[Tuple, List[Dict]]]:
+                """
+                キャンペーンレベルのInsightsをバッチ（最大50キャンペーン）単位で順に (チェックポイントの単位, Insights) として返す
+                - チェックポイント済みのバッチはステージングに書き込み済みのため取得しない
+                - 失敗したバッチ（1キャンペーンでも取得できなかったバッチを含む）は返さずに failed_batches に記録する
+                メモリに保持するのは常に1バッチ分のみ（アカウント全体・全期間のリストは作らない）
+                """
+                # キャンペーンを50件ずつのバッチに分割
+                batch_size = 50  # Meta APIのバッチリクエスト最大数
+                for batch_start in range(0, len(pending_campaigns), batch_size):
+                    batch_end = min(batch_start + batch_size, len(pending_campaigns))
+                    batch_campaigns = pending_campaigns[batch_start:batch_end]
+                    batch_num = (batch_start // batch_size) + 1
+                    total_batches = (len(pending_campaigns) + batch_size - 1) // batch_size
+                    batch_index = next_batch_index + batch_num - 1
+                    batch_insights = []
                 
-                except Exception as e:
-                    print(f"[Meta API] Error processing campaign batch {batch_num}: {str(e)}")
-                    # バッチエラーが発生しても次のバッチの処理を続行
-                    continue
-            
-            print(f"[Meta API] Campaign-level insights retrieved: {len(all_insights)}")
-            
-            # 数値の安全なパース関数（期間別ユニークリーチ取得処理で使用）
-            def safe_int(value, default=0):
-                if value is None or value == '':
-                    return default
-                try:
-                    return int(float(value))  # float経由で変換（文字列の数値も対応）
-                except (ValueError, TypeError):
-                    return default
-            
-            # ===== 期間別のユニークリーチ数を取得（キャンペーンレベルのみ） =====
-            # 7日間、30日間、全期間それぞれで、time_incrementなしで期間全体の集計データを取得
-            print(f"[Meta API] Fetching period unique reach for 7 days, 30 days, and all period...")
-            
-            # マップを初期化
-            campaign_period_reach_7days_map = {}
-            campaign_period_reach_30days_map = {}
-            campaign_period_reach_all_map = {}
-            campaign_period_reach_map = {}
-            
-            # 日次データ取得時と同じcurrent_until_dtを使用（JST基準で計算済み）
-            until_str = current_until_dt.strftime('%Y-%m-%d')
-            
-            # 7日間: current_until_dtから6日前まで
-            seven_days_ago_dt = current_until_dt - timedelta(days=6)
-            seven_days_ago_str = seven_days_ago_dt.strftime('%Y-%m-%d')
-            time_range_7days_dict = {
-                "since": seven_days_ago_str,
-                "until": until_str
-            }
-            time_range_7days_json = json.dumps(time_range_7days_dict, separators=(',', ':'))
-            time_range_7days_encoded = urllib.parse.quote(time_range_7days_json, safe='')
-            
-            # 30日間: current_until_dtから29日前まで
-            thirty_days_ago_dt = current_until_dt - timedelta(days=29)
-            thirty_days_ago_str = thirty_days_ago_dt.strftime('%Y-%m-%d')
-            time_range_30days_dict = {
-                "since": thirty_days_ago_str,
-                "until": until_str
-            }
-            time_range_30days_json = json.dumps(time_range_30days_dict, separators=(',', ':'))
-            time_range_30days_encoded = urllib.parse.quote(time_range_30days_json, safe='')
-            
-            # 全期間: 日次データ取得時と同じcurrent_since_dtとcurrent_until_dtを使用
-            time_range_all_dict = {
-                "since": current_since_dt.strftime('%Y-%m-%d'),
-                "until": until_str
-            }
-            time_range_all_json = json.dumps(time_range_all_dict, separators=(',', ':'))
-            time_range_all_encoded = urllib.parse.quote(time_range_all_json, safe='')
-            
-            # 期間別のマップとtime_rangeのペア
-            period_configs = [
-                ("7days", campaign_period_reach_7days_map, time_range_7days_encoded),
-                ("30days", campaign_period_reach_30days_map, time_range_30days_encoded),
-                ("all", campaign_period_reach_all_map, time_range_all_encoded)
-            ]
-            
-            # 各期間でユニークリーチを取得
-            period_reach_fields = "campaign_id,campaign_name,reach"
-            for period_name, period_map, time_range_encoded in period_configs:
-                print(f"[Meta API] Fetching {period_name} unique reach...")
+                    print(f"[Meta API] Processing campaign batch {batch_num}/{total_batches} ({len(batch_campaigns)} campaigns)")
                 
-                # バッチ処理で期間全体のユニークリーチ数を取得
-                batch_size = 50
-                for batch_start in range(0, len(all_campaigns), batch_size):
-                    batch_end = min(batch_start + batch_size, len(all_campaigns))
-                    batch_campaigns = all_campaigns[batch_start:batch_end]
-                    batch_num = (batch_start // batch_size) + 1
-                    total_batches = (len(all_campaigns) + batch_size - 1) // batch_size
-                    
-                    print(f"[Meta API] Processing {period_name} unique reach batch {batch_num}/{total_batches} ({len(batch_campaigns)} campaigns)")
-                    
+                    # バッチリクエストの作成
                     batch_requests = []
                     for campaign in batch_campaigns:
                         campaign_id = campaign.get('id')
-                        # time_incrementなしで期間全体の集計データ（1件）を取得
+                        # 相対URLを作成（access_tokenとtime_rangeを含む）
+                        # time_increment=1を追加して日次データを取得（重要：これがないと期間全体の集計データが1件だけ返される）
+                        # Meta APIのバッチリクエストでは、time_rangeはJSON文字列として渡す必要がある
+                        # URLエンコードが必要だが、{}や:などの文字もエンコードする必要がある
+                        # time_rangeは{"since":"2022-11-26","until":"2025-12-22"}の形式
+                        time_range_encoded = urllib.parse.quote(time_range_json, safe='')
                         filtering_json = json.dumps([{
                             "field": "campaign.id",
                             "operator": "IN",
                             "value": [campaign_id]
                         }], separators=(',', ':'))
                         filtering_encoded = urllib.parse.quote(filtering_json, safe='')
-                        relative_url = f"{account_id_for_api}/insights?fields={period_reach_fields}&time_range={time_range_encoded}&level=campaign&filtering={filtering_encoded}&limit=100"
+                        # time_incrementパラメータを追加（日次データを取得するために必須）
+                        # level=campaignを明示的に指定（キャンペーンレベルのデータのみを取得）
+                        relative_url = f"{account_id_for_api}/insights?fields={campaign_fields}&time_range={time_range_encoded}&time_increment={time_increment}&level=campaign&filtering={filtering_encoded}&limit=100"
+                    
+                        # デバッグログ（最初のバッチの最初のキャンペーンのみ）
+                        if batch_start == 0 and len(batch_requests) == 0:
+                            print(f"[Meta API] Sample relative_url for batch request: {relative_url}")
+                            print(f"[Meta API] time_range_json: {time_range_json}")
+                            print(f"[Meta API] time_range_encoded: {time_range_encoded}")
+                            print(f"[Meta API] time_increment: {time_increment}")
+                            print(f"[Meta API] Full URL would be: https://graph.facebook.com/v24.0/{relative_url}")
+                    
                         batch_requests.append({
                             "method": "GET",
                             "relative_url": relative_url
                         })
-                    
+                
                     try:
+                        # バッチリクエストを送信
                         batch_url = "https://graph.facebook.com/v24.0/"
                         batch_params = {
                             "access_token": access_token,
                             "batch": json.dumps(batch_requests, separators=(',', ':'))
                         }
-                        
+                    
+                        # デバッグ: バッチリクエストの内容を確認（最初のバッチのみ）
+                        if batch_start == 0:
+                            print(f"[Meta API] ===== Batch Request Debug (First Batch) =====")
+                            print(f"[Meta API] Batch URL: {batch_url}")
+                            print(f"[Meta API] Number of requests in batch: {len(batch_requests)}")
+                            print(f"[Meta API] First request relative_url: {batch_requests[0].get('relative_url')}")
+                            print(f"[Meta API] First request method: {batch_requests[0].get('method')}")
+                            # リクエストURLを解析してパラメータを確認
+                            first_relative_url = batch_requests[0].get('relative_url', '')
+                            print(f"[Meta API] Parsed relative_url: {first_relative_url}")
+                            # time_rangeとtime_incrementが含まれているか確認
+                            if 'time_range=' in first_relative_url:
+                                print(f"[Meta API] ✓ time_range parameter found in URL")
+                            else:
+                                print(f"[Meta API] ✗ ERROR: time_range parameter NOT found in URL!")
+                            if 'time_increment=' in first_relative_url:
+                                print(f"[Meta API] ✓ time_increment parameter found in URL")
+                            else:
+                                print(f"[Meta API] ✗ ERROR: time_increment parameter NOT found in URL!")
+                            print(f"[Meta API] ==============================================")
+                    
                         batch_response = await client.post(batch_url, params=batch_params)
-                        raise_for_status_with_body(batch_response, "period_unique_reach_batch")
+                        raise_for_status_with_body(batch_response, "daily_insights_batch")
                         batch_data = batch_response.json()
-                        
+                    
+                        # デバッグ: バッチレスポンスの内容を確認（最初のバッチの最初のレスポンスのみ）
+                        if batch_start == 0 and len(batch_data) > 0:
+                            first_response = batch_data[0]
+                            print(f"[Meta API] ===== Batch Response Debug (First Response) =====")
+                            print(f"[Meta API] Response code: {first_response.get('code')}")
+                            if first_response.get('code') == 200:
+                                try:
+                                    first_body = json.loads(first_response.get('body', '{}'))
+                                    first_data = first_body.get('data', [])
+                                    print(f"[Meta API] Total insights in first response: {len(first_data)}")
+                                    if len(first_data) > 0:
+                                        print(f"[Meta API] First insight date_start: {first_data[0].get('date_start')}")
+                                        print(f"[Meta API] First insight campaign_name: {first_data[0].get('campaign_name')}")
+                                        if len(first_data) > 1:
+                                            print(f"[Meta API] Second insight date_start: {first_data[1].get('date_start')}")
+                                            dates_in_first_batch = [d.get('date_start') for d in first_data[:10] if d.get('date_start')]
+                                            unique_dates_in_batch = sorted(list(set(dates_in_first_batch)))
+                                            print(f"[Meta API] First 10 dates in batch: {dates_in_first_batch}")
+                                            print(f"[Meta API] Unique dates in first 10 insights: {unique_dates_in_batch}")
+                                            print(f"[Meta API] Number of unique dates: {len(unique_dates_in_batch)}")
+                                            if len(unique_dates_in_batch) == 1:
+                                                print(f"[Meta API] ⚠️ WARNING: Only 1 unique date in first 10 insights!")
+                                        else:
+                                            print(f"[Meta API] ⚠️ WARNING: Only 1 insight returned!")
+                                    else:
+                                        print(f"[Meta API] ⚠️ WARNING: No insights in response!")
+                                        print(f"[Meta API] Response body: {first_response.get('body', '')[:500]}")
+                                except Exception as e:
+                                    print(f"[Meta API] Error parsing first response: {str(e)}")
+                                    print(f"[Meta API] Response body: {first_response.get('body', '')[:500]}")
+                            else:
+                                print(f"[Meta API] ✗ ERROR: Response code is not 200!")
+                                print(f"[Meta API] Response body: {first_response.get('body', '')[:500]}")
+                            print(f"[Meta API] ================================================")
+                    
+                        if len(batch_data) != len(batch_campaigns):
+                            raise Exception(f"Batch response has {len(batch_data)} item(s) for {len(batch_campaigns)} campaign(s)")
+                        # バッチレスポンスを処理（Metaがタイムアウトした項目はnullのため失敗として扱う）
                         for idx, batch_item in enumerate(batch_data):
+                            if not batch_item:
+                                raise Exception(f"No response for campaign {batch_campaigns[idx].get('id')} in batch (timed out)")
                             campaign = batch_campaigns[idx]
-                            campaign_name_raw = campaign.get('name', 'Unknown')
+                            campaign_name = campaign.get('name', 'Unknown')
                             campaign_id = campaign.get('id')
-                            
+                        
                             if batch_item.get('code') == 200:
                                 try:
                                     item_body = json.loads(batch_item.get('body', '{}'))
-                                    period_insights = item_body.get('data', [])
+                                    page_insights = item_body.get('data', [])
+                                
+                                    if len(page_insights) > 0:
+                                        batch_insights.extend(page_insights)
                                     
-                                    if len(period_insights) > 0:
-                                        # time_incrementなしの場合、期間全体のデータは1件のみ
-                                        unique_reach = safe_int(period_insights[0].get('reach'), 0)
-                                        campaign_name = normalize_campaign_name(campaign_name_raw)
-                                        if campaign_id:
-                                            period_map[campaign_id] = unique_reach
-                                        period_map[campaign_name] = unique_reach
-                                        if idx < 3:
-                                            print(f"[Meta API] {period_name} unique reach for '{campaign_name}' (normalized from '{campaign_name_raw}'): {unique_reach:,}")
+                                        # サンプルデータをログ出力（最初のバッチの最初のキャンペーンのみ）
+                                        if batch_start == 0 and idx == 0:
+                                            sample = page_insights[0]
+                                            print(f"[Meta API] Sample insight data for campaign {campaign_name}:")
+                                            print(f"  date_start: {sample.get('date_start')}")
+                                            print(f"  impressions: {sample.get('impressions')}")
+                                            print(f"  clicks: {sample.get('clicks')}")
+                                            print(f"  inline_link_clicks: {sample.get('inline_link_clicks')}")
+                                            print(f"  spend: {sample.get('spend')}")
+                                            print(f"  reach: {sample.get('reach')}")
+                                            print(f"  frequency: {sample.get('frequency')}")
+                                            print(f"  Total insights retrieved: {len(page_insights)}")
+                                            # 日付のバリエーションを確認
+                                            if len(page_insights) > 1:
+                                                dates = [insight.get('date_start') for insight in page_insights[:10] if insight.get('date_start')]
+                                                unique_dates = list(set(dates))
+                                                print(f"  Sample dates (first 10 insights): {unique_dates}")
+                                                print(f"  Unique dates count: {len(unique_dates)}")
+                                    
+                                        # ページネーション処理（pagingがある場合）
+                                        paging = item_body.get('paging', {})
+                                        page_count = 1
+                                        while 'next' in paging:
+                                            page_count += 1
+                                            next_url = paging['next']
+                                            # next_urlには既にaccess_tokenが含まれている可能性があるため、そのまま使用
+                                            print(f"[Meta API] Fetching page {page_count} for {campaign_name}...")
+                                            next_response = await client.get(next_url)
+                                            next_response.raise_for_status()
+                                            next_data = next_response.json()
+                                            next_insights = next_data.get('data', [])
+                                            batch_insights.extend(next_insights)
+                                            paging = next_data.get('paging', {})
+                                            print(f"[Meta API] Retrieved {len(next_insights)} more insights for {campaign_name} (page {page_count}, batch total: {len(batch_insights)})")
+                                            # ページネーションのデバッグ（最初のキャンペーンのみ）
+                                            if batch_start == 0 and idx == 0 and len(next_insights) > 0:
+                                                next_dates = [d.get('date_start') for d in next_insights[:5] if d.get('date_start')]
+                                                print(f"[Meta API] Sample dates from page {page_count}: {next_dates}")
+                                        if page_count > 1:
+                                            print(f"[Meta API] Completed pagination for {campaign_name}: {page_count} pages")
+                                    
+                                        if idx < 3 or (batch_start == 0 and idx == 0):
+                                            print(f"  ✓ Success: Retrieved {len(page_insights)} insights for {campaign_name}")
                                     else:
                                         if idx < 3:
-                                            print(f"[Meta API] ⚠️ No {period_name} unique reach data for {campaign_name_raw} ({campaign_id})")
+                                            print(f"  ⚠ No insights data returned for {campaign_name}")
                                 except json.JSONDecodeError as e:
-                                    print(f"[Meta API] ⚠️ Error parsing {period_name} batch response for {campaign_name_raw}: {str(e)}")
-                                    import traceback
-                                    print(f"[Meta API] Error details: {traceback.format_exc()}")
+                                    print(f"[Meta API] Error parsing batch response for {campaign_name}: {str(e)}")
+                                    print(f"  Response body: {batch_item.get('body', '')[:200]}")
+                                    # 1キャンペーンでも取得できなければバッチ全体を失敗にする
+                                    # （そのキャンペーンの行がステージングにないまま入れ替えると、既存の行が削除されるため）
+                                    raise Exception(f"Invalid insights response for campaign {campaign_id}: {str(e)}")
                             else:
                                 error_body = batch_item.get('body', '{}')
                                 try:
                                     error_data = json.loads(error_body) if isinstance(error_body, str) else error_body
                                     error_msg = error_data.get('error', {}).get('message', str(error_body))
-                                    print(f"[Meta API] ⚠️ Error fetching {period_name} unique reach for {campaign_name_raw} ({campaign_id}): {error_msg}")
-                                    # エラーが発生した場合でも、マップには0を設定しない（既存の値があれば保持）
-                                except:
-                                    print(f"[Meta API] ⚠️ Error fetching {period_name} unique reach for {campaign_name_raw} ({campaign_id}): {error_body}")
+                                except Exception:
+                                    error_msg = str(error_body)
+                                print(f"[Meta API] Error fetching insights for {campaign_name} ({campaign_id}): {error_msg}")
+                                raise Exception(f"Failed to fetch insights for campaign {campaign_id} (code {batch_item.get('code')}): {error_msg}")
                     
                     except Exception as e:
-                        print(f"[Meta API] Error processing {period_name} batch {batch_num}: {str(e)}")
+                        print(f"[Meta API] Error processing campaign batch {batch_num}: {str(e)}")
+                        # 途中まで取得したデータは破棄し、次のバッチの処理を続行（失敗したバッチは再実行時に取得）
+                        db.rollback()
+                        failed_batches.append(batch_num)
                         continue
                 
-                print(f"[Meta API] {period_name} unique reach map size: {len(period_map)}")
+                    yield ("campaign", batch_index, time_slice, [c.get('id') for c in batch_campaigns]), batch_insights
+            
+            async def fetch_async_report_batches() -> AsyncIterator[Tuple[Tuple, List[Dict]]]:
+                """
+                大規模アカウント用: 期間を分割した非同期レポートでキャンペーンレベルのInsightsを取得し、期間単位で返す
+                - チェックポイント（level="campaign_async"、期間ごと）済みの期間はステージングに書き込み済みのため取得しない
+                - 未取得の期間はレポートを並行して実行し、完了した期間から返す
+                - 失敗した期間は返さずに failed_batches に記録する
+                """
+                async_checkpoints = SyncRunService.get_checkpoints(db, sync_run, "campaign_async")
+                completed_slices = {checkpoint.time_slice for checkpoint in async_checkpoints}
+                
+                slices = MetaAsyncReports.time_slices(current_since_dt, current_until_dt, settings.META_ASYNC_REPORT_SLICE_DAYS)
+                pending_slices = [s for s in slices if SyncRunService.time_slice(*s) not in completed_slices]
+                print(f"[Meta API] Using async insights reports: {len(pending_slices)}/{len(slices)} time slices to fetch ({settings.META_ASYNC_REPORT_SLICE_DAYS} days each)")
+                async for _, report_slice, insights, error in MetaAsyncReports.run_reports(
+                    client, account_id_for_api, access_token, campaign_fields, "campaign", pending_slices
+                ):
+                    slice_label = SyncRunService.time_slice(*report_slice)
+                    if insights is None:
+                        failed_batches.append(slice_label)
+                        continue
+                    yield ("campaign_async", slices.index(report_slice), slice_label, []), insights
             
-            print(f"[Meta API] Period unique reach fetch completed")
+            # 期間別のユニークリーチは日次データとは別に period_reach テーブルで管理する
+            # （保存完了後に ReachService.precompute_popular_ranges でまとめて取得）
             
             # ===== 広告セットレベルのinsights取得 =====
             # 注意: キャンペーンレベルのデータのみを取得するため、広告セット・広告レベルのデータ取得はスキップ
             # キャンペーンレベルのデータ取得が正しく行われているか確認するため、広告セット・広告レベルのデータは取得しない
-            all_adset_insights = []  # 空のリストを設定（統合処理で使用）
-            all_ad_insights = []      # 空のリストを設定（統合処理で使用）
             
             # 以下の広告セット・広告レベルのデータ取得処理はスキップ（キャンペーンレベルのデータのみを取得）
+            # 再開する場合は "adset" in sync_limits["levels"] のプランのみ取得し、広告セットの件数を sync_limits["max_adsets"] までに制限すること
             """
             # 広告セットレベルのデータ取得処理（スキップ）
-            adset_fields = "campaign_id,campaign_name,adset_name,date_start,spend,impressions,clicks,inline_link_clicks,reach,actions,conversions,action_values,frequency"
+            adset_fields = "campaign_id,campaign_name,adset_id,adset_name,date_start,spend,impressions,clicks,inline_link_clicks,reach,actions,conversions,action_values,frequency"
             
             for batch_start in range(0, len(all_campaigns), batch_size):
                 batch_end = min(batch_start + batch_size, len(all_campaigns))
@@ -673,7 +688,7 @@ async def sync_meta_data_to_campaigns(user: User, access_token: str, account_id:
             # 広告レベルのデータ取得処理もスキップ（キャンペーンレベルのデータのみを取得）
             """
             print(f"[Meta API] Fetching ad-level insights for account {account_id}...")
-            ad_fields = "campaign_id,campaign_name,adset_name,ad_name,date_start,spend,impressions,clicks,inline_link_clicks,reach,actions,conversions,action_values,frequency"
+            ad_fields = "campaign_id,campaign_name,adset_id,adset_name,ad_id,ad_name,date_start,spend,impressions,clicks,inline_link_clicks,reach,actions,conversions,action_values,frequency"
             
             for batch_start in range(0, len(all_campaigns), batch_size):
                 batch_end = min(batch_start + batch_size, len(all_campaigns))
@@ -742,702 +757,361 @@ async def sync_meta_data_to_campaigns(user: User, access_token: str, account_id:
             print(f"[Meta API] Ad-level insights retrieved: {len(all_ad_insights)}")
             """
             
-            # すべてのレベルのinsightsを統合
-            # 注意: キャンペーンレベルのデータのみを使用（広告セット・広告レベルのデータは空のリスト）
-            all_insights = all_insights + all_adset_insights + all_ad_insights
-            print(f"[Meta API] Total insights (campaign-level only): {len(all_insights)} (adset: {len(all_adset_insights)}, ad: {len(all_ad_insights)})")
-            
-            # 数値の安全なパース関数（Noneや空文字列を0に変換）
-            def safe_float(value, default=0.0):
-                if value is None or value == '':
-                    return default
-                try:
-                    return float(value)
-                except (ValueError, TypeError):
-                    return default
-            
-            def safe_int(value, default=0):
-                if value is None or value == '':
-                    return default
-                try:
-                    return int(float(value))  # float経由で変換（文字列の数値も対応）
-                except (ValueError, TypeError):
-                    return default
-            
             # InsightsデータをCampaignテーブルに保存（キャンペーン/広告セット/広告レベル）
-            # 全上書き方式：既存データを削除してから新規作成（データの一貫性を保つため）
-            print(f"[Meta API] Starting data sync for account {account_id_for_db} (full overwrite mode: deleting existing data before sync)")
+            # 全上書き方式：取得したバッチから順にステージングテーブルに書き込み、検証後に既存データと入れ替える
+            print(f"[Meta API] Starting data sync for account {account_id_for_db} (full overwrite mode via staging table)")
             
-            # 既存データを削除（このアカウントの全レベルのデータ: キャンペーン/広告セット/広告）
-            # 削除と保存を同一トランザクションで実行（データの一貫性を保つため）
-            delete_count = 0
-            try:
-                delete_count = db.query(Campaign).filter(
-                    Campaign.user_id == user.id,
-                    Campaign.meta_account_id.in_([account_id_for_db, account_id_for_db.replace("act_", "")])
-                    # 広告セット・広告レベルのデータも削除対象に含める（Meta APIから取得しているため）
-                ).delete(synchronize_session=False)
-                print(f"[Meta API] Deleted {delete_count} existing records for account {account_id_for_db} (all levels) before sync")
-            except Exception as e:
-                import traceback
-                error_msg = f"[Meta API] Error deleting existing data for account {account_id}: {str(e)}"
-                print(error_msg)
-                print(f"[Meta API] Error details: {traceback.format_exc()}")
-                db.rollback()
-                # 削除エラー時は同期処理を中止
-                raise Exception(f"Failed to delete existing data for account {account_id}: {str(e)}")
+            # 取得期間の月次パーティションを事前に作成（別トランザクション）
+            PartitionService.ensure_partitions(current_since_dt, current_until_dt)
+            
+            # ディメンションキーの解決（この同期中はメモリ上にキャッシュ）
+            resolver = DimensionResolver(db, user.id)
+            # コンバージョンとしてカウントするアクションタイプ（ユーザーの設定、未設定時は既定の優先順位）
+            action_extractor = MetaActionExtractor.for_user(user)
             
+            # 書き込みの集計（行データは保持せず、件数・日付範囲のみ。再開前の試行の分は含まない）
             saved_count = 0
-            # 重複チェック用のセット（campaign_name, date, meta_account_idの組み合わせ）
-            seen_records = set()
-            
-            # デバッグ: 取得したInsightsデータの日付バリエーションを確認
-            if all_insights:
-                all_dates = [insight.get('date_start') for insight in all_insights if insight.get('date_start')]
-                unique_dates = sorted(list(set(all_dates)))
-                print(f"[Meta API] ===== Insights Data Analysis ======")
-                print(f"[Meta API] Total insights retrieved: {len(all_insights)}")
-                print(f"[Meta API] Total unique dates: {len(unique_dates)}")
-                if len(unique_dates) > 0:
-                    print(f"[Meta API] Date range: {unique_dates[0]} to {unique_dates[-1]}")
-                    print(f"[Meta API] First 10 unique dates: {unique_dates[:10]}")
-                    print(f"[Meta API] Last 10 unique dates: {unique_dates[-10:]}")
-                    # 各日付の件数を確認
-                    date_counts = {}
-                    for date in all_dates:
-                        date_counts[date] = date_counts.get(date, 0) + 1
-                    print(f"[Meta API] Date distribution (first 10 dates):")
-                    for date in unique_dates[:10]:
-                        print(f"  {date}: {date_counts.get(date, 0)} insights")
-                if len(unique_dates) == 1:
-                    print(f"[Meta API] ⚠️ WARNING: All insights have the same date! This indicates time_increment may not be working.")
-                    print(f"[Meta API] Requested date range: {start_date_str} to {end_date_str}")
-                    print(f"[Meta API] Actual date received: {unique_dates[0]}")
-                print(f"[Meta API] =====================================")
-            
-            for insight in all_insights:
-                try:
-                    # 日付を取得
-                    date_str = insight.get('date_start')
-                    if not date_str:
-                        print(f"[Meta API] WARNING: Skipping insight with no date_start: {insight}")
-                        continue
-                    campaign_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-                    
-                    # データを取得（キャンペーン/広告セット/広告レベル）
-                    # キャンペーン名を正規化してから保存（期間別ユニークリーチ取得時のキャンペーン名と一致させるため）
-                    campaign_name_raw = insight.get('campaign_name', 'Unknown')
-                    campaign_name = normalize_campaign_name(campaign_name_raw)
-                    # ad_set_name と ad_name を Meta API のレスポンスから取得
-                    ad_set_name = insight.get('adset_name')  # 広告セット名（あれば）
-                    ad_name = insight.get('ad_name')          # 広告名（あれば）
-                    
-                    # 期間別のユニークリーチ数を取得（キャンペーンID優先、なければ名前で取得）
-                    campaign_id = insight.get('campaign_id')
-                    period_unique_reach_7days = campaign_period_reach_7days_map.get(campaign_id) if campaign_id else None
-                    period_unique_reach_30days = campaign_period_reach_30days_map.get(campaign_id) if campaign_id else None
-                    period_unique_reach_all = campaign_period_reach_all_map.get(campaign_id) if campaign_id else None
-                    if period_unique_reach_7days is None:
-                        period_unique_reach_7days = campaign_period_reach_7days_map.get(campaign_name, 0)
-                    if period_unique_reach_30days is None:
-                        period_unique_reach_30days = campaign_period_reach_30days_map.get(campaign_name, 0)
-                    if period_unique_reach_all is None:
-                        period_unique_reach_all = campaign_period_reach_all_map.get(campaign_name, 0)
-                    period_unique_reach = period_unique_reach_all  # 後方互換性（全期間の値）
-                    
-                    # デバッグログ（最初の数件のみ）
-                    if saved_count < 3:
-                        print(f"[Meta API] Processing insight: campaign={campaign_name}, date={campaign_date}")
-                        print(f"  Raw data: spend={insight.get('spend')}, impressions={insight.get('impressions')}, clicks={insight.get('clicks')}, inline_link_clicks={insight.get('inline_link_clicks')}")
-                    
-                    spend = safe_float(insight.get('spend'), 0.0)
-                    impressions = safe_int(insight.get('impressions'), 0)
-                    all_clicks = safe_int(insight.get('clicks'), 0)
-                    inline_link_clicks = safe_int(insight.get('inline_link_clicks'), 0)
-                    reach = safe_int(insight.get('reach'), 0)
-                    
-                    # デバッグログ（最初の数件のみ）
-                    if saved_count < 3:
-                        print(f"  Parsed: spend={spend}, impressions={impressions}, clicks={all_clicks}, inline_link_clicks={inline_link_clicks}, reach={reach}")
-                    
-                    # クリック数はinline_link_clicksを使用
-                    clicks = inline_link_clicks if inline_link_clicks > 0 else all_clicks
-                    link_clicks = inline_link_clicks if inline_link_clicks > 0 else all_clicks
-                    
-                    # エンゲージメント関連のデータを取得
-                    engagements = safe_int(insight.get('engagements'), 0)
-                    if engagements == 0:
-                        actions = insight.get('actions', [])
-                        if actions:
-                            for action in actions:
-                                if action.get('action_type') == 'post_engagement':
-                                    engagements += safe_int(action.get('value'), 0)
-                    
-                    # landing_page_viewsはactionsから抽出
-                    landing_page_views = 0
-                    actions = insight.get('actions', [])
-                    if actions:
-                        for action in actions:
-                            if action.get('action_type') == 'landing_page_view':
-                                landing_page_views += safe_int(action.get('value'), 0)
-                    
-                    frequency = safe_float(insight.get('frequency'), 0.0)
-                    if frequency == 0 and reach > 0:
-                        frequency = (impressions / reach) if reach > 0 else 0.0
-                    
-                    # conversionsとconversion_valueを取得
-                    # キャンペーンごとに主要なコンバージョンタイプのみをカウント（すべてを合計しない）
-                    # いずれか1つのコンバージョンタイプのみを使用
-                    conversions_data = insight.get('conversions', [])
-                    conversions = 0
-                    conversion_value = 0.0
-                    selected_conversion_type = "none"
-                    
-                    # デバッグログ（最初の数件のみ）
-                    if saved_count < 3:
-                        print(f"[Meta API] Conversions data for {campaign_name}: {conversions_data}")
-                    
-                    if conversions_data:
-                        # 優先順位に基づいて、最初に見つかった主要なコンバージョンタイプのみをカウント
-                        # 優先順位: 購入関連 > 登録関連 > リード関連 > その他
-                        found_conversion = False
-                        
-                        # 1. 購入関連を優先（purchase, omni_purchase, offsite_conversion.fb_pixel_purchase, onsite_conversion.meta_purchase）
-                        for conv in conversions_data:
-                            if isinstance(conv, dict):
-                                action_type = conv.get('action_type', '')
-                                if (action_type in ['purchase', 'omni_purchase'] or
-                                    action_type == 'offsite_conversion.fb_pixel_purchase' or
-                                    action_type == 'onsite_conversion.meta_purchase' or
-                                    action_type.startswith('offsite_conversion.fb_pixel_purchase') or
-                                    action_type.startswith('onsite_conversion.meta_purchase')):
-                                    value = conv.get('value', 0)
-                                    try:
-                                        conversions = int(value) if isinstance(value, (int, str)) else 0
-                                        selected_conversion_type = action_type
-                                        found_conversion = True
-                                        if saved_count < 3:
-                                            print(f"[Meta API] Selected conversion type (purchase): {action_type} = {conversions}")
-                                        break
-                                    except (ValueError, TypeError):
-                                        pass
-                        
-                        # 2. 購入関連が見つからなかった場合、登録関連をチェック
-                        if not found_conversion:
-                            for conv in conversions_data:
-                                if isinstance(conv, dict):
-                                    action_type = conv.get('action_type', '')
-                                    if (action_type == 'complete_registration' or
-                                        action_type == 'offsite_conversion.fb_pixel_complete_registration' or
-                                        action_type.startswith('offsite_conversion.fb_pixel_complete_registration')):
-                                        value = conv.get('value', 0)
-                                        try:
-                                            conversions = int(value) if isinstance(value, (int, str)) else 0
-                                            selected_conversion_type = action_type
-                                            found_conversion = True
-                                            if saved_count < 3:
-                                                print(f"[Meta API] Selected conversion type (registration): {action_type} = {conversions}")
-                                            break
-                                        except (ValueError, TypeError):
-                                            pass
+            fetched_count = 0
+            min_date = None
+            max_date = None
+            
+            def write_insights(insights: List[Dict], checkpoint_id: uuid.UUID) -> int:
+                """1バッチ分のInsightsを変換し、STAGING_BATCH_SIZE行ずつステージングテーブルに書き込む（書き込んだ行数を返す）"""
+                nonlocal saved_count, fetched_count, min_date, max_date
+                staged_rows = []
+                batch_saved_count = 0
+                # 重複チェック用のキー（ディメンションキー + 日付）。バッチ間ではキャンペーンまたは期間が重ならないため、
+                # バッチ内のみで保持する（同期全体で保持するとメモリが行数に比例して増える。全体の重複は SyncStaging.validate で検出）
+                seen_records = set()
+                normalized_rows = normalize_insight_page(insights, action_extractor, verbose_count=3 if saved_count == 0 else 0)
+                for insight, values in zip(insights, normalized_rows):
+                    fetched_count += 1
+                    try:
+                        if values is None:
+                            continue
+                        # 名前はディメンションの解決にのみ使う（campaignsには名前のカラムがない）
+                        campaign_name = values.pop("campaign_name")
+                        ad_set_name = values.pop("ad_set_name")
+                        ad_name = values.pop("ad_name")
+                        campaign_date = values["date"]
                         
-                        # 3. 登録関連も見つからなかった場合、リード関連をチェック
-                        if not found_conversion:
-                            for conv in conversions_data:
-                                if isinstance(conv, dict):
-                                    action_type = conv.get('action_type', '')
-                                    if (action_type == 'lead' or
-                                        action_type == 'offsite_conversion.fb_pixel_lead' or
-                                        action_type.startswith('offsite_conversion.fb_pixel_lead')):
-                                        value = conv.get('value', 0)
-                                        try:
-                                            conversions = int(value) if isinstance(value, (int, str)) else 0
-                                            selected_conversion_type = action_type
-                                            found_conversion = True
-                                            if saved_count < 3:
-                                                print(f"[Meta API] Selected conversion type (lead): {action_type} = {conversions}")
-                                            break
-                                        except (ValueError, TypeError):
-                                            pass
+                        # Meta IDでディメンションを解決（名前変更されても同じキーになる）
+                        dimension_keys = resolver.resolve_row(
+                            account_id_for_db,
+                            campaign_name,
+                            ad_set_name,
+                            ad_name,
+                            campaign_id=insight.get('campaign_id'),
+                            adset_id=insight.get('adset_id'),
+                            ad_id=insight.get('ad_id')
+                        )
                         
-                        # 4. 上記のいずれも見つからなかった場合、最初のコンバージョンタイプを使用
-                        if not found_conversion and conversions_data:
-                            conv = conversions_data[0]
-                            if isinstance(conv, dict):
-                                action_type = conv.get('action_type', '')
-                                value = conv.get('value', 0)
-                                try:
-                                    conversions = int(value) if isinstance(value, (int, str)) else 0
-                                    selected_conversion_type = action_type
-                                    if saved_count < 3:
-                                        print(f"[Meta API] Selected conversion type (first available): {action_type} = {conversions}")
-                                except (ValueError, TypeError):
-                                    conversions = 0
-                            else:
-                                try:
-                                    conversions = int(conv) if isinstance(conv, (int, str)) else 0
-                                    selected_conversion_type = "unknown"
-                                    if saved_count < 3:
-                                        print(f"[Meta API] Selected conversion type (unknown format): {conversions}")
-                                except (ValueError, TypeError):
-                                    conversions = 0
-                    
-                    # フォールバック: actionsから取得（conversionsが0の場合のみ）
-                    if conversions == 0:
-                        actions = insight.get('actions', [])
-                        # 同じ優先順位で検索
-                        for action in actions:
-                            if isinstance(action, dict):
-                                action_type = action.get('action_type', '')
-                                if (action_type in ['purchase', 'omni_purchase'] or
-                                    action_type == 'offsite_conversion.fb_pixel_purchase' or
-                                    action_type == 'onsite_conversion.meta_purchase'):
-                                    value = action.get('value', 0)
-                                    try:
-                                        conversions = int(value) if isinstance(value, (int, str)) else 0
-                                        selected_conversion_type = action_type
-                                        break
-                                    except (ValueError, TypeError):
-                                        pass
-                                elif (action_type == 'complete_registration' or
-                                      action_type == 'offsite_conversion.fb_pixel_complete_registration'):
-                                    value = action.get('value', 0)
-                                    try:
-                                        conversions = int(value) if isinstance(value, (int, str)) else 0
-                                        selected_conversion_type = action_type
-                                        break
-                                    except (ValueError, TypeError):
-                                        pass
-                                elif (action_type == 'lead' or
-                                      action_type == 'offsite_conversion.fb_pixel_lead'):
-                                    value = action.get('value', 0)
-                                    try:
-                                        conversions = int(value) if isinstance(value, (int, str)) else 0
-                                        selected_conversion_type = action_type
-                                        break
-                                    except (ValueError, TypeError):
-                                        pass
-                    
-                    # conversion_valueを取得（action_valuesから）
-                    # 購入関連のコンバージョンタイプのみを取得（合計しない）
-                    action_values = insight.get('action_values', [])
-                    conversion_value = 0.0
-                    
-                    if action_values:
-                        # 購入関連のコンバージョン価値のみを取得（最初に見つかったもの）
-                        for av in action_values:
-                            if isinstance(av, dict):
-                                av_type = av.get('action_type', '')
-                                if (av_type in ['purchase', 'omni_purchase'] or
-                                    av_type == 'offsite_conversion.fb_pixel_purchase' or
-                                    av_type == 'onsite_conversion.meta_purchase' or
-                                    av_type.startswith('offsite_conversion.fb_pixel_purchase') or
-                                    av_type.startswith('onsite_conversion.meta_purchase')):
-                                    value = av.get('value', 0)
-                                    try:
-                                        conversion_value = float(value) if isinstance(value, (int, float, str)) else 0.0
-                                        break
-                                    except (ValueError, TypeError):
-                                        pass
-                    
-                    # フォールバック: actionsから取得（conversion_valueが0の場合のみ）
-                    if conversion_value == 0:
-                        actions = insight.get('actions', [])
-                        for action in actions:
-                            action_type = action.get('action_type', '')
-                            if (action_type in ['purchase', 'omni_purchase'] or
-                                action_type == 'offsite_conversion.fb_pixel_purchase' or
-                                action_type == 'onsite_conversion.meta_purchase'):
-                                value = action.get('value', 0)
-                                try:
-                                    conversion_value = float(value) if isinstance(value, (int, float, str)) else 0.0
-                                    break
-                                except (ValueError, TypeError):
-                                    pass
-                    
-                    # メトリクスを計算
-                    ctr = (clicks / impressions * 100) if impressions > 0 else 0
-                    cpc = (spend / clicks) if clicks > 0 else 0
-                    cpm = (spend / impressions * 1000) if impressions > 0 else 0
-                    cpa = (spend / conversions) if conversions > 0 else 0
-                    cvr = (conversions / clicks * 100) if clicks > 0 else 0
-                    roas = (conversion_value / spend) if spend > 0 else 0
-                    
-                    # デバッグログ（最初の数件のみ）
-                    if saved_count < 3:
-                        print(f"  Final values: spend={spend}, impressions={impressions}, clicks={clicks}, conversions={conversions}, reach={reach}")
-                        print(f"  Selected conversion type: {selected_conversion_type}")
-                        if clicks > 0:
-                            cvr = (conversions / clicks * 100)
-                            print(f"  Conversion check: conversions={conversions}, clicks={clicks}, CVR={cvr:.2f}%")
-                        else:
-                            print(f"  Conversion check: conversions={conversions}, clicks={clicks} (no clicks)")
-                    
-                    # 重複チェック（同じcampaign_name, ad_set_name, ad_name, date, meta_account_idの組み合わせは1件のみ）
-                    record_key = (campaign_name, ad_set_name, ad_name, campaign_date, account_id)
-                    if record_key in seen_records:
-                        print(f"[Meta API] WARNING: Duplicate record skipped: {campaign_name} / {ad_set_name} / {ad_name} on {campaign_date}")
-                        continue
-                    seen_records.add(record_key)
-                    
-                    # 期間別のユニークリーチ数は既にLine 786-790で取得済み（重複処理を削除）
-                    # デバッグ: マップから取得した値をログ出力（最初の数件のみ）
-                    if saved_count < 3:
-                        print(f"[Meta API] 📊 Period unique reach for '{campaign_name}':")
-                        print(f"[Meta API]   7days: {period_unique_reach_7days:,} (map size: {len(campaign_period_reach_7days_map)})")
-                        print(f"[Meta API]   30days: {period_unique_reach_30days:,} (map size: {len(campaign_period_reach_30days_map)})")
-                        print(f"[Meta API]   all: {period_unique_reach_all:,} (map size: {len(campaign_period_reach_all_map)})")
-                        if period_unique_reach_7days == 0 and period_unique_reach_30days == 0 and period_unique_reach_all == 0:
-                            print(f"[Meta API]   ⚠️ WARNING: All period unique reach values are 0!")
-                            print(f"[Meta API]   Available keys in maps:")
-                            print(f"[Meta API]     7days: {list(campaign_period_reach_7days_map.keys())[:5]}")
-                            print(f"[Meta API]     30days: {list(campaign_period_reach_30days_map.keys())[:5]}")
-                            print(f"[Meta API]     all: {list(campaign_period_reach_all_map.keys())[:5]}")
-                            # キャンペーン名マッチングの確認
-                            print(f"[Meta API]   🔍 Campaign name matching check:")
-                            print(f"[Meta API]     Looking for: '{campaign_name}' (normalized from '{campaign_name_raw}')")
-                            print(f"[Meta API]     Normalized name matches: {campaign_name in campaign_period_reach_all_map}")
-                            if campaign_name not in campaign_period_reach_all_map:
-                                # 類似するキーを探す
-                                similar_keys = [k for k in campaign_period_reach_all_map.keys() if campaign_name.lower() in k.lower() or k.lower() in campaign_name.lower()]
-                                if similar_keys:
-                                    print(f"[Meta API]     Similar keys found: {similar_keys[:3]}")
-                    
-                    # 全上書き方式のため、既存データの更新処理は不要（すべて新規作成）
-                    campaign = Campaign(
-                        user_id=user.id,
-                        upload_id=upload.id,
-                        meta_account_id=account_id_for_db,
-                        date=campaign_date,
-                        campaign_name=campaign_name,
-                        ad_set_name=ad_set_name,  # 広告セット名（あれば）
-                        ad_name=ad_name,  # 広告名（あれば）
-                        cost=Decimal(str(spend)),
-                        impressions=impressions,
-                        clicks=clicks,
-                        conversions=conversions,
-                        conversion_value=Decimal(str(conversion_value)),
-                        reach=reach,
-                        period_unique_reach=period_unique_reach,  # 後方互換性（全期間の値）
-                        engagements=engagements,
-                        link_clicks=link_clicks,
-                        landing_page_views=landing_page_views,
-                        ctr=Decimal(str(round(ctr, 2))),
-                        cpc=Decimal(str(round(cpc, 2))),
-                        cpm=Decimal(str(round(cpm, 2))),
-                        cpa=Decimal(str(round(cpa, 2))),
-                        cvr=Decimal(str(round(cvr, 2))),
-                        roas=Decimal(str(round(roas, 2)))
-                    )
-                    
-                    # 新しいカラムが存在する場合のみ設定（マイグレーション実行後に有効化）
-                    # マイグレーション実行後は、これらのカラムも設定される
-                    try:
-                        # ===== データフロー可視化: DB保存時 =====
-                        print(f"[Meta API] 💾 DATA FLOW - DB Save:")
-                        print(f"[Meta API]   Campaign Name: '{campaign_name}' (normalized from '{campaign_name_raw}')")
-                        print(f"[Meta API]   Date: {campaign_date}")
-                        print(f"[Meta API]   Values to save:")
-                        print(f"[Meta API]     period_unique_reach_7days: {period_unique_reach_7days:,}")
-                        print(f"[Meta API]     period_unique_reach_30days: {period_unique_reach_30days:,}")
-                        print(f"[Meta API]     period_unique_reach_all: {period_unique_reach_all:,}")
+                        # 重複チェック（同じディメンションキー・日付の組み合わせは1件のみ）
+                        record_key = (
+                            dimension_keys.get("campaign_key"),
+                            dimension_keys.get("adset_key"),
+                            dimension_keys.get("ad_key"),
+                            campaign_date
+                        )
+                        if record_key in seen_records:
+                            print(f"[Meta API] WARNING: Duplicate record skipped: {campaign_name} / {ad_set_name} / {ad_name} on {campaign_date}")
+                            continue
+                        seen_records.add(record_key)
                         
-                        campaign.period_unique_reach_7days = period_unique_reach_7days
-                        campaign.period_unique_reach_30days = period_unique_reach_30days
-                        campaign.period_unique_reach_all = period_unique_reach_all
+                        # 全上書き方式のため、既存データの更新処理は不要（すべて新規作成）
+                        campaign = Campaign(
+                            user_id=user.id,
+                            upload_id=upload.id,
+                            meta_account_id=account_id_for_db,
+                            **dimension_keys,
+                            **values
+                        )
                         
-                        # 保存後の確認
-                        saved_7days = campaign.period_unique_reach_7days
-                        saved_30days = campaign.period_unique_reach_30days
-                        saved_all = campaign.period_unique_reach_all
+                        staged_rows.append(SyncStaging.to_row(campaign))
+                        saved_count += 1
+                        batch_saved_count += 1
+                        min_date = campaign_date if min_date is None else min(min_date, campaign_date)
+                        max_date = campaign_date if max_date is None else max(max_date, campaign_date)
+                        if len(staged_rows) >= STAGING_BATCH_SIZE:
+                            SyncStaging.insert_rows(staging_table, staged_rows, checkpoint_id)
+                            staged_rows = []
                         
-                        if saved_7days != period_unique_reach_7days or saved_30days != period_unique_reach_30days or saved_all != period_unique_reach_all:
-                            print(f"[Meta API] ⚠️ WARNING: DB save mismatch!")
-                            print(f"[Meta API]   Expected: 7days={period_unique_reach_7days:,}, 30days={period_unique_reach_30days:,}, all={period_unique_reach_all:,}")
-                            print(f"[Meta API]   Got: 7days={saved_7days:,}, 30days={saved_30days:,}, all={saved_all:,}")
-                        else:
-                            print(f"[Meta API]   ✅ DB save confirmed: 7days={saved_7days:,}, 30days={saved_30days:,}, all={saved_all:,}")
-                    except AttributeError:
-                        # カラムが存在しない場合は無視（念のため）
-                        print(f"[Meta API] ⚠️ AttributeError: period_unique_reach columns not found in Campaign model")
-                        pass
-                    
-                    db.add(campaign)
-                    saved_count += 1
-                    
-                    # デバッグログ（最初の数件のみ）
-                    if saved_count <= 3:
-                        print(f"  ✓ Saved campaign record #{saved_count}: {campaign_name} on {campaign_date}")
-                except Exception as e:
-                    print(f"[Meta API] Error processing insight: {str(e)}")
-                    continue
+                        # デバッグログ（最初の数件のみ）
+                        if saved_count <= 3:
+                            print(f"  ✓ Saved campaign record #{saved_count}: {campaign_name} on {campaign_date}")
+                    except Exception as e:
+                        print(f"[Meta API] Error processing insight: {str(e)}")
+                        continue
+                SyncStaging.insert_rows(staging_table, staged_rows, checkpoint_id)
+                # 新しく作成したディメンションを確定（後続バッチの失敗時のロールバックでキーが失われないように）
+                db.commit()
+                return batch_saved_count
+            
+            # キャンペーン数が多いアカウントは、キャンペーンごとのバッチリクエストではなく期間分割の非同期レポートで取得
+            use_async_reports = 0 < settings.META_ASYNC_REPORT_CAMPAIGN_THRESHOLD <= len(all_campaigns)
+            insight_batches = fetch_async_report_batches() if use_async_reports else fetch_campaign_insight_batches()
+            
+            # 取得 → 変換 → ステージングへの書き込み → チェックポイントの保存をバッチごとに流す
+            # （失敗したバッチがあっても、成功したバッチはステージングに残して再開時に再取得しない）
+            async for (level, batch_index, slice_label, object_ids), batch_insights in insight_batches:
+                checkpoint_id = uuid.uuid4()
+                staged_count = write_insights(batch_insights, checkpoint_id)
+                SyncRunService.save_checkpoint(db, sync_run, checkpoint_id, level, batch_index, slice_label, object_ids, staged_count)
+            
+            if failed_batches:
+                # 一部のバッチが欠けた状態で既存データを入れ替えないよう、実行を失敗として終了
+                raise Exception(f"{len(failed_batches)} campaign batch(es) / time slice(s) failed for account {account_id} (batches: {failed_batches}); retry to resume from checkpoint")
+            
+            # 再開前の試行でステージングに書き込んだ行も含めた件数・期間
+            total_staged = SyncRunService.staged_row_count(db, sync_run)
+            staged_summary = SyncStaging.summary(db, staging_table)
+            min_date, max_date = staged_summary.min_date, staged_summary.max_date
+            print(f"[Meta API] Campaign-level insights retrieved: {fetched_count}, staged: {saved_count} this attempt, {total_staged} in total (dates: {min_date} to {max_date})")
+            if min_date is not None and min_date == max_date:
+                print(f"[Meta API] ⚠️ WARNING: All insights have the same date! This indicates time_increment may not be working.")
+                print(f"[Meta API] Requested date range: {start_date_str} to {end_date_str}")
+            
+            # ステージングの内容を検証（件数・期間・重複）
+            is_valid, validation_message = SyncStaging.validate(db, staging_table, total_staged, current_since_dt, current_until_dt)
+            if not is_valid:
+                raise Exception(f"Staged data validation failed for account {account_id}: {validation_message}")
+            print(f"[Meta API] Staged data validated for account {account_id_for_db}: {validation_message}")
             
             # Uploadレコードを更新
-            upload.row_count = saved_count
-            if all_insights:
-                dates = [datetime.strptime(i.get('date_start', ''), '%Y-%m-%d').date() for i in all_insights if i.get('date_start')]
-                if dates:
-                    upload.start_date = min(dates)
-                    upload.end_date = max(dates)
-            
-            # 削除と保存を同一トランザクションでコミット（データの一貫性を保つため）
-            db.commit()
-            print(f"[Meta API] Successfully deleted {delete_count} and saved {saved_count} records for account {account_id} (all levels)")
+            upload.status = "completed"
+            upload.row_count = total_staged
+            upload.processed_at = datetime.utcnow()
+            upload.start_date = min_date
+            upload.end_date = max_date
+            
+            # 既存データとの差分（変更・追加・削除された行のみ）を同一トランザクションでコミット（データの一貫性を保つため）
+            # 取得期間で絞り込むことで、対象月のパーティションのみを走査する（全期間再取得時はアカウント全体）
+            merge_stats = SyncStaging.swap(
+                db,
+                staging_table,
+                user.id,
+                upload.id,
+                [account_id_for_db, account_id_for_db.replace("act_", "")],
+                None if replace_all_dates else current_since_dt,
+                None if replace_all_dates else current_until_dt
+            )
+            print(f"[Meta API] Successfully merged {total_staged} records for account {account_id} (all levels): inserted={merge_stats['inserted']}, updated={merge_stats['updated']}, deleted={merge_stats['deleted']}, unchanged={merge_stats['unchanged']}")
+            SyncStaging.drop(staging_table)
+            SyncRunService.complete(db, sync_run, merge_stats)
+            try:
+                AdAccountService.refresh_stats(db, user.id, account_id_for_db)
+            except Exception as e:
+                db.rollback()
+                print(f"[Meta API] ⚠️ Failed to refresh account stats: {str(e)}")
+
+            # よく使われる期間（7日間/30日間/全期間）のユニークリーチを事前取得
+            # 期間はDBに保存した日次データの範囲に合わせる（参照側と同じキーになるように）
+            if upload.start_date and upload.end_date:
+                try:
+                    stored = await ReachService.precompute_popular_ranges(
+                        db, user, access_token, account_id_for_db, upload.end_date, upload.start_date
+                    )
+                    print(f"[Meta API] Precomputed period reach entries: {stored}")
+                except Exception as e:
+                    db.rollback()
+                    print(f"[Meta API] ⚠️ Failed to precompute period reach (sync data is kept): {str(e)}")
     except Exception as e:
         db.rollback()
+        if sync_run:
+            SyncRunService.fail(db, sync_run, str(e))
+        # 失敗した同期は既存データに触れない（ステージングはチェックポイント済みのバッチの行とともに再開用に残す）
+        try:
+            upload.status = "error"
+            upload.error_message = str(e)[:1000]
+            db.commit()
+        except Exception:
+            db.rollback()
         raise
 
+# アクセストークンごとの同時同期数の制限（asyncio.Semaphoreはイベントループごとに作成する）
+_token_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+
+def _get_token_semaphore(access_token: str) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphores = _token_semaphores.setdefault(loop, {})
+    token_key = hashlib.sha256(access_token.encode()).hexdigest()
+    if token_key not in semaphores:
+        semaphores[token_key] = asyncio.Semaphore(max(1, settings.META_SYNC_MAX_CONCURRENCY_PER_TOKEN))
+    return semaphores[token_key]
+
+async def sync_account_with_own_session(
+    user_id: uuid.UUID,
+    access_token: str,
+    account_id: str,
+    days: Optional[int] = None,
+    replace_all_dates: bool = False
+) -> Dict:
+    """
+    1アカウント分の同期を専用のDBセッションで実行し、結果を返す（例外は結果に含める）
+    同じトークンの同時実行数は META_SYNC_MAX_CONCURRENCY_PER_TOKEN まで
+    同じ (ユーザー, アカウント, 取得日数, 全期間置換) の同期が実行中の場合は新たに実行せず、実行中の同期の終了を待ってその結果を返す
+    取得日数や全期間置換が違う同期が実行中の場合は、その終了を待ってから実行する（短い同期の結果で長い同期を済ませない）
+    """
+    api_account_id = ReachService.to_api_account_id(account_id)
+    started_at = time.monotonic()
+    account_key = f"meta_sync:{user_id}:{api_account_id}"
+    sync_key = f"{account_key}:{days if days is not None else 'all'}:{'replace' if replace_all_dates else 'merge'}"
+    
+    async def run_sync():
+        account_db = SessionLocal()
+        try:
+            account_user = account_db.query(User).filter(User.id == user_id).first()
+            if not account_user:
+                raise Exception(f"User not found (user_id: {user_id})")
+            await sync_meta_data_to_campaigns(
+                account_user,
+                access_token,
+                account_id,
+                account_db,
+                days=days,
+                replace_all_dates=replace_all_dates
+            )
+        finally:
+            account_db.close()
+    
+    try:
+        # 同じアカウントの同期（ステージングの入れ替え・再開する実行）は1つずつ（queue_key）
+        # トークンのセマフォはロック用の接続より先に取り、同時に使う接続数を同時実行数までに抑える
+        _, attached = await SingleFlight.run(
+            sync_key,
+            run_sync,
+            queue_key=account_key,
+            limiter=_get_token_semaphore(access_token)
+        )
+        result = {
+            "account_id": account_id,
+            "status": "success",
+            "elapsed_seconds": round(time.monotonic() - started_at, 1)
+        }
+        if attached:
+            # 実行中だった同期に相乗りした場合は、その実行の結果を返す
+            result["attached"] = True
+            status_db = SessionLocal()
+            try:
+                latest_run = SyncRunService.latest_requested_run(status_db, user_id, api_account_id, days)
+                if latest_run and latest_run.status == "failed":
+                    result["status"] = "error"
+                    result["error"] = latest_run.error_message
+            finally:
+                status_db.close()
+            print(f"[Meta Sync] Attached to running sync for account {account_id}: {result['status']}")
+        return result
+    except Exception as e:
+        import traceback
+        print(f"[Meta Sync] Error syncing account {account_id}: {str(e)}")
+        print(f"[Meta Sync] Error details: {traceback.format_exc()}")
+        return {
+            "account_id": account_id,
+            "status": "error",
+            "error": str(e),
+            "elapsed_seconds": round(time.monotonic() - started_at, 1)
+        }
+
+async def sync_accounts_concurrently(
+    user_id: uuid.UUID,
+    access_token: str,
+    account_ids: List[str],
+    days: Optional[int] = None,
+    replace_all_dates: bool = False
+) -> AsyncIterator[Dict]:
+    """複数アカウントを並行して同期し、完了した順に結果を返す（全体の所要時間は最も遅いアカウント程度）"""
+    tasks = [
+        asyncio.create_task(sync_account_with_own_session(user_id, access_token, acc_id, days, replace_all_dates))
+        for acc_id in account_ids
+    ]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+def _delete_csv_rows(user_id: uuid.UUID) -> int:
+    """CSVアップロードデータ（meta_account_idがNULL）を削除（重複を防ぐため、全レベルのデータ）"""
+    csv_db = SessionLocal()
+    try:
+        csv_delete_count = csv_db.query(Campaign).filter(
+            Campaign.user_id == user_id,
+            or_(
+                Campaign.meta_account_id.is_(None),
+                Campaign.meta_account_id == ''
+            )
+            # 広告セット・広告レベルのデータも削除対象に含める
+        ).delete(synchronize_session=False)
+        csv_db.commit()
+        print(f"[Meta Sync All] Deleted {csv_delete_count} CSV upload records (all levels)")
+        return csv_delete_count
+    except Exception as e:
+        import traceback
+        print(f"[Meta Sync All] Error deleting CSV data: {str(e)}")
+        print(f"[Meta Sync All] Error details: {traceback.format_exc()}")
+        csv_db.rollback()
+        return 0
+    finally:
+        csv_db.close()
+
+@router.get("/sync-status/")
+def get_sync_status(
+    account_id: Optional[str] = Query(None, description="Meta広告アカウントID（指定しない場合は全アカウントの最新の実行）"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """同期の進捗（アカウントごとの最新の実行と完了済みバッチ数）"""
+    if account_id:
+        account_ids = [ReachService.to_api_account_id(account_id)]
+    else:
+        account_ids = [
+            row[0] for row in db.query(SyncRun.meta_account_id).filter(
+                SyncRun.user_id == current_user.id
+            ).distinct().all()
+        ]
+    runs = []
+    for meta_account_id in account_ids:
+        latest_run = SyncRunService.latest_run(db, current_user.id, meta_account_id)
+        if latest_run:
+            runs.append(SyncRunService.progress(db, latest_run))
+    return {"data": runs}
+
 @router.get("/accounts/")
 async def get_meta_accounts(
+    background_tasks: BackgroundTasks,
+    refresh: bool = Query(False, description="Trueの場合はMeta APIからアカウント情報を再取得してから返す"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """ユーザーが連携しているMeta広告アカウント（アセット）一覧を取得"""
+    """
+    ユーザーが連携しているMeta広告アカウント（アセット）一覧を取得
+    ad_accountsのキャッシュから返し、メタデータが期限切れの場合はバックグラウンドで再取得する
+    """
     try:
-        print(f"[Meta Accounts] Getting accounts for user: {current_user.id}")
-        
-        # Meta APIから全ての広告アカウント情報を取得（アクセストークンがある場合）
-        account_names = {}
-        all_account_ids_from_api = []
+        accounts = AdAccountService.list_accounts(db, current_user.id)
         if current_user.meta_access_token:
-            try:
-                print(f"[Meta Accounts] Fetching account names from Meta API...")
-                async with httpx.AsyncClient() as client:
-                    # すべての広告アカウント情報を取得（ページネーション対応）
-                    accounts_url = "https://graph.facebook.com/v24.0/me/adaccounts"
-                    accounts_params = {
-                        "access_token": current_user.meta_access_token,
-                        "fields": "account_id,id,name",
-                        "limit": 100  # Meta APIの最大取得件数
-                    }
-                    
-                    # ページネーション処理（すべてのアカウントを取得）
-                    accounts_page_count = 0
-                    while True:
-                        accounts_page_count += 1
-                        print(f"[Meta Accounts] Fetching accounts page {accounts_page_count}...")
-                        accounts_response = await client.get(accounts_url, params=accounts_params)
-                        accounts_response.raise_for_status()
-                        accounts_data = accounts_response.json()
-                        
-                        if "data" in accounts_data:
-                            for account in accounts_data["data"]:
-                                # Meta APIのレスポンスでは、idとaccount_idの両方が存在する可能性がある
-                                # idフィールドには act_ プレフィックスが含まれている可能性がある（例: act_343589077304936）
-                                # account_idフィールドには act_ プレフィックスが含まれていない可能性がある（例: 343589077304936）
-                                account_id_from_id = account.get("id")  # act_343589077304936 の形式
-                                account_id_from_account_id = account.get("account_id")  # 343589077304936 の形式
-                                
-                                # account_idを決定（act_プレフィックスを削除した形式を使用）
-                                if account_id_from_account_id:
-                                    account_id = account_id_from_account_id
-                                elif account_id_from_id:
-                                    # idフィールドから act_ プレフィックスを削除
-                                    account_id = account_id_from_id.replace("act_", "") if account_id_from_id.startswith("act_") else account_id_from_id
-                                else:
-                                    continue
-                                
-                                account_name = account.get("name")
-                                if not account_name or account_name.strip() == "":
-                                    account_name = account_id
-                                print(f"[Meta Accounts] Account ID: {account_id}, Name: {account_name}")
-                                # account_idとidの両方のキーで保存（どちらでも検索できるように）
-                                account_names[account_id] = account_name
-                                if account_id_from_id and account_id_from_id != account_id:
-                                    account_names[account_id_from_id] = account_name
-                                    # act_プレフィックスなしの形式も保存
-                                    account_id_without_act = account_id_from_id.replace("act_", "") if account_id_from_id.startswith("act_") else account_id_from_id
-                                    if account_id_without_act != account_id:
-                                        account_names[account_id_without_act] = account_name
-                                all_account_ids_from_api.append(account_id)
-                        
-                        print(f"[Meta Accounts] Retrieved {len(accounts_data.get('data', []))} accounts (total: {len(all_account_ids_from_api)})")
-                        
-                        # 次のページがあるかチェック
-                        paging = accounts_data.get('paging', {})
-                        next_url = paging.get('next')
-                        
-                        if not next_url:
-                            # 次のページがない場合は終了
-                            print(f"[Meta Accounts] No more account pages. Total accounts retrieved: {len(all_account_ids_from_api)}")
-                            break
-                        
-                        # 次のページのURLを設定（パラメータをクリア）
-                        accounts_url = next_url
-                        accounts_params = {}
-                    
-                    print(f"[Meta Accounts] Fetched {len(account_names)} account names from Meta API")
-                    print(f"[Meta Accounts] Account names dict: {account_names}")
-                    print(f"[Meta Accounts] All account IDs from API: {all_account_ids_from_api}")
-            except Exception as e:
-                import traceback
-                print(f"[Meta Accounts] Error fetching account names: {str(e)}")
-                print(f"[Meta Accounts] Error details: {traceback.format_exc()}")
-                # エラーが発生した場合、データベースから取得したアカウントIDを使用
-        
-        # Meta APIから取得したアカウントIDを使用（なければデータベースから取得）
-        if all_account_ids_from_api:
-            account_ids = all_account_ids_from_api
-            print(f"[Meta Accounts] Using {len(account_ids)} account IDs from Meta API")
-        else:
-            # Meta APIから取得できなかった場合、データベースから取得
-            accounts = db.query(Campaign.meta_account_id).filter(
-                Campaign.user_id == current_user.id,
-                Campaign.meta_account_id.isnot(None)
-            ).distinct().all()
-            account_ids = [acc[0] for acc in accounts if acc[0]]
-            print(f"[Meta Accounts] Using {len(account_ids)} account IDs from database (fallback)")
-            
-            # データベースから取得したアカウントIDの場合でも、Meta APIからアカウント名を取得を試みる
-            if account_ids and current_user.meta_access_token:
-                # account_namesにデータがないアカウントIDのみ取得
-                missing_names = [aid for aid in account_ids if aid not in account_names]
-                if missing_names:
-                    try:
-                        print(f"[Meta Accounts] Attempting to fetch account names for {len(missing_names)} accounts from database")
-                        async with httpx.AsyncClient() as client:
-                            for account_id in missing_names:
-                                try:
-                                    # 個別にアカウント情報を取得
-                                    account_url = f"https://graph.facebook.com/v24.0/{account_id}"
-                                    account_params = {
-                                        "access_token": current_user.meta_access_token,
-                                        "fields": "account_id,id,name"
-                                    }
-                                    account_response = await client.get(account_url, params=account_params)
-                                    account_response.raise_for_status()
-                                    account_data = account_response.json()
-                                    
-                                    # エラーチェック
-                                    if "error" in account_data:
-                                        print(f"[Meta Accounts] Error from Meta API for {account_id}: {account_data.get('error')}")
-                                        account_names[account_id] = account_id
-                                        continue
-                                    
-                                    account_name = account_data.get("name")
-                                    if account_name and account_name.strip():
-                                        account_names[account_id] = account_name
-                                        print(f"[Meta Accounts] Fetched name for {account_id}: {account_name}")
-                                    else:
-                                        account_names[account_id] = account_id
-                                        print(f"[Meta Accounts] Name is empty for {account_id}, using account_id")
-                                except Exception as e:
-                                    print(f"[Meta Accounts] Error fetching name for {account_id}: {str(e)}")
-                                    account_names[account_id] = account_id
-                    except Exception as e:
-                        print(f"[Meta Accounts] Error fetching account names from Meta API: {str(e)}")
-                        # エラーが発生した場合、account_idをそのまま使用
-                        for account_id in missing_names:
-                            if account_id not in account_names:
-                                account_names[account_id] = account_id
-        
-        # データベースに実際に保存されているmeta_account_idの形式を確認
-        existing_account_ids = db.query(Campaign.meta_account_id).filter(
-            Campaign.user_id == current_user.id,
-            Campaign.meta_account_id.isnot(None)
-        ).distinct().all()
-        existing_account_ids_list = [acc[0] for acc in existing_account_ids if acc[0]]
-        print(f"[Meta Accounts] Existing meta_account_ids in DB: {existing_account_ids_list}")
+            never_fetched = all(account.metadata_refreshed_at is None for account in accounts)
+            if refresh or never_fetched:
+                # 初回（キャッシュなし）または明示的な再取得の場合のみ、取得を待ってから返す
+                print(f"[Meta Accounts] Fetching account metadata from Meta API (user: {current_user.id})")
+                await AdAccountService.refresh_metadata_in_background(current_user.id, current_user.meta_access_token)
+                db.expire_all()
+                accounts = AdAccountService.list_accounts(db, current_user.id)
+            elif any(AdAccountService.is_metadata_stale(account) for account in accounts):
+                background_tasks.add_task(
+                    AdAccountService.refresh_metadata_in_background,
+                    current_user.id,
+                    current_user.meta_access_token
+                )
         
-        # 各アカウントの統計情報を取得
-        result = []
-        for account_id in account_ids:
-            try:
-                # account_idの形式を確認（act_プレフィックスがあるかどうか）
-                # Meta APIから取得したaccount_idは act_ プレフィックスなしの形式（例: 343589077304936）
-                # データベースには act_343589077304936 の形式で保存されている
-                # データベースの形式（act_付き）で検索する
-                account_id_with_prefix = f"act_{account_id}" if not account_id.startswith("act_") else account_id
-                account_id_without_prefix = account_id.replace("act_", "") if account_id.startswith("act_") else account_id
-                
-                print(f"[Meta Accounts] Searching for account_id: {account_id} (with prefix: {account_id_with_prefix}, without prefix: {account_id_without_prefix})")
-                
-                # データベースに実際に存在する形式を確認
-                matching_ids = [aid for aid in existing_account_ids_list if account_id_with_prefix == aid or account_id_without_prefix == aid.replace("act_", "")]
-                print(f"[Meta Accounts] Matching account_ids in DB: {matching_ids}")
-                
-                # 各アカウントのデータ件数を取得（全レベル合計）
-                # データベースには act_ プレフィックス付きで保存されているので、それで検索
-                total_count = db.query(Campaign).filter(
-                    Campaign.user_id == current_user.id,
-                    Campaign.meta_account_id == account_id_with_prefix
-                ).count()
-                
-                print(f"[Meta Accounts] Query result for {account_id} (searching with {account_id_with_prefix}): total_count={total_count}")
-                
-                # ユニークなキャンペーン数を取得
-                unique_campaigns = db.query(Campaign.campaign_name).filter(
-                    Campaign.user_id == current_user.id,
-                    Campaign.meta_account_id == account_id_with_prefix,
-                    or_(
-                        Campaign.ad_set_name == '',
-                        Campaign.ad_set_name.is_(None)
-                    ),
-                    or_(
-                        Campaign.ad_name == '',
-                        Campaign.ad_name.is_(None)
-                    )
-                ).distinct().count()
-                
-                # 最新のデータ日付を取得
-                latest_date = db.query(func.max(Campaign.date)).filter(
-                    Campaign.user_id == current_user.id,
-                    Campaign.meta_account_id == account_id_with_prefix
-                ).scalar()
-                
-                # アカウント名を取得（Meta APIから取得できた場合はそれを使用、なければアカウントID）
-                account_name = account_names.get(account_id)
-                if not account_name or account_name.strip() == "":
-                    # account_namesにデータがない場合、Meta APIから個別に取得を試みる
-                    if current_user.meta_access_token:
-                        try:
-                            async with httpx.AsyncClient() as client:
-                                account_url = f"https://graph.facebook.com/v24.0/{account_id}"
-                                account_params = {
-                                    "access_token": current_user.meta_access_token,
-                                    "fields": "account_id,id,name"
-                                }
-                                account_response = await client.get(account_url, params=account_params)
-                                account_response.raise_for_status()
-                                account_data = account_response.json()
-                                
-                                if "error" not in account_data and "name" in account_data:
-                                    account_name = account_data.get("name")
-                                    if account_name and account_name.strip():
-                                        account_names[account_id] = account_name
-                                        print(f"[Meta Accounts] Fetched name for {account_id}: {account_name}")
-                                    else:
-                                        account_name = account_id
-                                else:
-                                    account_name = account_id
-                        except Exception as e:
-                            print(f"[Meta Accounts] Error fetching name for {account_id}: {str(e)}")
-                            account_name = account_id
-                    else:
-                        account_name = account_id
-                
-                print(f"[Meta Accounts] For account_id {account_id}, final name: {account_name}")
-                print(f"[Meta Accounts] Account {account_id} stats: data_count={total_count}, campaign_count={unique_campaigns}")
-                
-                # nameが空の場合はaccount_idを使用
-                final_name = account_name if account_name and account_name.strip() else account_id
-                
-                account_result = {
-                    "account_id": account_id,
-                    "name": final_name,
-                    "data_count": total_count,
-                    "campaign_count": unique_campaigns,
-                    "latest_date": str(latest_date) if latest_date else None
-                }
-                print(f"[Meta Accounts] Account result: {account_result}")
-                result.append(account_result)
-            except Exception as e:
-                import traceback
-                print(f"[Meta Accounts] Error processing account {account_id}: {str(e)}")
-                print(f"[Meta Accounts] Error details: {traceback.format_exc()}")
-                # エラーが発生したアカウントはスキップして続行
-                continue
+        # データ件数が未集計のアカウントのみ集計（同期・削除のたびに更新されるため通常は不要）
+        for account in accounts:
+            if account.stats_refreshed_at is None:
+                AdAccountService.refresh_stats(db, current_user.id, account.meta_account_id)
         
+        result = [AdAccountService.to_dict(account) for account in accounts]
         print(f"[Meta Accounts] Returning {len(result)} accounts")
         return {
             "accounts": result,
@@ -1508,6 +1182,10 @@ async def delete_all_meta_data(
         # コミットして削除を確定
         db.commit()
         print(f"[Meta Delete All] Successfully committed deletion: {total_deleted} records")
+        if account_id:
+            AdAccountService.refresh_stats(db, current_user.id, account_id)
+        else:
+            AdAccountService.refresh_all_stats(db, current_user.id)
         
         # 削除後のレコード数を確認
         count_after = db.query(Campaign).filter(
@@ -1535,11 +1213,13 @@ async def delete_all_meta_data(
 @router.post("/sync-all")
 async def sync_all_meta_data(
     account_id: Optional[str] = Query(None, description="同期するMeta広告アカウントID（指定しない場合は全アカウント）"),
+    stream: bool = Query(False, description="アカウントごとの結果を完了順にNDJSONで返す"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     本番環境テスト用: ユーザーの全期間Metaデータを再取得
+    アカウントは並行して同期する（各アカウント専用のDBセッション、トークンごとの同時実行数制限あり）
     """
     try:
         print(f"[Meta Sync All] Starting full period sync for user: {current_user.id}")
@@ -1559,7 +1239,7 @@ async def sync_all_meta_data(
         else:
             # 全アカウントを取得
             try:
-                async with httpx.AsyncClient() as client:
+                async with graph_client() as client:
                     accounts_url = "https://graph.facebook.com/v24.0/me/adaccounts"
                     accounts_params = {
                         "access_token": current_user.meta_access_token,
@@ -1589,98 +1269,54 @@ async def sync_all_meta_data(
             )
         
         # 各アカウントの全期間データを取得
-        # まず、全アカウントの全期間データを削除（sync_meta_data_to_campaigns内の削除処理は期間内のみのため）
-        # CSVデータも含めて全データを削除（重複を防ぐため）
-        print(f"[Meta Sync All] Deleting all existing data (including CSV data) for {len(account_ids)} account(s) before sync...")
-        
-        total_deleted = 0
+        # 既存データは各アカウントの同期完了時にステージングと入れ替える（事前に削除しない）
+        # 同期中もダッシュボードは既存データを参照でき、失敗したアカウントのデータはそのまま残る
+        print(f"[Meta Sync All] Starting data sync for {len(account_ids)} account(s) (existing data is replaced per account after each sync)...")
         
-        # 1. Meta APIデータ（meta_account_idが設定されている）を削除（全レベルのデータ）
-        for acc_id in account_ids:
-            try:
-                # このアカウントの全期間データを削除（期間制限なし、全レベルのデータ）
-                delete_count = db.query(Campaign).filter(
-                    Campaign.user_id == current_user.id,
-                    Campaign.meta_account_id == acc_id
-                    # 広告セット・広告レベルのデータも削除対象に含める（Meta APIから取得しているため）
-                ).delete(synchronize_session=False)
-                total_deleted += delete_count
-                print(f"[Meta Sync All] Deleted {delete_count} Meta API records for account {acc_id} (all levels)")
-            except Exception as e:
-                import traceback
-                error_msg = f"[Meta Sync All] Error deleting Meta API data for account {acc_id}: {str(e)}"
-                print(error_msg)
-                print(f"[Meta Sync All] Error details: {traceback.format_exc()}")
-                db.rollback()
-                # 削除エラー時は同期処理を中止
-                raise HTTPException(status_code=500, detail=f"Failed to delete existing Meta API data for account {acc_id}: {str(e)}")
-        
-        # 2. CSVアップロードデータ（meta_account_idがNULL）も削除（重複を防ぐため、全レベルのデータ）
-        try:
-            csv_delete_count = db.query(Campaign).filter(
-                Campaign.user_id == current_user.id,
-                or_(
-                    Campaign.meta_account_id.is_(None),
-                    Campaign.meta_account_id == ''
-                )
-                # 広告セット・広告レベルのデータも削除対象に含める
-            ).delete(synchronize_session=False)
-            total_deleted += csv_delete_count
-            print(f"[Meta Sync All] Deleted {csv_delete_count} CSV upload records (all levels)")
-        except Exception as e:
-            import traceback
-            error_msg = f"[Meta Sync All] Error deleting CSV data: {str(e)}"
-            print(error_msg)
-            print(f"[Meta Sync All] Error details: {traceback.format_exc()}")
-            db.rollback()
-            # 削除エラー時は同期処理を中止
-            raise HTTPException(status_code=500, detail=f"Failed to delete existing CSV data: {str(e)}")
+        user_id = current_user.id
+        access_token = current_user.meta_access_token
         
-        # コミットして削除を確定（sync_meta_data_to_campaigns内で保存と一緒にコミットされるため、ここではコミットしない）
-        # ただし、sync_meta_data_to_campaignsが呼ばれる前に削除を確定する必要があるため、ここでコミット
-        db.commit()
-        print(f"[Meta Sync All] Deletion completed: {total_deleted} records deleted (Meta API + CSV data, all levels), starting data sync...")
+        def build_summary(total_synced: int, results: List[Dict]) -> Dict:
+            return {
+                "status": "success",
+                "message": f"{total_synced}/{len(account_ids)}アカウントのデータを同期しました",
+                "total_accounts": len(account_ids),
+                "synced_accounts": total_synced,
+                "results": results
+            }
         
-        total_synced = 0
-        results = []
+        async def run_syncs() -> AsyncIterator[Dict]:
+            """全アカウントを並行して同期し、完了したアカウントから結果を返す"""
+            total_synced = 0
+            results = []
+            async for result in sync_accounts_concurrently(
+                user_id,
+                access_token,
+                account_ids,
+                days=None,  # 全期間（37ヶ月）
+                replace_all_dates=True  # 取得期間外の古いデータも含めて入れ替える
+            ):
+                if result["status"] == "success":
+                    total_synced += 1
+                print(f"[Meta Sync All] Account {result['account_id']} finished: {result['status']} ({len(results) + 1}/{len(account_ids)}, {result['elapsed_seconds']}s)")
+                results.append(result)
+                yield result
+            # Metaデータの入れ替えが1件以上成功した場合のみ、CSVデータを短いトランザクションで削除する
+            if total_synced > 0:
+                _delete_csv_rows(user_id)
+            yield build_summary(total_synced, results)
         
-        for idx, acc_id in enumerate(account_ids):
-            try:
-                acc_id_for_db = acc_id if acc_id.startswith("act_") else f"act_{acc_id}"
-                print(f"[Meta Sync All] Syncing account {idx + 1}/{len(account_ids)}: {acc_id_for_db}")
-                await sync_meta_data_to_campaigns(
-                    current_user,
-                    current_user.meta_access_token,
-                    acc_id_for_db,
-                    db,
-                    days=None  # 全期間（37ヶ月）
-                )
-                total_synced += 1
-                results.append({
-                    "account_id": acc_id,
-                    "status": "success"
-                })
-                print(f"[Meta Sync All] Successfully synced account: {acc_id}")
-            except Exception as e:
-                import traceback
-                error_details = traceback.format_exc()
-                print(f"[Meta Sync All] Error syncing account {acc_id}: {str(e)}")
-                print(f"[Meta Sync All] Error details: {error_details}")
-                results.append({
-                    "account_id": acc_id,
-                    "status": "error",
-                    "error": str(e)
-                })
-                # 1つのアカウントでエラーが発生しても、他のアカウントの同期は続行
-                continue
+        if stream:
+            # アカウントごとの結果を完了順にNDJSONで返し、最終行に全体の結果を返す
+            async def stream_results():
+                async for item in run_syncs():
+                    yield json.dumps(item, ensure_ascii=False, default=str) + "\n"
+            return StreamingResponse(stream_results(), media_type="application/x-ndjson")
         
-        return {
-            "status": "success",
-            "message": f"{total_synced}/{len(account_ids)}アカウントのデータを同期しました",
-            "total_accounts": len(account_ids),
-            "synced_accounts": total_synced,
-            "results": results
-        }
+        summary = None
+        async for item in run_syncs():
+            summary = item
+        return summary
     except HTTPException:
         raise
     except Exception as e:
@@ -1757,7 +1393,7 @@ async def get_meta_insights(
     access_token = current_user.meta_access_token
     
     try:
-        async with httpx.AsyncClient() as client:
+        async with graph_client() as client:
             all_insights = []
             
             # キャンペーン一覧を取得
@@ -1781,7 +1417,7 @@ async def get_meta_insights(
                 if not next_url:
                     break
                 campaigns_url = next_url
-                campaigns_params = {}
+                campaigns_params = None  # 次ページのURLにパラメータが含まれているため指定しない（空のdictはURLのクエリを消す）
             
             # 各キャンペーンのInsightsを取得（キャンペーンレベルのみ）
             time_range_dict = {"since": since, "until": until}
@@ -2013,7 +1649,6 @@ async def meta_oauth_callback(
     error: Optional[str] = Query(None, description="エラーメッセージ"),
     error_reason: Optional[str] = Query(None, description="エラー理由"),
     error_description: Optional[str] = Query(None, description="エラー詳細"),
-    background_tasks: BackgroundTasks = BackgroundTasks(),
     db: Session = Depends(get_db)
 ):
     """Meta OAuthコールバック - トークンを取得して保存"""
@@ -2264,7 +1899,7 @@ async def meta_oauth_callback(
                 
                 # 次のページのURLを設定（パラメータをクリア）
                 accounts_url = next_url
-                accounts_params = {}  # URLにパラメータが含まれているためクリア
+                accounts_params = None  # 次ページのURLにパラメータが含まれているため指定しない（空のdictはURLのクエリを消す）
             
             if not accounts:
                 raise HTTPException(
@@ -2305,89 +1940,19 @@ async def meta_oauth_callback(
             # アカウント情報をバックグラウンドタスクに渡すためにコピー
             accounts_for_background = [{"id": acc.get("id"), "name": acc.get("name", "Unknown")} for acc in accounts]
             user_id_for_background = user.id
-            access_token_for_background = long_lived_token  # トークンも保存
-            
-            def sync_full_period_background_sync():
-                """バックグラウンドで全期間のデータを取得（同期関数ラッパー）"""
-                import asyncio
-                from ..database import SessionLocal
-                
-                print(f"[Meta OAuth] Background sync: Task started")
-                print(f"[Meta OAuth] Background sync: Accounts to sync: {len(accounts_for_background)}")
-                
-                # 新しいイベントループを作成（バックグラウンドタスク用）
-                try:
-                    loop = asyncio.get_event_loop()
-                except RuntimeError:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                
-                async def sync_all_accounts_async():
-                    """非同期で全アカウントのデータを取得"""
-                    background_db = SessionLocal()
-                    try:
-                        # ユーザー情報を再取得
-                        background_user = background_db.query(User).filter(User.id == user_id_for_background).first()
-                        if not background_user:
-                            print(f"[Meta OAuth] Background sync: ERROR - User not found (user_id: {user_id_for_background})")
-                            return
-                        
-                        print(f"[Meta OAuth] Background sync: User found: {background_user.id}")
-                        print(f"[Meta OAuth] Background sync: User meta_account_id: {background_user.meta_account_id}")
-                        print(f"[Meta OAuth] Background sync: Starting full period sync for user {background_user.id}")
-                        
-                        # トークンを使用（保存されたトークンを使用）
-                        access_token = access_token_for_background
-                        if not access_token:
-                            print(f"[Meta OAuth] Background sync: ERROR - No access token found")
-                            return
-                        
-                        for idx, account in enumerate(accounts_for_background):
-                            account_id_to_sync = account.get("id")
-                            account_name = account.get("name", "Unknown")
-                            print(f"[Meta OAuth] Background sync: Syncing account {idx + 1}/{len(accounts_for_background)} (full period): {account_name} ({account_id_to_sync})")
-                            try:
-                                await sync_meta_data_to_campaigns(background_user, access_token, account_id_to_sync, background_db, days=None)
-                                print(f"[Meta OAuth] Background sync: Successfully synced full period for {account_name}")
-                            except Exception as account_error:
-                                import traceback
-                                print(f"[Meta OAuth] Background sync: ERROR syncing full period for {account_name}: {str(account_error)}")
-                                print(f"[Meta OAuth] Background sync: Error details: {traceback.format_exc()}")
-                                continue
-                        
-                        print(f"[Meta OAuth] Background sync: Full period sync completed for user {background_user.id}")
-                    except Exception as sync_error:
-                        import traceback
-                        print(f"[Meta OAuth] Background sync: CRITICAL ERROR: {str(sync_error)}")
-                        print(f"[Meta OAuth] Background sync: Error details: {traceback.format_exc()}")
-                    finally:
-                        background_db.close()
-                        print(f"[Meta OAuth] Background sync: Database connection closed")
-                
-                # 非同期関数を実行
-                try:
-                    # 新しいイベントループを作成して実行
-                    new_loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(new_loop)
-                    try:
-                        new_loop.run_until_complete(sync_all_accounts_async())
-                    finally:
-                        new_loop.close()
-                except Exception as e:
-                    import traceback
-                    print(f"[Meta OAuth] Background sync: ERROR executing async function: {str(e)}")
-                    print(f"[Meta OAuth] Background sync: Error details: {traceback.format_exc()}")
-                    # フォールバック: asyncio.runを使用（新しいイベントループを作成）
-                    try:
-                        asyncio.run(sync_all_accounts_async())
-                    except Exception as e2:
-                        import traceback
-                        print(f"[Meta OAuth] Background sync: ERROR with asyncio.run: {str(e2)}")
-                        print(f"[Meta OAuth] Background sync: Error details: {traceback.format_exc()}")
             
-            # バックグラウンドタスクとして追加（同期関数として）
-            background_tasks.add_task(sync_full_period_background_sync)
-            print(f"[Meta OAuth] Background task added for full period sync")
+            # 全アカウントの全期間同期をワーカーのジョブとして登録（Webワーカーでは実行しない）
+            sync_job = JobQueue.enqueue(
+                db,
+                "meta_sync",
+                {
+                    "user_id": str(user_id_for_background),
+                    "account_ids": [account["id"] for account in accounts_for_background],
+                    "days": None  # 全期間（37ヶ月）
+                },
+                user_id=user_id_for_background
+            )
+            print(f"[Meta OAuth] Sync job {sync_job.id} enqueued for full period sync ({len(accounts_for_background)} account(s))")
             
             # localhostの場合、https://をhttp://に強制的に変換（normalize_localhost_url関数を使用）
             final_frontend_url = normalize_localhost_url(frontend_url)
@@ -2534,7 +2099,8 @@ async def update_unique_reach(
     db: Session = Depends(get_db)
 ):
     """
-    全キャンペーンのユニークリーチをMeta APIから取得してDBに保存
+    全アカウントの期間別ユニークリーチをMeta APIから再取得してperiod_reachキャッシュを更新
+    （アカウント/キャンペーン単位で7日間・30日間・全期間をまとめて取得）
     """
     if not current_user.meta_access_token:
         raise HTTPException(
@@ -2545,29 +2111,22 @@ async def update_unique_reach(
     access_token = current_user.meta_access_token
     
     try:
-        # 1. データベースから全キャンペーン情報を取得
-        print("[Update Unique Reach] Fetching campaign information from database...")
-        campaign_query = text("""
-            SELECT 
-                campaign_name,
-                meta_account_id,
-                MIN(date) as start_date,
-                MAX(date) as end_date
-            FROM campaigns
-            WHERE campaign_name IS NOT NULL 
-              AND campaign_name != ''
-              AND meta_account_id IS NOT NULL
-              AND meta_account_id != ''
-            GROUP BY campaign_name, meta_account_id
-            ORDER BY campaign_name, meta_account_id
-        """)
-        
-        result = db.execute(campaign_query)
-        campaign_rows = result.fetchall()
+        # 1. データベースからアカウントごとの日付範囲を取得
+        print("[Update Unique Reach] Fetching account date ranges from database...")
+        account_rows = db.query(
+            Campaign.meta_account_id,
+            func.min(Campaign.date).label('start_date'),
+            func.max(Campaign.date).label('end_date'),
+            func.count(func.distinct(Campaign.campaign_key)).label('campaign_count')
+        ).filter(
+            Campaign.user_id == current_user.id,
+            Campaign.meta_account_id.isnot(None),
+            Campaign.meta_account_id != ''
+        ).group_by(Campaign.meta_account_id).all()
         
-        print(f"[Update Unique Reach] Found {len(campaign_rows)} unique campaigns")
+        print(f"[Update Unique Reach] Found {len(account_rows)} accounts")
         
-        if len(campaign_rows) == 0:
+        if len(account_rows) == 0:
             return {
                 "success_count": 0,
                 "error_count": 0,
@@ -2578,164 +2137,49 @@ async def update_unique_reach(
         success_count = 0
         error_count = 0
         details = []
+        total_campaigns = 0
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            for row in campaign_rows:
-                campaign_name = row[0]
-                meta_account_id = row[1]
-                start_date = row[2]
-                end_date = row[3]
-                
-                print(f"[Update Unique Reach] Processing: {campaign_name} ({meta_account_id})")
-                
-                try:
-                    # 2a) Meta Graph API でキャンペーンIDを検索
-                    # meta_account_idから"act_"プレフィックスを削除（既に含まれている場合）
-                    account_id = meta_account_id.replace("act_", "") if meta_account_id.startswith("act_") else meta_account_id
-                    
-                    campaigns_url = f"https://graph.facebook.com/v18.0/act_{account_id}/campaigns"
-                    campaigns_params = {
-                        "access_token": access_token,
-                        "fields": "id,name",
-                        "filtering": json.dumps([{"field": "name", "operator": "EQUAL", "value": campaign_name}]),
-                        "limit": 100
-                    }
-                    
-                    print(f"[Update Unique Reach] Searching for campaign: {campaign_name}")
-                    campaigns_response = await client.get(campaigns_url, params=campaigns_params)
-                    campaigns_response.raise_for_status()
-                    campaigns_data = campaigns_response.json()
-                    
-                    campaign_list = campaigns_data.get('data', [])
-                    
-                    if len(campaign_list) == 0:
-                        error_msg = f"Campaign '{campaign_name}' not found in Meta API"
-                        print(f"[Update Unique Reach] ❌ {error_msg}")
-                        error_count += 1
-                        details.append({
-                            "campaign_name": campaign_name,
-                            "meta_account_id": meta_account_id,
-                            "status": "error",
-                            "error": error_msg
-                        })
-                        continue
-                    
-                    # 最初に見つかったキャンペーンIDを使用
-                    campaign_id = campaign_list[0].get('id')
-                    found_campaign_name = campaign_list[0].get('name', '')
-                    
-                    print(f"[Update Unique Reach] Found campaign_id: {campaign_id} (name: {found_campaign_name})")
-                    
-                    # 2b) 期間全体のユニークリーチを取得
-                    insights_url = f"https://graph.facebook.com/v18.0/{campaign_id}/insights"
-                    time_range_dict = {
-                        "since": start_date.strftime("%Y-%m-%d"),
-                        "until": end_date.strftime("%Y-%m-%d")
-                    }
-                    time_range_json = json.dumps(time_range_dict, separators=(',', ':'))
-                    
-                    insights_params = {
-                        "access_token": access_token,
-                        "fields": "reach",
-                        "time_range": time_range_json
-                        # time_incrementは指定しない（期間全体の集計値を取得）
-                    }
-                    
-                    print(f"[Update Unique Reach] Fetching unique reach for period: {time_range_json}")
-                    insights_response = await client.get(insights_url, params=insights_params)
-                    insights_response.raise_for_status()
-                    insights_data = insights_response.json()
-                    
-                    insights_list = insights_data.get('data', [])
-                    
-                    if len(insights_list) == 0:
-                        error_msg = f"No insights data returned for campaign '{campaign_name}'"
-                        print(f"[Update Unique Reach] ❌ {error_msg}")
-                        error_count += 1
-                        details.append({
-                            "campaign_name": campaign_name,
-                            "meta_account_id": meta_account_id,
-                            "status": "error",
-                            "error": error_msg
-                        })
-                        continue
-                    
-                    # time_incrementなしの場合、期間全体のデータは1件のみ
-                    unique_reach = int(insights_list[0].get('reach', 0))
-                    
-                    print(f"[Update Unique Reach] Meta API unique reach: {unique_reach:,}")
-                    
-                    # 2c) 取得したユニークリーチをデータベースの period_unique_reach に更新
-                    update_query = text("""
-                        UPDATE campaigns 
-                        SET period_unique_reach = :unique_reach 
-                        WHERE campaign_name = :campaign_name 
-                          AND meta_account_id = :meta_account_id
-                    """)
-                    
-                    db.execute(update_query, {
-                        "unique_reach": unique_reach,
-                        "campaign_name": campaign_name,
-                        "meta_account_id": meta_account_id
-                    })
-                    db.commit()
-                    
-                    # 更新されたレコード数を確認
-                    count_query = text("""
-                        SELECT COUNT(*) 
-                        FROM campaigns 
-                        WHERE campaign_name = :campaign_name 
-                          AND meta_account_id = :meta_account_id
-                    """)
-                    count_result = db.execute(count_query, {
-                        "campaign_name": campaign_name,
-                        "meta_account_id": meta_account_id
-                    })
-                    updated_count = count_result.scalar()
-                    
-                    print(f"[Update Unique Reach] ✅ Updated {updated_count} records for '{campaign_name}': period_unique_reach = {unique_reach:,}")
-                    
-                    success_count += 1
-                    details.append({
-                        "campaign_name": campaign_name,
-                        "meta_account_id": meta_account_id,
-                        "status": "success",
-                        "unique_reach": unique_reach,
-                        "updated_records": updated_count
-                    })
-                    
-                except httpx.HTTPStatusError as e:
-                    error_msg = f"Meta API error: {e.response.status_code} - {e.response.text[:200]}"
-                    print(f"[Update Unique Reach] ❌ {error_msg}")
-                    error_count += 1
-                    details.append({
-                        "campaign_name": campaign_name,
-                        "meta_account_id": meta_account_id,
-                        "status": "error",
-                        "error": error_msg
-                    })
-                    continue
-                except Exception as e:
-                    error_msg = f"Unexpected error: {str(e)}"
-                    print(f"[Update Unique Reach] ❌ {error_msg}")
-                    import traceback
-                    print(f"[Update Unique Reach] Traceback: {traceback.format_exc()}")
-                    error_count += 1
-                    details.append({
-                        "campaign_name": campaign_name,
-                        "meta_account_id": meta_account_id,
-                        "status": "error",
-                        "error": error_msg
-                    })
-                    continue
+        for row in account_rows:
+            meta_account_id = row.meta_account_id
+            total_campaigns += row.campaign_count or 0
+            print(f"[Update Unique Reach] Processing account: {meta_account_id} ({row.start_date} ~ {row.end_date})")
+            try:
+                # 同じアカウントの更新が実行中の場合は、その終了を待って結果を共有する
+                stored, attached = await SingleFlight.run(
+                    f"update_reach:{current_user.id}:{meta_account_id}",
+                    lambda: ReachService.precompute_popular_ranges(
+                        db, current_user, access_token, meta_account_id, row.end_date, row.start_date
+                    )
+                )
+                success_count += 1
+                details.append({
+                    "meta_account_id": meta_account_id,
+                    "status": "success",
+                    "start_date": str(row.start_date),
+                    "end_date": str(row.end_date),
+                    "updated_entries": stored or 0,
+                    "attached": attached
+                })
+                print(f"[Update Unique Reach] ✅ Updated {stored} period reach entries for {meta_account_id}")
+            except Exception as e:
+                db.rollback()
+                error_msg = f"Unexpected error: {str(e)}"
+                print(f"[Update Unique Reach] ❌ {error_msg}")
+                error_count += 1
+                details.append({
+                    "meta_account_id": meta_account_id,
+                    "status": "error",
+                    "error": error_msg
+                })
+                continue
         
         return {
             "success_count": success_count,
             "error_count": error_count,
             "total": success_count + error_count,
-            "total_campaigns": len(campaign_rows),
+            "total_campaigns": total_campaigns,
             "details": details,
-            "message": f"{success_count}/{len(campaign_rows)}キャンペーンのユニークリーチを更新しました。"
+            "message": f"{success_count}/{len(account_rows)}アカウントのユニークリーチを更新しました。"
         }
         
     except Exception as e:
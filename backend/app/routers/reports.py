@@ -0,0 +1,113 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from datetime import date
+from typing import Dict, Optional, Tuple
+import asyncio
+import time
+import uuid
+from ..database import get_db
+from ..models.analysis import AnalysisResult
+from ..models.job import Job
+from ..models.report_artifact import ReportArtifact
+from ..utils.dependencies import get_current_user_id
+from ..services.report_artifacts import ReportArtifactService
+from ..config import settings
+
+router = APIRouter()
+
+# 生成の完了を確認する間隔（秒）
+REPORT_POLL_SECONDS = 0.5
+
+def _artifact_response(artifact: ReportArtifact, cache_status: str) -> Response:
+    return Response(
+        content=artifact.content,
+        media_type=artifact.content_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{artifact.filename}"',
+            "X-Report-Cache": cache_status,
+        }
+    )
+
+def _lookup_or_enqueue(db: Session, spec: Dict) -> Tuple[Optional[ReportArtifact], Optional[Job]]:
+    """キャッシュにあればそれを返し、なければreportジョブを登録（生成中のジョブがあれば再利用）"""
+    artifact = ReportArtifactService.get_cached(db, spec["cache_key"])
+    if artifact is not None:
+        return artifact, None
+    return None, ReportArtifactService.find_or_enqueue(db, spec)
+
+def _poll(db: Session, job_id: uuid.UUID, cache_key: str) -> Tuple[Optional[ReportArtifact], Optional[Job]]:
+    db.expire_all()
+    artifact = ReportArtifactService.get_cached(db, cache_key)
+    job = db.query(Job).filter(Job.id == job_id).first()
+    return artifact, job
+
+async def _serve_report(db: Session, spec: Dict) -> Response:
+    """
+    キャッシュ済みならすぐに返す。未生成ならワーカーの生成を REPORT_WAIT_SECONDS まで待ち（スレッドを占有しない）、
+    間に合わなければ 202 を返してクライアントに再試行させる（同じジョブの完了を待つ）
+    """
+    artifact, job = await run_in_threadpool(_lookup_or_enqueue, db, spec)
+    if artifact is not None:
+        return _artifact_response(artifact, "hit")
+
+    deadline = time.monotonic() + settings.REPORT_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        await asyncio.sleep(REPORT_POLL_SECONDS)
+        artifact, job = await run_in_threadpool(_poll, db, job.id, spec["cache_key"])
+        if artifact is not None:
+            return _artifact_response(artifact, "miss")
+        if job is None or job.status in ("failed", "cancelled"):
+            error = job.error_message if job else "job not found"
+            print(f"[Reports] ❌ {spec['report_type']} report failed: {error}")
+            raise HTTPException(status_code=500, detail=f"レポートの生成に失敗しました: {error}")
+
+    return JSONResponse(
+        status_code=202,
+        content={"status": job.status, "job_id": str(job.id), "detail": "レポートを生成中です。しばらくしてから再度お試しください。"},
+        headers={"Retry-After": "3"}
+    )
+
+def _describe_analysis_report(db: Session, user_id: uuid.UUID, analysis_id: uuid.UUID) -> Dict:
+    analysis = db.query(AnalysisResult).filter(
+        AnalysisResult.id == analysis_id,
+        AnalysisResult.user_id == user_id
+    ).first()
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    if analysis.status != "completed":
+        raise HTTPException(status_code=400, detail="分析が完了していないため、PDFを生成できません")
+    return ReportArtifactService.describe(db, user_id, "pdf", analysis=analysis)
+
+@router.get("/pdf/{analysis_id}/")
+async def download_pdf_report(
+    analysis_id: uuid.UUID,
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    """AI分析結果のPDFレポート"""
+    spec = await run_in_threadpool(_describe_analysis_report, db, current_user_id, analysis_id)
+    return await _serve_report(db, spec)
+
+@router.get("/excel/")
+async def download_excel_report(
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    """期間のサマリー・キャンペーン別・日別トレンドのExcelレポート（既定: JSTの直近30日）"""
+    spec = await run_in_threadpool(ReportArtifactService.describe, db, current_user_id, "excel", None, start_date, end_date)
+    return await _serve_report(db, spec)
+
+@router.get("/csv/")
+async def download_csv_report(
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    """期間のキャンペーン別・日別データのCSV（アップロードと同じ列名、既定: JSTの直近30日）"""
+    spec = await run_in_threadpool(ReportArtifactService.describe, db, current_user_id, "csv", None, start_date, end_date)
+    return await _serve_report(db, spec)
@@ -1,14 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Form
 from sqlalchemy.orm import Session
-from datetime import datetime
 import os
 import uuid
-import pandas as pd
 import base64
 from typing import Optional
 from ..database import get_db
-from ..models.campaign import Upload, Campaign
-from ..services.data_service import DataService
+from ..models.campaign import Upload
+from ..services.job_queue import JobQueue
 from ..utils.dependencies import get_current_user
 from ..models.user import User
 
@@ -53,88 +51,22 @@ async def upload_file(
         
         upload.file_size = len(content)
         upload.file_url = file_path
-        
-        # Parse file
-        if filename.endswith('.csv'):
-            df = DataService.parse_csv_file(file_path)
-        else:
-            df = DataService.parse_excel_file(file_path)
-        
-        # Validate
-        is_valid, error_msg = DataService.validate_dataframe(df)
-        if not is_valid:
-            upload.status = "error"
-            upload.error_message = error_msg
-            db.commit()
-            raise HTTPException(status_code=400, detail=error_msg)
-        
-        # Check for duplicates before processing
-        duplicate_count = 0
-        for _, row in df.iterrows():
-            # Handle empty/NaT dates
-            date_value = row.get('日付', '')
-            if pd.isna(date_value) or date_value == '' or str(date_value).lower() == 'nat':
-                continue  # Skip rows with invalid dates
-            try:
-                campaign_date = pd.to_datetime(date_value).date()
-            except (ValueError, TypeError):
-                continue  # Skip rows with invalid dates
-            
-            # Handle NaN values in string fields
-            campaign_name = str(row.get('キャンペーン名', '') or '').replace('nan', '').replace('NaN', '')
-            ad_set_name = str(row.get('広告セット名', '') or '').replace('nan', '').replace('NaN', '')
-            ad_name = str(row.get('広告名', '') or '').replace('nan', '').replace('NaN', '')
-            
-            existing = db.query(Campaign).filter(
-                Campaign.user_id == current_user.id,
-                Campaign.date == campaign_date,
-                Campaign.campaign_name == campaign_name,
-                Campaign.ad_set_name == ad_set_name,
-                Campaign.ad_name == ad_name
-            ).first()
-            
-            if existing:
-                duplicate_count += 1
-        
-        # Process and save (duplicates will be updated)
-        row_count = DataService.process_and_save_data(df, current_user.id, upload.id, db)
-        
-        # Get date range - filter out NaT values
-        valid_dates = pd.to_datetime(df['日付'], errors='coerce').dropna()
-        if len(valid_dates) > 0:
-            upload.start_date = valid_dates.min().date()
-            upload.end_date = valid_dates.max().date()
-        else:
-            raise HTTPException(status_code=400, detail="有効な日付データが見つかりませんでした")
-        upload.row_count = row_count
-        upload.status = "completed"
-        upload.processed_at = datetime.utcnow()
-        
         db.commit()
         
-        # Create notification with duplicate info
-        from ..services.notification_service import NotificationService
-        if duplicate_count > 0:
-            message = f"{upload.file_name} の処理が完了しました（{row_count}件のデータ、うち{duplicate_count}件は既存データを更新）"
-        else:
-            message = f"{upload.file_name} の処理が完了しました（{row_count}件のデータ）"
-        
-        NotificationService.create_notification(
+        # 解析・保存はワーカーで実行（Webワーカーを長時間占有しない）
+        job = JobQueue.enqueue(
+            db,
+            "upload",
+            {"upload_id": str(upload.id)},
             user_id=current_user.id,
-            type="upload_complete",
-            title="ファイルアップロードが完了しました",
-            message=message,
-            data={"upload_id": str(upload.id)},
-            db=db
+            max_attempts=1  # 解析エラーは再実行しても解消しないためリトライしない
         )
         
         return {
             "id": str(upload.id),
             "file_name": upload.file_name,
-            "row_count": row_count,
-            "start_date": str(upload.start_date),
-            "end_date": str(upload.end_date),
-            "status": "completed"
+            "job_id": str(job.id),
+            "status": "processing"
         }
         
     except Exception as e:
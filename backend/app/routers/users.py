@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from ..models.user import User
-from ..schemas.user import UserResponse, MetaAccountSettings, MetaAccountSettingsResponse
+from ..schemas.user import UserResponse, MetaAccountSettings, MetaAccountSettingsResponse, ConversionSettings, ConversionSettingsResponse
+from ..services.meta_actions import MetaActionExtractor, DEFAULT_CONVERSION_ACTION_TYPES
 from ..utils.dependencies import get_current_user
 from ..database import get_db
 
@@ -40,3 +41,35 @@ def get_meta_settings(
         meta_account_id=current_user.meta_account_id,
         meta_access_token=None  # セキュリティのため、トークンは返さない
     )
+
+def _conversion_settings_response(user: User) -> ConversionSettingsResponse:
+    return ConversionSettingsResponse(
+        conversion_action_types=user.conversion_action_types,
+        default_action_types=DEFAULT_CONVERSION_ACTION_TYPES,
+        is_default=not user.conversion_action_types
+    )
+
+@router.get("/me/conversion-settings/", response_model=ConversionSettingsResponse)
+def get_conversion_settings(
+    current_user: User = Depends(get_current_user)
+):
+    """Get action types counted as conversions in Meta sync"""
+    return _conversion_settings_response(current_user)
+
+@router.put("/me/conversion-settings/", response_model=ConversionSettingsResponse)
+def update_conversion_settings(
+    settings: ConversionSettings,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Update action types counted as conversions in Meta sync
+    優先順位順のアクションタイプ（末尾が "*" は前方一致）。次回の同期から反映される
+    """
+    action_types = MetaActionExtractor.validate_action_types(settings.conversion_action_types or [])
+    if len(action_types) > 50:
+        raise HTTPException(status_code=400, detail="コンバージョンのアクションタイプは50件までです")
+    current_user.conversion_action_types = action_types or None
+    db.commit()
+    db.refresh(current_user)
+    return _conversion_settings_response(current_user)
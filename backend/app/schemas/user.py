@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 import uuid
 
@@ -71,3 +71,11 @@ class MetaAccountSettings(BaseModel):
 class MetaAccountSettingsResponse(BaseModel):
     message: str
     meta_account_id: Optional[str] = None
+
+class ConversionSettings(BaseModel):
+    conversion_action_types: Optional[List[str]] = None  # Noneまたは空の場合は既定の設定に戻す
+
+class ConversionSettingsResponse(BaseModel):
+    conversion_action_types: Optional[List[str]] = None
+    default_action_types: List[str]
+    is_default: bool
@@ -0,0 +1,183 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import uuid
+from ..models.campaign import Campaign
+from ..models.dimension import AdAccount
+from ..database import SessionLocal
+from ..config import settings
+from .single_flight import SingleFlight
+from .graph_client import graph_client
+
+GRAPH_API_BASE = "https://graph.facebook.com/v24.0"
+ACCOUNT_METADATA_FIELDS = "account_id,id,name,timezone_name,timezone_offset_hours_utc,currency,account_status"
+
+class AdAccountService:
+    """
+    Meta広告アカウントのメタデータ（名前・タイムゾーン・通貨・ステータス）とデータ件数を ad_accounts にキャッシュする
+    - メタデータは AD_ACCOUNT_METADATA_TTL_HOURS ごとにバックグラウンドで再取得
+    - データ件数（data_count / campaign_count / latest_date）は同期・削除のたびに更新
+    アカウント一覧はこのテーブルのみから返す（Meta APIやcampaignsの集計はリクエストごとに行わない）
+    """
+
+    @staticmethod
+    def to_db_account_id(account_id: str) -> str:
+        """ad_accounts / campaigns には act_ プレフィックス付きで保存されている"""
+        return account_id if account_id.startswith("act_") else f"act_{account_id}"
+
+    @staticmethod
+    def list_accounts(db: Session, user_id: uuid.UUID) -> List[AdAccount]:
+        return db.query(AdAccount).filter(
+            AdAccount.user_id == user_id,
+            AdAccount.meta_account_id.isnot(None),
+            AdAccount.is_accessible.isnot(False)
+        ).order_by(AdAccount.name, AdAccount.meta_account_id).all()
+
+    @staticmethod
+    def get_account(db: Session, user_id: uuid.UUID, account_id: str) -> Optional[AdAccount]:
+        return db.query(AdAccount).filter(
+            AdAccount.user_id == user_id,
+            AdAccount.source_key == AdAccountService.to_db_account_id(account_id)
+        ).first()
+
+    @staticmethod
+    def is_metadata_stale(account: Optional[AdAccount]) -> bool:
+        if account is None or account.metadata_refreshed_at is None:
+            return True
+        threshold = datetime.utcnow() - timedelta(hours=settings.AD_ACCOUNT_METADATA_TTL_HOURS)
+        return account.metadata_refreshed_at < threshold
+
+    @staticmethod
+    def _get_or_create(db: Session, user_id: uuid.UUID, account_id: str) -> AdAccount:
+        db_account_id = AdAccountService.to_db_account_id(account_id)
+        account = AdAccountService.get_account(db, user_id, db_account_id)
+        if account is None:
+            account = AdAccount(user_id=user_id, source_key=db_account_id, meta_account_id=db_account_id)
+            db.add(account)
+        return account
+
+    @staticmethod
+    def _apply_metadata(account: AdAccount, data: Dict):
+        name = (data.get("name") or "").strip()
+        if name:
+            account.name = name[:255]
+        account.timezone_name = data.get("timezone_name")
+        tz_offset = data.get("timezone_offset_hours_utc")
+        account.timezone_offset_hours = float(tz_offset) if tz_offset is not None else None
+        account.currency = data.get("currency")
+        account.account_status = data.get("account_status")
+        account.is_accessible = True
+        account.metadata_refreshed_at = datetime.utcnow()
+
+    @staticmethod
+    async def refresh_metadata(db: Session, user_id: uuid.UUID, access_token: str) -> int:
+        """/me/adaccounts から全アカウントのメタデータを取得して保存（一覧にないアカウントは参照不可として記録）"""
+        fetched: Dict[str, Dict] = {}
+        async with graph_client() as client:
+            url = f"{GRAPH_API_BASE}/me/adaccounts"
+            params = {"access_token": access_token, "fields": ACCOUNT_METADATA_FIELDS, "limit": 100}
+            while True:
+                response = await client.get(url, params=params)
+                response.raise_for_status()
+                data = response.json()
+                for account in data.get("data", []):
+                    account_id = account.get("account_id") or account.get("id")
+                    if account_id:
+                        fetched[AdAccountService.to_db_account_id(str(account_id))] = account
+                next_url = data.get("paging", {}).get("next")
+                if not next_url:
+                    break
+                url = next_url
+                params = None  # 次ページのURLにパラメータが含まれているため指定しない（空のdictはURLのクエリを消す）
+
+        for db_account_id, data in fetched.items():
+            AdAccountService._apply_metadata(AdAccountService._get_or_create(db, user_id, db_account_id), data)
+        db.query(AdAccount).filter(
+            AdAccount.user_id == user_id,
+            AdAccount.meta_account_id.isnot(None),
+            AdAccount.source_key.notin_(list(fetched.keys()) or [""])
+        ).update({AdAccount.is_accessible: False}, synchronize_session=False)
+        db.commit()
+        print(f"[Ad Accounts] Refreshed metadata for {len(fetched)} accounts (user: {user_id})")
+        return len(fetched)
+
+    @staticmethod
+    async def refresh_metadata_in_background(user_id: uuid.UUID, access_token: str):
+        """専用のセッションでメタデータを再取得（同じユーザーの再取得が実行中なら相乗り）"""
+        async def run_refresh():
+            refresh_db = SessionLocal()
+            try:
+                return await AdAccountService.refresh_metadata(refresh_db, user_id, access_token)
+            finally:
+                refresh_db.close()
+        try:
+            await SingleFlight.run(f"ad_accounts:{user_id}", run_refresh)
+        except Exception as e:
+            print(f"[Ad Accounts] ⚠️ Failed to refresh metadata (cached values are kept): {str(e)}")
+
+    @staticmethod
+    async def get_timezone_offset(db: Session, user_id: uuid.UUID, account_id: str, access_token: str) -> Optional[float]:
+        """アカウントのタイムゾーン（UTCからの時差）。キャッシュが期限内ならMeta APIを呼ばない"""
+        account = AdAccountService.get_account(db, user_id, account_id)
+        if account is not None and not AdAccountService.is_metadata_stale(account) and account.timezone_offset_hours is not None:
+            return account.timezone_offset_hours
+        try:
+            async with graph_client() as client:
+                response = await client.get(
+                    f"{GRAPH_API_BASE}/{AdAccountService.to_db_account_id(account_id)}",
+                    params={"access_token": access_token, "fields": ACCOUNT_METADATA_FIELDS}
+                )
+                response.raise_for_status()
+                data = response.json()
+            account = AdAccountService._get_or_create(db, user_id, account_id)
+            AdAccountService._apply_metadata(account, data)
+            db.commit()
+            return account.timezone_offset_hours
+        except Exception as e:
+            db.rollback()
+            print(f"[Ad Accounts] ⚠️ Failed to get account timezone for {account_id}: {str(e)}")
+            # 期限切れでも保存済みの値があれば使用
+            return account.timezone_offset_hours if account is not None else None
+
+    @staticmethod
+    def refresh_stats(db: Session, user_id: uuid.UUID, account_id: str):
+        """アカウントのデータ件数・キャンペーン数・最新日付を集計して保存"""
+        db_account_id = AdAccountService.to_db_account_id(account_id)
+        data_count, latest_date = db.query(func.count(Campaign.id), func.max(Campaign.date)).filter(
+            Campaign.user_id == user_id,
+            Campaign.meta_account_id == db_account_id
+        ).first()
+        campaign_count = db.query(Campaign.campaign_key).filter(
+            Campaign.user_id == user_id,
+            Campaign.meta_account_id == db_account_id,
+            Campaign.adset_key.is_(None),
+            Campaign.ad_key.is_(None)
+        ).distinct().count()
+        account = AdAccountService._get_or_create(db, user_id, db_account_id)
+        account.data_count = data_count
+        account.campaign_count = campaign_count
+        account.latest_date = latest_date
+        account.stats_refreshed_at = datetime.utcnow()
+        db.commit()
+
+    @staticmethod
+    def refresh_all_stats(db: Session, user_id: uuid.UUID):
+        for account in db.query(AdAccount).filter(AdAccount.user_id == user_id, AdAccount.meta_account_id.isnot(None)).all():
+            AdAccountService.refresh_stats(db, user_id, account.meta_account_id)
+
+    @staticmethod
+    def to_dict(account: AdAccount) -> Dict:
+        account_id = account.meta_account_id.replace("act_", "")
+        return {
+            "account_id": account_id,
+            "name": account.name or account_id,
+            "data_count": account.data_count or 0,
+            "campaign_count": account.campaign_count or 0,
+            "latest_date": str(account.latest_date) if account.latest_date else None,
+            "timezone_name": account.timezone_name,
+            "timezone_offset_hours": account.timezone_offset_hours,
+            "currency": account.currency,
+            "account_status": account.account_status,
+            "metadata_refreshed_at": account.metadata_refreshed_at.isoformat() + 'Z' if account.metadata_refreshed_at else None,
+        }
@@ -1,6 +1,5 @@
 import os
 import json
-from openai import OpenAI
 from ..config import settings
 
 class AIAnalysisService:
@@ -10,6 +9,8 @@ class AIAnalysisService:
         api_key = os.getenv("OPENAI_API_KEY") or settings.OPENAI_API_KEY
         if not api_key:
             raise ValueError("OPENAI_API_KEY is not set")
+        # openaiは重いため、初回の分析時に読み込む（サーバーの起動時間を短縮）
+        from openai import OpenAI
         return OpenAI(api_key=api_key)
     
     @staticmethod
@@ -0,0 +1,215 @@
+from sqlalchemy import Date, Integer, Numeric
+from sqlalchemy.orm import Query
+from datetime import date
+from decimal import Decimal
+from typing import Callable, Iterator, List, Optional
+import csv
+import io
+import itertools
+import json
+import tempfile
+from ..database import SessionLocal
+from ..models.campaign import Campaign
+from ..config import settings
+
+# エクスポートできる列（既定ではすべて、この順で出力）
+EXPORT_COLUMNS = [
+    "date",
+    "meta_account_id",
+    "campaign_name",
+    "ad_set_name",
+    "ad_name",
+    "cost",
+    "impressions",
+    "clicks",
+    "conversions",
+    "conversion_value",
+    "reach",
+    "engagements",
+    "link_clicks",
+    "landing_page_views",
+    "ctr",
+    "cpc",
+    "cpm",
+    "cpa",
+    "cvr",
+    "roas",
+]
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+# Excelの1シートの最大行数（見出しを除く）
+XLSX_MAX_ROWS = 1048575
+
+class _ChunkSink:
+    """ParquetWriter の書き込み先。書き込まれたバイト列を溜め、drain() でレスポンスに流す"""
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+class CampaignExportService:
+    """
+    キャンペーンデータのストリーミングエクスポート（CSV・NDJSON・Parquet・Excel）
+    サーバーサイドカーソルから EXPORT_BATCH_ROWS 件ずつ読み込んで書き出すため、件数によらずメモリ使用量は一定
+    """
+
+    @staticmethod
+    def parse_columns(columns: Optional[str]) -> List[str]:
+        """カンマ区切りの列名（未指定時はすべて）。不明な列はValueError"""
+        if not columns:
+            return list(EXPORT_COLUMNS)
+        selected = [column.strip() for column in columns.split(",") if column.strip()]
+        unknown = [column for column in selected if column not in EXPORT_COLUMNS]
+        if unknown or not selected:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)} (available: {', '.join(EXPORT_COLUMNS)})")
+        return selected
+
+    @staticmethod
+    def _json_value(value):
+        if isinstance(value, Decimal):
+            return float(value)
+        if isinstance(value, date):
+            return value.isoformat()
+        return value
+
+    @staticmethod
+    def _parquet_schema(columns: List[str]):
+        import pyarrow as pa
+        fields = []
+        for name in columns:
+            # 名前の列はディメンションから参照する列（column_property）のため、テーブルではなくマッパーから型を取得
+            column_type = Campaign.__mapper__.columns[name].type
+            if isinstance(column_type, Date):
+                arrow_type = pa.date32()
+            elif isinstance(column_type, Numeric):
+                arrow_type = pa.decimal128(column_type.precision or 18, column_type.scale or 2)
+            elif isinstance(column_type, Integer):
+                arrow_type = pa.int64()
+            else:
+                arrow_type = pa.string()
+            fields.append(pa.field(name, arrow_type))
+        return pa.schema(fields)
+
+    @staticmethod
+    def check_format(export_format: str):
+        """Parquetは pyarrow が必要（未インストールの場合はRuntimeError）"""
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown format: {export_format} (available: {', '.join(EXPORT_FORMATS)})")
+        if export_format == "parquet":
+            try:
+                import pyarrow.parquet  # noqa: F401
+            except ImportError:
+                raise RuntimeError("Parquet export requires the pyarrow package")
+
+    @staticmethod
+    def _stream_xlsx(result, columns: List[str], batch_rows: int) -> Iterator[bytes]:
+        """
+        書き込み専用モードのExcelを一時ファイルに書き出してから送る
+        （xlsxはzipのため全行の書き込み後でないと送れないが、行はメモリに保持しない）
+        """
+        from .report_service import ReportService
+
+        rows = itertools.islice(
+            (row for partition in result.partitions(batch_rows) for row in partition),
+            XLSX_MAX_ROWS
+        )
+        with tempfile.TemporaryFile() as output:
+            total = ReportService.write_excel_rows(output, "campaigns", columns, rows)
+            print(f"[Export] ✅ Exported {total} row(s) as xlsx ({output.tell():,} bytes)")
+            output.seek(0)
+            while True:
+                chunk = output.read(1024 * 1024)
+                if not chunk:
+                    break
+                yield chunk
+
+    @staticmethod
+    def stream(
+        build_query: Callable[..., Query],
+        columns: List[str],
+        export_format: str
+    ) -> Iterator[bytes]:
+        """
+        build_query(db) で作成したクエリの結果を export_format で書き出す（StreamingResponse用のジェネレーター）
+        DBセッションはジェネレーター内で開く（リクエストの依存関係の終了後もレスポンスの送信が続くため）
+        """
+        batch_rows = max(1, settings.EXPORT_BATCH_ROWS)
+        # ヘッダーはクエリの実行前に送り、すぐにダウンロードを開始させる
+        writer = None
+        sink = None
+        if export_format == "csv":
+            output = io.StringIO()
+            csv.writer(output).writerow(columns)
+            # Excel（日本語環境）で文字化けしないようBOM付きUTF-8
+            yield output.getvalue().encode("utf-8-sig")
+        elif export_format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            schema = CampaignExportService._parquet_schema(columns)
+            sink = _ChunkSink()
+            writer = pq.ParquetWriter(sink, schema, compression="snappy")
+            yield sink.drain()
+
+        db = SessionLocal()
+        try:
+            query = build_query(db).with_entities(*[getattr(Campaign, column) for column in columns])
+            # stream_results: psycopg2のサーバーサイドカーソル（名前付きカーソル）で yield_per 件ずつ取得
+            result = db.execute(query.statement.execution_options(stream_results=True, yield_per=batch_rows))
+            if export_format == "xlsx":
+                yield from CampaignExportService._stream_xlsx(result, columns, batch_rows)
+                return
+            total = 0
+            for rows in result.partitions(batch_rows):
+                total += len(rows)
+                if export_format == "csv":
+                    output = io.StringIO()
+                    csv.writer(output).writerows(["" if value is None else value for value in row] for row in rows)
+                    yield output.getvalue().encode("utf-8")
+                elif export_format == "ndjson":
+                    yield "".join(
+                        json.dumps(
+                            {column: CampaignExportService._json_value(value) for column, value in zip(columns, row)},
+                            ensure_ascii=False
+                        ) + "\n"
+                        for row in rows
+                    ).encode("utf-8")
+                else:
+                    # 1バッチ = 1行グループ
+                    writer.write_table(pa.Table.from_pylist([dict(zip(columns, row)) for row in rows], schema=schema))
+                    yield sink.drain()
+            if writer is not None:
+                writer.close()
+                yield sink.drain()
+            print(f"[Export] ✅ Exported {total} row(s) as {export_format}")
+        except Exception as e:
+            # ヘッダー送信後のエラーはステータスコードで返せないため、ログに残して接続を切る
+            print(f"[Export] ❌ Export failed: {str(e)}")
+            raise
+        finally:
+            db.close()
@@ -2,8 +2,8 @@ import pandas as pd
 from datetime import date
 from typing import List, Dict
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
 from ..models.campaign import Campaign, Upload
+from .dimension_service import DimensionResolver, campaign_name_filter
 import uuid
 import math
 
@@ -241,6 +241,9 @@ class DataService:
             unique_campaigns = df[campaign_col].dropna().unique()
             print(f"[DataService] Unique campaigns in CSV: {list(unique_campaigns)}")
         
+        # ディメンションキーの解決（この取込中はメモリ上にキャッシュ）
+        resolver = DimensionResolver(db, user_id)
+        
         for idx, row in df.iterrows():
             # Get values with defaults (safely handle NaN)
             # row.get()がNaNを返す可能性があるため、safe_int/safe_floatで直接処理
@@ -344,23 +347,19 @@ class DataService:
             delete_query = db.query(Campaign).filter(
                 Campaign.user_id == user_id,
                 Campaign.date == campaign_date,
-                Campaign.campaign_name == campaign_name
+                campaign_name_filter(campaign_name)
             )
             
             # ad_set_nameとad_nameが空でない場合のみ、重複チェックに含める
             if ad_set_name and ad_set_name.strip():
                 delete_query = delete_query.filter(Campaign.ad_set_name == ad_set_name)
             else:
-                delete_query = delete_query.filter(
-                    or_(Campaign.ad_set_name == '', Campaign.ad_set_name.is_(None))
-                )
+                delete_query = delete_query.filter(Campaign.adset_key.is_(None))
             
             if ad_name and ad_name.strip():
                 delete_query = delete_query.filter(Campaign.ad_name == ad_name)
             else:
-                delete_query = delete_query.filter(
-                    or_(Campaign.ad_name == '', Campaign.ad_name.is_(None))
-                )
+                delete_query = delete_query.filter(Campaign.ad_key.is_(None))
             
             # 既存データを削除（Meta APIデータも含む）
             deleted_count = delete_query.delete(synchronize_session=False)
@@ -382,29 +381,132 @@ class DataService:
                 print(f"  ad_set_name='{ad_set_name}', ad_name='{ad_name}'")
                 print(f"  Will CREATE new campaign (deleted {deleted_count} existing record(s))")
             
+            # ディメンションキーを解決（CSVはMeta IDがないため名前によるサロゲートキー。名前はディメンションにのみ保存）
+            dimension_keys = resolver.resolve_row(None, campaign_name, ad_set_name, ad_name)
+            
             # 新規データを保存（既存データは削除済み）
-                campaign = Campaign(
-                    user_id=user_id,
-                    upload_id=upload_id,
-                    date=campaign_date,
-                    campaign_name=campaign_name,
-                    ad_set_name=ad_set_name,
-                    ad_name=ad_name,
-                    impressions=impressions,
-                    clicks=clicks,
-                    cost=cost,
-                    conversions=conversions,
-                    conversion_value=conversion_value,
-                    reach=reach,
-                    engagements=engagements,
-                    link_clicks=link_clicks,
-                    landing_page_views=landing_page_views,
-                    **metrics
-                )
-                db.add(campaign)
-                saved_count += 1
+            campaign = Campaign(
+                user_id=user_id,
+                upload_id=upload_id,
+                date=campaign_date,
+                **dimension_keys,
+                impressions=impressions,
+                clicks=clicks,
+                cost=cost,
+                conversions=conversions,
+                conversion_value=conversion_value,
+                reach=reach,
+                engagements=engagements,
+                link_clicks=link_clicks,
+                landing_page_views=landing_page_views,
+                **metrics
+            )
+            db.add(campaign)
+            saved_count += 1
             print(f"[DataService] Created new campaign: '{campaign_name}' on {campaign_date} (saved_count: {saved_count})")
         
         db.commit()
         print(f"[DataService] Saved {saved_count} new campaigns (deleted existing duplicates)")
         return saved_count
+    
+    @staticmethod
+    def process_upload(upload_id: uuid.UUID, db: Session) -> Dict:
+        """
+        保存済みのアップロードファイルを解析・保存する（ワーカーのuploadジョブから実行）
+        エラー時はUploadレコードをerrorにして例外を送出する
+        """
+        from datetime import datetime
+        from .notification_service import NotificationService
+        
+        upload = db.query(Upload).filter(Upload.id == upload_id).first()
+        if not upload:
+            raise ValueError(f"Upload not found: {upload_id}")
+        file_path = upload.file_url
+        
+        try:
+            # Parse file
+            if upload.file_name.endswith('.csv'):
+                df = DataService.parse_csv_file(file_path)
+            else:
+                df = DataService.parse_excel_file(file_path)
+            
+            # Validate
+            is_valid, error_msg = DataService.validate_dataframe(df)
+            if not is_valid:
+                raise ValueError(error_msg)
+            
+            # Check for duplicates before processing
+            duplicate_count = 0
+            for _, row in df.iterrows():
+                # Handle empty/NaT dates
+                date_value = row.get('日付', '')
+                if pd.isna(date_value) or date_value == '' or str(date_value).lower() == 'nat':
+                    continue  # Skip rows with invalid dates
+                try:
+                    campaign_date = pd.to_datetime(date_value).date()
+                except (ValueError, TypeError):
+                    continue  # Skip rows with invalid dates
+                
+                # Handle NaN values in string fields
+                campaign_name = str(row.get('キャンペーン名', '') or '').replace('nan', '').replace('NaN', '')
+                ad_set_name = str(row.get('広告セット名', '') or '').replace('nan', '').replace('NaN', '')
+                ad_name = str(row.get('広告名', '') or '').replace('nan', '').replace('NaN', '')
+                
+                existing = db.query(Campaign).filter(
+                    Campaign.user_id == upload.user_id,
+                    Campaign.date == campaign_date,
+                    campaign_name_filter(campaign_name),
+                    Campaign.ad_set_name == ad_set_name,
+                    Campaign.ad_name == ad_name
+                ).first()
+                
+                if existing:
+                    duplicate_count += 1
+            
+            # Get date range - filter out NaT values
+            valid_dates = pd.to_datetime(df['日付'], errors='coerce').dropna()
+            if len(valid_dates) == 0:
+                raise ValueError("有効な日付データが見つかりませんでした")
+            
+            # Process and save (duplicates will be updated)
+            row_count = DataService.process_and_save_data(df, upload.user_id, upload.id, db)
+            
+            upload.start_date = valid_dates.min().date()
+            upload.end_date = valid_dates.max().date()
+            upload.row_count = row_count
+            upload.status = "completed"
+            upload.processed_at = datetime.utcnow()
+            db.commit()
+        except Exception as e:
+            db.rollback()  # トランザクションをロールバック
+            upload.status = "error"
+            upload.error_message = str(e)
+            try:
+                db.commit()
+            except Exception:
+                db.rollback()
+            raise
+        
+        # Create notification with duplicate info
+        if duplicate_count > 0:
+            message = f"{upload.file_name} の処理が完了しました（{row_count}件のデータ、うち{duplicate_count}件は既存データを更新）"
+        else:
+            message = f"{upload.file_name} の処理が完了しました（{row_count}件のデータ）"
+        
+        NotificationService.create_notification(
+            user_id=upload.user_id,
+            type="upload_complete",
+            title="ファイルアップロードが完了しました",
+            message=message,
+            data={"upload_id": str(upload.id)},
+            db=db
+        )
+        
+        return {
+            "id": str(upload.id),
+            "file_name": upload.file_name,
+            "row_count": row_count,
+            "start_date": str(upload.start_date),
+            "end_date": str(upload.end_date),
+            "status": "completed"
+        }
@@ -0,0 +1,151 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Query, Session
+from typing import Dict, Optional, Tuple
+import uuid
+from ..models.campaign import Campaign
+from ..models.dimension import AdAccount, AdCampaign, AdSet, Ad
+from ..utils.campaign_names import normalize_campaign_name
+
+# CSVデータ（meta_account_idなし）用のアカウントのsource_key
+CSV_ACCOUNT_KEY = "csv"
+
+def aggregate_by_campaign(query: Query, *aggregates) -> Query:
+    """
+    キャンペーンのディメンションキーで集計（名前変更後も同一キャンペーンとして集計される）
+    キャンペーン名はディメンションテーブルから取得する（campaignsには名前を持たない）
+    """
+    return query.join(AdCampaign, AdCampaign.id == Campaign.campaign_key).with_entities(
+        AdCampaign.name.label('campaign_name'),
+        *aggregates
+    ).group_by(AdCampaign.id, AdCampaign.name)
+
+def campaign_name_filter(name: str):
+    """キャンペーン名での絞り込み条件（ディメンションで名前に一致するキーを求め、campaign_keyで絞り込む）"""
+    return Campaign.campaign_key.in_(select(AdCampaign.id).where(AdCampaign.name == name))
+
+class DimensionResolver:
+    """
+    アカウント/キャンペーン/広告セット/広告のディメンションキーを解決する
+    同期やCSV取込の1回の実行ごとに生成し、解決結果をメモリ上にキャッシュする
+    （アカウント単位で既存ディメンションをまとめて読み込み、行ごとのSELECTを発生させない）
+    """
+    def __init__(self, db: Session, user_id: uuid.UUID):
+        self.db = db
+        self.user_id = user_id
+        self._accounts: Dict[str, AdAccount] = {}
+        self._loaded_accounts = set()
+        self._campaigns: Dict[Tuple[int, str], AdCampaign] = {}
+        self._adsets: Dict[Tuple[int, str], AdSet] = {}
+        self._ads: Dict[Tuple[int, str], Ad] = {}
+        self.created_count = 0
+
+    @staticmethod
+    def name_source_key(name: str) -> str:
+        """CSVデータなどMeta IDがない場合のサロゲートキー"""
+        return f"name:{normalize_campaign_name(name)}"[:255]
+
+    def resolve_account(self, meta_account_id: Optional[str], name: Optional[str] = None) -> int:
+        source_key = meta_account_id if meta_account_id else CSV_ACCOUNT_KEY
+        account = self._accounts.get(source_key)
+        if account is None:
+            account = self.db.query(AdAccount).filter(
+                AdAccount.user_id == self.user_id,
+                AdAccount.source_key == source_key
+            ).first()
+            if account is None:
+                account = AdAccount(
+                    user_id=self.user_id,
+                    source_key=source_key,
+                    meta_account_id=meta_account_id or None,
+                    name=name
+                )
+                self.db.add(account)
+                self.db.flush()  # account.idを取得するためにflush
+                self.created_count += 1
+            self._accounts[source_key] = account
+        if name and account.name != name:
+            account.name = name
+        self._load_account(account.id)
+        return account.id
+
+    def _load_account(self, account_key: int):
+        """アカウント配下の既存ディメンションをまとめて読み込む（1アカウントにつき3クエリ）"""
+        if account_key in self._loaded_accounts:
+            return
+        self._loaded_accounts.add(account_key)
+        for campaign in self.db.query(AdCampaign).filter(AdCampaign.account_key == account_key).all():
+            self._campaigns[(campaign.account_key, campaign.source_key)] = campaign
+        adsets = self.db.query(AdSet).join(AdCampaign, AdCampaign.id == AdSet.campaign_key).filter(
+            AdCampaign.account_key == account_key
+        ).all()
+        for adset in adsets:
+            self._adsets[(adset.campaign_key, adset.source_key)] = adset
+        ads = self.db.query(Ad).join(AdSet, AdSet.id == Ad.adset_key).join(
+            AdCampaign, AdCampaign.id == AdSet.campaign_key
+        ).filter(AdCampaign.account_key == account_key).all()
+        for ad in ads:
+            self._ads[(ad.adset_key, ad.source_key)] = ad
+
+    def _resolve(self, cache: Dict, model, parent_attr: str, parent_key: int, meta_id_attr: str, name: str, meta_id: Optional[str]) -> int:
+        name = (name or '').strip()[:255]
+        name_key = self.name_source_key(name)
+        source_key = str(meta_id) if meta_id else name_key
+
+        obj = cache.get((parent_key, source_key))
+        if obj is None and meta_id:
+            # 名前で登録済み（CSVデータや移行前のデータ）のディメンションがあればMeta IDに昇格
+            obj = cache.pop((parent_key, name_key), None)
+            if obj is not None:
+                obj.source_key = source_key
+                setattr(obj, meta_id_attr, str(meta_id))
+                cache[(parent_key, source_key)] = obj
+        if obj is None:
+            obj = model(**{
+                parent_attr: parent_key,
+                "source_key": source_key,
+                meta_id_attr: str(meta_id) if meta_id else None,
+                "name": name
+            })
+            self.db.add(obj)
+            self.db.flush()  # obj.idを取得するためにflush
+            self.created_count += 1
+            cache[(parent_key, source_key)] = obj
+        elif name and obj.name != name:
+            # Ads Managerでの名前変更は同じキーのまま最新の名前に更新
+            obj.name = name
+        return obj.id
+
+    def resolve_campaign(self, account_key: int, name: str, meta_campaign_id: Optional[str] = None) -> int:
+        return self._resolve(self._campaigns, AdCampaign, "account_key", account_key, "meta_campaign_id", name, meta_campaign_id)
+
+    def resolve_adset(self, campaign_key: int, name: Optional[str], meta_adset_id: Optional[str] = None) -> Optional[int]:
+        if not (name and name.strip()) and not meta_adset_id:
+            return None
+        return self._resolve(self._adsets, AdSet, "campaign_key", campaign_key, "meta_adset_id", name, meta_adset_id)
+
+    def resolve_ad(self, adset_key: Optional[int], name: Optional[str], meta_ad_id: Optional[str] = None) -> Optional[int]:
+        if adset_key is None or (not (name and name.strip()) and not meta_ad_id):
+            return None
+        return self._resolve(self._ads, Ad, "adset_key", adset_key, "meta_ad_id", name, meta_ad_id)
+
+    def resolve_row(
+        self,
+        meta_account_id: Optional[str],
+        campaign_name: str,
+        ad_set_name: Optional[str] = None,
+        ad_name: Optional[str] = None,
+        campaign_id: Optional[str] = None,
+        adset_id: Optional[str] = None,
+        ad_id: Optional[str] = None
+    ) -> Dict[str, Optional[int]]:
+        """日次レコード1行分のディメンションキーを解決（Campaignのカラム名で返す）"""
+        account_key = self.resolve_account(meta_account_id)
+        campaign_key = self.resolve_campaign(account_key, campaign_name, campaign_id)
+        adset_key = self.resolve_adset(campaign_key, ad_set_name, adset_id)
+        ad_key = self.resolve_ad(adset_key, ad_name, ad_id)
+        return {
+            "account_key": account_key,
+            "campaign_key": campaign_key,
+            "adset_key": adset_key,
+            "ad_key": ad_key,
+        }
@@ -1,12 +1,17 @@
 import os
+from functools import lru_cache
 from typing import Optional
 from ..config import settings
 
-try:
-    import resend
-except ImportError:
-    resend = None
-    print("[EmailService] Warning: resend package is not installed. Email functionality will be disabled.")
+@lru_cache(maxsize=1)
+def _load_resend():
+    """resendは初回のメール送信時に読み込む（サーバーの起動時間を短縮）"""
+    try:
+        import resend
+    except ImportError:
+        print("[EmailService] Warning: resend package is not installed. Email functionality will be disabled.")
+        return None
+    return resend
 
 class EmailService:
     """Email service using Resend"""
@@ -15,9 +20,12 @@ class EmailService:
         self.api_key = settings.RESEND_API_KEY or os.getenv("RESEND_API_KEY")
         self.from_email = settings.RESEND_FROM_EMAIL or os.getenv("RESEND_FROM_EMAIL")
         self.from_name = settings.RESEND_FROM_NAME or os.getenv("RESEND_FROM_NAME", "MIERU AI")
-        
-        if self.api_key and resend:
+    
+    def _get_resend(self):
+        resend = _load_resend()
+        if resend is not None and self.api_key:
             resend.api_key = self.api_key
+        return resend
     
     def _get_from_address(self) -> str:
         """Get formatted from address with name"""
@@ -27,7 +35,7 @@ class EmailService:
     
     def is_configured(self) -> bool:
         """Check if email service is configured"""
-        return bool(self.api_key and self.from_email and resend is not None)
+        return bool(self.api_key and self.from_email and _load_resend() is not None)
     
     def send_password_reset_email(
         self,
@@ -50,6 +58,7 @@ class EmailService:
             print("[EmailService] Resend is not configured. Skipping email send.")
             return False
         
+        resend = self._get_resend()
         if resend is None:
             print("[EmailService] resend package is not installed.")
             return False
@@ -204,6 +213,7 @@ class EmailService:
             print("[EmailService] Resend is not configured. Skipping email send.")
             return False
         
+        resend = self._get_resend()
         if resend is None:
             print("[EmailService] resend package is not installed.")
             return False
@@ -368,6 +378,7 @@ class EmailService:
             print("[EmailService] Resend is not configured. Skipping email send.")
             return False
         
+        resend = self._get_resend()
         if resend is None:
             print("[EmailService] resend package is not installed.")
             return False
@@ -540,6 +551,7 @@ class EmailService:
             print("[EmailService] Resend is not configured. Skipping email send.")
             return False
         
+        resend = self._get_resend()
         if resend is None:
             print("[EmailService] resend package is not installed.")
             return False
@@ -0,0 +1,217 @@
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import httpx
+from ..config import settings
+
+GRAPH_API_BASE = "https://graph.facebook.com/v24.0"
+
+# キャッシュキーから除外するパラメータ（トークンが変わっても同じリクエストとして扱う）
+SECRET_PARAMS = {"access_token", "appsecret_proof", "client_secret"}
+# 保存したレスポンス内のトークン（ページングのnext URLなど）の置き換え先
+TOKEN_PLACEHOLDER = "__GRAPH_CACHE_ACCESS_TOKEN__"
+
+CACHE_MODES = ("passthrough", "record", "replay")
+# トークンのユーザーによって結果が変わるパス（/me, /me/adaccounts など、バージョンの有無を問わない）
+USER_RELATIVE_PATH = re.compile(r"^(/v\d+\.\d+)?/me(/|$)")
+
+class GraphCacheMiss(httpx.TransportError):
+    """replayモードでキャッシュにないリクエスト（Meta APIは呼ばない）"""
+
+class GraphResponseCache:
+    """
+    Graph APIレスポンスのディスクキャッシュ
+    - キー: メソッド + URL（パス・ソート済みのクエリ）+ フォーム本文。access_tokenなどの秘密情報は除外
+      （/me などトークンのユーザーで結果が変わるパスのみ、トークンのハッシュを含める）
+    - 保存内容のトークンはプレースホルダーに置き換える（ディスクにトークンを残さない）
+    - 合計サイズが上限を超えたら、最終アクセスが古いファイルから削除
+    """
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._total_bytes: Optional[int] = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def _normalized_params(raw: str) -> List[Tuple[str, str]]:
+        return sorted((k, v) for k, v in parse_qsl(raw, keep_blank_values=True) if k not in SECRET_PARAMS)
+
+    @staticmethod
+    def key(request: httpx.Request) -> str:
+        parts = [
+            request.method.upper(),
+            f"{request.url.host}{request.url.path}",
+            urlencode(GraphResponseCache._normalized_params(request.url.query.decode())),
+        ]
+        if request.content and "application/x-www-form-urlencoded" in request.headers.get("content-type", ""):
+            parts.append(urlencode(GraphResponseCache._normalized_params(request.content.decode())))
+        elif request.content:
+            parts.append(hashlib.sha256(request.content).hexdigest())
+        if USER_RELATIVE_PATH.match(request.url.path):
+            # 他のユーザーのトークンで保存した結果を返さない
+            access_tokens = sorted(GraphResponseCache.request_tokens(request, ("access_token",)))
+            parts.append("token:" + hashlib.sha256("\n".join(access_tokens).encode()).hexdigest())
+        return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+    @staticmethod
+    def request_tokens(request: httpx.Request, params=SECRET_PARAMS) -> List[str]:
+        tokens = [v for k, v in parse_qsl(request.url.query.decode()) if k in params]
+        if request.content and "application/x-www-form-urlencoded" in request.headers.get("content-type", ""):
+            tokens += [v for k, v in parse_qsl(request.content.decode()) if k in params]
+        return [token for token in tokens if token]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path, None)  # 最終アクセス日時を更新（削除順の判定用）
+            return entry
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put(self, key: str, entry: Dict):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, _, size in self._scan())
+            else:
+                self._total_bytes += len(data)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _scan(self) -> List[Tuple[float, str, int]]:
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                        files.append((stat.st_mtime, path, stat.st_size))
+                    except FileNotFoundError:
+                        pass
+        return files
+
+    def _evict(self):
+        """上限の90%になるまで最終アクセスが古い順に削除"""
+        files = sorted(self._scan())
+        total = sum(size for _, _, size in files)
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for _, path, size in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except FileNotFoundError:
+                pass
+        self._total_bytes = total
+        print(f"[Graph Cache] Evicted {removed} entries (size: {total / 1024 / 1024:.1f}MB)")
+
+class CachingTransport(httpx.AsyncBaseTransport):
+    """
+    Graph APIへのリクエストをキャッシュ経由で送るhttpxのトランスポート
+    - passthrough: キャッシュを使わない
+    - record: Meta APIを呼び、成功したレスポンスを保存（保存済みでも再取得して上書き）
+    - replay: 保存済みのレスポンスのみを返す（キャッシュにない場合は GraphCacheMiss、Meta APIは呼ばない）
+    """
+    def __init__(self, mode: str, cache: GraphResponseCache, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.mode = mode
+        self.cache = cache
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.mode == "passthrough":
+            return await self.transport.handle_async_request(request)
+
+        await request.aread()
+        key = GraphResponseCache.key(request)
+        tokens = GraphResponseCache.request_tokens(request)
+        if self.mode == "replay":
+            entry = self.cache.get(key)
+            if entry is None:
+                raise GraphCacheMiss(f"Graph cache miss in replay mode: {request.method} {request.url.path}", request=request)
+            content = entry["content"]
+            if tokens:
+                content = content.replace(TOKEN_PLACEHOLDER, tokens[0])
+            return httpx.Response(
+                entry["status_code"],
+                headers={"content-type": entry.get("content_type", "application/json")},
+                content=content.encode("utf-8"),
+                request=request
+            )
+
+        response = await self.transport.handle_async_request(request)
+        body = await response.aread()
+        await response.aclose()
+        if 200 <= response.status_code < 300:
+            content = body.decode("utf-8", errors="replace")
+            for token in tokens:
+                content = content.replace(token, TOKEN_PLACEHOLDER)
+            try:
+                self.cache.put(key, {
+                    "status_code": response.status_code,
+                    "content_type": response.headers.get("content-type", "application/json"),
+                    "url": f"{request.url.host}{request.url.path}",
+                    "recorded_at": time.time(),
+                    "content": content,
+                })
+            except OSError as e:
+                print(f"[Graph Cache] ⚠️ Failed to record response: {str(e)}")
+        # bodyは展開済みのため、圧縮・長さのヘッダーは引き継がない
+        headers = [
+            (name, value) for name, value in response.headers.items()
+            if name.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+        ]
+        return httpx.Response(
+            response.status_code,
+            headers=headers,
+            content=body,
+            request=request,
+            extensions=response.extensions
+        )
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+_caches: Dict[str, GraphResponseCache] = {}
+
+def get_graph_cache() -> GraphResponseCache:
+    directory = settings.META_GRAPH_CACHE_DIR
+    if directory not in _caches:
+        _caches[directory] = GraphResponseCache(directory, settings.META_GRAPH_CACHE_MAX_MB * 1024 * 1024)
+    return _caches[directory]
+
+def graph_client(mode: Optional[str] = None, **kwargs) -> httpx.AsyncClient:
+    """
+    Graph API用の共通httpxクライアント（async with graph_client() as client: で使用）
+    mode を省略した場合は META_GRAPH_CACHE_MODE（passthrough / record / replay。replayは本番環境では使用不可）
+    OAuthのトークン交換など、レスポンスに新しいトークンが含まれるリクエストには使用しないこと
+    """
+    mode = mode or settings.META_GRAPH_CACHE_MODE
+    if mode not in CACHE_MODES:
+        raise ValueError(f"Unknown Graph cache mode: {mode} (expected one of {CACHE_MODES})")
+    if mode == "replay" and settings.is_production:
+        # 保存済みのレスポンスは保存時のトークンの権限で取得したもの（他のユーザーに返さない）
+        raise ValueError("Graph cache replay mode is not allowed in production")
+    if mode != "passthrough":
+        kwargs["transport"] = CachingTransport(mode, get_graph_cache())
+    return httpx.AsyncClient(**kwargs)
@@ -0,0 +1,117 @@
+from sqlalchemy.orm import Session
+from datetime import date
+from typing import Awaitable, Callable, Dict, Optional
+import asyncio
+import uuid
+from ..models.job import Job
+
+# ジョブ種別ごとの処理（job, db -> 結果）。ワーカーが job_type で呼び分ける
+JobHandler = Callable[[Job, Session], Awaitable[Optional[Dict]]]
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+# 再実行しない失敗時の処理（job, db, エラー）。ジョブの対象の状態を失敗にする（JobQueue.fail から呼ばれる）
+JobFailureHandler = Callable[[Job, Session, str], None]
+JOB_FAILURE_HANDLERS: Dict[str, JobFailureHandler] = {}
+
+def job_handler(job_type: str):
+    def decorator(func: JobHandler) -> JobHandler:
+        JOB_HANDLERS[job_type] = func
+        return func
+    return decorator
+
+def job_failure_handler(job_type: str):
+    def decorator(func: JobFailureHandler) -> JobFailureHandler:
+        JOB_FAILURE_HANDLERS[job_type] = func
+        return func
+    return decorator
+
+@job_handler("meta_sync")
+async def run_meta_sync(job: Job, db: Session) -> Dict:
+    """Meta広告アカウントの同期（payload: user_id, account_ids, days, replace_all_dates）"""
+    from ..models.user import User
+    from ..routers.meta_api import sync_accounts_concurrently
+
+    payload = job.payload or {}
+    user_id = uuid.UUID(payload["user_id"])
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user or not user.meta_access_token:
+        raise ValueError(f"User not found or Meta access token missing (user_id: {user_id})")
+
+    results = []
+    async for result in sync_accounts_concurrently(
+        user_id,
+        user.meta_access_token,
+        payload.get("account_ids", []),
+        days=payload.get("days"),
+        replace_all_dates=payload.get("replace_all_dates", False)
+    ):
+        print(f"[Jobs] meta_sync {job.id}: account {result['account_id']} {result['status']}")
+        results.append(result)
+
+    synced_accounts = len([r for r in results if r["status"] == "success"])
+    if results and synced_accounts == 0:
+        # 全アカウント失敗時はリトライ（チェックポイントから再開される）
+        raise Exception(f"All {len(results)} account(s) failed to sync: {results[0].get('error')}")
+    return {
+        "total_accounts": len(results),
+        "synced_accounts": synced_accounts,
+        "results": results,
+    }
+
+@job_handler("analysis")
+async def run_analysis(job: Job, db: Session) -> Dict:
+    """AI分析（payload: analysis_id, user_id, start_date, end_date, campaign_name）"""
+    from ..routers.analysis import perform_analysis_task
+
+    payload = job.payload or {}
+    await perform_analysis_task(
+        uuid.UUID(payload["analysis_id"]),
+        uuid.UUID(payload["user_id"]),
+        date.fromisoformat(payload["start_date"]),
+        date.fromisoformat(payload["end_date"]),
+        payload.get("campaign_name")
+    )
+    return {"analysis_id": payload["analysis_id"]}
+
+@job_failure_handler("analysis")
+def fail_analysis(job: Job, db: Session, error: str):
+    """処理中のままの分析結果をエラーにする"""
+    from ..models.analysis import AnalysisResult
+
+    analysis_id = (job.payload or {}).get("analysis_id")
+    if not analysis_id:
+        return
+    db.query(AnalysisResult).filter(
+        AnalysisResult.id == uuid.UUID(analysis_id),
+        AnalysisResult.status == "processing"
+    ).update({AnalysisResult.status: "error", AnalysisResult.error_message: error[:2000]}, synchronize_session=False)
+
+@job_handler("upload")
+async def run_upload(job: Job, db: Session) -> Dict:
+    """CSV/Excelアップロードの解析・保存（payload: upload_id）"""
+    from .data_service import DataService
+
+    payload = job.payload or {}
+    # 解析・保存は同期処理のため、イベントループ（ハートビート）を止めないよう別スレッドで実行
+    return await asyncio.to_thread(DataService.process_upload, uuid.UUID(payload["upload_id"]), db)
+
+@job_failure_handler("upload")
+def fail_upload(job: Job, db: Session, error: str):
+    """処理中のままのアップロードをエラーにする"""
+    from ..models.campaign import Upload
+
+    upload_id = (job.payload or {}).get("upload_id")
+    if not upload_id:
+        return
+    db.query(Upload).filter(
+        Upload.id == uuid.UUID(upload_id),
+        Upload.status == "processing"
+    ).update({Upload.status: "error", Upload.error_message: error[:2000]}, synchronize_session=False)
+
+@job_handler("report")
+async def run_report(job: Job, db: Session) -> Dict:
+    """レポート（PDF・Excel・CSV）の生成とキャッシュへの保存（payload: ReportArtifactService.describe の結果）"""
+    from .report_artifacts import ReportArtifactService
+
+    # 生成はCPU処理のため、イベントループ（ハートビート）を止めないよう別スレッドで実行
+    return await asyncio.to_thread(ReportArtifactService.render_and_store, db, job.payload or {})
@@ -0,0 +1,192 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, text
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+import uuid
+from ..models.job import Job
+from .single_flight import SingleFlight
+from ..config import settings
+
+# ジョブ種別ごとの既定の優先度（数値が小さいほど優先）
+JOB_PRIORITIES = {
+    "upload": 10,
+    "analysis": 20,
+    "report": 30,
+    "meta_sync": 50,
+}
+
+class JobQueue:
+    """
+    Postgresをキューとしたバックグラウンドジョブの登録・取得・状態管理
+    ワーカーは SELECT ... FOR UPDATE SKIP LOCKED でジョブを取得するため、複数プロセスで同時に実行できる
+    """
+
+    @staticmethod
+    def enqueue(
+        db: Session,
+        job_type: str,
+        payload: Dict,
+        user_id: Optional[uuid.UUID] = None,
+        priority: Optional[int] = None,
+        max_attempts: int = 3
+    ) -> Job:
+        job = Job(
+            user_id=user_id,
+            job_type=job_type,
+            payload=payload,
+            priority=priority if priority is not None else JOB_PRIORITIES.get(job_type, 100),
+            max_attempts=max_attempts,
+            status="queued",
+            run_after=datetime.utcnow()
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        print(f"[Jobs] Enqueued {job_type} job {job.id} (priority={job.priority})")
+        return job
+
+    @staticmethod
+    def running_counts(db: Session) -> Dict[str, int]:
+        rows = db.query(Job.job_type, func.count(Job.id)).filter(Job.status == "running").group_by(Job.job_type).all()
+        return {job_type: count for job_type, count in rows}
+
+    @staticmethod
+    def _lock_limited_types(db: Session, job_types: List[str]):
+        """
+        同時実行数の上限がある種別ごとにトランザクション単位のアドバイザリーロックを取得（コミット・ロールバックで解放）
+        実行中の件数の確認から取得のコミットまでをワーカー間で直列化し、同時に上限を超えて取得させない
+        """
+        if db.get_bind().dialect.name != "postgresql":
+            return
+        # 複数の種別のロックを取るため、デッドロックしないよう常に同じ順序で取得
+        for job_type in sorted(job_types):
+            db.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": SingleFlight.lock_id(f"jobs:{job_type}")})
+
+    @staticmethod
+    def claim(db: Session, worker_id: str, job_types: Iterable[str]) -> Optional[Job]:
+        """実行可能なジョブを1件取得して実行中にする（種別ごとの同時実行数の上限に達している種別は除外）"""
+        limits = settings.job_concurrency_limits
+        job_types = list(job_types)
+        JobQueue._lock_limited_types(db, [job_type for job_type in job_types if job_type in limits])
+        running = JobQueue.running_counts(db)
+        available_types = [
+            job_type for job_type in job_types
+            if job_type not in limits or running.get(job_type, 0) < limits[job_type]
+        ]
+        if not available_types:
+            db.rollback()
+            return None
+
+        now = datetime.utcnow()
+        job = db.query(Job).filter(
+            Job.status == "queued",
+            Job.run_after <= now,
+            Job.job_type.in_(available_types)
+        ).order_by(Job.priority, Job.created_at).with_for_update(skip_locked=True).first()
+        if not job:
+            db.rollback()
+            return None
+
+        job.status = "running"
+        job.attempts = (job.attempts or 0) + 1
+        job.locked_by = worker_id
+        job.started_at = now
+        job.heartbeat_at = now
+        job.error_message = None
+        db.commit()
+        return job
+
+    @staticmethod
+    def heartbeat(db: Session, job_ids: List[uuid.UUID]):
+        if not job_ids:
+            return
+        db.query(Job).filter(Job.id.in_(job_ids), Job.status == "running").update(
+            {Job.heartbeat_at: datetime.utcnow()}, synchronize_session=False
+        )
+        db.commit()
+
+    @staticmethod
+    def complete(db: Session, job: Job, result: Optional[Dict] = None):
+        job.status = "completed"
+        job.result = result
+        job.finished_at = datetime.utcnow()
+        job.locked_by = None
+        db.commit()
+
+    @staticmethod
+    def fail(db: Session, job: Job, error: str):
+        """失敗を記録。試行回数が残っていればバックオフ後に再実行する"""
+        now = datetime.utcnow()
+        job.error_message = error[:4000]
+        job.locked_by = None
+        if job.attempts < job.max_attempts:
+            job.status = "queued"
+            job.run_after = now + timedelta(seconds=30 * (2 ** (job.attempts - 1)))
+        else:
+            job.status = "failed"
+            job.finished_at = now
+            JobQueue._mark_target_failed(db, job, error)
+        db.commit()
+
+    @staticmethod
+    def _mark_target_failed(db: Session, job: Job, error: str):
+        """
+        再実行しない失敗で、ジョブの対象（分析結果・アップロードなど）の状態を失敗にする
+        ハンドラーが例外を記録する前にワーカーが停止した場合（requeue_stale）も、対象が処理中のまま残らないようにする
+        """
+        from .job_handlers import JOB_FAILURE_HANDLERS
+
+        on_failure = JOB_FAILURE_HANDLERS.get(job.job_type)
+        if on_failure is None:
+            return
+        try:
+            with db.begin_nested():
+                on_failure(job, db, error)
+        except Exception as e:
+            print(f"[Jobs] ⚠️ Failed to mark the target of {job.job_type} job {job.id} as failed: {str(e)}")
+
+    @staticmethod
+    def requeue_stale(db: Session) -> int:
+        """ワーカーの停止などでハートビートが途絶えた実行中ジョブを再キュー（試行回数超過は失敗）"""
+        threshold = datetime.utcnow() - timedelta(seconds=settings.JOB_STALE_SECONDS)
+        stale_jobs = db.query(Job).filter(
+            Job.status == "running",
+            Job.heartbeat_at < threshold
+        ).with_for_update(skip_locked=True).all()
+        for job in stale_jobs:
+            print(f"[Jobs] Job {job.id} ({job.job_type}) has no heartbeat since {job.heartbeat_at}, requeueing")
+            JobQueue.fail(db, job, f"Worker {job.locked_by} stopped responding")
+        db.commit()
+        return len(stale_jobs)
+
+    @staticmethod
+    def cancel(db: Session, job: Job) -> bool:
+        """キュー待ちのジョブのみキャンセル可能"""
+        if job.status != "queued":
+            return False
+        job.status = "cancelled"
+        job.finished_at = datetime.utcnow()
+        db.commit()
+        return True
+
+    @staticmethod
+    def to_dict(job: Job) -> Dict:
+        def iso(value: Optional[datetime]) -> Optional[str]:
+            return value.isoformat() + 'Z' if value else None
+        duration_seconds = None
+        if job.started_at and job.finished_at:
+            duration_seconds = round((job.finished_at - job.started_at).total_seconds(), 1)
+        return {
+            "id": str(job.id),
+            "job_type": job.job_type,
+            "status": job.status,
+            "priority": job.priority,
+            "attempts": job.attempts,
+            "max_attempts": job.max_attempts,
+            "result": job.result,
+            "error_message": job.error_message,
+            "created_at": iso(job.created_at),
+            "started_at": iso(job.started_at),
+            "finished_at": iso(job.finished_at),
+            "duration_seconds": duration_seconds,
+        }
@@ -0,0 +1,174 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# コンバージョンとしてカウントするアクションタイプ（優先順位順）
+# 末尾が "*" のものは前方一致（例: offsite_conversion.fb_pixel_purchase.xxx）
+# 1件のInsightsでは、最も優先順位の高いアクションタイプ1つのみをカウントする（すべてを合計しない）
+DEFAULT_CONVERSION_ACTION_TYPES = [
+    # 1. 購入関連
+    "purchase",
+    "omni_purchase",
+    "offsite_conversion.fb_pixel_purchase*",
+    "onsite_conversion.meta_purchase*",
+    # 2. 登録関連
+    "complete_registration",
+    "offsite_conversion.fb_pixel_complete_registration*",
+    # 3. リード関連
+    "lead",
+    "offsite_conversion.fb_pixel_lead*",
+]
+
+# コンバージョン価値（action_values）としてカウントするアクションタイプ（購入関連のみ）
+DEFAULT_CONVERSION_VALUE_ACTION_TYPES = [
+    "purchase",
+    "omni_purchase",
+    "offsite_conversion.fb_pixel_purchase*",
+    "onsite_conversion.meta_purchase*",
+]
+
+# actionsから合計する指標（アクションタイプ → 指標名）
+SUM_ACTION_METRICS = {
+    "post_engagement": "engagements",
+    "landing_page_view": "landing_page_views",
+}
+
+# 抽出結果の列
+ACTION_METRIC_COLUMNS = ["conversions", "conversion_value", "conversion_type", "engagements", "landing_page_views"]
+
+def _parse_number(value, cast):
+    try:
+        return cast(float(value)) if value not in (None, '') else cast(0)
+    except (ValueError, TypeError):
+        return cast(0)
+
+class ActionTypeRules:
+    """
+    アクションタイプ → 優先順位（小さいほど優先）の対応表
+    完全一致は辞書、前方一致は一覧で判定し、判定結果はアクションタイプごとにキャッシュする
+    （同じアカウントでは同じアクションタイプが繰り返し出現するため、2回目以降は辞書の参照のみ）
+    """
+    def __init__(self, action_types: Sequence[str]):
+        self.action_types = list(action_types)
+        self._exact: Dict[str, int] = {}
+        self._prefixes: List[Tuple[str, int]] = []
+        for priority, action_type in enumerate(self.action_types):
+            if action_type.endswith("*"):
+                self._prefixes.append((action_type[:-1], priority))
+                # 前方一致の指定は、接頭辞そのもの（完全一致）も対象
+                self._exact.setdefault(action_type[:-1], priority)
+            else:
+                self._exact.setdefault(action_type, priority)
+        self._cache: Dict[str, Optional[int]] = {}
+
+    def priority(self, action_type: str) -> Optional[int]:
+        """アクションタイプの優先順位（対象外はNone）"""
+        try:
+            return self._cache[action_type]
+        except KeyError:
+            pass
+        priority = self._exact.get(action_type)
+        for prefix, prefix_priority in self._prefixes:
+            if action_type.startswith(prefix) and (priority is None or prefix_priority < priority):
+                priority = prefix_priority
+        self._cache[action_type] = priority
+        return priority
+
+    def select(self, entries: Iterable) -> Optional[Tuple[str, object]]:
+        """一覧から最も優先順位の高いエントリの (action_type, value) を返す（同順位はリスト内で先のもの）"""
+        best = None
+        best_priority = None
+        for entry in entries or ():
+            if not isinstance(entry, dict):
+                continue
+            action_type = entry.get('action_type', '')
+            priority = self.priority(action_type)
+            if priority is not None and (best_priority is None or priority < best_priority):
+                best = (action_type, entry.get('value', 0))
+                best_priority = priority
+                if priority == 0:
+                    break
+        return best
+
+class MetaActionExtractor:
+    """
+    Meta APIのInsightsの actions / action_values / conversions からコンバージョン等の指標を抽出する
+    1ページ分のInsightsをまとめて処理し、指標ごとの列（リスト）で返す
+    コンバージョンとしてカウントするアクションタイプはユーザーごとに設定可能（未設定時は既定の優先順位）
+    """
+    def __init__(
+        self,
+        conversion_action_types: Optional[Sequence[str]] = None,
+        conversion_value_action_types: Optional[Sequence[str]] = None
+    ):
+        self.conversion_rules = ActionTypeRules(conversion_action_types or DEFAULT_CONVERSION_ACTION_TYPES)
+        # 既定の設定では、対象のタイプがない場合に最初のコンバージョンタイプを使用する（従来の動作）
+        # ユーザーが設定した場合は、設定したタイプのみをカウントする
+        self.count_first_conversion = not conversion_action_types
+        self.value_rules = ActionTypeRules(conversion_value_action_types or DEFAULT_CONVERSION_VALUE_ACTION_TYPES)
+
+    @staticmethod
+    def for_user(user) -> "MetaActionExtractor":
+        """ユーザーのコンバージョン設定（users.conversion_action_types）から作成"""
+        return MetaActionExtractor(getattr(user, "conversion_action_types", None) or None)
+
+    @staticmethod
+    def validate_action_types(action_types: Sequence[str]) -> List[str]:
+        """設定値を正規化（空白除去・空要素と重複の除外）"""
+        normalized = []
+        for action_type in action_types:
+            action_type = (action_type or '').strip()
+            if action_type and action_type != "*" and action_type not in normalized:
+                normalized.append(action_type)
+        return normalized
+
+    def extract_page(self, insights: List[Dict]) -> Dict[str, List]:
+        """1ページ分のInsightsから指標を抽出（各列はinsightsと同じ順序・同じ件数）"""
+        columns: Dict[str, List] = {column: [] for column in ACTION_METRIC_COLUMNS}
+        conversions_column = columns["conversions"]
+        value_column = columns["conversion_value"]
+        type_column = columns["conversion_type"]
+        engagements_column = columns["engagements"]
+        landing_page_views_column = columns["landing_page_views"]
+
+        for insight in insights:
+            actions = insight.get('actions') or []
+
+            # actionsから合計する指標（1回の走査でまとめて集計）
+            sums = {"engagements": 0, "landing_page_views": 0}
+            for action in actions:
+                if isinstance(action, dict):
+                    metric = SUM_ACTION_METRICS.get(action.get('action_type'))
+                    if metric:
+                        sums[metric] += _parse_number(action.get('value'), int)
+            engagements = _parse_number(insight.get('engagements'), int) or sums["engagements"]
+
+            # コンバージョン: conversions → actions の順に、最も優先順位の高いタイプ1つのみ
+            conversions = 0
+            conversion_type = "none"
+            conversions_data = insight.get('conversions') or []
+            selected = self.conversion_rules.select(conversions_data)
+            if selected is None and conversions_data and self.count_first_conversion:
+                first = conversions_data[0]
+                selected = (first.get('action_type', ''), first.get('value', 0)) if isinstance(first, dict) else ("unknown", first)
+            if selected:
+                conversion_type, conversions = selected[0], _parse_number(selected[1], int)
+            if conversions == 0:
+                selected = self.conversion_rules.select(actions)
+                if selected:
+                    conversion_type, conversions = selected[0], _parse_number(selected[1], int)
+
+            # コンバージョン価値: action_values → actions の順に、購入関連のタイプ1つのみ
+            conversion_value = 0.0
+            selected = self.value_rules.select(insight.get('action_values'))
+            if selected:
+                conversion_value = _parse_number(selected[1], float)
+            if conversion_value == 0:
+                selected = self.value_rules.select(actions)
+                if selected:
+                    conversion_value = _parse_number(selected[1], float)
+
+            conversions_column.append(conversions)
+            value_column.append(conversion_value)
+            type_column.append(conversion_type)
+            engagements_column.append(engagements)
+            landing_page_views_column.append(sums["landing_page_views"])
+        return columns
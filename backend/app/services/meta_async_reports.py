@@ -0,0 +1,150 @@
+from datetime import date, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import json
+import time
+import httpx
+from ..config import settings
+
+GRAPH_API_BASE = "https://graph.facebook.com/v24.0"
+
+class MetaAsyncReportError(Exception):
+    pass
+
+class MetaAsyncReports:
+    """
+    Meta APIの非同期Insightsレポート（POST /act_xxx/insights → report_run_id → ポーリング → 結果をページ取得）
+    大規模アカウントでは同期の /insights 呼び出しがタイムアウトするため、期間を分割したレポートを並行して実行する
+    - レポートの作成とポーリングは並行（同時実行数は META_ASYNC_REPORT_MAX_PARALLEL まで）
+    - 結果は完了した期間から順に1期間ずつ取得して返す（メモリに保持するのは1期間分のみ）
+    """
+
+    @staticmethod
+    def time_slices(since: date, until: date, slice_days: int) -> List[Tuple[date, date]]:
+        """期間を slice_days 日ごとに分割（両端を含む）"""
+        slices = []
+        slice_since = since
+        while slice_since <= until:
+            slice_until = min(slice_since + timedelta(days=max(1, slice_days) - 1), until)
+            slices.append((slice_since, slice_until))
+            slice_since = slice_until + timedelta(days=1)
+        return slices
+
+    @staticmethod
+    async def submit(
+        client: httpx.AsyncClient,
+        account_id_for_api: str,
+        access_token: str,
+        fields: str,
+        level: str,
+        since: date,
+        until: date
+    ) -> str:
+        """非同期レポートを作成して report_run_id を返す"""
+        response = await client.post(
+            f"{GRAPH_API_BASE}/{account_id_for_api}/insights",
+            params={
+                "access_token": access_token,
+                "fields": fields,
+                "level": level,
+                "time_range": json.dumps({"since": since.isoformat(), "until": until.isoformat()}, separators=(',', ':')),
+                "time_increment": "1",
+            }
+        )
+        response.raise_for_status()
+        report_run_id = response.json().get("report_run_id")
+        if not report_run_id:
+            raise MetaAsyncReportError(f"report_run_id not returned: {response.text[:500]}")
+        return report_run_id
+
+    @staticmethod
+    async def wait(client: httpx.AsyncClient, report_run_id: str, access_token: str) -> Dict:
+        """レポートの完了をバックオフしながら待つ（失敗・期限切れは例外）"""
+        interval = settings.META_ASYNC_REPORT_POLL_INITIAL_SECONDS
+        deadline = time.monotonic() + settings.META_ASYNC_REPORT_TIMEOUT_SECONDS
+        while True:
+            response = await client.get(
+                f"{GRAPH_API_BASE}/{report_run_id}",
+                params={"access_token": access_token, "fields": "async_status,async_percent_completion"}
+            )
+            response.raise_for_status()
+            status = response.json()
+            async_status = status.get("async_status")
+            if async_status == "Job Completed":
+                return status
+            if async_status in ("Job Failed", "Job Skipped"):
+                raise MetaAsyncReportError(f"Report {report_run_id} {async_status}")
+            if time.monotonic() + interval > deadline:
+                raise MetaAsyncReportError(
+                    f"Report {report_run_id} timed out after {settings.META_ASYNC_REPORT_TIMEOUT_SECONDS}s "
+                    f"({async_status}, {status.get('async_percent_completion')}%)"
+                )
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, settings.META_ASYNC_REPORT_POLL_MAX_SECONDS)
+
+    @staticmethod
+    async def iter_result_pages(client: httpx.AsyncClient, report_run_id: str, access_token: str) -> AsyncIterator[List[Dict]]:
+        """完了したレポートの結果をページ単位で返す"""
+        url = f"{GRAPH_API_BASE}/{report_run_id}/insights"
+        params = {"access_token": access_token, "limit": 500}
+        while True:
+            response = await client.get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
+            yield data.get("data", [])
+            next_url = data.get("paging", {}).get("next")
+            if not next_url:
+                break
+            url = next_url
+            params = None  # 次ページのURLにパラメータが含まれているため指定しない（空のdictはURLのクエリを消す）
+
+    @staticmethod
+    async def run_reports(
+        client: httpx.AsyncClient,
+        account_id_for_api: str,
+        access_token: str,
+        fields: str,
+        level: str,
+        slices: List[Tuple[date, date]]
+    ) -> AsyncIterator[Tuple[int, Tuple[date, date], Optional[List[Dict]], Optional[str]]]:
+        """
+        期間ごとのレポートを並行して実行し、完了した順に (slicesでの位置, 期間, insights, エラー) を返す
+        失敗した期間は insights=None とエラーメッセージを返す（他の期間の処理は続行）
+        """
+        semaphore = asyncio.Semaphore(max(1, settings.META_ASYNC_REPORT_MAX_PARALLEL))
+
+        async def prepare(index: int, time_slice: Tuple[date, date]) -> Tuple[int, Optional[str], Optional[str]]:
+            async with semaphore:
+                try:
+                    report_run_id = await MetaAsyncReports.submit(
+                        client, account_id_for_api, access_token, fields, level, time_slice[0], time_slice[1]
+                    )
+                    print(f"[Meta Async Report] Submitted {report_run_id} for {time_slice[0]} ~ {time_slice[1]} ({level})")
+                    await MetaAsyncReports.wait(client, report_run_id, access_token)
+                    return index, report_run_id, None
+                except Exception as e:
+                    return index, None, str(e)
+
+        tasks = [asyncio.create_task(prepare(index, time_slice)) for index, time_slice in enumerate(slices)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                index, report_run_id, error = await finished
+                time_slice = slices[index]
+                if error:
+                    print(f"[Meta Async Report] ❌ Report for {time_slice[0]} ~ {time_slice[1]} failed: {error}")
+                    yield index, time_slice, None, error
+                    continue
+                try:
+                    insights = []
+                    async for page in MetaAsyncReports.iter_result_pages(client, report_run_id, access_token):
+                        insights.extend(page)
+                except Exception as e:
+                    print(f"[Meta Async Report] ❌ Failed to read results of {report_run_id}: {str(e)}")
+                    yield index, time_slice, None, str(e)
+                    continue
+                print(f"[Meta Async Report] ✅ {report_run_id}: {len(insights)} insights for {time_slice[0]} ~ {time_slice[1]}")
+                yield index, time_slice, insights, None
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
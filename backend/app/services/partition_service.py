@@ -0,0 +1,146 @@
+from sqlalchemy import text
+from datetime import date, datetime
+from typing import List, Optional
+from ..database import engine
+from ..config import settings
+
+PARENT_TABLE = "campaigns"
+DEFAULT_PARTITION = "campaigns_default"
+# 事前に作成する過去の月数（Meta APIの最大取得期間37ヶ月 + 当月）。これより古い行はデフォルトパーティションに入る
+PRECREATE_PAST_MONTHS = 38
+
+class PartitionService:
+    """
+    campaignsテーブル（月次RANGEパーティション）の管理
+    - 同期や起動時に必要な月のパーティションを作成
+    - 保持期間（CAMPAIGNS_RETENTION_MONTHS、既定は無効）を設定した場合のみ、過ぎた月をパーティション単位でDETACH/DROP
+      （行単位のDELETEによる肥大化を避ける）
+    パーティションのDDLは親テーブルのロックを取るため、通常の処理とは別の短いトランザクションで実行する
+    """
+
+    @staticmethod
+    def month_start(d: date) -> date:
+        return date(d.year, d.month, 1)
+
+    @staticmethod
+    def add_months(d: date, months: int) -> date:
+        month_index = d.year * 12 + (d.month - 1) + months
+        return date(month_index // 12, month_index % 12 + 1, 1)
+
+    @staticmethod
+    def partition_name(month: date) -> str:
+        return f"{PARENT_TABLE}_p{month.year:04d}{month.month:02d}"
+
+    @staticmethod
+    def is_partitioned(conn) -> bool:
+        """campaignsが宣言的パーティションテーブルか（移行前の通常テーブルでは何もしない）"""
+        result = conn.execute(text("""
+            SELECT 1 FROM pg_partitioned_table pt
+            JOIN pg_class c ON c.oid = pt.partrelid
+            WHERE c.relname = :table_name
+        """), {"table_name": PARENT_TABLE}).first()
+        return result is not None
+
+    @staticmethod
+    def existing_partitions(conn) -> List[str]:
+        rows = conn.execute(text("""
+            SELECT child.relname
+            FROM pg_inherits i
+            JOIN pg_class parent ON parent.oid = i.inhparent
+            JOIN pg_class child ON child.oid = i.inhrelid
+            WHERE parent.relname = :table_name
+        """), {"table_name": PARENT_TABLE}).fetchall()
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def _create_month_partition(conn, month: date):
+        name = PartitionService.partition_name(month)
+        upper = PartitionService.add_months(month, 1)
+        bounds = f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+
+        # デフォルトパーティションに該当月の行がある場合、そのままでは作成できないため移動してからATTACH
+        has_default_rows = conn.execute(text(f"""
+            SELECT 1 FROM {DEFAULT_PARTITION} WHERE date >= :lower AND date < :upper LIMIT 1
+        """), {"lower": month, "upper": upper}).first() is not None
+
+        if has_default_rows:
+            conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+        else:
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} {bounds}"))
+        if has_default_rows:
+            params = {"lower": month, "upper": upper}
+            conn.execute(text(f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} WHERE date >= :lower AND date < :upper"), params)
+            conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE date >= :lower AND date < :upper"), params)
+            conn.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} {bounds}"))
+            print(f"[Partition] Moved rows for {month:%Y-%m} from {DEFAULT_PARTITION} to {name}")
+        print(f"[Partition] Created partition {name} ({month} ~ {upper})")
+
+    @staticmethod
+    def ensure_partitions(since: date, until: date) -> int:
+        """since〜untilを含む月のパーティションを作成（既存はスキップ）"""
+        created = 0
+        with engine.begin() as conn:
+            if not PartitionService.is_partitioned(conn):
+                return 0
+            existing = set(PartitionService.existing_partitions(conn))
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"))
+            month = PartitionService.month_start(since)
+            last_month = PartitionService.month_start(until)
+            while month <= last_month:
+                if PartitionService.partition_name(month) not in existing:
+                    PartitionService._create_month_partition(conn, month)
+                    created += 1
+                month = PartitionService.add_months(month, 1)
+        return created
+
+    @staticmethod
+    def ensure_future_partitions(months_ahead: Optional[int] = None) -> int:
+        """Meta APIで取得できる最も古い月（保持期間がそれより短い場合は保持期間の開始月）から数ヶ月先までのパーティションを作成"""
+        if months_ahead is None:
+            months_ahead = settings.CAMPAIGNS_PARTITION_MONTHS_AHEAD
+        this_month = PartitionService.month_start(datetime.utcnow().date())
+        months_back = PRECREATE_PAST_MONTHS
+        if settings.CAMPAIGNS_RETENTION_MONTHS > 0:
+            months_back = min(months_back, settings.CAMPAIGNS_RETENTION_MONTHS)
+        return PartitionService.ensure_partitions(
+            PartitionService.add_months(this_month, -(months_back - 1)),
+            PartitionService.add_months(this_month, months_ahead)
+        )
+
+    @staticmethod
+    def apply_retention(retention_months: Optional[int] = None) -> List[str]:
+        """保持期間より古い月のパーティションをDETACHしてDROP（保持期間が0の場合は何もしない）"""
+        if retention_months is None:
+            retention_months = settings.CAMPAIGNS_RETENTION_MONTHS
+        if not retention_months or retention_months <= 0:
+            return []
+        cutoff = PartitionService.add_months(
+            PartitionService.month_start(datetime.utcnow().date()), -(retention_months - 1)
+        )
+        dropped = []
+        with engine.begin() as conn:
+            if not PartitionService.is_partitioned(conn):
+                return []
+            for name in sorted(PartitionService.existing_partitions(conn)):
+                if not name.startswith(f"{PARENT_TABLE}_p"):
+                    continue
+                try:
+                    month = date(int(name[-6:-2]), int(name[-2:]), 1)
+                except ValueError:
+                    continue
+                if month < cutoff:
+                    conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+                    conn.execute(text(f"DROP TABLE {name}"))
+                    dropped.append(name)
+                    print(f"[Partition] Dropped partition {name} (older than retention cutoff {cutoff})")
+        return dropped
+
+    @staticmethod
+    def run_maintenance():
+        """起動時のパーティション管理（将来分の作成 + 保持期間を設定している場合はその適用）"""
+        try:
+            created = PartitionService.ensure_future_partitions()
+            dropped = PartitionService.apply_retention()
+            print(f"[Partition] Maintenance completed: created={created}, dropped={len(dropped)}")
+        except Exception as e:
+            print(f"[Partition] ⚠️ Partition maintenance failed: {str(e)}")
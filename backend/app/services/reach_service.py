@@ -0,0 +1,332 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+import httpx
+import json
+import uuid
+from ..models.period_reach import PeriodReach
+from ..models.campaign import Campaign
+from ..models.user import User
+from ..config import settings
+from ..utils.campaign_names import normalize_campaign_name
+from .graph_client import graph_client
+
+# accountレベルのキャッシュで使用するobject_key
+ACCOUNT_KEY = "__account__"
+
+# レベルごとのMeta API上の名前フィールド
+LEVEL_NAME_FIELDS = {
+    "account": None,
+    "campaign": "campaign_name",
+    "adset": "adset_name",
+    "ad": "ad_name",
+}
+
+class ReachService:
+    """
+    任意の期間のユニークリーチを返すサービス
+    - period_reachテーブルをキャッシュとして参照し、ミス時のみMeta APIから取得する
+    - 同じ (アカウント, レベル, 期間) の全オブジェクトを1回のリクエストでまとめて取得・保存する
+    """
+    GRAPH_API_BASE = "https://graph.facebook.com/v24.0"
+
+    @staticmethod
+    def to_api_account_id(account_id: str) -> str:
+        """Meta APIのアカウントIDは act_ プレフィックスが必要"""
+        return account_id if account_id.startswith("act_") else f"act_{account_id}"
+
+    @staticmethod
+    def today_jst() -> date:
+        jst = timezone(timedelta(hours=9))  # JST = UTC+9
+        return datetime.now(jst).date()
+
+    @staticmethod
+    def is_closed_range(until: date) -> bool:
+        """終了日が十分過去であれば、Meta側の値は確定済みとみなす"""
+        settle_days = settings.PERIOD_REACH_SETTLE_DAYS
+        return until <= ReachService.today_jst() - timedelta(days=settle_days)
+
+    @staticmethod
+    def compute_expires_at(until: date) -> datetime:
+        """確定済みの期間は長いTTL、直近日を含む期間は短いTTL"""
+        now = datetime.utcnow()
+        if ReachService.is_closed_range(until):
+            return now + timedelta(hours=settings.PERIOD_REACH_CLOSED_TTL_HOURS)
+        return now + timedelta(minutes=settings.PERIOD_REACH_OPEN_TTL_MINUTES)
+
+    @staticmethod
+    def popular_ranges(until_date: date, all_since: date) -> Dict[str, Tuple[date, date]]:
+        """ダッシュボードで使われる期間（7日間/30日間/全期間）"""
+        return {
+            "7days": (until_date - timedelta(days=6), until_date),
+            "30days": (until_date - timedelta(days=29), until_date),
+            "all": (all_since, until_date),
+        }
+
+    @staticmethod
+    def get_account_data_range(db: Session, user_id: uuid.UUID, account_id: str) -> Optional[Tuple[date, date]]:
+        """アカウントの日次データが存在する期間（最小日〜最大日）"""
+        api_account_id = ReachService.to_api_account_id(account_id)
+        result = db.query(
+            func.min(Campaign.date).label('min_date'),
+            func.max(Campaign.date).label('max_date')
+        ).filter(
+            Campaign.user_id == user_id,
+            Campaign.meta_account_id.in_([api_account_id, api_account_id.replace("act_", "")])
+        ).first()
+        if not result or not result.min_date or not result.max_date:
+            return None
+        return result.min_date, result.max_date
+
+    @staticmethod
+    def clamp_to_data_range(
+        db: Session,
+        user_id: uuid.UUID,
+        account_id: str,
+        since: date,
+        until: date
+    ) -> Tuple[date, date]:
+        """
+        期間をアカウントのデータ範囲に切り詰める
+        範囲外には配信実績がないためユニークリーチは変わらず、事前計算済みのキャッシュと同じキーになる
+        """
+        data_range = ReachService.get_account_data_range(db, user_id, account_id)
+        if not data_range:
+            return since, until
+        min_date, max_date = data_range
+        clamped_since = max(since, min_date)
+        clamped_until = min(until, max_date)
+        if clamped_since > clamped_until:
+            return since, until
+        return clamped_since, clamped_until
+
+    @staticmethod
+    def get_popular_reach_map(
+        db: Session,
+        user_id: uuid.UUID,
+        account_id: str,
+        level: str = "campaign"
+    ) -> Dict[str, Dict[str, int]]:
+        """事前計算済みの期間（7日間/30日間/全期間）のキャッシュを取得（period -> object_key -> reach）"""
+        data_range = ReachService.get_account_data_range(db, user_id, account_id)
+        if not data_range:
+            return {}
+        min_date, max_date = data_range
+        return {
+            period_name: ReachService.get_cached(db, user_id, account_id, level, since, until)
+            for period_name, (since, until) in ReachService.popular_ranges(max_date, min_date).items()
+        }
+
+    @staticmethod
+    def get_cached(
+        db: Session,
+        user_id: uuid.UUID,
+        account_id: str,
+        level: str,
+        since: date,
+        until: date,
+        object_keys: Optional[Iterable[str]] = None
+    ) -> Dict[str, int]:
+        """有効期限内のキャッシュを取得（object_key -> reach）"""
+        query = db.query(PeriodReach.object_key, PeriodReach.reach).filter(
+            PeriodReach.user_id == user_id,
+            PeriodReach.meta_account_id == ReachService.to_api_account_id(account_id),
+            PeriodReach.level == level,
+            PeriodReach.since == since,
+            PeriodReach.until == until,
+            PeriodReach.expires_at > datetime.utcnow()
+        )
+        if object_keys is not None:
+            query = query.filter(PeriodReach.object_key.in_(list(object_keys)))
+        return {row.object_key: int(row.reach or 0) for row in query.all()}
+
+    @staticmethod
+    def store(
+        db: Session,
+        user_id: uuid.UUID,
+        account_id: str,
+        level: str,
+        since: date,
+        until: date,
+        values: Dict[str, int]
+    ) -> int:
+        """取得したユニークリーチをまとめて保存（同じキーは上書き）"""
+        if not values:
+            return 0
+        now = datetime.utcnow()
+        expires_at = ReachService.compute_expires_at(until)
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "user_id": user_id,
+                "meta_account_id": ReachService.to_api_account_id(account_id),
+                "level": level,
+                "object_key": object_key[:255],
+                "since": since,
+                "until": until,
+                "reach": int(reach or 0),
+                "fetched_at": now,
+                "expires_at": expires_at,
+            }
+            for object_key, reach in values.items()
+        ]
+        stmt = pg_insert(PeriodReach).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_period_reach_key",
+            set_={
+                "reach": stmt.excluded.reach,
+                "fetched_at": stmt.excluded.fetched_at,
+                "expires_at": stmt.excluded.expires_at,
+            }
+        )
+        db.execute(stmt)
+        db.commit()
+        return len(rows)
+
+    @staticmethod
+    def purge_expired(db: Session, user_id: Optional[uuid.UUID] = None) -> int:
+        """有効期限切れのキャッシュを削除"""
+        query = db.query(PeriodReach).filter(PeriodReach.expires_at <= datetime.utcnow())
+        if user_id is not None:
+            query = query.filter(PeriodReach.user_id == user_id)
+        deleted = query.delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+    @staticmethod
+    async def fetch_from_meta(
+        client: httpx.AsyncClient,
+        access_token: str,
+        account_id: str,
+        level: str,
+        since: date,
+        until: date
+    ) -> Dict[str, int]:
+        """
+        Meta APIから期間全体のユニークリーチを取得（time_incrementなし）
+        レベル内の全オブジェクトを1回のリクエスト（+ページネーション）で取得する
+        """
+        if level not in LEVEL_NAME_FIELDS:
+            raise ValueError(f"Invalid level: {level}")
+        name_field = LEVEL_NAME_FIELDS[level]
+        fields = f"{name_field},reach" if name_field else "reach"
+
+        url = f"{ReachService.GRAPH_API_BASE}/{ReachService.to_api_account_id(account_id)}/insights"
+        params = {
+            "access_token": access_token,
+            "fields": fields,
+            "level": level,
+            "time_range": json.dumps({
+                "since": since.strftime('%Y-%m-%d'),
+                "until": until.strftime('%Y-%m-%d')
+            }, separators=(',', ':')),
+            "limit": 500
+        }
+
+        values: Dict[str, int] = {}
+        while True:
+            response = await client.get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
+            for item in data.get('data', []):
+                try:
+                    reach = int(float(item.get('reach') or 0))
+                except (ValueError, TypeError):
+                    reach = 0
+                if name_field:
+                    object_key = normalize_campaign_name(item.get(name_field, ''))
+                    if not object_key:
+                        continue
+                    # 同名オブジェクトが複数ある場合は最大値を採用（名前単位での集計のため）
+                    values[object_key] = max(values.get(object_key, 0), reach)
+                else:
+                    values[ACCOUNT_KEY] = reach
+            next_url = data.get('paging', {}).get('next')
+            if not next_url:
+                break
+            url = next_url
+            params = None  # 次ページのURLにパラメータが含まれているため指定しない（空のdictはURLのクエリを消す）
+
+        if level == "account" and ACCOUNT_KEY not in values:
+            # 配信実績がない期間は0として保存（毎回の再取得を防ぐ）
+            values[ACCOUNT_KEY] = 0
+        return values
+
+    @staticmethod
+    async def get_reach(
+        db: Session,
+        user: User,
+        account_id: str,
+        since: date,
+        until: date,
+        level: str = "account",
+        object_key: Optional[str] = None,
+        client: Optional[httpx.AsyncClient] = None
+    ) -> Optional[int]:
+        """
+        (アカウント, レベル, 対象, 期間) のユニークリーチを返す
+        キャッシュミス時はMeta APIから取得して保存する。取得できない場合はNone
+        """
+        if level == "account":
+            object_key = ACCOUNT_KEY
+        else:
+            object_key = normalize_campaign_name(object_key or '')
+            if not object_key:
+                return None
+
+        since, until = ReachService.clamp_to_data_range(db, user.id, account_id, since, until)
+        cached = ReachService.get_cached(db, user.id, account_id, level, since, until, [object_key])
+        if object_key in cached:
+            print(f"[Reach] Cache hit: {account_id} {level} '{object_key}' {since}~{until} = {cached[object_key]:,}")
+            return cached[object_key]
+
+        if not user.meta_access_token:
+            print(f"[Reach] Cache miss and no access token: {account_id} {level} '{object_key}' {since}~{until}")
+            return None
+
+        print(f"[Reach] Cache miss, fetching from Meta API: {account_id} {level} {since}~{until}")
+        try:
+            if client is None:
+                async with graph_client(timeout=30.0) as own_client:
+                    values = await ReachService.fetch_from_meta(own_client, user.meta_access_token, account_id, level, since, until)
+            else:
+                values = await ReachService.fetch_from_meta(client, user.meta_access_token, account_id, level, since, until)
+        except Exception as e:
+            print(f"[Reach] ⚠️ Failed to fetch reach from Meta API: {str(e)}")
+            return None
+
+        # 期間内に配信実績がない対象も0として保存（毎回の再取得を防ぐ）
+        values.setdefault(object_key, 0)
+        ReachService.store(db, user.id, account_id, level, since, until, values)
+        return values[object_key]
+
+    @staticmethod
+    async def precompute_popular_ranges(
+        db: Session,
+        user: User,
+        access_token: str,
+        account_id: str,
+        until_date: date,
+        all_since: date,
+        levels: Tuple[str, ...] = ("account", "campaign")
+    ) -> int:
+        """同期後に、よく使われる期間のユニークリーチを事前に取得してキャッシュする"""
+        ReachService.purge_expired(db, user.id)
+        stored = 0
+        ranges = ReachService.popular_ranges(until_date, all_since)
+        async with graph_client(timeout=60.0) as client:
+            for period_name, (since, until) in ranges.items():
+                if since > until:
+                    continue
+                for level in levels:
+                    try:
+                        values = await ReachService.fetch_from_meta(client, access_token, account_id, level, since, until)
+                        stored += ReachService.store(db, user.id, account_id, level, since, until, values)
+                        print(f"[Reach] Precomputed {period_name} ({since}~{until}) {level}: {len(values)} entries")
+                    except Exception as e:
+                        db.rollback()
+                        print(f"[Reach] ⚠️ Failed to precompute {period_name} {level} reach for {account_id}: {str(e)}")
+                        continue
+        return stored
@@ -0,0 +1,344 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import csv
+import hashlib
+import io
+import time
+import uuid
+from ..models.analysis import AnalysisResult
+from ..models.campaign import Campaign
+from ..models.dimension import AdCampaign
+from ..models.job import Job
+from ..models.report_artifact import ReportArtifact
+from ..models.user import User
+from .dimension_service import aggregate_by_campaign, campaign_name_filter
+from .job_queue import JobQueue
+from ..config import settings
+
+REPORT_CONTENT_TYPES = {
+    "pdf": "application/pdf",
+    "excel": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# CSVの列（アップロードのCSVと同じ列名にして、再アップロードできるようにする）
+CSV_COLUMNS = [
+    ("日付", "date"),
+    ("キャンペーン名", "campaign_name"),
+    ("費用", "cost"),
+    ("インプレッション", "impressions"),
+    ("クリック数", "clicks"),
+    ("コンバージョン数", "conversions"),
+    ("コンバージョン価値", "conversion_value"),
+    ("リーチ", "reach"),
+    ("エンゲージメント", "engagements"),
+    ("リンククリック", "link_clicks"),
+    ("ランディングページビュー", "landing_page_views"),
+]
+
+class ReportArtifactService:
+    """
+    レポート（PDF・Excel・CSV）の生成とキャッシュ
+    - ダウンロードのリクエストはキャッシュの確認とreportジョブの登録のみ行い、生成はワーカーで実行する
+    - キャッシュのキーは (レポート種別, 分析ID/期間, データのバージョン)。同期・アップロードでデータが変わると別のキーになり再生成される
+    """
+
+    @staticmethod
+    def default_period(start_date: Optional[date], end_date: Optional[date]) -> Tuple[date, date]:
+        """JST基準の直近30日（ダッシュボードの既定と同じ）"""
+        today_jst = datetime.now(timezone(timedelta(hours=9))).date()
+        return start_date or today_jst - timedelta(days=30), end_date or today_jst
+
+    @staticmethod
+    def _campaign_rows(db: Session, user_id: uuid.UUID, start_date: date, end_date: date, campaign_name: Optional[str] = None):
+        query = db.query(Campaign).filter(
+            Campaign.user_id == user_id,
+            Campaign.date >= start_date,
+            Campaign.date <= end_date,
+            # データの重複排除: キャンペーンレベルのみを使用
+            Campaign.adset_key.is_(None)
+        )
+        if campaign_name:
+            query = query.filter(campaign_name_filter(campaign_name))
+        return query
+
+    @staticmethod
+    def data_version(db: Session, user_id: uuid.UUID, start_date: date, end_date: date, campaign_name: Optional[str] = None) -> str:
+        """
+        期間内のデータのフィンガープリント（件数・合計値・最終登録日時・row_hash・キャンペーン名の最終更新日時）。同期・アップロード・削除で変わる
+        Meta同期の差分マージは変わった行をその場でUPDATEする（created_atは変わらない）ため、row_hash（指標値のハッシュ）も含める
+        名前変更はディメンションテーブルの更新のみでcampaignsの行は変わらないため、ad_campaigns.updated_at も含める
+        """
+        if db.get_bind().dialect.name == "postgresql":
+            row_hashes = func.md5(func.string_agg(func.coalesce(Campaign.row_hash, ''), aggregate_order_by('', Campaign.row_hash)))
+        else:
+            row_hashes = func.group_concat(Campaign.row_hash)
+        row = ReportArtifactService._campaign_rows(db, user_id, start_date, end_date, campaign_name).join(
+            AdCampaign, AdCampaign.id == Campaign.campaign_key
+        ).with_entities(
+            row_hashes,
+            func.count(),
+            func.sum(Campaign.cost),
+            func.sum(Campaign.impressions),
+            func.sum(Campaign.clicks),
+            func.sum(Campaign.conversions),
+            func.sum(Campaign.conversion_value),
+            func.sum(Campaign.reach),
+            func.max(Campaign.created_at),
+            func.max(AdCampaign.updated_at)
+        ).first()
+        return hashlib.md5("|".join(str(value) for value in row).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def describe(
+        db: Session,
+        user_id: uuid.UUID,
+        report_type: str,
+        analysis: Optional[AnalysisResult] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> Dict:
+        """レポートの指定（reportジョブのpayload）とキャッシュのキーを作成"""
+        campaign_name = None
+        if analysis is not None:
+            start_date = analysis.analysis_period_start.date()
+            end_date = analysis.analysis_period_end.date()
+            campaign_name = analysis.campaign_name
+            subject = f"analysis:{analysis.id}"
+            filename = f"meta_ad_report_{analysis.id}.pdf"
+        else:
+            start_date, end_date = ReportArtifactService.default_period(start_date, end_date)
+            subject = f"period:{start_date}:{end_date}"
+            prefix = "campaigns_report" if report_type == "csv" else "meta_ad_report"
+            extension = "xlsx" if report_type == "excel" else report_type
+            filename = f"{prefix}_{start_date}_{end_date}.{extension}"
+
+        version = ReportArtifactService.data_version(db, user_id, start_date, end_date, campaign_name)
+        cache_key = hashlib.sha256(f"{report_type}:{user_id}:{subject}:{version}".encode("utf-8")).hexdigest()
+        return {
+            "report_type": report_type,
+            "user_id": str(user_id),
+            "analysis_id": str(analysis.id) if analysis is not None else None,
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "cache_key": cache_key,
+            "filename": filename,
+        }
+
+    @staticmethod
+    def get_cached(db: Session, cache_key: str) -> Optional[ReportArtifact]:
+        artifact = db.query(ReportArtifact).filter(
+            ReportArtifact.cache_key == cache_key,
+            ReportArtifact.expires_at > datetime.utcnow()
+        ).first()
+        if artifact is not None:
+            artifact.download_count = (artifact.download_count or 0) + 1
+            artifact.last_accessed_at = datetime.utcnow()
+            db.commit()
+        return artifact
+
+    @staticmethod
+    def find_or_enqueue(db: Session, spec: Dict) -> Job:
+        """同じレポートを生成中のジョブがあればそれを返す（連打・複数タブで重複して生成しない）"""
+        user_id = uuid.UUID(spec["user_id"])
+        pending_jobs = db.query(Job).filter(
+            Job.user_id == user_id,
+            Job.job_type == "report",
+            Job.status.in_(["queued", "running"])
+        ).all()
+        for job in pending_jobs:
+            if (job.payload or {}).get("cache_key") == spec["cache_key"]:
+                return job
+        return JobQueue.enqueue(db, "report", spec, user_id=user_id, max_attempts=2)
+
+    @staticmethod
+    def _campaign_summaries(db: Session, user_id: uuid.UUID, start_date: date, end_date: date, campaign_name: Optional[str] = None) -> List[Dict]:
+        """キャンペーン別の集計（費用の多い順）"""
+        rows = aggregate_by_campaign(
+            ReportArtifactService._campaign_rows(db, user_id, start_date, end_date, campaign_name),
+            func.sum(Campaign.impressions).label('impressions'),
+            func.sum(Campaign.clicks).label('clicks'),
+            func.sum(Campaign.cost).label('cost'),
+            func.sum(Campaign.conversions).label('conversions'),
+            func.sum(Campaign.conversion_value).label('conversion_value')
+        ).all()
+
+        result = []
+        for c in rows:
+            impressions = int(c.impressions or 0)
+            clicks = int(c.clicks or 0)
+            cost = float(c.cost or 0)
+            conversions = int(c.conversions or 0)
+            conversion_value = float(c.conversion_value or 0)
+            result.append({
+                "campaign_name": c.campaign_name,
+                "impressions": impressions,
+                "clicks": clicks,
+                "cost": round(cost, 2),
+                "conversions": conversions,
+                "ctr": round((clicks / impressions * 100) if impressions > 0 else 0, 2),
+                "cpc": round((cost / clicks) if clicks > 0 else 0, 2),
+                "cpa": round((cost / conversions) if conversions > 0 else 0, 2),
+                "cvr": round((conversions / clicks * 100) if clicks > 0 else 0, 2),
+                # レポートはROASを%で表示する
+                "roas": round((conversion_value / cost * 100) if cost > 0 else 0, 2),
+            })
+        result.sort(key=lambda x: x['cost'], reverse=True)
+        return result
+
+    @staticmethod
+    def _summary(db: Session, user_id: uuid.UUID, start_date: date, end_date: date) -> Dict:
+        row = ReportArtifactService._campaign_rows(db, user_id, start_date, end_date).with_entities(
+            func.sum(Campaign.impressions).label('impressions'),
+            func.sum(Campaign.clicks).label('clicks'),
+            func.sum(Campaign.cost).label('cost'),
+            func.sum(Campaign.conversions).label('conversions'),
+            func.sum(Campaign.conversion_value).label('conversion_value')
+        ).first()
+        impressions = int(row.impressions or 0)
+        clicks = int(row.clicks or 0)
+        cost = float(row.cost or 0)
+        conversions = int(row.conversions or 0)
+        conversion_value = float(row.conversion_value or 0)
+        return {
+            "period": {"start_date": str(start_date), "end_date": str(end_date)},
+            "totals": {
+                "impressions": impressions,
+                "clicks": clicks,
+                "cost": cost,
+                "conversions": conversions,
+                "conversion_value": conversion_value,
+            },
+            "averages": {
+                "ctr": (clicks / impressions * 100) if impressions > 0 else 0,
+                "cpc": (cost / clicks) if clicks > 0 else 0,
+                "cpa": (cost / conversions) if conversions > 0 else 0,
+                "cvr": (conversions / clicks * 100) if clicks > 0 else 0,
+                "roas": (conversion_value / cost * 100) if cost > 0 else 0,
+            }
+        }
+
+    @staticmethod
+    def _trends(db: Session, user_id: uuid.UUID, start_date: date, end_date: date) -> List[Dict]:
+        rows = ReportArtifactService._campaign_rows(db, user_id, start_date, end_date).with_entities(
+            Campaign.date,
+            func.sum(Campaign.impressions).label('impressions'),
+            func.sum(Campaign.clicks).label('clicks'),
+            func.sum(Campaign.cost).label('cost'),
+            func.sum(Campaign.conversions).label('conversions')
+        ).group_by(Campaign.date).order_by(Campaign.date).all()
+        return [
+            {
+                "date": str(t.date),
+                "impressions": int(t.impressions or 0),
+                "clicks": int(t.clicks or 0),
+                "cost": float(t.cost or 0),
+                "conversions": int(t.conversions or 0)
+            }
+            for t in rows
+        ]
+
+    @staticmethod
+    def _render_csv(db: Session, user_id: uuid.UUID, start_date: date, end_date: date) -> bytes:
+        rows = ReportArtifactService._campaign_rows(db, user_id, start_date, end_date).with_entities(
+            *[getattr(Campaign, attr) for _, attr in CSV_COLUMNS]
+        ).order_by(Campaign.date, Campaign.campaign_name)
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow([label for label, _ in CSV_COLUMNS])
+        for row in rows.yield_per(1000):
+            writer.writerow(["" if value is None else value for value in row])
+        # Excelで文字化けしないようBOM付きUTF-8
+        return output.getvalue().encode("utf-8-sig")
+
+    @staticmethod
+    def render(db: Session, spec: Dict) -> Tuple[bytes, Dict]:
+        """レポートを生成（ワーカーのスレッドで実行）。(内容, 生成に使ったデータの件数など) を返す"""
+        from .report_service import ReportService  # reportlab・openpyxlは生成時のみ読み込む
+
+        user_id = uuid.UUID(spec["user_id"])
+        start_date = date.fromisoformat(spec["start_date"])
+        end_date = date.fromisoformat(spec["end_date"])
+        report_type = spec["report_type"]
+
+        if report_type == "pdf":
+            analysis = db.query(AnalysisResult).filter(
+                AnalysisResult.id == uuid.UUID(spec["analysis_id"]),
+                AnalysisResult.user_id == user_id
+            ).first()
+            if analysis is None:
+                raise ValueError(f"Analysis not found: {spec['analysis_id']}")
+            user = db.query(User).filter(User.id == user_id).first()
+            analysis_data = {
+                "campaign_name": analysis.campaign_name,
+                "overall_rating": analysis.overall_rating,
+                "overall_comment": analysis.overall_comment,
+                "issues": analysis.issues or [],
+                "recommendations": analysis.recommendations or [],
+                "action_plan": analysis.action_plan or [],
+            }
+            campaigns = ReportArtifactService._campaign_summaries(db, user_id, start_date, end_date, analysis.campaign_name)
+            content = ReportService.generate_pdf_report(
+                user.name if user else "",
+                analysis_data,
+                analysis.raw_data or {},
+                campaigns
+            )
+            return content, {"campaigns": len(campaigns)}
+
+        if report_type == "excel":
+            campaigns = ReportArtifactService._campaign_summaries(db, user_id, start_date, end_date)
+            trends = ReportArtifactService._trends(db, user_id, start_date, end_date)
+            content = ReportService.generate_excel_report(
+                ReportArtifactService._summary(db, user_id, start_date, end_date),
+                campaigns,
+                trends
+            )
+            return content, {"campaigns": len(campaigns), "days": len(trends)}
+
+        if report_type == "csv":
+            return ReportArtifactService._render_csv(db, user_id, start_date, end_date), {}
+
+        raise ValueError(f"Unknown report type: {report_type}")
+
+    @staticmethod
+    def render_and_store(db: Session, spec: Dict) -> Dict:
+        """レポートを生成して report_artifacts に保存（同じキーが既にあれば再利用）"""
+        existing = db.query(ReportArtifact).filter(ReportArtifact.cache_key == spec["cache_key"]).first()
+        if existing is not None and existing.expires_at > datetime.utcnow():
+            return {"artifact_id": str(existing.id), "size_bytes": existing.size_bytes, "cached": True}
+
+        started_at = time.monotonic()
+        content, stats = ReportArtifactService.render(db, spec)
+        render_ms = int((time.monotonic() - started_at) * 1000)
+
+        now = datetime.utcnow()
+        artifact = existing or ReportArtifact(cache_key=spec["cache_key"], user_id=uuid.UUID(spec["user_id"]))
+        artifact.report_type = spec["report_type"]
+        artifact.filename = spec["filename"]
+        artifact.content_type = REPORT_CONTENT_TYPES[spec["report_type"]]
+        artifact.content = content
+        artifact.size_bytes = len(content)
+        artifact.render_ms = render_ms
+        artifact.created_at = now
+        artifact.last_accessed_at = now
+        artifact.expires_at = now + timedelta(hours=settings.REPORT_CACHE_TTL_HOURS)
+        if existing is None:
+            db.add(artifact)
+        db.commit()
+        print(f"[Reports] ✅ Rendered {spec['report_type']} report {spec['filename']} ({len(content):,} bytes) in {render_ms}ms {stats}")
+        return {"artifact_id": str(artifact.id), "size_bytes": len(content), "render_ms": render_ms, "cached": False, **stats}
+
+    @staticmethod
+    def purge_expired(db: Session) -> int:
+        """期限切れのレポートを削除"""
+        deleted = db.query(ReportArtifact).filter(
+            ReportArtifact.expires_at <= datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.commit()
+        if deleted:
+            print(f"[Reports] Purged {deleted} expired report(s)")
+        return deleted
@@ -0,0 +1,145 @@
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import contextlib
+import hashlib
+import weakref
+from ..database import engine
+
+class SingleFlight:
+    """
+    同じキーの処理（例: 同じユーザー・アカウントの同期）を同時に1つだけ実行する
+    - 同一プロセス内: 実行中のタスクに後続のリクエストを相乗りさせ、同じ結果を返す
+    - プロセス間: Postgresのアドバイザリロックで排他し、ロックを持つ処理の終了を待つ
+      （待っていた側は自分では実行せず attached=True を返すため、結果は呼び出し側がDBから参照する）
+    相乗りさせずに順番に実行する処理（例: 期間の違う同じアカウントの同期）は queue_key で指定する
+    ロック用の接続はキーごとに1本（queue_key のロックも同じ接続で取る）
+    Postgres以外（SQLiteなど）ではプロセス内の排他のみ
+    """
+    # イベントループごとの実行中タスク（asyncio.Taskはループをまたいで共有できないため）
+    _tasks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]" = weakref.WeakKeyDictionary()
+    # イベントループごとの queue_key の順番待ち用のロック
+    _queue_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Lock]]" = weakref.WeakKeyDictionary()
+    POLL_INTERVAL_SECONDS = 2.0
+
+    @staticmethod
+    def lock_id(key: str) -> int:
+        """キーをpg_advisory_lock用の符号付き64bit整数に変換"""
+        return int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], "big", signed=True)
+
+    @staticmethod
+    def _supports_advisory_lock() -> bool:
+        return engine.dialect.name == "postgresql"
+
+    @staticmethod
+    def _try_lock(conn, lock_id: int) -> bool:
+        return bool(conn.execute(text("SELECT pg_try_advisory_lock(:lock_id)"), {"lock_id": lock_id}).scalar())
+
+    @staticmethod
+    def _unlock(conn, lock_id: int):
+        conn.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": lock_id})
+
+    @staticmethod
+    async def _acquire_when_free(conn, lock_id: int, message: str):
+        """ロックが空くまで待って取得（待つ間はトランザクションを閉じる）"""
+        waiting = False
+        while not await run_in_threadpool(SingleFlight._try_lock, conn, lock_id):
+            if not waiting:
+                print(message)
+                waiting = True
+            await run_in_threadpool(conn.rollback)
+            await asyncio.sleep(SingleFlight.POLL_INTERVAL_SECONDS)
+
+    @staticmethod
+    async def _run_with_lock(
+        key: str,
+        func: Callable[[], Awaitable[Any]],
+        queue_key: Optional[str]
+    ) -> Tuple[Any, bool]:
+        if not SingleFlight._supports_advisory_lock():
+            return await func(), False
+
+        lock_id = SingleFlight.lock_id(key)
+        queue_lock_id = SingleFlight.lock_id(queue_key) if queue_key else None
+        # アドバイザリロックは接続単位のため、処理中は専用の接続（key と queue_key で共用）で保持する
+        try:
+            conn = await run_in_threadpool(engine.connect)
+        except Exception as e:
+            # ロック用の接続が取れない場合はプロセス内の排他のみで実行
+            print(f"[SingleFlight] ⚠️ Advisory lock unavailable for {key}, falling back to in-process lock: {str(e)}")
+            return await func(), False
+        try:
+            if await run_in_threadpool(SingleFlight._try_lock, conn, lock_id):
+                try:
+                    if queue_lock_id is not None:
+                        await SingleFlight._acquire_when_free(
+                            conn, queue_lock_id, f"[SingleFlight] {queue_key} is running in another process, queued until it finishes"
+                        )
+                    try:
+                        return await func(), False
+                    finally:
+                        if queue_lock_id is not None:
+                            await run_in_threadpool(SingleFlight._unlock, conn, queue_lock_id)
+                finally:
+                    await run_in_threadpool(SingleFlight._unlock, conn, lock_id)
+                    await run_in_threadpool(conn.commit)
+
+            # 他のプロセスで実行中: 終了（ロック解放）まで待って相乗り
+            await SingleFlight._acquire_when_free(
+                conn, lock_id, f"[SingleFlight] {key} is running in another process, waiting for it to finish"
+            )
+            await run_in_threadpool(SingleFlight._unlock, conn, lock_id)
+            await run_in_threadpool(conn.commit)
+            return None, True
+        finally:
+            await run_in_threadpool(conn.close)
+
+    @staticmethod
+    async def _run_task(
+        key: str,
+        func: Callable[[], Awaitable[Any]],
+        queue_key: Optional[str],
+        limiter: Optional[asyncio.Semaphore]
+    ) -> Tuple[Any, bool]:
+        # 同じ queue_key のプロセス内の順番待ち → 同時実行数の制限 → ロック用の接続の順に取得する
+        # （待っている間は実行枠も接続も持たない）
+        if queue_key is None:
+            queue_lock = contextlib.nullcontext()
+        else:
+            loop = asyncio.get_running_loop()
+            queue_lock = SingleFlight._queue_locks.setdefault(loop, {}).setdefault(queue_key, asyncio.Lock())
+        async with queue_lock:
+            async with (limiter or contextlib.nullcontext()):
+                return await SingleFlight._run_with_lock(key, func, queue_key)
+
+    @staticmethod
+    async def run(
+        key: str,
+        func: Callable[[], Awaitable[Any]],
+        queue_key: Optional[str] = None,
+        limiter: Optional[asyncio.Semaphore] = None
+    ) -> Tuple[Any, bool]:
+        """
+        keyの処理を1つだけ実行し、(結果, 相乗りしたかどうか) を返す
+        他のプロセスの実行に相乗りした場合、結果はNone
+        queue_key: keyが違っても同時に実行しない処理のキー（相乗りせず、実行中の処理の終了を待ってから実行する）
+        limiter: 同時実行数を制限するセマフォ（ロック用の接続を取る前に取得する）
+        """
+        loop = asyncio.get_running_loop()
+        tasks = SingleFlight._tasks.setdefault(loop, {})
+        task = tasks.get(key)
+        if task is not None and not task.done():
+            print(f"[SingleFlight] {key} is already running, attaching to it")
+            result, _ = await asyncio.shield(task)
+            return result, True
+
+        task = asyncio.create_task(SingleFlight._run_task(key, func, queue_key, limiter))
+        tasks[key] = task
+
+        def cleanup(finished_task: asyncio.Task):
+            if tasks.get(key) is finished_task:
+                del tasks[key]
+        task.add_done_callback(cleanup)
+        # 呼び出し元がキャンセルされても、相乗りしている他の呼び出しのために処理は継続する
+        return await asyncio.shield(task)
@@ -0,0 +1,230 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Set
+import uuid
+from ..models.sync_run import SyncRun, SyncCheckpoint
+from .sync_staging import SyncStaging
+from ..config import settings
+
+class SyncRunService:
+    """
+    Meta同期の実行とチェックポイントの管理
+    - バッチ（レベル, バッチ番号, 期間）単位で取得データを実行のステージングテーブルに書き込み、完了済みとして記録する
+      （チェックポイントにはバッチのIDのみを保存し、取得データはステージングの1か所にだけ書き込む）
+    - 同じ (アカウント, 取得日数の指定) の再実行は、直近の未完了の実行を引き継いで未完了のバッチのみ取得する
+    """
+
+    @staticmethod
+    def time_slice(since: date, until: date) -> str:
+        return f"{since.isoformat()}~{until.isoformat()}"
+
+    @staticmethod
+    def _filter_requested_days(query, requested_days: Optional[int]):
+        """取得日数の指定が同じ実行（Noneは全期間の同期）"""
+        if requested_days is None:
+            return query.filter(SyncRun.requested_days.is_(None))
+        return query.filter(SyncRun.requested_days == requested_days)
+
+    @staticmethod
+    def find_resumable(
+        db: Session,
+        user_id: uuid.UUID,
+        meta_account_id: str,
+        requested_days: Optional[int]
+    ) -> Optional[SyncRun]:
+        """
+        再開できる実行（同じアカウント・取得日数の指定で未完了、かつ再開期限内）
+        期間の終了日（アカウントのタイムゾーンの昨日）は日付が変わるとずれるため、照合には使わない
+        """
+        threshold = datetime.utcnow() - timedelta(hours=settings.SYNC_RUN_RESUME_HOURS)
+        query = db.query(SyncRun).filter(
+            SyncRun.user_id == user_id,
+            SyncRun.meta_account_id == meta_account_id,
+            SyncRun.status.in_(["running", "failed"]),
+            SyncRun.updated_at >= threshold
+        )
+        query = SyncRunService._filter_requested_days(query, requested_days)
+        return query.order_by(SyncRun.updated_at.desc()).first()
+
+    @staticmethod
+    def start(
+        db: Session,
+        user_id: uuid.UUID,
+        meta_account_id: str,
+        requested_days: Optional[int],
+        since: date,
+        until: date,
+        replace_all_dates: bool = False
+    ) -> SyncRun:
+        """
+        未完了の実行があれば再開、なければ新しい実行を作成し、ステージングテーブルを用意する
+        再開時は元の実行の期間（since/until）を引き継ぐ（チェックポイント済みのバッチと同じ期間で残りを取得するため）
+        ステージングが削除されている場合はチェックポイントを破棄し、今回の期間で最初から取得する
+        """
+        run = SyncRunService.find_resumable(db, user_id, meta_account_id, requested_days)
+        if run and not SyncStaging.exists(run.staging_table):
+            print(f"[Sync Run] Staging table of run {run.id} is gone, restarting it from the first batch")
+            db.query(SyncCheckpoint).filter(SyncCheckpoint.run_id == run.id).delete(synchronize_session=False)
+            run.since = since
+            run.until = until
+        if run:
+            run.status = "running"
+            run.attempt_count = (run.attempt_count or 1) + 1
+            run.error_message = None
+            run.replace_all_dates = run.replace_all_dates or replace_all_dates
+            print(f"[Sync Run] Resuming run {run.id} for {meta_account_id} ({run.since} ~ {run.until}, attempt {run.attempt_count})")
+        else:
+            run = SyncRun(
+                id=uuid.uuid4(),
+                user_id=user_id,
+                meta_account_id=meta_account_id,
+                requested_days=requested_days,
+                since=since,
+                until=until,
+                replace_all_dates=replace_all_dates,
+                status="running"
+            )
+            db.add(run)
+            print(f"[Sync Run] Starting new run for {meta_account_id} ({since} ~ {until})")
+        # テーブルの作成前に実行から参照させる（作成直後のテーブルを古いステージングとして削除させない）
+        run.staging_table = SyncStaging.table_name(run.id)
+        db.commit()
+        SyncStaging.create(run.id)
+        # チェックポイントを保存する前に失敗したバッチの行を削除（そのバッチは再取得する）
+        checkpoint_ids = [row.id for row in db.query(SyncCheckpoint.id).filter(SyncCheckpoint.run_id == run.id)]
+        SyncStaging.discard_unconfirmed(run.staging_table, checkpoint_ids)
+        return run
+
+    @staticmethod
+    def get_checkpoints(db: Session, run: SyncRun, level: str) -> List[SyncCheckpoint]:
+        return db.query(SyncCheckpoint).filter(
+            SyncCheckpoint.run_id == run.id,
+            SyncCheckpoint.level == level
+        ).order_by(SyncCheckpoint.batch_index).all()
+
+    @staticmethod
+    def staged_row_count(db: Session, run: SyncRun) -> int:
+        """チェックポイント済みのバッチでステージングに書き込んだ行数の合計"""
+        return int(db.query(func.coalesce(func.sum(SyncCheckpoint.row_count), 0)).filter(
+            SyncCheckpoint.run_id == run.id
+        ).scalar())
+
+    @staticmethod
+    def completed_object_ids(checkpoints: List[SyncCheckpoint], time_slice: str) -> Set[str]:
+        completed = set()
+        for checkpoint in checkpoints:
+            if checkpoint.time_slice == time_slice:
+                completed.update(str(object_id) for object_id in (checkpoint.object_ids or []))
+        return completed
+
+    @staticmethod
+    def save_checkpoint(
+        db: Session,
+        run: SyncRun,
+        checkpoint_id: uuid.UUID,
+        level: str,
+        batch_index: int,
+        time_slice: str,
+        object_ids: List[str],
+        row_count: int
+    ) -> SyncCheckpoint:
+        """
+        ステージングへの書き込みが済んだバッチを記録してコミット（次の失敗ではこのバッチは再取得しない）
+        checkpoint_id はバッチの行をステージングに書き込んだときの sync_checkpoint_id
+        """
+        checkpoint = SyncCheckpoint(
+            id=checkpoint_id,
+            run_id=run.id,
+            level=level,
+            batch_index=batch_index,
+            time_slice=time_slice,
+            object_ids=[str(object_id) for object_id in object_ids],
+            row_count=row_count
+        )
+        db.add(checkpoint)
+        run.updated_at = datetime.utcnow()
+        db.commit()
+        return checkpoint
+
+    @staticmethod
+    def record_plan_limits(db: Session, run: SyncRun, plan_limits: Dict):
+        """プランの制限で取得を打ち切った内容を記録"""
+        run.plan_limits = plan_limits
+        db.commit()
+
+    @staticmethod
+    def complete(db: Session, run: SyncRun, merge_stats: Optional[Dict[str, int]] = None):
+        """完了を記録（差分の件数も保存）。チェックポイントは不要になるため削除（ステージングは呼び出し側で削除済み）"""
+        db.query(SyncCheckpoint).filter(SyncCheckpoint.run_id == run.id).delete(synchronize_session=False)
+        run.staging_table = None
+        if merge_stats:
+            run.rows_inserted = merge_stats.get("inserted")
+            run.rows_updated = merge_stats.get("updated")
+            run.rows_deleted = merge_stats.get("deleted")
+            run.rows_unchanged = merge_stats.get("unchanged")
+        run.status = "completed"
+        run.completed_at = datetime.utcnow()
+        db.commit()
+        print(f"[Sync Run] Completed run {run.id} (attempts: {run.attempt_count}, changes: {merge_stats})")
+
+    @staticmethod
+    def latest_run(db: Session, user_id: uuid.UUID, meta_account_id: str) -> Optional[SyncRun]:
+        return db.query(SyncRun).filter(
+            SyncRun.user_id == user_id,
+            SyncRun.meta_account_id == meta_account_id
+        ).order_by(SyncRun.updated_at.desc()).first()
+
+    @staticmethod
+    def latest_requested_run(
+        db: Session,
+        user_id: uuid.UUID,
+        meta_account_id: str,
+        requested_days: Optional[int]
+    ) -> Optional[SyncRun]:
+        """同じ取得日数の指定の直近の実行（実行中の同期に相乗りしたリクエストの結果の参照用）"""
+        query = db.query(SyncRun).filter(
+            SyncRun.user_id == user_id,
+            SyncRun.meta_account_id == meta_account_id
+        )
+        query = SyncRunService._filter_requested_days(query, requested_days)
+        return query.order_by(SyncRun.updated_at.desc()).first()
+
+    @staticmethod
+    def progress(db: Session, run: SyncRun) -> Dict:
+        """実行の進捗（完了済みバッチ数・ステージングに書き込んだ行数）"""
+        completed_batches, fetched_insights = db.query(
+            func.count(SyncCheckpoint.id),
+            func.coalesce(func.sum(SyncCheckpoint.row_count), 0)
+        ).filter(SyncCheckpoint.run_id == run.id).first()
+        return {
+            "run_id": str(run.id),
+            "meta_account_id": run.meta_account_id,
+            "status": run.status,
+            "requested_days": run.requested_days,
+            "since": str(run.since),
+            "until": str(run.until),
+            "attempt_count": run.attempt_count,
+            "completed_batches": completed_batches,
+            "fetched_insights": int(fetched_insights),
+            "rows_inserted": run.rows_inserted,
+            "rows_updated": run.rows_updated,
+            "rows_deleted": run.rows_deleted,
+            "rows_unchanged": run.rows_unchanged,
+            "plan_limits": run.plan_limits,
+            "error_message": run.error_message,
+            "updated_at": run.updated_at.isoformat() + 'Z' if run.updated_at else None,
+        }
+
+    @staticmethod
+    def fail(db: Session, run: SyncRun, error: str):
+        """失敗を記録（チェックポイントとステージングは再開用に残す）"""
+        try:
+            db.rollback()
+            run.status = "failed"
+            run.error_message = error[:2000]
+            db.commit()
+            print(f"[Sync Run] Run {run.id} failed, checkpoints and staging are kept for resume: {error}")
+        except Exception as e:
+            db.rollback()
+            print(f"[Sync Run] ⚠️ Failed to record run failure: {str(e)}")
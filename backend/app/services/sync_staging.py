@@ -0,0 +1,248 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import Column, MetaData, Table, bindparam, text
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import hashlib
+import uuid
+from ..models.campaign import Campaign
+from ..models.sync_run import SyncRun
+from ..database import engine
+from ..config import settings
+
+PARENT_TABLE = "campaigns"
+
+# ステージングテーブルに書き込むカラム（campaignsと同じ並び）
+CAMPAIGN_COLUMNS = [column.name for column in Campaign.__table__.columns]
+# ステージングのみのカラム: 行を書き込んだバッチのチェックポイントID（campaignsには入れ替えない）
+CHECKPOINT_COLUMN = "sync_checkpoint_id"
+# 既存行との照合に使うディメンションキー（+ date）
+MATCH_KEYS = ["campaign_key", "adset_key", "ad_key"]
+# 変更があった行で更新するカラム（id・作成日時・照合キーは維持）
+UPDATE_COLUMNS = [
+    column for column in CAMPAIGN_COLUMNS
+    if column not in ("id", "user_id", "date", "created_at", *MATCH_KEYS)
+]
+# row_hashの対象（指標値。名前はディメンションテーブルで管理し、名前変更はディメンションの更新のみで済む）
+HASH_COLUMNS = [
+    "cost", "impressions", "clicks", "conversions", "conversion_value", "reach",
+    "engagements", "link_clicks", "landing_page_views",
+    "ctr", "cpc", "cpm", "cpa", "cvr", "roas",
+]
+
+class SyncStaging:
+    """
+    Meta同期1回分のデータを書き込むステージングテーブル
+    - 取得・変換中のデータは実行ごとのUNLOGGEDテーブルに書き込み、campaignsには触れない
+    - 検証後に短い1トランザクションで既存データとの差分（INSERT/UPDATE/DELETE）のみを反映し、
+      参照側（MVCC）は旧データか新データのどちらか一方のみを見る（途中状態や空のアカウントは見えない）
+    - 失敗した実行ではcampaignsには何も残らない。ステージングは再開用に残し（チェックポイント済みのバッチの行）、
+      完了時または再開期限の経過後に削除する（プロセスの異常終了で残ったものは sweep_stale で削除）
+    ステージングへの作成・書き込み・削除は同期処理のセッションとは別の接続で即時コミットする
+    """
+
+    @staticmethod
+    def table_name(run_id: uuid.UUID) -> str:
+        return f"{PARENT_TABLE}_stage_{run_id.hex}"
+
+    @staticmethod
+    def table(name: str) -> Table:
+        """INSERT用のテーブル定義（FKや制約はステージングでは不要）"""
+        return Table(
+            name,
+            MetaData(),
+            *[Column(column.name, column.type) for column in Campaign.__table__.columns],
+            Column(CHECKPOINT_COLUMN, UUID(as_uuid=True))
+        )
+
+    @staticmethod
+    def create(run_id: uuid.UUID) -> str:
+        """同期の実行のステージングテーブルを作成（再開時は既存のテーブルをそのまま使う）"""
+        name = SyncStaging.table_name(run_id)
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE UNLOGGED TABLE IF NOT EXISTS {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS, {CHECKPOINT_COLUMN} UUID)"
+            ))
+        print(f"[Sync Staging] Using staging table {name}")
+        return name
+
+    @staticmethod
+    def exists(name: Optional[str]) -> bool:
+        if not name:
+            return False
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+
+    @staticmethod
+    def discard_unconfirmed(name: str, checkpoint_ids: List[uuid.UUID]) -> int:
+        """チェックポイントが保存されていないバッチの行（書き込み途中で失敗したバッチ）を削除"""
+        with engine.begin() as conn:
+            deleted = conn.execute(
+                text(f"DELETE FROM {name} WHERE {CHECKPOINT_COLUMN} IS NULL OR {CHECKPOINT_COLUMN} NOT IN :ids").bindparams(
+                    bindparam("ids", expanding=True)
+                ),
+                {"ids": [str(checkpoint_id) for checkpoint_id in checkpoint_ids]}
+            ).rowcount
+        if deleted:
+            print(f"[Sync Staging] Discarded {deleted} row(s) of unfinished batches from {name}")
+        return deleted
+
+    @staticmethod
+    def compute_row_hash(row: Dict) -> str:
+        """指標値のハッシュ（値が同じならMetaから再取得しても同じハッシュになる）"""
+        values = []
+        for column in HASH_COLUMNS:
+            value = row.get(column)
+            values.append("" if value is None else str(value))
+        return hashlib.md5("\x1f".join(values).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def to_row(campaign: Campaign) -> Dict:
+        """Campaignオブジェクトをステージング用の行に変換（Python側のデフォルト値もここで設定）"""
+        row = {name: getattr(campaign, name) for name in CAMPAIGN_COLUMNS}
+        if row.get("id") is None:
+            row["id"] = uuid.uuid4()
+        if row.get("created_at") is None:
+            row["created_at"] = datetime.utcnow()
+        row["row_hash"] = SyncStaging.compute_row_hash(row)
+        return row
+
+    @staticmethod
+    def insert_rows(name: str, rows: List[Dict], checkpoint_id: uuid.UUID) -> int:
+        """ステージングにまとめて書き込み、すぐにコミット（長いトランザクションを作らない）"""
+        if not rows:
+            return 0
+        for row in rows:
+            row[CHECKPOINT_COLUMN] = checkpoint_id
+        with engine.begin() as conn:
+            conn.execute(SyncStaging.table(name).insert(), rows)
+        return len(rows)
+
+    @staticmethod
+    def summary(db: Session, name: str):
+        """(row_count, min_date, max_date)"""
+        return db.execute(text(f"""
+            SELECT COUNT(*) AS row_count, MIN(date) AS min_date, MAX(date) AS max_date
+            FROM {name}
+        """)).first()
+
+    @staticmethod
+    def validate(db: Session, name: str, expected_count: int, since: date, until: date) -> Tuple[bool, str]:
+        """件数・期間・重複をチェックし、問題があれば理由を返す"""
+        stats = SyncStaging.summary(db, name)
+        if stats.row_count != expected_count:
+            return False, f"row count mismatch (staged={stats.row_count}, expected={expected_count})"
+        if stats.row_count == 0:
+            return True, "no rows"
+        if stats.min_date < since or stats.max_date > until:
+            return False, f"dates out of range ({stats.min_date} ~ {stats.max_date}, expected {since} ~ {until})"
+        duplicate = db.execute(text(f"""
+            SELECT campaign_key, adset_key, ad_key, date, COUNT(*) AS duplicate_count
+            FROM {name}
+            GROUP BY campaign_key, adset_key, ad_key, date
+            HAVING COUNT(*) > 1
+            LIMIT 1
+        """)).first()
+        if duplicate:
+            return False, f"duplicate rows for campaign_key={duplicate.campaign_key} on {duplicate.date}"
+        return True, f"{stats.row_count} rows ({stats.min_date} ~ {stats.max_date})"
+
+    @staticmethod
+    def swap(
+        db: Session,
+        name: str,
+        user_id: uuid.UUID,
+        upload_id: uuid.UUID,
+        account_ids: Iterable[str],
+        since: Optional[date] = None,
+        until: Optional[date] = None
+    ) -> Dict[str, int]:
+        """
+        対象アカウント（期間指定時はその期間のみ）の行をステージングの内容に合わせる
+        ステージングの行は、再開前の試行で書き込んだ行も含めて完了した同期の upload_id にそろえる
+        行は (日付, キャンペーン/広告セット/広告のキー) で照合し、row_hashが変わった行のみUPDATE、
+        新しい行のみINSERT、ステージングにない行のみDELETEする（変わっていない行には書き込まない）
+        同期処理のセッションで実行し、flush済みのディメンションと一緒にコミットする
+        """
+        params = {"user_id": user_id, "account_ids": list(account_ids)}
+        date_clause = ""
+        if since is not None and until is not None:
+            date_clause = " AND c.date >= :since AND c.date <= :until"
+            params.update({"since": since, "until": until})
+        target_clause = f"c.user_id = :user_id AND c.meta_account_id = ANY(:account_ids){date_clause}"
+        # NULLのキー同士も一致させる（COALESCEにすることでハッシュ結合が使える。キーは1以上の連番）
+        key_match = " AND ".join(
+            ["c.date = s.date"] + [f"COALESCE(c.{key}, 0) = COALESCE(s.{key}, 0)" for key in MATCH_KEYS]
+        )
+        columns = ", ".join(CAMPAIGN_COLUMNS)
+        staged_columns = ", ".join(f"s.{column}" for column in CAMPAIGN_COLUMNS)
+        update_set = ", ".join(f"{column} = s.{column}" for column in UPDATE_COLUMNS)
+        try:
+            db.execute(text(f"UPDATE {name} SET upload_id = :upload_id WHERE upload_id IS DISTINCT FROM :upload_id"), {"upload_id": upload_id})
+            staged = db.execute(text(f"SELECT COUNT(*) FROM {name}")).scalar()
+            deleted = db.execute(text(f"""
+                DELETE FROM {PARENT_TABLE} c
+                WHERE {target_clause}
+                  AND NOT EXISTS (SELECT 1 FROM {name} s WHERE {key_match})
+            """), params).rowcount
+            updated = db.execute(text(f"""
+                UPDATE {PARENT_TABLE} c SET {update_set}
+                FROM {name} s
+                WHERE {target_clause} AND {key_match}
+                  AND c.row_hash IS DISTINCT FROM s.row_hash
+            """), params).rowcount
+            inserted = db.execute(text(f"""
+                INSERT INTO {PARENT_TABLE} ({columns})
+                SELECT {staged_columns} FROM {name} s
+                WHERE NOT EXISTS (SELECT 1 FROM {PARENT_TABLE} c WHERE {target_clause} AND {key_match})
+            """), params).rowcount
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        stats = {
+            "inserted": inserted,
+            "updated": updated,
+            "deleted": deleted,
+            "unchanged": max(staged - inserted - updated, 0),
+        }
+        print(f"[Sync Staging] Merged {name}: {stats}")
+        return stats
+
+    @staticmethod
+    def drop(name: str):
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+        except Exception as e:
+            print(f"[Sync Staging] ⚠️ Failed to drop staging table {name}: {str(e)}")
+
+    @staticmethod
+    def sweep_stale(db: Session) -> List[str]:
+        """
+        再開できる実行（未完了かつ再開期限内）から参照されていないステージングテーブルを削除
+        （完了前にプロセスが異常終了した実行や、再開期限を過ぎた実行のテーブル）
+        """
+        if db.get_bind().dialect.name != "postgresql":
+            return []
+        names = [row[0] for row in db.execute(text(
+            "SELECT tablename FROM pg_tables WHERE schemaname = current_schema() AND tablename LIKE :pattern"
+        ), {"pattern": f"{PARENT_TABLE}\\_stage\\_%"})]
+        if not names:
+            return []
+        threshold = datetime.utcnow() - timedelta(hours=settings.SYNC_RUN_RESUME_HOURS)
+        in_use = {row[0] for row in db.query(SyncRun.staging_table).filter(
+            SyncRun.staging_table.in_(names),
+            SyncRun.status.in_(["running", "failed"]),
+            SyncRun.updated_at >= threshold
+        )}
+        db.rollback()
+        dropped = []
+        for name in names:
+            if name in in_use:
+                continue
+            SyncStaging.drop(name)
+            dropped.append(name)
+        if dropped:
+            print(f"[Sync Staging] Dropped {len(dropped)} stale staging table(s): {', '.join(dropped)}")
+        return dropped
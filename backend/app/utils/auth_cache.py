@@ -0,0 +1,196 @@
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session, make_transient_to_detached
+from typing import Dict, NamedTuple, Optional, Tuple
+import select
+import threading
+import time
+import uuid
+from ..models.user import User
+from ..config import settings
+
+class UserPrincipal(NamedTuple):
+    """認証済みユーザーの最小限の情報（ORMオブジェクトを必要としないエンドポイント用）"""
+    id: uuid.UUID
+    email: str
+    plan: str
+    token_version: int
+
+class AuthPrincipalCache:
+    """
+    認証済みユーザーのプロセス内キャッシュ（キー: (ユーザーID, トークンバージョン)、期限: AUTH_PRINCIPAL_CACHE_SECONDS）
+    - 認証のたびに users テーブルを参照しない
+    - ユーザーの更新（プラン・Metaトークン・パスワードなど）はORMのフラッシュ時に自動で削除
+    - パスワードリセット時は token_version を上げるため、発行済みのトークンはキャッシュの有無にかかわらず無効
+    - 他のプロセス（Webワーカー・ジョブワーカー）での更新は Postgres の NOTIFY で通知され、各Webワーカーの
+      AuthInvalidationListener が削除する。リスナーが切断している間はキャッシュを使わない
+    """
+    _entries: Dict[Tuple[uuid.UUID, int], Tuple[float, UserPrincipal, User]] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _snapshot(user: User) -> User:
+        """セッションに属さない読み取り専用のコピー（リクエストごとに Session.merge(load=False) で取り込む）"""
+        columns = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+        snapshot = User(**columns)
+        make_transient_to_detached(snapshot)
+        return snapshot
+
+    @staticmethod
+    def get(user_id: uuid.UUID, token_version: int) -> Optional[Tuple[UserPrincipal, User]]:
+        if not AuthInvalidationListener.is_reliable():
+            return None
+        entry = AuthPrincipalCache._entries.get((user_id, token_version))
+        if entry is None:
+            return None
+        expires_at, principal, snapshot = entry
+        if expires_at < time.monotonic():
+            AuthPrincipalCache._entries.pop((user_id, token_version), None)
+            return None
+        return principal, snapshot
+
+    @staticmethod
+    def put(user: User) -> Tuple[UserPrincipal, User]:
+        """ユーザーをキャッシュに保存し、(principal, キャッシュ用のコピー) を返す（キャッシュ無効時はコピーせずに返す）"""
+        principal = UserPrincipal(
+            id=user.id,
+            email=user.email,
+            plan=user.plan or "FREE",
+            token_version=user.token_version or 0
+        )
+        if settings.AUTH_PRINCIPAL_CACHE_SECONDS <= 0:
+            return principal, user
+        snapshot = AuthPrincipalCache._snapshot(user)
+        expires_at = time.monotonic() + settings.AUTH_PRINCIPAL_CACHE_SECONDS
+        with AuthPrincipalCache._lock:
+            if len(AuthPrincipalCache._entries) >= settings.AUTH_PRINCIPAL_CACHE_MAX_ENTRIES:
+                AuthPrincipalCache._evict_expired()
+            AuthPrincipalCache._entries[(principal.id, principal.token_version)] = (expires_at, principal, snapshot)
+        return principal, snapshot
+
+    @staticmethod
+    def _evict_expired():
+        now = time.monotonic()
+        for key, (expires_at, _, _) in list(AuthPrincipalCache._entries.items()):
+            if expires_at < now:
+                AuthPrincipalCache._entries.pop(key, None)
+        # 期限内のエントリだけで上限に達している場合は全削除（次のリクエストから再取得）
+        if len(AuthPrincipalCache._entries) >= settings.AUTH_PRINCIPAL_CACHE_MAX_ENTRIES:
+            AuthPrincipalCache._entries.clear()
+
+    @staticmethod
+    def invalidate(user_id: uuid.UUID):
+        """ユーザーのキャッシュを全バージョン削除"""
+        with AuthPrincipalCache._lock:
+            for key in [key for key in AuthPrincipalCache._entries if key[0] == user_id]:
+                AuthPrincipalCache._entries.pop(key, None)
+
+    @staticmethod
+    def clear():
+        with AuthPrincipalCache._lock:
+            AuthPrincipalCache._entries.clear()
+
+    @staticmethod
+    def load(db: Session, user_id: uuid.UUID, token_version: int) -> Optional[Tuple[UserPrincipal, User]]:
+        """
+        キャッシュ → DB の順にユーザーを取得（トークンのバージョンが現在のバージョンと異なる場合はNone）
+        返す User はキャッシュ用のコピー（セッションに属さない）。キャッシュ無効時は db で読み込んだもの
+        """
+        cached = AuthPrincipalCache.get(user_id, token_version)
+        if cached is not None:
+            return cached
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is None or (user.token_version or 0) != token_version:
+            return None
+        return AuthPrincipalCache.put(user)
+
+class AuthInvalidationListener:
+    """
+    ユーザーの更新通知（NOTIFY auth_user_changed）を受け取り、このプロセスの AuthPrincipalCache から削除する
+    Webワーカーごとに専用のDB接続（接続プール外）を1本使う。切断中はキャッシュを使わず、再接続時にキャッシュを全削除する
+    """
+    CHANNEL = "auth_user_changed"
+    RECONNECT_DELAY = 5.0
+    _thread: Optional[threading.Thread] = None
+    _stopping = threading.Event()
+    _connected = False
+
+    @staticmethod
+    def is_reliable() -> bool:
+        """キャッシュを使ってよいか（リスナーを起動していないプロセスは単一プロセスとしてキャッシュを使う）"""
+        return AuthInvalidationListener._thread is None or AuthInvalidationListener._connected
+
+    @staticmethod
+    def start():
+        from ..database import engine
+        if engine.dialect.name != "postgresql" or settings.AUTH_PRINCIPAL_CACHE_SECONDS <= 0:
+            return
+        if AuthInvalidationListener._thread is not None:
+            return
+        AuthInvalidationListener._stopping.clear()
+        AuthInvalidationListener._thread = threading.Thread(
+            target=AuthInvalidationListener._run, name="auth-invalidation-listener", daemon=True
+        )
+        AuthInvalidationListener._thread.start()
+
+    @staticmethod
+    def stop():
+        AuthInvalidationListener._stopping.set()
+
+    @staticmethod
+    def _run():
+        from ..database import engine
+        while not AuthInvalidationListener._stopping.is_set():
+            connection = None
+            try:
+                # 接続プールから切り離した専用の接続（プールの接続数を消費しない）
+                connection = engine.raw_connection()
+                connection.detach()
+                dbapi_connection = connection.driver_connection
+                dbapi_connection.autocommit = True
+                with dbapi_connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {AuthInvalidationListener.CHANNEL}")
+                # 切断中の通知は受け取れないため、接続のたびにキャッシュを全削除
+                AuthPrincipalCache.clear()
+                AuthInvalidationListener._connected = True
+                print("[AuthCache] ✅ Listening for user updates")
+                while not AuthInvalidationListener._stopping.is_set():
+                    if select.select([dbapi_connection], [], [], 5.0) == ([], [], []):
+                        continue
+                    dbapi_connection.poll()
+                    while dbapi_connection.notifies:
+                        notify = dbapi_connection.notifies.pop(0)
+                        try:
+                            AuthPrincipalCache.invalidate(uuid.UUID(notify.payload))
+                        except ValueError:
+                            AuthPrincipalCache.clear()
+            except Exception as e:
+                AuthInvalidationListener._connected = False
+                print(f"[AuthCache] ⚠️ Invalidation listener disconnected, cache disabled until reconnect: {str(e)}")
+                AuthInvalidationListener._stopping.wait(AuthInvalidationListener.RECONNECT_DELAY)
+            finally:
+                AuthInvalidationListener._connected = False
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+def _notify_user_changed(connection, user_id: uuid.UUID):
+    """他のプロセスのキャッシュに通知（NOTIFYはトランザクションのコミット時に配信され、ロールバック時は送られない）"""
+    if connection.dialect.name != "postgresql":
+        return
+    connection.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": AuthInvalidationListener.CHANNEL, "payload": str(user_id)}
+    )
+
+@event.listens_for(User, "after_update")
+def _invalidate_updated_user(mapper, connection, target: User):
+    # ユーザーの更新（プラン・Metaトークン・パスワード・設定）をこのプロセスと他のプロセスのキャッシュに反映
+    AuthPrincipalCache.invalidate(target.id)
+    _notify_user_changed(connection, target.id)
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target: User):
+    AuthPrincipalCache.invalidate(target.id)
+    _notify_user_changed(connection, target.id)
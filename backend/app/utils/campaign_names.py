@@ -0,0 +1,32 @@
+import re
+import unicodedata
+
+def normalize_campaign_name(name: str) -> str:
+    """
+    キャンペーン名を正規化（前後のスペース削除、全角・半角の統一、全角数字の半角化）
+    
+    Args:
+        name: 正規化するキャンペーン名
+        
+    Returns:
+        正規化されたキャンペーン名
+    """
+    if not name:
+        return ''
+    
+    # 前後のスペースを削除
+    name = name.strip()
+    
+    # 全角スペースを半角スペースに変換
+    name = name.replace('　', ' ')
+    
+    # 連続するスペースを1つに統一
+    name = re.sub(r'\s+', ' ', name)
+    
+    # 全角数字を半角数字に変換（例: 「１」→「1」）
+    name = ''.join([unicodedata.normalize('NFKC', char) if unicodedata.category(char) == 'Nd' else char for char in name])
+    
+    # 再度前後のスペースを削除（連続スペース削除後のため）
+    name = name.strip()
+    
+    return name
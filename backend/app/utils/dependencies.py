@@ -2,65 +2,62 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from jose import JWTError, jwt
+from typing import Tuple
 import uuid
 from ..database import get_db
 from ..models.user import User
 from ..config import settings
+from .auth_cache import AuthPrincipalCache, UserPrincipal
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _authenticate(token: str, db: Session) -> Tuple[UserPrincipal, User]:
+    """JWTを検証し、キャッシュ（なければDB）からユーザーを取得"""
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.id == uuid.UUID(user_id)).first()
-    if user is None:
-        raise credentials_exception
-    return user
-
-
-
-
-from sqlalchemy.orm import Session
-from jose import JWTError, jwt
-import uuid
-from ..database import get_db
-from ..models.user import User
-from ..config import settings
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+            raise _credentials_exception()
+        # token_version導入前に発行されたトークンはバージョン0として扱う
+        token_version = int(payload.get("ver", 0))
+        user_uuid = uuid.UUID(user_id)
+    except (JWTError, ValueError, TypeError):
+        raise _credentials_exception()
+
+    loaded = AuthPrincipalCache.load(db, user_uuid, token_version)
+    if loaded is None:
+        raise _credentials_exception()
+    return loaded
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ) -> User:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.id == uuid.UUID(user_id)).first()
-    if user is None:
-        raise credentials_exception
+    _, user = _authenticate(token, db)
+    if user not in db:
+        # キャッシュのコピーをSELECTせずにセッションへ取り込む（更新・遅延読み込みは通常どおり可能）
+        user = db.merge(user, load=False)
     return user
+
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> UserPrincipal:
+    """ORMオブジェクトが不要なエンドポイント用（ID・メール・プランのみ）"""
+    principal, _ = _authenticate(token, db)
+    return principal
+
+async def get_current_user_id(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> uuid.UUID:
+    """ユーザーIDのみが必要なエンドポイント用"""
+    principal, _ = _authenticate(token, db)
+    return principal.id
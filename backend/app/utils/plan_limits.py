@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, List, Optional
 
 # プラン別の最大広告セット取得件数
 PLAN_LIMITS = {
@@ -7,15 +7,43 @@ PLAN_LIMITS = {
     "PRO": None  # None = 無制限
 }
 
+# プラン別に同期するデータのレベル（表示できないレベルはMeta APIから取得しない）
+PLAN_SYNC_LEVELS = {
+    "FREE": ["campaign"],
+    "STANDARD": ["campaign"],
+    "PRO": ["campaign", "adset", "ad"]
+}
+
+ALL_SYNC_LEVELS = ["campaign", "adset", "ad"]
+
 def get_max_adset_limit(plan: str) -> Optional[int]:
     """
     プランに応じた最大広告セット取得件数を返す
-    
+
     Args:
         plan: ユーザーのプラン（FREE, STANDARD, PRO）
-    
+
     Returns:
         最大取得件数（Noneの場合は無制限）
     """
-    return PLAN_LIMITS.get(plan.upper(), 100)  # デフォルトは100件
+    return PLAN_LIMITS.get((plan or "FREE").upper(), 100)  # デフォルトは100件
+
+def get_sync_limits(plan: str) -> Dict:
+    """
+    Meta同期に適用するプランの制限を返す
+
+    Args:
+        plan: ユーザーのプラン（FREE, STANDARD, PRO）
 
+    Returns:
+        {"plan", "max_adsets"（広告セットの最大取得件数、Noneは無制限）, "levels"（同期するレベル）, "skipped_levels"}
+        キャンペーンレベルはすべてのプランで件数の上限なし
+    """
+    plan = (plan or "FREE").upper()
+    levels: List[str] = PLAN_SYNC_LEVELS.get(plan, ["campaign"])
+    return {
+        "plan": plan,
+        "max_adsets": get_max_adset_limit(plan),
+        "levels": levels,
+        "skipped_levels": [level for level in ALL_SYNC_LEVELS if level not in levels]
+    }
@@ -0,0 +1,223 @@
+from collections import OrderedDict
+from typing import Optional, Tuple
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from ..config import settings
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:
+    redis_asyncio = None
+
+# レート制限（スライディングウィンドウ・カウンター）
+# キーごとに「現在のウィンドウの回数」と「直前のウィンドウの回数」のみを保持し、
+# 直前の回数を経過時間で按分して推定する: prev * (1 - 経過/period) + curr
+# キーあたりのメモリは一定で、タイムスタンプの一覧は持たない
+
+def sliding_window(window: int, curr: int, prev: int, now_window: int) -> Tuple[int, int]:
+    """保存済みのウィンドウを現在のウィンドウに合わせた (curr, prev) を返す"""
+    if window == now_window:
+        return curr, prev
+    if window == now_window - 1:
+        return 0, curr
+    return 0, 0
+
+def sliding_window_check(curr: int, prev: int, limit: int, period: int, now: float) -> Tuple[bool, int]:
+    """(許可するか, 再試行までの秒数) を返す"""
+    weight = 1 - (now % period) / period
+    if prev * weight + curr < limit:
+        return True, 0
+    return False, max(1, math.ceil(period - now % period))
+
+class MemoryRateLimitBackend:
+    """
+    プロセス内のバックエンド（ワーカー間では共有されない）
+    キー数が max_keys を超えたら、最後のアクセスが最も古いキーから削除（LRU）
+    """
+    def __init__(self, max_keys: int):
+        self.max_keys = max(1, max_keys)
+        self._entries: "OrderedDict[str, Tuple[int, int, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def hit(self, key: str, limit: int, period: int, now: float) -> Tuple[bool, int]:
+        now_window = int(now // period)
+        with self._lock:
+            window, curr, prev = self._entries.pop(key, (now_window, 0, 0))
+            curr, prev = sliding_window(window, curr, prev, now_window)
+            allowed, retry_after = sliding_window_check(curr, prev, limit, period, now)
+            if allowed:
+                curr += 1
+            self._entries[key] = (now_window, curr, prev)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+        return allowed, retry_after
+
+class SharedMemoryRateLimitBackend:
+    """
+    同じサーバーの全ワーカーで共有するバックエンド（共有メモリ上のファイルをmmapし、flockで排他）
+    - 固定長のスロット表（max_keys スロット）のため、キーが増えてもメモリは一定
+    - キーのハッシュで8スロットの組を決め、空きがなければ組の中で最後のアクセスが最も古いスロットを再利用（LRU）
+    """
+    # key_hash(u64), window(i64), curr(u32), prev(u32), last_seen(f64)
+    SLOT = struct.Struct("<QqIId")
+    WAYS = 8
+
+    def __init__(self, path: str, max_keys: int):
+        self.sets = max(1, max_keys // self.WAYS)
+        size = self.sets * self.WAYS * self.SLOT.size
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size != size:
+                # 初回（またはスロット数の変更時）のみ作り直す
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._fd, size)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_hash(key: str) -> int:
+        # 0は空きスロットを表すため使用しない
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") | 1
+
+    async def hit(self, key: str, limit: int, period: int, now: float) -> Tuple[bool, int]:
+        key_hash = self.key_hash(key)
+        now_window = int(now // period)
+        base = (key_hash % self.sets) * self.WAYS
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                target = None
+                entry = None
+                oldest_seen = None
+                for slot in range(base, base + self.WAYS):
+                    offset = slot * self.SLOT.size
+                    slot_hash, window, curr, prev, last_seen = self.SLOT.unpack_from(self._map, offset)
+                    if slot_hash == key_hash:
+                        target, entry = offset, (window, curr, prev)
+                        break
+                    if oldest_seen is None or last_seen < oldest_seen:
+                        target, oldest_seen = offset, last_seen
+                window, curr, prev = entry or (now_window, 0, 0)
+                curr, prev = sliding_window(window, curr, prev, now_window)
+                allowed, retry_after = sliding_window_check(curr, prev, limit, period, now)
+                if allowed:
+                    curr += 1
+                self.SLOT.pack_into(self._map, target, key_hash, now_window, curr, prev, now)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return allowed, retry_after
+
+class RedisRateLimitBackend:
+    """
+    Redisのバックエンド（複数サーバー・全ワーカーで共有）
+    ウィンドウごとのカウンターをLuaスクリプトで原子的に判定・加算し、2ウィンドウ分の期限で自動削除
+    """
+    SCRIPT = """
+local curr = tonumber(redis.call('GET', KEYS[1]) or '0')
+local prev = tonumber(redis.call('GET', KEYS[2]) or '0')
+if prev * tonumber(ARGV[2]) + curr >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+    def __init__(self, url: str):
+        self.client = redis_asyncio.from_url(url)
+        self._script = self.client.register_script(self.SCRIPT)
+
+    async def hit(self, key: str, limit: int, period: int, now: float) -> Tuple[bool, int]:
+        now_window = int(now // period)
+        weight = 1 - (now % period) / period
+        allowed = await self._script(
+            keys=[f"rate_limit:{key}:{now_window}", f"rate_limit:{key}:{now_window - 1}"],
+            args=[limit, weight, period * 2]
+        )
+        if allowed:
+            return True, 0
+        return False, max(1, math.ceil(period - now % period))
+
+def _shared_memory_path() -> str:
+    if settings.RATE_LIMIT_SHARED_PATH:
+        return settings.RATE_LIMIT_SHARED_PATH
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "mieru_rate_limit")
+
+def _local_backend():
+    """Redisを使わない場合のバックエンド（共有メモリが使えない環境ではプロセス内のみ）"""
+    if fcntl is not None:
+        try:
+            return SharedMemoryRateLimitBackend(_shared_memory_path(), settings.RATE_LIMIT_MAX_KEYS)
+        except OSError as e:
+            print(f"[RateLimiter] ⚠️ Shared memory backend unavailable, using per-process limits: {str(e)}")
+    return MemoryRateLimitBackend(settings.RATE_LIMIT_MAX_KEYS)
+
+_backends = {}
+
+def get_rate_limit_backend():
+    """
+    RATE_LIMIT_BACKEND に応じたバックエンド（プロセスごとに1つ）
+    - auto: RATE_LIMIT_REDIS_URL が設定され、redisパッケージがあればRedis、それ以外は共有メモリ
+    - redis / shared / memory: 指定のバックエンド
+    """
+    if "backend" in _backends:
+        return _backends["backend"]
+    mode = settings.RATE_LIMIT_BACKEND
+    redis_url = settings.RATE_LIMIT_REDIS_URL or (settings.REDIS_URL if mode == "redis" else None)
+    if mode in ("auto", "redis") and redis_url and redis_asyncio is not None:
+        backend = RedisRateLimitBackend(redis_url)
+    else:
+        if mode == "redis":
+            print("[RateLimiter] ⚠️ redis package is not installed, falling back to local rate limits")
+        backend = MemoryRateLimitBackend(settings.RATE_LIMIT_MAX_KEYS) if mode == "memory" else _local_backend()
+    print(f"[RateLimiter] Using {type(backend).__name__}")
+    _backends["backend"] = backend
+    return backend
+
+class RateLimiter:
+    """
+    キー（例: クライアントIP）ごとに period 秒あたり limit 回までに制限する
+    Redisが応答しない場合は、そのリクエストのみローカル（共有メモリ）のバックエンドで判定する
+    """
+    def __init__(self, limit: int, period: int, namespace: str, backend=None):
+        self.limit = limit
+        self.period = period
+        self.namespace = namespace
+        self._backend = backend
+        self._fallback = None
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = get_rate_limit_backend()
+        return self._backend
+
+    async def hit(self, key: str, now: Optional[float] = None) -> Tuple[bool, int]:
+        """1回分を記録し、(許可するか, 再試行までの秒数) を返す（拒否した回はカウントしない）"""
+        now = time.time() if now is None else now
+        namespaced_key = f"{self.namespace}:{key}"
+        try:
+            return await self.backend.hit(namespaced_key, self.limit, self.period, now)
+        except Exception as e:
+            if not isinstance(self.backend, RedisRateLimitBackend):
+                raise
+            print(f"[RateLimiter] ⚠️ Redis rate limit failed, using local limits: {str(e)}")
+            if self._fallback is None:
+                self._fallback = _local_backend()
+            return await self._fallback.hit(namespaced_key, self.limit, self.period, now)
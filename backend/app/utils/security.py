@@ -1,9 +1,17 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+import asyncio
+import multiprocessing
+import threading
+import time
+from fastapi import HTTPException, status
 from ..config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash"""
@@ -13,6 +21,110 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+def _verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """(一致したか, BCRYPT_ROUNDSが変わっていれば新しいハッシュ) を返す（プロセスプールで実行）"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+class PasswordHasher:
+    """
+    bcryptのハッシュ化・検証を専用のプロセスプール（PASSWORD_HASH_WORKERS プロセス）で実行する
+    - 1回あたり数百msのCPU処理をWebプロセスのスレッドプール・GILから切り離し、ログインが集中しても他のAPIを遅らせない
+    - 待ちを含めた同時実行数が PASSWORD_HASH_MAX_PENDING を超えたら 503 を返す（キューを無制限に伸ばさない）
+    """
+    _pool: Optional[ProcessPoolExecutor] = None
+    _lock = threading.Lock()
+    _metrics: Dict[str, float] = {
+        "submitted": 0,
+        "completed": 0,
+        "rejected": 0,
+        "in_flight": 0,
+        "max_in_flight": 0,
+        "total_seconds": 0.0,
+        "max_seconds": 0.0,
+    }
+
+    @staticmethod
+    def _get_pool() -> ProcessPoolExecutor:
+        with PasswordHasher._lock:
+            if PasswordHasher._pool is None:
+                # spawn: Webプロセスのスレッド・イベントループを子プロセスに引き継がない
+                PasswordHasher._pool = ProcessPoolExecutor(
+                    max_workers=max(1, settings.PASSWORD_HASH_WORKERS),
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+                print(f"[PasswordHasher] Started process pool ({settings.PASSWORD_HASH_WORKERS} workers, bcrypt rounds: {settings.BCRYPT_ROUNDS})")
+            return PasswordHasher._pool
+
+    @staticmethod
+    async def _run(func, *args):
+        metrics = PasswordHasher._metrics
+        with PasswordHasher._lock:
+            if metrics["in_flight"] >= settings.PASSWORD_HASH_MAX_PENDING:
+                metrics["rejected"] += 1
+                print(f"[PasswordHasher] ⚠️ Queue full ({metrics['in_flight']} pending), rejecting request")
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="ログインが混み合っています。しばらくしてから再度お試しください。",
+                    headers={"Retry-After": "5"}
+                )
+            metrics["submitted"] += 1
+            metrics["in_flight"] += 1
+            metrics["max_in_flight"] = max(metrics["max_in_flight"], metrics["in_flight"])
+        started_at = time.monotonic()
+        try:
+            pool = PasswordHasher._get_pool()
+            return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+        except BrokenProcessPool:
+            # 子プロセスが異常終了したプールは使えないため、次のリクエストで作り直す
+            with PasswordHasher._lock:
+                if PasswordHasher._pool is pool:
+                    PasswordHasher._pool = None
+            print("[PasswordHasher] ❌ Process pool broken, it will be restarted on the next request")
+            raise
+        finally:
+            elapsed = time.monotonic() - started_at
+            with PasswordHasher._lock:
+                metrics["in_flight"] -= 1
+                metrics["completed"] += 1
+                metrics["total_seconds"] += elapsed
+                metrics["max_seconds"] = max(metrics["max_seconds"], elapsed)
+
+    @staticmethod
+    async def hash(password: str) -> str:
+        return await PasswordHasher._run(get_password_hash, password)
+
+    @staticmethod
+    async def verify(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """(一致したか, 再ハッシュが必要な場合の新しいハッシュ) を返す"""
+        return await PasswordHasher._run(_verify_and_update, plain_password, hashed_password)
+
+    @staticmethod
+    def metrics() -> Dict:
+        """キューの状況（待ちを含む実行中の件数・処理時間）"""
+        with PasswordHasher._lock:
+            metrics = dict(PasswordHasher._metrics)
+        workers = max(1, settings.PASSWORD_HASH_WORKERS)
+        return {
+            "workers": workers,
+            "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+            "max_pending": settings.PASSWORD_HASH_MAX_PENDING,
+            "in_flight": int(metrics["in_flight"]),
+            "queued": max(0, int(metrics["in_flight"]) - workers),
+            "max_in_flight": int(metrics["max_in_flight"]),
+            "submitted": int(metrics["submitted"]),
+            "completed": int(metrics["completed"]),
+            "rejected": int(metrics["rejected"]),
+            "avg_ms": round(metrics["total_seconds"] / metrics["completed"] * 1000, 1) if metrics["completed"] else 0.0,
+            "max_ms": round(metrics["max_seconds"] * 1000, 1),
+        }
+
+    @staticmethod
+    def shutdown():
+        with PasswordHasher._lock:
+            if PasswordHasher._pool is not None:
+                PasswordHasher._pool.shutdown(wait=False, cancel_futures=True)
+                PasswordHasher._pool = None
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -23,7 +135,3 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
-
-
-
-
@@ -0,0 +1,58 @@
+from sqlalchemy import text
+from typing import Dict, List
+import importlib
+import time
+from ..database import engine
+
+# 起動時には読み込まず、初回の利用時に読み込む重いライブラリ（アップロード・レポート・AI分析・メール）
+HEAVY_MODULES: List[str] = [
+    "pandas",
+    "openpyxl",
+    "reportlab.platypus",
+    "openai",
+    "resend",
+]
+
+def preload_modules() -> Dict[str, float]:
+    """重いライブラリを読み込み、モジュールごとの所要時間（ms）を返す（未インストールのものはスキップ）"""
+    timings = {}
+    for name in HEAVY_MODULES:
+        started_at = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            print(f"[Warmup] ⚠️ {name} is not installed, skipping")
+            continue
+        timings[name] = round((time.perf_counter() - started_at) * 1000, 1)
+    return timings
+
+def open_db_connections() -> int:
+    """接続プールのサイズ分の接続を開いておく（最初のリクエストで接続を待たない）"""
+    size = engine.pool.size() if hasattr(engine.pool, "size") else 1
+    connections = []
+    try:
+        for _ in range(max(1, size)):
+            conn = engine.connect()
+            connections.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        # 閉じるとプールに戻り、次のリクエストで再利用される
+        for conn in connections:
+            conn.close()
+    return len(connections)
+
+def warm_up() -> Dict:
+    """
+    WARMUP_ON_STARTUP=true の場合にワーカーの起動時（リクエストの受け付け前）に実行
+    起動は遅くなるが、各ワーカーの最初のアップロード・レポート・分析リクエストが速くなる
+    """
+    started_at = time.perf_counter()
+    result = {"modules": {}, "db_connections": 0}
+    try:
+        result["modules"] = preload_modules()
+        result["db_connections"] = open_db_connections()
+        print(f"[Warmup] ✅ Preloaded {len(result['modules'])} module(s) and opened {result['db_connections']} DB connection(s) in {time.perf_counter() - started_at:.2f}s")
+    except Exception as e:
+        # ウォームアップの失敗で起動を止めない（初回のリクエストで通常どおり読み込む）
+        print(f"[Warmup] ⚠️ Failed: {str(e)}")
+    return result
@@ -0,0 +1,117 @@
+"""
+バックグラウンドジョブのワーカー
+
+    python -m app.worker
+
+jobsテーブルからジョブを取得して実行する（Webプロセスとは別プロセスで起動）
+複数プロセスを起動しても SELECT ... FOR UPDATE SKIP LOCKED により同じジョブは1回だけ実行される
+"""
+import asyncio
+import os
+import signal
+import socket
+import time
+import traceback
+import uuid
+from typing import Dict, Optional
+from .config import settings
+from .database import SessionLocal
+from . import models  # すべてのモデルを登録
+from .models.job import Job
+from .services.job_queue import JobQueue
+from .services.job_handlers import JOB_HANDLERS
+from .services.report_artifacts import ReportArtifactService
+from .services.sync_staging import SyncStaging
+
+class Worker:
+    def __init__(self, concurrency: Optional[int] = None):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.concurrency = max(1, concurrency or settings.JOB_WORKER_CONCURRENCY)
+        self.running: Dict[uuid.UUID, asyncio.Task] = {}
+        self.stopping = False
+
+    def stop(self):
+        print(f"[Worker] Stop requested, waiting for {len(self.running)} running job(s)...")
+        self.stopping = True
+
+    async def run_job(self, job_id: uuid.UUID):
+        db = SessionLocal()
+        started_at = time.monotonic()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            handler = JOB_HANDLERS.get(job.job_type)
+            print(f"[Worker] Running {job.job_type} job {job.id} (attempt {job.attempts}/{job.max_attempts})")
+            try:
+                if handler is None:
+                    raise ValueError(f"Unknown job type: {job.job_type}")
+                result = await handler(job, db)
+                db.rollback()  # ハンドラー内の未コミットの状態を破棄してからジョブを更新
+                JobQueue.complete(db, job, result)
+                print(f"[Worker] ✅ {job.job_type} job {job.id} completed in {time.monotonic() - started_at:.1f}s")
+            except Exception as e:
+                print(f"[Worker] ❌ {job.job_type} job {job.id} failed: {str(e)}")
+                print(f"[Worker] Error details: {traceback.format_exc()}")
+                db.rollback()
+                JobQueue.fail(db, job, str(e))
+        except Exception as e:
+            print(f"[Worker] ⚠️ Failed to update job {job_id}: {str(e)}")
+        finally:
+            db.close()
+
+    def claim_jobs(self):
+        """空きスロット分のジョブを取得して実行開始"""
+        db = SessionLocal()
+        try:
+            while len(self.running) < self.concurrency:
+                job = JobQueue.claim(db, self.worker_id, JOB_HANDLERS.keys())
+                if not job:
+                    break
+                job_id = job.id
+                self.running[job_id] = asyncio.create_task(self.run_job(job_id))
+        finally:
+            db.close()
+
+    def maintain(self):
+        """実行中ジョブのハートビート更新、停止したワーカーのジョブの再キュー、期限切れレポート・古いステージングテーブルの削除"""
+        db = SessionLocal()
+        try:
+            JobQueue.heartbeat(db, list(self.running.keys()))
+            JobQueue.requeue_stale(db)
+            ReportArtifactService.purge_expired(db)
+            SyncStaging.sweep_stale(db)
+        except Exception as e:
+            db.rollback()
+            print(f"[Worker] ⚠️ Maintenance failed: {str(e)}")
+        finally:
+            db.close()
+
+    async def run(self):
+        print(f"[Worker] Started {self.worker_id} (concurrency={self.concurrency}, job types={sorted(JOB_HANDLERS.keys())})")
+        last_maintenance = 0.0
+        while not self.stopping or self.running:
+            for job_id, task in list(self.running.items()):
+                if task.done():
+                    del self.running[job_id]
+            if time.monotonic() - last_maintenance >= settings.JOB_HEARTBEAT_SECONDS:
+                self.maintain()
+                last_maintenance = time.monotonic()
+            if not self.stopping:
+                try:
+                    self.claim_jobs()
+                except Exception as e:
+                    print(f"[Worker] ⚠️ Failed to claim jobs: {str(e)}")
+            await asyncio.sleep(settings.JOB_POLL_INTERVAL_SECONDS)
+        print(f"[Worker] Stopped {self.worker_id}")
+
+async def main():
+    worker = Worker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:
+            pass  # Windowsではシグナルハンドラーを登録できない
+    await worker.run()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Excelレポートの生成時間とメモリ使用量を、書式付き（通常モード）と書き込み専用モードで比較するスクリプト
+- rich: Workbookをメモリ上に作成し、全セルを走査して列幅を調整（EXCEL_STREAMING_MIN_ROWS 以下の場合）
+- streaming: 書き込み専用モード（行は一時ファイルに書き出し、列幅は先頭の行から決定）
+- export: /api/campaigns/export?format=xlsx と同じ1シートの表
+各計測は別プロセスで実行し、プロセスの最大RSSを比較する
+
+使い方: python benchmark_excel.py [行数 ...]
+"""
+import io
+import os
+import resource
+import subprocess
+import sys
+import time
+
+# プロジェクトルートをパスに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)
+
+def make_campaigns(rows: int) -> list:
+    return [
+        {
+            "campaign_name": f"キャンペーン_{i:06d}_春のセール",
+            "cost": 12345.67 + i,
+            "impressions": 100000 + i,
+            "clicks": 1000 + i % 100,
+            "conversions": i % 50,
+            "ctr": 1.23,
+            "cpc": 45.6,
+            "cpa": 789.0,
+            "cvr": 2.34,
+            "roas": 321.0,
+        }
+        for i in range(rows)
+    ]
+
+def run_one(mode: str, rows: int):
+    """子プロセスで1回計測して結果を出力"""
+    from app.config import settings
+    from app.services.report_service import ReportService
+
+    summary = {"period": {"start_date": "2025-01-01", "end_date": "2025-12-31"}, "totals": {}, "averages": {}}
+    trends = [{"date": f"2025-01-{d % 28 + 1:02d}", "cost": 1000, "impressions": 1, "clicks": 1, "conversions": 1} for d in range(365)]
+    started = time.perf_counter()
+    if mode == "rich":
+        settings.EXCEL_STREAMING_MIN_ROWS = 10 ** 9
+        size = len(ReportService.generate_excel_report(summary, make_campaigns(rows), trends))
+    elif mode == "streaming":
+        settings.EXCEL_STREAMING_MIN_ROWS = 0
+        size = len(ReportService.generate_excel_report(summary, make_campaigns(rows), trends))
+    else:
+        headers = ["date", "campaign_name", "cost", "impressions", "clicks", "conversions"]
+        generated = (("2025-01-01", f"キャンペーン_{i:06d}", 1234.5, i, i % 100, i % 7) for i in range(rows))
+        output = io.BytesIO()
+        ReportService.write_excel_rows(output, "campaigns", headers, generated)
+        size = output.tell()
+    elapsed = time.perf_counter() - started
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{elapsed:.2f} {max_rss_mb:.1f} {size}")
+
+def main(row_counts: list):
+    for rows in row_counts:
+        print(f"\n{rows:,} 行")
+        for mode in ("rich", "streaming", "export"):
+            result = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--run", mode, str(rows)],
+                cwd=script_dir,
+                capture_output=True,
+                text=True
+            )
+            if result.returncode != 0:
+                print(f"  {mode:>10}: ❌ {result.stderr.strip().splitlines()[-1]}")
+                continue
+            elapsed, max_rss_mb, size = result.stdout.strip().splitlines()[-1].split()
+            print(f"  {mode:>10}: {float(elapsed):6.2f}s, max RSS {float(max_rss_mb):7.1f} MB, {int(size) / 1e6:6.2f} MB xlsx")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--run":
+        run_one(sys.argv[2], int(sys.argv[3]))
+    else:
+        print("=" * 80)
+        print("Excelレポートのベンチマーク")
+        print("=" * 80)
+        main([int(arg) for arg in sys.argv[1:]] or [10000, 100000])
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+app.main のインポート時間（サーバー・ワーカーの起動時間）を python -X importtime で計測するスクリプト
+- [1] 合計のインポート時間と、累積時間の大きいモジュール
+- [2] 初回の利用時に読み込むはずの重いライブラリ（pandas・openpyxl・reportlab・openai・resend）が読み込まれていないかの確認
+- [3] 重いライブラリの読み込み時間（WARMUP_ON_STARTUP=true の場合に起動時に払うコスト）
+
+使い方: python benchmark_importtime.py [表示するモジュール数]
+重いライブラリが app.main のインポートで読み込まれている場合は終了コード1
+"""
+import os
+import subprocess
+import sys
+
+# プロジェクトルートをパスに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)
+
+from app.utils.warmup import HEAVY_MODULES
+
+def run_importtime() -> list:
+    """子プロセスで app.main をインポートし、(モジュール名, 自身の時間µs, 累積時間µs) のリストを返す"""
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite:////tmp/benchmark_importtime.db")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=script_dir,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        sys.exit(1)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+def main(top: int) -> int:
+    print("\n[1/3] app.main のインポート時間")
+    rows = run_importtime()
+    total = next((cumulative for name, _, cumulative in rows if name == "app.main"), 0)
+    print(f"  app.main: {total / 1000:8.1f} ms ({len(rows)} modules)")
+    # 直接インポートしたモジュール（app.* とトップレベルのパッケージ）を累積時間の順に表示
+    top_level = [row for row in rows if "." not in row[0] or row[0].startswith("app.")]
+    for name, _, cumulative in sorted(top_level, key=lambda row: row[2], reverse=True)[1:top + 1]:
+        print(f"  {name:<50} {cumulative / 1000:8.1f} ms")
+
+    print("\n[2/3] 重いライブラリが起動時に読み込まれていないか")
+    imported = {name for name, _, _ in rows}
+    eager = [module for module in HEAVY_MODULES if module.split(".")[0] in imported]
+    for module in HEAVY_MODULES:
+        status = "❌ imported at startup" if module in eager else "✅ lazy"
+        print(f"  {module:<20} {status}")
+
+    print("\n[3/3] 重いライブラリの読み込み時間（初回利用時 / ウォームアップ時）")
+    for module in HEAVY_MODULES:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True
+        )
+        if result.returncode != 0:
+            print(f"  {module:<20} not installed")
+            continue
+        last = [line for line in result.stderr.splitlines() if line.startswith("import time:")][-1]
+        print(f"  {module:<20} {int(last.split('|')[1]) / 1000:8.1f} ms")
+
+    return 1 if eager else 0
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("インポート時間のベンチマーク")
+    print("=" * 80)
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 15))
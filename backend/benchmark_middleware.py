@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+ミドルウェアの1リクエストあたりのオーバーヘッドを計測するスクリプト
+- before: 従来の BaseHTTPMiddleware の3層（HTTPSリダイレクト修正・セキュリティヘッダー・レート制限）
+- after: app/middleware/security.py の純粋なASGIミドルウェア
+- none: ミドルウェアなし（基準）
+いずれもCORSミドルウェアを最も外側に置き、HTTPサーバーを介さずASGIアプリを直接呼び出して計測します
+
+使い方: python benchmark_middleware.py [リクエスト数]
+"""
+import asyncio
+import os
+import sys
+import time
+from collections import defaultdict
+
+# プロジェクトルートをパスに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from app.middleware.security import RateLimitMiddleware, SecurityHeadersMiddleware
+
+ORIGIN = "http://localhost:3000"
+
+# ===== 従来のミドルウェア（比較用にそのまま再現） =====
+class LegacyHTTPSRedirectMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        if response.status_code in [301, 302, 307, 308]:
+            location = response.headers.get("location", "")
+            if location and location.startswith("http://") and "localhost" not in location and "127.0.0.1" not in location:
+                response.headers["location"] = location.replace("http://", "https://", 1)
+        return response
+
+class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        if response.status_code in [301, 302, 307, 308]:
+            location = response.headers.get("location", "")
+            if location and location.startswith("http://") and "localhost" not in location and "127.0.0.1" not in location:
+                response.headers["location"] = location.replace("http://", "https://", 1)
+        has_cors_headers = any(header.lower().startswith('access-control-') for header in response.headers.keys())
+        if not has_cors_headers:
+            if "X-Content-Type-Options" not in response.headers:
+                response.headers["X-Content-Type-Options"] = "nosniff"
+            if "X-Frame-Options" not in response.headers:
+                response.headers["X-Frame-Options"] = "DENY"
+            if "X-XSS-Protection" not in response.headers:
+                response.headers["X-XSS-Protection"] = "1; mode=block"
+            if "Strict-Transport-Security" not in response.headers:
+                response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+        return response
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, calls: int = 60, period: int = 60):
+        super().__init__(app)
+        self.calls = calls
+        self.period = period
+        self.cache = defaultdict(list)
+
+    async def dispatch(self, request: Request, call_next):
+        if request.url.path in ["/health", "/docs", "/openapi.json", "/redoc"] or request.method == "OPTIONS":
+            return await call_next(request)
+        if not (request.url.path == "/api/auth/login" and request.method == "POST"):
+            return await call_next(request)
+        client_ip = request.client.host
+        now = time.time()
+        self.cache[client_ip] = [t for t in self.cache[client_ip] if now - t < self.period]
+        if len(self.cache[client_ip]) >= self.calls:
+            return JSONResponse(status_code=429, content={"detail": "rate limited"})
+        self.cache[client_ip].append(now)
+        return await call_next(request)
+
+def build_app(variant: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/campaigns/summary")
+    async def summary():
+        return {"impressions": 1000, "clicks": 10, "spend": 1234.5}
+
+    if variant == "before":
+        app.add_middleware(LegacyHTTPSRedirectMiddleware)
+        app.add_middleware(LegacySecurityHeadersMiddleware)
+        app.add_middleware(LegacyRateLimitMiddleware, calls=1000000, period=60)
+    elif variant == "after":
+        app.add_middleware(SecurityHeadersMiddleware)
+        app.add_middleware(RateLimitMiddleware, calls=1000000, period=60, paths=[("POST", "/api/auth/login")])
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[ORIGIN],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    return app
+
+async def call(app, path: str) -> int:
+    """ASGIアプリを直接呼び出し、ステータスコードを返す"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"origin", ORIGIN.encode())],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    status = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+
+    await app(scope, receive, send)
+    return status["code"]
+
+async def measure(variant: str, requests: int) -> float:
+    app = build_app(variant)
+    # ウォームアップ（ミドルウェアスタックの構築を計測から除外）
+    for _ in range(200):
+        assert await call(app, "/api/campaigns/summary") == 200
+    started = time.perf_counter()
+    for _ in range(requests):
+        await call(app, "/api/campaigns/summary")
+    return (time.perf_counter() - started) / requests * 1_000_000
+
+async def main(requests: int):
+    results = {}
+    for variant in ("none", "before", "after"):
+        results[variant] = await measure(variant, requests)
+    print("=" * 80)
+    print(f"ミドルウェアのオーバーヘッド（{requests}リクエスト、1リクエストあたり）")
+    print("=" * 80)
+    for variant, micros in results.items():
+        overhead = micros - results["none"]
+        print(f"{variant:>7}: {micros:8.1f} µs/request  (middleware overhead: {overhead:+8.1f} µs)")
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
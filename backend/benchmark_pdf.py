@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+PDFレポートの生成時間とファイルサイズを計測するスクリプト
+- [1] フォントの登録を毎回行う場合（キャッシュなし）と、プロセス内で1回だけ行う場合（キャッシュあり）の生成時間
+- [2] 日本語フォントごとのPDFのサイズ（TrueTypeはサブセット埋め込み、CIDフォントは埋め込みなし）
+
+使い方: PDF_FONT_PATH=/path/to/ipaexg.ttf python benchmark_pdf.py [回数]
+"""
+import os
+import sys
+import time
+
+# プロジェクトルートをパスに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)
+
+from app.config import settings
+from app.services import report_service
+from app.services.report_service import ReportService, register_japanese_fonts
+
+ANALYSIS = {
+    "campaign_name": None,
+    "overall_rating": 4,
+    "overall_comment": "全体としてCPAは目標内で推移していますが、一部キャンペーンのCTRが低下しています。",
+    "issues": [{"issue": "CTRの低下", "impact": "クリック単価が上昇しています", "severity": "高"}],
+    "recommendations": [{"category": "クリエイティブ", "title": "画像の差し替え", "description": "反応の良い訴求に寄せる", "expected_impact": "CTR +20%", "difficulty": 2}],
+    "action_plan": [{"step": "1", "action": "クリエイティブの入れ替え", "timeline": "1週間", "responsible": "運用担当"}],
+}
+CAMPAIGNS = [{"campaign_name": f"春のセール_{i}", "cost": 120000 + i, "conversions": 30 + i, "roas": 350.0, "cpa": 4000.0} for i in range(10)]
+
+def render() -> bytes:
+    return ReportService.generate_pdf_report("テストユーザー", ANALYSIS, {}, CAMPAIGNS)
+
+def measure(label: str, count: int, clear_cache: bool):
+    samples = []
+    size = 0
+    for _ in range(count):
+        if clear_cache:
+            register_japanese_fonts.cache_clear()
+        started = time.perf_counter()
+        size = len(render())
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    print(f"  {label:<28} median {samples[len(samples) // 2] * 1000:7.1f} ms, max {samples[-1] * 1000:7.1f} ms, {size / 1024:7.1f} KB")
+
+def main(count: int):
+    print(f"\n[1/2] 生成時間（{count}回、フォント: {settings.PDF_FONT_PATH or '自動検出'}）")
+    measure("font registered every call", count, clear_cache=True)
+    measure("font cached per process", count, clear_cache=False)
+
+    print("\n[2/2] フォントごとのファイルサイズ")
+    font_file = settings.PDF_FONT_PATH
+    if font_file and os.path.exists(font_file):
+        print(f"  font file                    {os.path.getsize(font_file) / 1024:7.1f} KB ({font_file})")
+    register_japanese_fonts.cache_clear()
+    print(f"  TrueType (subset embedded)   {len(render()) / 1024:7.1f} KB (font: {register_japanese_fonts()})")
+    # TrueTypeフォントが見つからない環境と同じ状態（CIDフォント）
+    settings.PDF_FONT_PATH = None
+    original = report_service._japanese_font_candidates
+    report_service._japanese_font_candidates = lambda: []
+    register_japanese_fonts.cache_clear()
+    print(f"  CID (not embedded)           {len(render()) / 1024:7.1f} KB (font: {register_japanese_fonts()})")
+    report_service._japanese_font_candidates = original
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("PDFレポートのベンチマーク")
+    print("=" * 80)
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
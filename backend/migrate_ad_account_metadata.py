@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Meta広告アカウントのメタデータとデータ件数のカラムを ad_accounts に追加するスクリプト
+- timezone_name / timezone_offset_hours / currency / account_status / is_accessible / metadata_refreshed_at:
+  Meta APIから取得したアカウント情報のキャッシュ（AD_ACCOUNT_METADATA_TTL_HOURSごとに再取得）
+- data_count / campaign_count / latest_date / stats_refreshed_at: campaignsのデータ件数（同期・削除のたびに更新）
+既存のアカウントは、次回のアカウント一覧の取得時にメタデータとデータ件数が保存されます
+"""
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)
+
+from app.database import engine
+from sqlalchemy import text
+
+COLUMNS = [
+    ("timezone_name", "VARCHAR(64)"),
+    ("timezone_offset_hours", "DOUBLE PRECISION"),
+    ("currency", "VARCHAR(8)"),
+    ("account_status", "INTEGER"),
+    ("is_accessible", "BOOLEAN NOT NULL DEFAULT TRUE"),
+    ("metadata_refreshed_at", "TIMESTAMP"),
+    ("data_count", "INTEGER"),
+    ("campaign_count", "INTEGER"),
+    ("latest_date", "DATE"),
+    ("stats_refreshed_at", "TIMESTAMP"),
+]
+
+def migrate_ad_account_metadata():
+    """ad_accountsにメタデータ・データ件数のカラムを追加"""
+    print("\n[1/2] データベース接続を確認中...")
+    try:
+        with engine.connect() as conn:
+            print("[1/2] ✅ データベース接続成功")
+            
+            # トランザクション開始
+            trans = conn.begin()
+            
+            try:
+                for col_name, col_type in COLUMNS:
+                    print(f"\n[2/2] ad_accounts.{col_name}カラムを追加中...")
+                    conn.execute(text(f"ALTER TABLE ad_accounts ADD COLUMN IF NOT EXISTS {col_name} {col_type};"))
+                    print(f"[2/2] ✅ {col_name}カラムを追加しました（既に存在する場合はスキップ）")
+                
+                # コミット
+                trans.commit()
+                return True
+                
+            except Exception as e:
+                trans.rollback()
+                raise e
+                
+    except Exception as e:
+        print(f"\n❌ エラーが発生しました: {e}")
+        import traceback
+        print(f"\n詳細なエラー情報:")
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("データベースマイグレーション: ad_accounts メタデータ・データ件数カラム追加")
+    print("=" * 80)
+    
+    if migrate_ad_account_metadata():
+        print("\n✅ マイグレーション完了")
+    else:
+        print("\n❌ マイグレーション失敗")
+        sys.exit(1)
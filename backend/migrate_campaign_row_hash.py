@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Meta同期の差分書き込み用のカラムを追加するスクリプト
+- campaigns.row_hash: 名前・指標値のハッシュ（変わっていない行は同期時に書き込まない）
+- sync_runs.rows_inserted / rows_updated / rows_deleted / rows_unchanged: 同期ごとの差分の件数
+既存の行はrow_hashがNULLのため、次回の同期で1回だけUPDATEされます
+"""
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)
+
+from app.database import engine
+from sqlalchemy import text
+
+def migrate_campaign_row_hash():
+    """row_hashカラムと差分件数カラムを追加"""
+    print("\n[1/3] データベース接続を確認中...")
+    try:
+        with engine.connect() as conn:
+            print("[1/3] ✅ データベース接続成功")
+            
+            # トランザクション開始
+            trans = conn.begin()
+            
+            try:
+                print("\n[2/3] campaigns.row_hashカラムを追加中...")
+                conn.execute(text("ALTER TABLE campaigns ADD COLUMN IF NOT EXISTS row_hash VARCHAR(32);"))
+                print("[2/3] ✅ row_hashカラムを追加しました（既に存在する場合はスキップ）")
+                
+                for col_name in ["rows_inserted", "rows_updated", "rows_deleted", "rows_unchanged"]:
+                    print(f"\n[3/3] sync_runs.{col_name}カラムを追加中...")
+                    conn.execute(text(f"ALTER TABLE sync_runs ADD COLUMN IF NOT EXISTS {col_name} INTEGER;"))
+                    print(f"[3/3] ✅ {col_name}カラムを追加しました（既に存在する場合はスキップ）")
+                
+                # コミット
+                trans.commit()
+                return True
+                
+            except Exception as e:
+                trans.rollback()
+                raise e
+                
+    except Exception as e:
+        print(f"\n❌ エラーが発生しました: {e}")
+        import traceback
+        print(f"\n詳細なエラー情報:")
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("データベースマイグレーション: campaigns.row_hash / sync_runs差分件数カラム追加")
+    print("=" * 80)
+    
+    if migrate_campaign_row_hash():
+        print("\n✅ マイグレーション完了")
+    else:
+        print("\n❌ マイグレーション失敗")
+        sys.exit(1)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+campaignsテーブルを月次RANGEパーティションテーブルに移行するスクリプト
+- 既存のcampaignsテーブルを campaigns_legacy にリネーム
+- パーティション親テーブル（主キー: id, date）を作成し、データ期間分の月次パーティションとデフォルトパーティションを作成
+- campaigns_legacy からデータを移動し、件数を検証
+- 検証後に campaigns_legacy を削除（--keep-legacy 指定時は残す）
+"""
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)
+
+from app.database import engine
+from app.models.campaign import Campaign
+from app.services.partition_service import PartitionService, DEFAULT_PARTITION
+from sqlalchemy import text
+from datetime import datetime
+
+def migrate_campaigns_partitioning(keep_legacy: bool = False):
+    """campaignsテーブルをパーティションテーブルに移行"""
+    print("\n[1/5] データベース接続を確認中...")
+    try:
+        with engine.connect() as conn:
+            print("[1/5] ✅ データベース接続成功")
+            
+            if PartitionService.is_partitioned(conn):
+                print("[1/5] ✅ campaignsテーブルは既にパーティションテーブルです")
+                return True
+            
+            # トランザクション開始
+            trans = conn.begin()
+            
+            try:
+                print("\n[2/5] 既存テーブルを campaigns_legacy にリネーム中...")
+                conn.execute(text("ALTER TABLE campaigns RENAME TO campaigns_legacy"))
+                # インデックス名（主キーを含む）が新テーブルと衝突しないようにリネーム
+                index_names = conn.execute(text("""
+                    SELECT indexname FROM pg_indexes WHERE tablename = 'campaigns_legacy'
+                """)).fetchall()
+                for (index_name,) in index_names:
+                    conn.execute(text(f'ALTER INDEX "{index_name}" RENAME TO "{index_name}_legacy"'))
+                print(f"[2/5] ✅ リネーム完了（インデックス{len(index_names)}件）")
+                
+                print("\n[3/5] パーティション親テーブルを作成中...")
+                Campaign.__table__.create(bind=conn)
+                conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF campaigns DEFAULT"))
+                
+                date_range = conn.execute(text("SELECT MIN(date), MAX(date) FROM campaigns_legacy")).first()
+                today = datetime.utcnow().date()
+                min_date = date_range[0] or today
+                max_date = max(date_range[1] or today, today)
+                month = PartitionService.month_start(min_date)
+                last_month = PartitionService.add_months(PartitionService.month_start(max_date), 3)
+                partition_count = 0
+                while month <= last_month:
+                    PartitionService._create_month_partition(conn, month)
+                    partition_count += 1
+                    month = PartitionService.add_months(month, 1)
+                print(f"[3/5] ✅ 月次パーティション{partition_count}件を作成しました（{min_date} ~ {last_month}）")
+                
+                print("\n[4/5] データを移動中...")
+                legacy_columns = set(row[0] for row in conn.execute(text("""
+                    SELECT column_name FROM information_schema.columns WHERE table_name = 'campaigns_legacy'
+                """)).fetchall())
+                columns = [c.name for c in Campaign.__table__.columns if c.name in legacy_columns]
+                column_list = ", ".join(columns)
+                conn.execute(text(f"INSERT INTO campaigns ({column_list}) SELECT {column_list} FROM campaigns_legacy"))
+                legacy_count = conn.execute(text("SELECT COUNT(*) FROM campaigns_legacy")).scalar()
+                new_count = conn.execute(text("SELECT COUNT(*) FROM campaigns")).scalar()
+                if legacy_count != new_count:
+                    raise Exception(f"件数が一致しません: legacy={legacy_count}, partitioned={new_count}")
+                print(f"[4/5] ✅ {new_count}件のレコードを移動しました")
+                
+                print("\n[5/5] campaigns_legacy の後処理...")
+                if keep_legacy:
+                    print("[5/5] ⚠️ --keep-legacy が指定されたため campaigns_legacy を残します")
+                else:
+                    conn.execute(text("DROP TABLE campaigns_legacy"))
+                    print("[5/5] ✅ campaigns_legacy を削除しました")
+                
+                # コミット
+                trans.commit()
+                print("\n✅ マイグレーション完了")
+                return True
+                
+            except Exception as e:
+                trans.rollback()
+                raise e
+                
+    except Exception as e:
+        print(f"\n❌ エラーが発生しました: {e}")
+        import traceback
+        print(f"\n詳細なエラー情報:")
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("データベースマイグレーション: campaignsテーブルの月次パーティション化")
+    print("=" * 80)
+    
+    if migrate_campaigns_partitioning(keep_legacy="--keep-legacy" in sys.argv):
+        print("\n✅ マイグレーション完了")
+    else:
+        print("\n❌ マイグレーション失敗")
+        sys.exit(1)
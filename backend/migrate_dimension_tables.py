@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+ディメンションテーブル（ad_accounts / ad_campaigns / ad_sets / ads）を作成し、
+campaignsテーブルに整数キー（account_key / campaign_key / adset_key / ad_key）を追加してバックフィルするスクリプト
+- 既存データにはMetaのオブジェクトIDがないため、名前によるサロゲートキーで登録する
+- 次回のMeta API同期時に、同じ名前のディメンションはMeta IDに昇格される
+- バックフィル後、campaignsテーブルから名前のカラム（campaign_name / ad_set_name / ad_name）を削除する
+  （名前はディメンションテーブルからのみ参照する。row_hashの対象から名前が外れるため、次回の同期では既存の行が1回だけUPDATEされる）
+- 削除前のカラム定義で作成された同期のステージングテーブルも削除する（未完了の同期は次回最初から取得）
+"""
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)
+
+from app.database import engine, SessionLocal
+from app.models.dimension import AdAccount, AdCampaign, AdSet, Ad
+from app.services.dimension_service import DimensionResolver
+from sqlalchemy import text
+
+KEY_COLUMNS = [
+    ("account_key", "ad_accounts"),
+    ("campaign_key", "ad_campaigns"),
+    ("adset_key", "ad_sets"),
+    ("ad_key", "ads"),
+]
+
+def create_tables_and_columns():
+    """ディメンションテーブルとキーカラムを作成"""
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            print("\n[2/5] ディメンションテーブルを作成中...")
+            for model in [AdAccount, AdCampaign, AdSet, Ad]:
+                model.__table__.create(bind=conn, checkfirst=True)
+                print(f"[2/5] ✅ {model.__tablename__}テーブルを作成しました（既に存在する場合はスキップ）")
+            
+            print("\n[3/5] campaignsテーブルにキーカラムを追加中...")
+            for col_name, ref_table in KEY_COLUMNS:
+                conn.execute(text(f"""
+                    ALTER TABLE campaigns
+                    ADD COLUMN IF NOT EXISTS {col_name} INTEGER REFERENCES {ref_table}(id);
+                """))
+                print(f"[3/5] ✅ {col_name}カラムを追加しました")
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_campaigns_account_key ON campaigns (account_key);"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_campaigns_campaign_key ON campaigns (campaign_key);"))
+            trans.commit()
+        except Exception as e:
+            trans.rollback()
+            raise e
+
+def has_name_columns() -> bool:
+    """campaignsテーブルに名前のカラムが残っているか（削除済みならバックフィルは不要）"""
+    with engine.connect() as conn:
+        return conn.execute(text("""
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'campaigns' AND column_name = 'campaign_name'
+        """)).first() is not None
+
+def backfill_keys():
+    """既存の日次レコードにディメンションキーを設定（名前の組み合わせ単位でUPDATE）"""
+    db = SessionLocal()
+    try:
+        combos = db.execute(text("""
+            SELECT DISTINCT user_id, meta_account_id, campaign_name,
+                   COALESCE(ad_set_name, '') AS ad_set_name, COALESCE(ad_name, '') AS ad_name
+            FROM campaigns
+            WHERE campaign_key IS NULL
+            ORDER BY user_id, meta_account_id
+        """)).fetchall()
+        print(f"\n[4/5] バックフィル対象の組み合わせ: {len(combos)}件")
+        
+        resolvers = {}
+        updated_total = 0
+        for idx, row in enumerate(combos):
+            resolver = resolvers.get(row.user_id)
+            if resolver is None:
+                resolver = DimensionResolver(db, row.user_id)
+                resolvers[row.user_id] = resolver
+            keys = resolver.resolve_row(
+                row.meta_account_id or None,
+                row.campaign_name,
+                row.ad_set_name or None,
+                row.ad_name or None
+            )
+            result = db.execute(text("""
+                UPDATE campaigns
+                SET account_key = :account_key, campaign_key = :campaign_key,
+                    adset_key = :adset_key, ad_key = :ad_key
+                WHERE user_id = :user_id
+                  AND meta_account_id IS NOT DISTINCT FROM :meta_account_id
+                  AND campaign_name = :campaign_name
+                  AND COALESCE(ad_set_name, '') = :ad_set_name
+                  AND COALESCE(ad_name, '') = :ad_name
+                  AND campaign_key IS NULL
+            """), {
+                **keys,
+                "user_id": row.user_id,
+                "meta_account_id": row.meta_account_id,
+                "campaign_name": row.campaign_name,
+                "ad_set_name": row.ad_set_name,
+                "ad_name": row.ad_name
+            })
+            updated_total += result.rowcount
+            if (idx + 1) % 100 == 0:
+                db.commit()
+                print(f"[4/5] {idx + 1}/{len(combos)}件処理済み（更新レコード: {updated_total}件）")
+        db.commit()
+        created = sum(r.created_count for r in resolvers.values())
+        print(f"[4/5] ✅ ディメンション{created}件を作成し、{updated_total}件のレコードを更新しました")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def drop_name_columns():
+    """キーが設定されていない行がないことを確認してから、名前のカラムを削除"""
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            print("\n[5/5] campaignsテーブルから名前のカラムを削除中...")
+            missing = conn.execute(text(
+                "SELECT COUNT(*) FROM campaigns WHERE account_key IS NULL OR campaign_key IS NULL"
+            )).scalar()
+            if missing:
+                raise RuntimeError(f"ディメンションキーが未設定の行が{missing}件あります（名前のカラムは削除しません）")
+            stage_tables = [row[0] for row in conn.execute(text(
+                "SELECT tablename FROM pg_tables WHERE schemaname = current_schema() AND tablename LIKE 'campaigns\\_stage\\_%'"
+            ))]
+            for name in stage_tables:
+                conn.execute(text(f"DROP TABLE IF EXISTS {name};"))
+            if stage_tables:
+                print(f"[5/5] 同期のステージングテーブル {len(stage_tables)} 件を削除しました")
+            conn.execute(text("ALTER TABLE campaigns ALTER COLUMN account_key SET NOT NULL;"))
+            conn.execute(text("ALTER TABLE campaigns ALTER COLUMN campaign_key SET NOT NULL;"))
+            conn.execute(text("""
+                ALTER TABLE campaigns
+                DROP COLUMN IF EXISTS campaign_name,
+                DROP COLUMN IF EXISTS ad_set_name,
+                DROP COLUMN IF EXISTS ad_name;
+            """))
+            trans.commit()
+            print("[5/5] ✅ 名前のカラムを削除しました")
+        except Exception as e:
+            trans.rollback()
+            raise e
+
+def migrate_dimension_tables():
+    print("\n[1/5] データベース接続を確認中...")
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        print("[1/5] ✅ データベース接続成功")
+        create_tables_and_columns()
+        if has_name_columns():
+            backfill_keys()
+            drop_name_columns()
+        else:
+            print("\n[4/5] ✅ 名前のカラムは既に削除されています（バックフィル・削除をスキップ）")
+        return True
+    except Exception as e:
+        print(f"\n❌ エラーが発生しました: {e}")
+        import traceback
+        print(f"\n詳細なエラー情報:")
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("データベースマイグレーション: ディメンションテーブル作成・キーのバックフィル・名前のカラム削除")
+    print("=" * 80)
+    
+    if migrate_dimension_tables():
+        print("\n✅ マイグレーション完了")
+    else:
+        print("\n❌ マイグレーション失敗")
+        sys.exit(1)
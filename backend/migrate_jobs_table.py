@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+バックグラウンドジョブのjobsテーブルを作成するスクリプト
+- jobs: ジョブのキュー（種別・優先度・状態・試行回数・開始/終了時刻）
+作成後、ワーカーを別プロセスで起動します: python -m app.worker
+"""
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)
+
+from app.database import engine
+from app.models.job import Job
+
+def migrate_jobs_table():
+    """jobsテーブルを作成"""
+    print("\n[1/2] データベース接続を確認中...")
+    try:
+        with engine.connect() as conn:
+            print("[1/2] ✅ データベース接続成功")
+            
+            # トランザクション開始
+            trans = conn.begin()
+            
+            try:
+                print("\n[2/2] jobsテーブルを作成中...")
+                Job.__table__.create(bind=conn, checkfirst=True)
+                print("[2/2] ✅ jobsテーブルを作成しました（既に存在する場合はスキップ）")
+                
+                # コミット
+                trans.commit()
+                return True
+                
+            except Exception as e:
+                trans.rollback()
+                raise e
+                
+    except Exception as e:
+        print(f"\n❌ エラーが発生しました: {e}")
+        import traceback
+        print(f"\n詳細なエラー情報:")
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("データベースマイグレーション: jobsテーブル作成")
+    print("=" * 80)
+    
+    if migrate_jobs_table():
+        print("\n✅ マイグレーション完了")
+    else:
+        print("\n❌ マイグレーション失敗")
+        sys.exit(1)
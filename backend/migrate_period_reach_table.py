@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+期間別ユニークリーチをperiod_reachテーブルへ移行するスクリプト
+- period_reachテーブルを作成（期間ごとのユニークリーチのキャッシュ）
+- campaignsテーブルの period_unique_reach / period_unique_reach_7days / period_unique_reach_30days / period_unique_reach_all を削除
+  （日次レコードごとに同じ値を重複保存していたカラム）
+移行後は POST /api/meta/update-unique-reach または再同期でキャッシュが作成されます
+"""
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)
+
+from app.database import engine
+from app.models.period_reach import PeriodReach
+from sqlalchemy import text
+
+def migrate_period_reach_table():
+    """period_reachテーブルを作成し、重複カラムを削除"""
+    print("\n[1/3] データベース接続を確認中...")
+    try:
+        with engine.connect() as conn:
+            print("[1/3] ✅ データベース接続成功")
+            
+            # トランザクション開始
+            trans = conn.begin()
+            
+            try:
+                print("\n[2/3] period_reachテーブルを作成中...")
+                PeriodReach.__table__.create(bind=conn, checkfirst=True)
+                print("[2/3] ✅ period_reachテーブルを作成しました（既に存在する場合はスキップ）")
+                
+                columns_to_drop = [
+                    "period_unique_reach",
+                    "period_unique_reach_7days",
+                    "period_unique_reach_30days",
+                    "period_unique_reach_all"
+                ]
+                
+                for col_name in columns_to_drop:
+                    print(f"\n[3/3] {col_name}カラムを削除中...")
+                    conn.execute(text(f"ALTER TABLE campaigns DROP COLUMN IF EXISTS {col_name};"))
+                    print(f"[3/3] ✅ {col_name}カラムを削除しました")
+                
+                # コミット
+                trans.commit()
+                print("\n✅ マイグレーション完了")
+                return True
+                
+            except Exception as e:
+                trans.rollback()
+                raise e
+                
+    except Exception as e:
+        print(f"\n❌ エラーが発生しました: {e}")
+        import traceback
+        print(f"\n詳細なエラー情報:")
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("データベースマイグレーション: period_reachテーブル作成・period_unique_reachカラム削除")
+    print("=" * 80)
+    
+    if migrate_period_reach_table():
+        print("\n✅ マイグレーション完了")
+    else:
+        print("\n❌ マイグレーション失敗")
+        sys.exit(1)
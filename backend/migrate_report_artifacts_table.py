@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+生成済みレポートのキャッシュ（report_artifactsテーブル）を作成するスクリプト
+- report_artifacts: reportジョブが生成したPDF・Excel・CSV（キャッシュのキー・内容・有効期限）
+期限切れのレポートはワーカー（python -m app.worker）が定期的に削除します
+"""
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)
+
+from app.database import engine
+from app.models.report_artifact import ReportArtifact
+
+def migrate_report_artifacts_table():
+    """report_artifactsテーブルを作成"""
+    print("\n[1/2] データベース接続を確認中...")
+    try:
+        with engine.connect() as conn:
+            print("[1/2] ✅ データベース接続成功")
+            
+            # トランザクション開始
+            trans = conn.begin()
+            
+            try:
+                print("\n[2/2] report_artifactsテーブルを作成中...")
+                ReportArtifact.__table__.create(bind=conn, checkfirst=True)
+                print("[2/2] ✅ report_artifactsテーブルを作成しました（既に存在する場合はスキップ）")
+                
+                # コミット
+                trans.commit()
+                return True
+                
+            except Exception as e:
+                trans.rollback()
+                raise e
+                
+    except Exception as e:
+        print(f"\n❌ エラーが発生しました: {e}")
+        import traceback
+        print(f"\n詳細なエラー情報:")
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("データベースマイグレーション: report_artifactsテーブル作成")
+    print("=" * 80)
+    
+    if migrate_report_artifacts_table():
+        print("\n✅ マイグレーション完了")
+    else:
+        print("\n❌ マイグレーション失敗")
+        sys.exit(1)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Meta同期の実行にプランの制限の記録カラムを追加するスクリプト
+- sync_runs.plan_limits: プランの制限で取得しなかった内容（スキップしたレベル・広告セット数の上限）
+NULLの場合は制限なし（PROプラン、またはこのカラム追加前の実行）です
+"""
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)
+
+from app.database import engine
+from sqlalchemy import text
+
+def migrate_sync_runs_plan_limits():
+    """plan_limitsカラムを追加"""
+    print("\n[1/2] データベース接続を確認中...")
+    try:
+        with engine.connect() as conn:
+            print("[1/2] ✅ データベース接続成功")
+            
+            # トランザクション開始
+            trans = conn.begin()
+            
+            try:
+                print("\n[2/2] sync_runs.plan_limitsカラムを追加中...")
+                conn.execute(text("ALTER TABLE sync_runs ADD COLUMN IF NOT EXISTS plan_limits JSON;"))
+                print("[2/2] ✅ plan_limitsカラムを追加しました（既に存在する場合はスキップ）")
+                
+                # コミット
+                trans.commit()
+                return True
+                
+            except Exception as e:
+                trans.rollback()
+                raise e
+                
+    except Exception as e:
+        print(f"\n❌ エラーが発生しました: {e}")
+        import traceback
+        print(f"\n詳細なエラー情報:")
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("データベースマイグレーション: sync_runs.plan_limits カラム追加")
+    print("=" * 80)
+    
+    if migrate_sync_runs_plan_limits():
+        print("\n✅ マイグレーション完了")
+    else:
+        print("\n❌ マイグレーション失敗")
+        sys.exit(1)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Meta同期の再開方法を変更するスクリプト
+- sync_runs.requested_days: 同期の指定（取得日数、NULLは全期間）。再開する実行の照合に使う（期間の終了日は日付が変わるとずれるため）
+- sync_runs.staging_table: チェックポイント済みのバッチの行を書き込んだステージングテーブル
+- sync_checkpoints.insights を削除（取得データはチェックポイントではなくステージングテーブルに1回だけ書き込む）
+既存のチェックポイントは取得データをinsightsカラムにのみ持っているため削除します（未完了の実行は次回の同期で最初から取得）
+"""
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)
+
+from app.database import engine
+from sqlalchemy import text
+
+def migrate_sync_runs_resume():
+    """requested_days・staging_tableカラムを追加し、チェックポイントのinsightsカラムを削除"""
+    print("\n[1/4] データベース接続を確認中...")
+    try:
+        with engine.connect() as conn:
+            print("[1/4] ✅ データベース接続成功")
+
+            # トランザクション開始
+            trans = conn.begin()
+
+            try:
+                print("\n[2/4] sync_runsにrequested_days・staging_tableカラムを追加中...")
+                conn.execute(text("ALTER TABLE sync_runs ADD COLUMN IF NOT EXISTS requested_days INTEGER;"))
+                conn.execute(text("ALTER TABLE sync_runs ADD COLUMN IF NOT EXISTS staging_table VARCHAR(63);"))
+                print("[2/4] ✅ カラムを追加しました（既に存在する場合はスキップ）")
+
+                print("\n[3/4] 再開の照合用のインデックスを作り直し中...")
+                conn.execute(text("DROP INDEX IF EXISTS ix_sync_runs_lookup;"))
+                conn.execute(text("""
+                    CREATE INDEX IF NOT EXISTS ix_sync_runs_lookup
+                    ON sync_runs (user_id, meta_account_id, requested_days, status);
+                """))
+                print("[3/4] ✅ ix_sync_runs_lookup を作成しました")
+
+                print("\n[4/4] sync_checkpoints.insightsカラムを削除中...")
+                result = conn.execute(text("""
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_name = 'sync_checkpoints' AND column_name = 'insights'
+                """))
+                if result.first():
+                    deleted = conn.execute(text("DELETE FROM sync_checkpoints;")).rowcount
+                    print(f"[4/4] 既存のチェックポイント {deleted} 件を削除しました")
+                    conn.execute(text("ALTER TABLE sync_checkpoints DROP COLUMN insights;"))
+                    print("[4/4] ✅ insightsカラムを削除しました")
+                else:
+                    print("[4/4] ✅ insightsカラムは既に削除されています（スキップ）")
+
+                # コミット
+                trans.commit()
+                return True
+
+            except Exception as e:
+                trans.rollback()
+                raise e
+
+    except Exception as e:
+        print(f"\n❌ エラーが発生しました: {e}")
+        import traceback
+        print(f"\n詳細なエラー情報:")
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("データベースマイグレーション: Meta同期の再開（取得日数での照合・ステージングの再利用）")
+    print("=" * 80)
+
+    if migrate_sync_runs_resume():
+        print("\n✅ マイグレーション完了")
+    else:
+        print("\n❌ マイグレーション失敗")
+        sys.exit(1)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Meta同期の再開用テーブルを作成するスクリプト
+- sync_runs: 同期の実行（アカウント・期間・状態・試行回数）
+- sync_checkpoints: 完了済みのバッチ（レベル, バッチ, 期間）と取得データ
+失敗した同期を再実行すると、完了済みのバッチは再取得せずに再開します
+"""
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)
+
+from app.database import engine
+from app.models.sync_run import SyncRun, SyncCheckpoint
+
+def migrate_sync_runs_tables():
+    """sync_runs / sync_checkpointsテーブルを作成"""
+    print("\n[1/3] データベース接続を確認中...")
+    try:
+        with engine.connect() as conn:
+            print("[1/3] ✅ データベース接続成功")
+            
+            # トランザクション開始
+            trans = conn.begin()
+            
+            try:
+                print("\n[2/3] sync_runsテーブルを作成中...")
+                SyncRun.__table__.create(bind=conn, checkfirst=True)
+                print("[2/3] ✅ sync_runsテーブルを作成しました（既に存在する場合はスキップ）")
+                
+                print("\n[3/3] sync_checkpointsテーブルを作成中...")
+                SyncCheckpoint.__table__.create(bind=conn, checkfirst=True)
+                print("[3/3] ✅ sync_checkpointsテーブルを作成しました（既に存在する場合はスキップ）")
+                
+                # コミット
+                trans.commit()
+                return True
+                
+            except Exception as e:
+                trans.rollback()
+                raise e
+                
+    except Exception as e:
+        print(f"\n❌ エラーが発生しました: {e}")
+        import traceback
+        print(f"\n詳細なエラー情報:")
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("データベースマイグレーション: sync_runs / sync_checkpointsテーブル作成")
+    print("=" * 80)
+    
+    if migrate_sync_runs_tables():
+        print("\n✅ マイグレーション完了")
+    else:
+        print("\n❌ マイグレーション失敗")
+        sys.exit(1)
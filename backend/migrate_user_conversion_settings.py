@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+ユーザーごとのコンバージョン設定のカラムを追加するスクリプト
+- users.conversion_action_types: Meta同期でコンバージョンとしてカウントするアクションタイプ（優先順位順）
+NULLの場合は既定の優先順位（購入 > 登録 > リード）で集計されます
+"""
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)
+
+from app.database import engine
+from sqlalchemy import text
+
+def migrate_user_conversion_settings():
+    """conversion_action_typesカラムを追加"""
+    print("\n[1/2] データベース接続を確認中...")
+    try:
+        with engine.connect() as conn:
+            print("[1/2] ✅ データベース接続成功")
+            
+            # トランザクション開始
+            trans = conn.begin()
+            
+            try:
+                print("\n[2/2] users.conversion_action_typesカラムを追加中...")
+                conn.execute(text("ALTER TABLE users ADD COLUMN IF NOT EXISTS conversion_action_types JSON;"))
+                print("[2/2] ✅ conversion_action_typesカラムを追加しました（既に存在する場合はスキップ）")
+                
+                # コミット
+                trans.commit()
+                return True
+                
+            except Exception as e:
+                trans.rollback()
+                raise e
+                
+    except Exception as e:
+        print(f"\n❌ エラーが発生しました: {e}")
+        import traceback
+        print(f"\n詳細なエラー情報:")
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("データベースマイグレーション: users.conversion_action_types カラム追加")
+    print("=" * 80)
+    
+    if migrate_user_conversion_settings():
+        print("\n✅ マイグレーション完了")
+    else:
+        print("\n❌ マイグレーション失敗")
+        sys.exit(1)
@@ -1,17 +1,171 @@
 #!/usr/bin/env python3
-"""Railway用のサーバー起動スクリプト"""
+"""
+Railway用のサーバー起動スクリプト
+- テーブルの作成・パーティション管理をワーカーの起動前に1回だけ実行（各ワーカーでは実行しない）
+- WEB_WORKERS（0: 本番はコンテナのCPUクォータ、最大 WEB_WORKERS_MAX）のプロセスでuvicornを起動
+- DB_CONNECTION_BUDGET をWeb・ジョブワーカーのプロセス数で割り、各プロセスの接続プールのサイズを決める
+- JOB_WORKER_PROCESSES（既定1）のジョブワーカー（python -m app.worker）を子プロセスとして起動し、
+  終了した場合は再起動する（アップロード・分析・Meta同期・レポートのジョブはワーカーがないと実行されない）
+  ワーカーを別のRailwayサービスで起動する場合は JOB_WORKER_PROCESSES=0 にする
+- 停止時は SHUTDOWN_GRACE_SECONDS まで実行中のリクエスト・ジョブの終了を待つ
+"""
+import math
 import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Optional, Tuple
 import uvicorn
 
+# ジョブワーカーが終了した場合に再起動するまでの待ち時間（秒）
+JOB_WORKER_RESTART_DELAY = 5.0
+
+def get_cpu_quota() -> Optional[int]:
+    """コンテナのCPUクォータ（cgroup v2 の cpu.max / v1 の cpu.cfs_quota_us）。制限がない場合はNone"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            return max(1, math.ceil(int(quota) / int(period)))
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return max(1, math.ceil(quota / period))
+    except (OSError, ValueError):
+        pass
+    return None
+
+def get_web_workers() -> int:
+    """
+    Webワーカーのプロセス数（DB接続プール・認証キャッシュ・bcryptプールはワーカーごとに作られる）
+    sched_getaffinity / cpu_count はホストのCPU数を返すため、コンテナのCPUクォータがあればそれを優先し、WEB_WORKERS_MAX までにする
+    """
+    from app.config import settings
+    if settings.WEB_WORKERS > 0:
+        return settings.WEB_WORKERS
+    if not settings.is_production:
+        return 1
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = get_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, quota)
+    return max(1, min(cpus, settings.WEB_WORKERS_MAX))
+
+def get_db_pool_limits(processes: int, reserved: int = 0) -> Tuple[int, int]:
+    """
+    プロセスごとの (pool_size, max_overflow)
+    全プロセスの最大接続数（pool_size + max_overflow の合計）+ プール外の接続数（reserved）が
+    DB_CONNECTION_BUDGET を超えないように縮小する
+    """
+    from app.config import settings
+    pool_size, max_overflow = settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW
+    if settings.DB_CONNECTION_BUDGET <= 0:
+        return pool_size, max_overflow
+    budget = settings.DB_CONNECTION_BUDGET - reserved
+    if (pool_size + max_overflow) * processes <= budget:
+        return pool_size, max_overflow
+    per_process = max(2, budget // processes)
+    pool_size = max(1, min(pool_size, per_process // 2))
+    return pool_size, max(0, min(max_overflow, per_process - pool_size))
+
+class JobWorkerSupervisor:
+    """ジョブワーカー（python -m app.worker）の子プロセスを起動し、終了したら再起動する"""
+
+    def __init__(self, processes: int):
+        self.processes = processes
+        self.children = [None] * processes
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.supervise, name="job-worker-supervisor", daemon=True)
+
+    def spawn(self, index: int):
+        backend_dir = os.path.dirname(os.path.abspath(__file__))
+        self.children[index] = subprocess.Popen([sys.executable, "-m", "app.worker"], cwd=backend_dir)
+        print(f"[Server] Started job worker #{index + 1} (pid {self.children[index].pid})")
+
+    def start(self):
+        for index in range(self.processes):
+            self.spawn(index)
+        self.thread.start()
+
+    def supervise(self):
+        while not self.stopping.wait(JOB_WORKER_RESTART_DELAY):
+            for index, child in enumerate(self.children):
+                if child.poll() is not None and not self.stopping.is_set():
+                    print(f"[Server] ⚠️ Job worker #{index + 1} exited with code {child.returncode}, restarting...")
+                    self.spawn(index)
+
+    def stop(self, timeout: float):
+        """SIGTERMで停止を要求し、実行中のジョブの終了を timeout 秒まで待つ"""
+        self.stopping.set()
+        for child in self.children:
+            if child.poll() is None:
+                child.terminate()
+        deadline = time.monotonic() + timeout
+        for index, child in enumerate(self.children):
+            try:
+                child.wait(timeout=max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                print(f"[Server] ⚠️ Job worker #{index + 1} did not stop in {timeout}s, killing")
+                child.kill()
+                child.wait()
+
 if __name__ == "__main__":
+    from app.config import settings
+    from app.db_migrate import migrate
+
     # 環境変数PORTからポート番号を取得（デフォルトは8000）
     port = int(os.environ.get("PORT", 8000))
     
-    # uvicornでアプリケーションを起動
-    uvicorn.run(
-        "app.main:app",
-        host="0.0.0.0",
-        port=port,
-        log_level="info"
+    if not migrate():
+        sys.exit(1)
+    # このプロセスはリクエストを処理しないため、マイグレーションで使った接続を閉じる
+    from app.database import engine
+    engine.dispose()
+    # ワーカープロセスでは起動時のマイグレーションを行わない（環境変数は子プロセスに引き継がれる）
+    os.environ["DB_MIGRATE_ON_STARTUP"] = "false"
+    
+    # Webプロセス内のワーカーと二重に起動しない
+    job_workers = 0 if settings.JOBS_RUN_IN_PROCESS else max(0, settings.JOB_WORKER_PROCESSES)
+    workers = get_web_workers()
+    
+    # DB接続数の予算をプロセスに配分（環境変数は子プロセスに引き継がれる）
+    # Webワーカーはプール外に認証キャッシュの LISTEN 用の接続を1本ずつ使う
+    pool_size, max_overflow = get_db_pool_limits(workers + job_workers, reserved=workers)
+    os.environ["DB_POOL_SIZE"] = str(pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = str(max_overflow)
+    print(
+        f"[Server] DB connections: {workers + job_workers} process(es) x (pool {pool_size} + overflow {max_overflow}) + {workers} listener(s)"
+        f" = up to {(workers + job_workers) * (pool_size + max_overflow) + workers} (budget: {settings.DB_CONNECTION_BUDGET or 'unlimited'})"
     )
-
+    supervisor = JobWorkerSupervisor(job_workers)
+    if job_workers:
+        supervisor.start()
+    elif not settings.JOBS_RUN_IN_PROCESS:
+        print("[Server] ⚠️ No job worker in this service: run python -m app.worker separately or jobs will stay queued")
+    
+    print(f"[Server] Starting {workers} worker(s) on port {port} (graceful shutdown: {settings.SHUTDOWN_GRACE_SECONDS}s)")
+    
+    
+    # uvicornでアプリケーションを起動（停止シグナルを受けるとリクエストの終了を待ってから戻る）
+    try:
+        uvicorn.run(
+            "app.main:app",
+            host="0.0.0.0",
+            port=port,
+            workers=workers,
+            timeout_graceful_shutdown=settings.SHUTDOWN_GRACE_SECONDS,
+            log_level="info"
+        )
+    finally:
+        if job_workers:
+            supervisor.stop(settings.SHUTDOWN_GRACE_SECONDS)
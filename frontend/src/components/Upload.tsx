@@ -162,6 +162,7 @@ export const Upload: React.FC<UploadProps> = ({ onUploadComplete }) => {
     setError(null);
     
     try {
+      // サーバーでの解析・保存（ジョブ）の完了まで待つ。CSVの形式エラーなどはジョブのエラーとして返る
       const result = await Api.uploadFile(file);
       
       if (!result.success) {
@@ -171,7 +172,7 @@ export const Upload: React.FC<UploadProps> = ({ onUploadComplete }) => {
       setRecordCount(result.rows);
       setSuccess(true);
       
-      // Fetch campaign data after upload
+      // Fetch campaign data after the upload job has finished
       try {
         const data = await Api.fetchCampaignData();
       setTimeout(() => {
@@ -1950,7 +1950,9 @@ class ApiClient {
       throw new Error(errorMessage);
     }
 
-    const result = await response.json();
+    // 解析・保存はサーバーのジョブで実行される。完了を待ってから結果（件数・期間）を返す
+    const accepted = await response.json();
+    const result = await this.waitForJob(accepted.job_id, 'ファイルの処理中にエラーが発生しました。');
     return {
       success: true,
       rows: result.row_count,
@@ -1962,6 +1964,35 @@ class ApiClient {
     };
   }
 
+  // バックグラウンドジョブの完了を待ち、結果を返す（失敗・キャンセル時はジョブのエラーメッセージで例外）
+  private async waitForJob(jobId: string, failureMessage: string, maxAttempts = 150): Promise<any> {
+    // Poll every 2 seconds for up to 5 minutes
+    for (let i = 0; i < maxAttempts; i++) {
+      const response = await fetch(`${this.baseURL}/jobs/${jobId}`, {
+        credentials: 'include',  // CORS credentials をサポート
+        headers: this.getHeaders(),
+      });
+
+      if (!response.ok) {
+        // 401エラーは統一処理
+        if (response.status === 401) {
+          this.handle401Error(response);
+        }
+        throw new Error(`ジョブの状態の取得に失敗しました: ${response.status}`);
+      }
+
+      const job = await response.json();
+      if (job.status === 'completed') {
+        return job.result || {};
+      } else if (job.status === 'failed' || job.status === 'cancelled') {
+        throw new Error(job.error_message || failureMessage);
+      }
+
+      await new Promise(resolve => setTimeout(resolve, 2000));
+    }
+    throw new Error('処理がタイムアウトしました。しばらくしてからアップロード履歴をご確認ください。');
+  }
+
   async getUploads() {
     const response = await fetch(`${this.baseURL}/uploads/`, {
       credentials: 'include',  // CORS credentials をサポート
@@ -2074,14 +2105,24 @@ class ApiClient {
     throw new Error('分析がタイムアウトしました。しばらくしてから再度お試しください。');
   }
 
-  async downloadPDFReport(analysisId: string) {
-    const response = await fetch(
-      `${this.baseURL}/reports/pdf/${analysisId}/`,
-      { 
+  // レポートはサーバーのジョブで生成される。生成中（202）の間は Retry-After の間隔で再取得する
+  private async fetchReport(url: string, maxAttempts = 40): Promise<Response> {
+    for (let i = 0; i < maxAttempts; i++) {
+      const response = await fetch(url, {
         credentials: 'include',  // CORS credentials をサポート
-        headers: this.getHeaders() 
+        headers: this.getHeaders(),
+      });
+      if (response.status !== 202) {
+        return response;
       }
-    );
+      const retryAfter = Number(response.headers.get('Retry-After')) || 3;
+      await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+    }
+    throw new Error('レポートの生成がタイムアウトしました。しばらくしてから再度お試しください。');
+  }
+
+  async downloadPDFReport(analysisId: string) {
+    const response = await this.fetchReport(`${this.baseURL}/reports/pdf/${analysisId}/`);
     
     if (!response.ok) throw new Error('PDFの生成に失敗しました');
     
@@ -2101,13 +2142,7 @@ class ApiClient {
     if (startDate) params.append('start_date', startDate);
     if (endDate) params.append('end_date', endDate);
     
-    const response = await fetch(
-      `${this.baseURL}/reports/excel/?${params}`,
-      { 
-        credentials: 'include',  // CORS credentials をサポート
-        headers: this.getHeaders() 
-      }
-    );
+    const response = await this.fetchReport(`${this.baseURL}/reports/excel/?${params}`);
     
     if (!response.ok) throw new Error('Excelの生成に失敗しました');
     
@@ -2128,13 +2163,7 @@ class ApiClient {
     if (startDate) params.append('start_date', startDate);
     if (endDate) params.append('end_date', endDate);
     
-    const response = await fetch(
-      `${this.baseURL}/reports/csv/?${params}`,
-      { 
-        credentials: 'include',  // CORS credentials をサポート
-        headers: this.getHeaders() 
-      }
-    );
+    const response = await this.fetchReport(`${this.baseURL}/reports/csv/?${params}`);
     
     if (!response.ok) throw new Error('CSVの生成に失敗しました');
     